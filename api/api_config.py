@@ -0,0 +1,105 @@
+"""
+Configuration for the DM3K API
+
+Every setting can be overridden with an environment variable of the same name.
+"""
+
+import os
+
+
+def _env_bool(name, default):
+    return str(os.environ.get(name, default)).lower() in ("1", "true", "yes", "on")
+
+
+# --- result cache (see optimizer.util.result_cache) ---
+# set DM3K_CACHE_ENABLED=0 to turn the cache off
+DM3K_CACHE_ENABLED = _env_bool("DM3K_CACHE_ENABLED", True)
+# directory of the on-disk tier, which is shared by all uwsgi workers
+DM3K_CACHE_DIR = os.environ.get("DM3K_CACHE_DIR", "/tmp/dm3k_cache")
+DM3K_CACHE_MEMORY_MB = float(os.environ.get("DM3K_CACHE_MEMORY_MB", 64))
+DM3K_CACHE_DISK_MB = float(os.environ.get("DM3K_CACHE_DISK_MB", 1024))
+DM3K_CACHE_TTL_SEC = float(os.environ.get("DM3K_CACHE_TTL_SEC", 3600))
+
+# --- single-flight coalescing of identical solves (see optimizer.util.single_flight) ---
+DM3K_SINGLE_FLIGHT_ENABLED = _env_bool("DM3K_SINGLE_FLIGHT_ENABLED", True)
+# directory of the lock and result files, which must be shared by all uwsgi workers
+DM3K_SINGLE_FLIGHT_DIR = os.environ.get("DM3K_SINGLE_FLIGHT_DIR", "/tmp/dm3k_single_flight")
+# max time that a request waits for an identical solve in flight before solving on its own
+DM3K_SINGLE_FLIGHT_TIMEOUT_SEC = float(os.environ.get("DM3K_SINGLE_FLIGHT_TIMEOUT_SEC", 600))
+
+# --- batch solves (see optimizer.util.batch) ---
+# number of worker processes used to solve a batch (0 = number of cores)
+DM3K_BATCH_MAX_WORKERS = int(os.environ.get("DM3K_BATCH_MAX_WORKERS", 0))
+# python that runs the worker processes ("" = the python of the API, see optimizer.util.batch.python_executable)
+DM3K_BATCH_PYTHON = os.environ.get("DM3K_BATCH_PYTHON", "")
+# directory of stored datasets that batch items can refer to with "datasetRef"
+DM3K_DATASET_DIR = os.environ.get("DM3K_DATASET_DIR", os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "examples"))
+
+# --- transport (see optimizer.util.codec) ---
+# JSON codec used to decode requests and encode responses ("auto" = orjson if it is installed, else json)
+DM3K_JSON_CODEC = os.environ.get("DM3K_JSON_CODEC", "auto")
+# responses smaller than this are not compressed
+DM3K_COMPRESS_MIN_BYTES = int(os.environ.get("DM3K_COMPRESS_MIN_BYTES", 1024))
+# max size of a (decompressed) request body
+DM3K_MAX_REQUEST_BYTES = int(float(os.environ.get("DM3K_MAX_REQUEST_MB", 512)) * 2 ** 20)
+
+# --- metrics (see optimizer.util.metrics and GET /api/metrics) ---
+# directory of the metrics files of the uwsgi workers, which must be shared by all workers (clear it when the server starts)
+DM3K_METRICS_DIR = os.environ.get("DM3K_METRICS_DIR", "/tmp/dm3k_metrics")
+
+# --- startup (see optimizer.util.preload) ---
+# set DM3K_PRELOAD=1 to import and warm up the optimizers when the app is loaded...in the uwsgi master (see app.ini), so the
+# forked workers share them.  Otherwise pyomo and pandas are imported by the first solve of each worker
+DM3K_PRELOAD = _env_bool("DM3K_PRELOAD", False)
+# comma separated <dataset>:<optimizer> pairs (datasets in DM3K_DATASET_DIR) that are solved to warm up the optimizers
+DM3K_WARM_UP_DATASETS = os.environ.get("DM3K_WARM_UP_DATASETS", "simpleKnapsack:KnapsackViz,AlienWorldDomination_wShip:FullHouseViz")
+
+# --- admission control (see optimizer.util.admission) ---
+# set DM3K_ADMISSION_ENABLED=0 to solve every problem, whatever its size
+DM3K_ADMISSION_ENABLED = _env_bool("DM3K_ADMISSION_ENABLED", True)
+# directory of the slot files of large problems, which must be shared by all uwsgi workers
+DM3K_ADMISSION_DIR = os.environ.get("DM3K_ADMISSION_DIR", "/tmp/dm3k_admission")
+# problems whose estimated model is over these limits are rejected (0 = no limit)
+DM3K_ADMISSION_MAX_NONZEROS = int(os.environ.get("DM3K_ADMISSION_MAX_NONZEROS", 2000000))
+DM3K_ADMISSION_MAX_MEMORY_MB = float(os.environ.get("DM3K_ADMISSION_MAX_MEMORY_MB", 1024))
+# problems over these limits are large...they are solved in heuristic mode, DM3K_ADMISSION_LARGE_SLOTS at a time (0 = no limit)
+DM3K_ADMISSION_LARGE_NONZEROS = int(os.environ.get("DM3K_ADMISSION_LARGE_NONZEROS", 200000))
+DM3K_ADMISSION_LARGE_MEMORY_MB = float(os.environ.get("DM3K_ADMISSION_LARGE_MEMORY_MB", 0))
+DM3K_ADMISSION_LARGE_SLOTS = int(os.environ.get("DM3K_ADMISSION_LARGE_SLOTS", 1))
+# max time a large problem waits for a slot before it is turned away
+DM3K_ADMISSION_QUEUE_TIMEOUT_SEC = float(os.environ.get("DM3K_ADMISSION_QUEUE_TIMEOUT_SEC", 60))
+# heuristic mode: the solver stops at this relative mipgap or time limit and returns its best solution so far
+DM3K_HEURISTIC_MIPGAP = float(os.environ.get("DM3K_HEURISTIC_MIPGAP", 0.05))
+DM3K_HEURISTIC_TIMEOUT_SEC = int(os.environ.get("DM3K_HEURISTIC_TIMEOUT_SEC", 120))
+
+# --- progress of solves (see optimizer.util.progress) ---
+# directory of the progress files, which must be shared by all uwsgi workers
+DM3K_PROGRESS_DIR = os.environ.get("DM3K_PROGRESS_DIR", "/tmp/dm3k_progress")
+# max time a progress stream waits for its solve to start
+DM3K_PROGRESS_WAIT_SEC = float(os.environ.get("DM3K_PROGRESS_WAIT_SEC", 60))
+# a progress stream sends a comment when there were no events for this long, so proxies keep the connection open
+DM3K_PROGRESS_KEEPALIVE_SEC = float(os.environ.get("DM3K_PROGRESS_KEEPALIVE_SEC", 15))
+
+# --- deadlines (see optimizer.util.deadline) ---
+# seconds a request may take when it does not set its own deadline (X-Deadline-Sec header or deadlineSec), and the max
+# deadline a request may set...keep them below the uwsgi_read_timeout of nginx (/nginx/nginx.conf)
+DM3K_DEFAULT_DEADLINE_SEC = float(os.environ.get("DM3K_DEFAULT_DEADLINE_SEC", 300))
+DM3K_MAX_DEADLINE_SEC = float(os.environ.get("DM3K_MAX_DEADLINE_SEC", 900))
+
+# --- profiling of solves (see optimizer.util.profiling) ---
+# set DM3K_PROFILE_ENABLED=0 to ignore requests to profile a solve (the X-Profile header or "profile")
+DM3K_PROFILE_ENABLED = _env_bool("DM3K_PROFILE_ENABLED", True)
+# directory of the profiles, which must be shared by all uwsgi workers...only the latest DM3K_PROFILE_MAX_COUNT are kept
+DM3K_PROFILE_DIR = os.environ.get("DM3K_PROFILE_DIR", "/tmp/dm3k_profiles")
+DM3K_PROFILE_MAX_COUNT = int(os.environ.get("DM3K_PROFILE_MAX_COUNT", 20))
+
+# --- capture of requests for replay (see optimizer.util.capture and tests/benchmarks/replay.py) ---
+# share of the POST /api/vizdata requests that are captured with their timings (0 = off, 1 = every request)
+DM3K_CAPTURE_RATE = float(os.environ.get("DM3K_CAPTURE_RATE", 0))
+# directory of the captures, which must be shared by all uwsgi workers...only the latest DM3K_CAPTURE_MAX_COUNT are kept
+DM3K_CAPTURE_DIR = os.environ.get("DM3K_CAPTURE_DIR", "/tmp/dm3k_captures")
+DM3K_CAPTURE_MAX_COUNT = int(os.environ.get("DM3K_CAPTURE_MAX_COUNT", 1000))
+# replace the instance names of the captured problems with a keyed hash (set DM3K_CAPTURE_SALT to a secret, so the names
+# can not be guessed back...the same salt gives the same names)
+DM3K_CAPTURE_ANONYMIZE = _env_bool("DM3K_CAPTURE_ANONYMIZE", True)
+DM3K_CAPTURE_SALT = os.environ.get("DM3K_CAPTURE_SALT", "")
@@ -7,10 +7,15 @@ import argparse
 import logging
 import os
 
+import api_config
 from flask import Flask
 from flask_cors import CORS
 from views import api
 
+# (views puts the app directory on the path)
+from optimizer.util.batch import load_dataset_ref
+from optimizer.util.preload import preload
+
 app = Flask(__name__)
 CORS(app)
 app.register_blueprint(api)
@@ -37,6 +42,16 @@ logging.basicConfig(
 log = logging.getLogger()
 log.debug("Debug Logging ON")
 
+if api_config.DM3K_PRELOAD:
+    warm_up_inputs = []
+    for pair in filter(None, api_config.DM3K_WARM_UP_DATASETS.split(",")):
+        dataset_ref, _, optimizer_name = pair.partition(":")
+        try:
+            warm_up_inputs.append((optimizer_name or None, load_dataset_ref(dataset_ref.strip(), api_config.DM3K_DATASET_DIR)))
+        except ValueError as e:
+            log.warning("Unable to load warm up dataset: %s", e)
+    preload(warm_up_inputs)
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--debug", action="store_true")
@@ -4,21 +4,333 @@ API Endpoints for DM3K API
 
 import os
 import sys
+import time
 
-from flask import Blueprint
+from flask import Blueprint, Response
 from flask import current_app as app
-from flask import jsonify, request
+from flask import g, request, send_file, stream_with_context
 
 # ensure that optimizer directory is in path
 app_directory = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..")
 if app_directory not in sys.path:
     sys.path.append(app_directory)
 
-from optimizer.slim_optimizer_main import algorithm_dict  # noqa: E402
-from optimizer.slim_optimizer_main import create_opt  # noqa: E402
+import api_config  # noqa: E402
+
+from optimizer.slim_optimizer_validate import estimate_input_size, input_class_dict, validate_input  # noqa: E402
+from optimizer.slim_output_base import TRACE_KEY, VALUE_KEY, iter_trace_columns, select_fields  # noqa: E402
+from optimizer.util.admission import ADMIT, LARGE, REJECT, AdmissionControl, add_memory_estimate  # noqa: E402
+from optimizer.util.batch import cancelled_response, check_item, load_dataset_ref, set_python_executable, solve_batch  # noqa: E402
+from optimizer.util.cancel import Cancelled  # noqa: E402
+from optimizer.util.capture import RequestCapture  # noqa: E402
+from optimizer.util.codec import PayloadTooLargeError, StreamCompressor, choose_encoding, compress, decompress, get_codec  # noqa: E402
+from optimizer.util.deadline import Deadline, DisconnectWatcher  # noqa: E402
+from optimizer.util.history_pattern import HistoryManager  # noqa: E402
+from optimizer.util.metrics import MetricsRegistry  # noqa: E402
+from optimizer.util.metrics import MEMORY_MB_BUCKETS, PROMETHEUS_CONTENT_TYPE, SIZE_BUCKETS, count_solver_processes  # noqa: E402
+from optimizer.util.profiling import COLLAPSED_FILE, SUMMARY_FILE, ProfileStore  # noqa: E402
+from optimizer.util.progress import ProgressBoard  # noqa: E402
+from optimizer.util.result_cache import ResultCache, problem_key  # noqa: E402
+from optimizer.util.scenario import solve_scenarios  # noqa: E402
+from optimizer.util.single_flight import SingleFlight  # noqa: E402
 
 api = Blueprint("api", __name__)
 
+NDJSON_MIMETYPE = "application/x-ndjson"
+SSE_MIMETYPE = "text/event-stream"
+# number of full_trace rows sent per chunk of a streamed response
+STREAM_CHUNK_ROWS = 1000
+
+result_cache = ResultCache(
+    cache_dir=api_config.DM3K_CACHE_DIR,
+    max_memory_bytes=int(api_config.DM3K_CACHE_MEMORY_MB * 2 ** 20),
+    max_disk_bytes=int(api_config.DM3K_CACHE_DISK_MB * 2 ** 20),
+    ttl_sec=api_config.DM3K_CACHE_TTL_SEC,
+)
+
+single_flight = SingleFlight(api_config.DM3K_SINGLE_FLIGHT_DIR, wait_timeout_sec=api_config.DM3K_SINGLE_FLIGHT_TIMEOUT_SEC)
+
+codec = get_codec(api_config.DM3K_JSON_CODEC)
+
+progress_board = ProgressBoard(api_config.DM3K_PROGRESS_DIR)
+
+if api_config.DM3K_BATCH_PYTHON:
+    set_python_executable(api_config.DM3K_BATCH_PYTHON)
+
+profile_store = ProfileStore(api_config.DM3K_PROFILE_DIR, max_profiles=api_config.DM3K_PROFILE_MAX_COUNT)
+
+request_capture = RequestCapture(
+    api_config.DM3K_CAPTURE_DIR,
+    sample_rate=api_config.DM3K_CAPTURE_RATE,
+    anonymize=api_config.DM3K_CAPTURE_ANONYMIZE,
+    salt=api_config.DM3K_CAPTURE_SALT,
+    max_captures=api_config.DM3K_CAPTURE_MAX_COUNT,
+)
+
+admission = AdmissionControl(
+    api_config.DM3K_ADMISSION_DIR,
+    max_size={"nonzeros": api_config.DM3K_ADMISSION_MAX_NONZEROS, "memory_mb": api_config.DM3K_ADMISSION_MAX_MEMORY_MB},
+    large_size={"nonzeros": api_config.DM3K_ADMISSION_LARGE_NONZEROS, "memory_mb": api_config.DM3K_ADMISSION_LARGE_MEMORY_MB},
+    large_slots=api_config.DM3K_ADMISSION_LARGE_SLOTS,
+    queue_timeout_sec=api_config.DM3K_ADMISSION_QUEUE_TIMEOUT_SEC,
+)
+# solve options of large problems (see optimizer.util.admission)
+HEURISTIC_SOLVE_KWARGS = {"mipgap": api_config.DM3K_HEURISTIC_MIPGAP, "timeout": api_config.DM3K_HEURISTIC_TIMEOUT_SEC}
+# the termination condition of a solve whose result is cached and shared (see _reusable)
+OPTIMAL_TERMINATION = "optimal"
+
+metrics = MetricsRegistry(api_config.DM3K_METRICS_DIR)
+metrics.counter("dm3k_requests_total", "Requests by endpoint and statusCode")
+metrics.histogram("dm3k_request_duration_seconds", "Time to answer a request (including streaming the response)")
+metrics.gauge("dm3k_requests_in_progress", "Requests being answered (or waiting for a worker thread)")
+metrics.histogram("dm3k_stage_duration_seconds", "Time of each stage (ingest, build, solve, output, transport...)")
+metrics.histogram("dm3k_model_variables", "Variables of the solved models", buckets=SIZE_BUCKETS)
+metrics.histogram("dm3k_model_constraints", "Constraints of the solved models", buckets=SIZE_BUCKETS)
+metrics.histogram("dm3k_model_nonzeros", "Nonzero coefficients of the constraints of the solved models", buckets=SIZE_BUCKETS)
+metrics.counter("dm3k_solver_terminations_total", "Solves by termination condition of the solver")
+metrics.histogram("dm3k_solver_peak_memory_mb", "Peak resident memory (MB) of the solver process of each solve", buckets=MEMORY_MB_BUCKETS)
+metrics.histogram("dm3k_solver_cpu_seconds", "CPU time (user and system) of the solver process of each solve")
+metrics.counter("dm3k_cache_lookups_total", "Result cache lookups by result (hit or miss)")
+metrics.counter("dm3k_admission_total", "Problems by admission decision (admit, large, reject, or shed when no large slot freed up)")
+
+
+@api.before_request
+def _start_history():
+    # history of the transport stages (decompress, decode, encode, compress) of this request
+    g.hist_mgr = HistoryManager()
+    g.request_start = time.time()
+    g.endpoint = request.url_rule.rule if request.url_rule else "unknown"
+    metrics.inc("dm3k_requests_in_progress", labels={"endpoint": g.endpoint})
+    # so the other workers see this request in progress (e.g. the saturation of the workers in a load test)
+    metrics.flush()
+
+
+@api.teardown_request
+def _record_request(exc):
+    # runs after a streamed response has been sent
+    if "request_start" not in g:
+        return
+    status = 500 if exc is not None else g.get("status_code", 200)
+    metrics.inc("dm3k_requests_in_progress", -1, labels={"endpoint": g.endpoint})
+    metrics.inc("dm3k_requests_total", labels={"endpoint": g.endpoint, "status": status})
+    metrics.observe("dm3k_request_duration_seconds", time.time() - g.request_start, labels={"endpoint": g.endpoint})
+    _record_solve(g.hist_mgr.get_history())
+    metrics.flush()
+    if "progress" in g:
+        g.progress.done(status, g.get("reason"))
+    if "disconnect_watcher" in g:
+        g.disconnect_watcher.stop()
+    if "profile" in g:
+        g.profile.save()  # a solve that failed is profiled too (and tracemalloc is stopped)
+    if "capture" in g:
+        # after the response was sent, so the capture does not add to the latency of the request
+        observed = dict(g.capture["observed"], statusCode=status, total_sec=time.time() - g.request_start)
+        request_capture.save(g.capture["input"], observed)
+
+
+def _record_solve(history, solve_stats=None):
+    """
+    Add the stages of a solve (or of the transport of a request) and the size of the solved model to the metrics
+
+    :param list history: list of dicts with "operation" and "time_to_run_sec" (see HistoryManager.get_history)
+    :param dict solve_stats: see OptimizerBase.get_solve_stats (None = not a solve)
+    """
+    for h in history:
+        if h.get("depth"):
+            continue  # the nested spans (e.g. the stages of the build) are part of the time of their stage
+        metrics.observe("dm3k_stage_duration_seconds", h["time_to_run_sec"], labels={"stage": h["operation"]})
+    if solve_stats:
+        metrics.observe("dm3k_model_variables", solve_stats["variables"])
+        metrics.observe("dm3k_model_constraints", solve_stats["constraints"])
+        metrics.observe("dm3k_model_nonzeros", solve_stats.get("nonzeros", 0))
+        metrics.inc("dm3k_solver_terminations_total", labels={"condition": solve_stats["termination_condition"]})
+        if solve_stats.get("solver_peak_rss_MB") is not None:
+            metrics.observe("dm3k_solver_peak_memory_mb", solve_stats["solver_peak_rss_MB"])
+            metrics.observe("dm3k_solver_cpu_seconds", solve_stats["solver_cpu_sec"])
+
+
+def _record_cache_lookup(hit):
+    metrics.inc("dm3k_cache_lookups_total", labels={"result": "hit" if hit else "miss"})
+
+
+def _read_json():
+    """
+    Decompress (per the Content-Encoding header) and decode the json body of the request
+
+    :return tuple: the decoded body and an error response (None if the body is valid)
+    """
+    try:
+        g.hist_mgr.start_tag("Decompressing Request")
+        data = decompress(request.get_data(cache=False), request.headers.get("Content-Encoding"), api_config.DM3K_MAX_REQUEST_BYTES)
+        g.hist_mgr.end_tag("Decompressing Request")
+
+        g.hist_mgr.start_tag("Decoding Request")
+        body = codec.loads(data)
+        g.hist_mgr.end_tag("Decoding Request")
+    except PayloadTooLargeError as e:
+        return None, {"body": [str(e)], "reason": "Request body too large", "statusCode": 413}
+    except ValueError as e:
+        return None, {"body": [str(e)], "reason": "Invalid request body", "statusCode": 400}
+
+    if not isinstance(body, dict):
+        return None, {"body": ["The request body must be a JSON object"], "reason": "Invalid request body", "statusCode": 400}
+    return body, None
+
+
+def _start_deadline(request_dict, cancel_path=None):
+    """
+    Start the deadline of the request (in g.deadline), from the X-Deadline-Sec header, the "deadlineSec" of the request or
+    the default of the server.  The deadline is a cancellation token (see optimizer.util.cancel) that is also cancelled if
+    the client disconnects.
+
+    :param dict request_dict: the decoded body of the request
+    :param str cancel_path: the deadline is also cancelled when this file exists (see ProgressBoard.cancel)
+    :return dict error_response: None if the deadline is valid
+    """
+    seconds = request.headers.get("X-Deadline-Sec", request_dict.get("deadlineSec"))
+    if seconds is None:
+        seconds = api_config.DM3K_DEFAULT_DEADLINE_SEC
+    try:
+        seconds = float(seconds)
+        if not seconds > 0:
+            raise ValueError("The deadline must be more than 0 seconds")
+    except (TypeError, ValueError) as e:
+        return {"body": [str(e)], "reason": "Invalid deadline", "statusCode": 400}
+    seconds = min(seconds, api_config.DM3K_MAX_DEADLINE_SEC)
+
+    # charged from the arrival of the request (including reading and decoding it)
+    g.deadline = Deadline(seconds, start_time=g.request_start, cancel_path=cancel_path)
+    client_fd = _client_fd()
+    if client_fd is not None:
+        g.disconnect_watcher = DisconnectWatcher(client_fd, g.deadline).start()
+    return None
+
+
+def _start_profile(request_dict):
+    """
+    Start a profile capture of the solve (in g.profile, see optimizer.util.profiling) if the X-Profile header or the "profile"
+    of the request asks for one
+
+    :param dict request_dict: the decoded body of the request
+    :return bool profiled: True if the solve is profiled
+    """
+    wanted = request.headers.get("X-Profile", request_dict.get("profile", False))
+    if isinstance(wanted, str):
+        wanted = wanted.lower() in ("1", "true", "yes", "on")
+    if not wanted or not api_config.DM3K_PROFILE_ENABLED:
+        return False
+    g.profile = profile_store.capture()
+    return True
+
+
+def _with_profile(response):
+    """
+    Save the profile of the solve (if it was profiled) and add its handle to the response
+    """
+    if "profile" in g:
+        response["profile"] = g.profile.save()
+    return response
+
+
+def _start_capture(input_dict):
+    """
+    Sample the request for the archive of captured requests (in g.capture, see optimizer.util.capture)...it is saved with how
+    it was answered by _record_request
+
+    :param dict input_dict: the decoded body of the request
+    """
+    if request_capture.sample():
+        g.capture = {"input": input_dict, "observed": {"cached": False}}
+
+
+def _capture_observed(**observed):
+    """
+    Add to what is observed about the answer of a captured request (e.g. its objective value or the stages of its solve)
+    """
+    if "capture" in g:
+        g.capture["observed"].update(observed)
+
+
+def _client_fd():
+    """
+    :return int fd: file descriptor of the connection of the client (None if the server does not expose it)
+    """
+    try:
+        import uwsgi  # only available when the app is run by uwsgi
+
+        return uwsgi.connection_fd()
+    except ImportError:
+        sock = request.environ.get("werkzeug.socket")  # the debug server
+        return sock.fileno() if sock is not None else None
+
+
+def _json_response(obj):
+    """
+    Encode a json response and compress it (per the Accept-Encoding header) if it is large enough
+
+    :param obj: a json serializable object
+    :return: a flask Response
+    """
+    g.hist_mgr.start_tag("Encoding Response")
+    data = codec.dumps(obj)
+    g.hist_mgr.end_tag("Encoding Response")
+
+    encoding = None
+    if len(data) >= api_config.DM3K_COMPRESS_MIN_BYTES:
+        encoding = choose_encoding(request.headers.get("Accept-Encoding"))
+    if encoding:
+        g.hist_mgr.start_tag("Compressing Response")
+        data = compress(data, encoding)
+        g.hist_mgr.end_tag("Compressing Response")
+
+    if isinstance(obj, dict) and "statusCode" in obj:
+        g.status_code = obj["statusCode"]
+        g.reason = obj.get("reason")
+    response = Response(data, mimetype="application/json")
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    response.headers["Server-Timing"] = _server_timing()
+    return response
+
+
+def _stream_response(lines):
+    """
+    Stream newline delimited json, compressed chunk by chunk (per the Accept-Encoding header)
+
+    :param lines: an iterable of json serializable objects, one per line
+    :return: a streamed flask Response
+    """
+    encoding = choose_encoding(request.headers.get("Accept-Encoding"))
+
+    def generate():
+        compressor = StreamCompressor(encoding) if encoding else None
+        chunk = []
+        for obj in lines:
+            chunk.append(codec.dumps(obj))
+            if len(chunk) >= STREAM_CHUNK_ROWS:
+                data = b"\n".join(chunk) + b"\n"
+                yield compressor.compress(data) if compressor else data
+                chunk = []
+        data = b"\n".join(chunk) + b"\n" if chunk else b""
+        if compressor:
+            data = compressor.compress(data) + compressor.finish()
+        if data:
+            yield data
+
+    response = Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    response.headers["Server-Timing"] = _server_timing()
+    return response
+
+
+def _server_timing():
+    # e.g. "decoding-request;dur=1.52, encoding-response;dur=0.31"
+    history = g.hist_mgr.get_history()
+    return ", ".join("{};dur={:.2f}".format(h["operation"].lower().replace(" ", "-"), h["time_to_run_sec"] * 1000) for h in history)
+
 
 @api.route("/api/version", methods=["GET"])
 def get_version():
@@ -37,11 +349,12 @@ def get_optimizers():
 
     :return list of optimizers
     """
-    opt_list = list(algorithm_dict.keys())
+    # the same names as slim_optimizer_main.algorithm_dict, without importing the models (and pyomo)
+    opt_list = list(input_class_dict.keys())
     if "default" in opt_list:
         opt_list.remove("default")
 
-    return jsonify(opt_list)
+    return _json_response(opt_list)
 
 
 @api.route("/api/vizdata", methods=["POST"])
@@ -55,25 +368,525 @@ def post_vizdata():
 
     app.logger.info("Viz Data POST")
 
-    input_dict = request.json
+    input_dict, error_response = _read_json()
+    if error_response is not None:
+        return _json_response(error_response)
     app.logger.debug(input_dict)
 
-    opt, validation_errors = create_opt(input_dict, input_dict["algorithm"])
+    # the client can follow the solve at /api/vizdata/progress/<progressId> and cancel it at /api/vizdata/cancel/<progressId>
+    # ...the done event is sent by _record_request
+    cancel_path = None
+    if input_dict.get("progressId") is not None:
+        try:
+            g.progress = progress_board.reporter(input_dict["progressId"])
+        except ValueError as e:
+            return _json_response({"body": [str(e)], "reason": "Invalid progress id", "statusCode": 400})
+        cancel_path = progress_board.cancel_path(input_dict["progressId"])
+
+    error_response = _start_deadline(input_dict, cancel_path)
+    if error_response is not None:
+        return _json_response(error_response)
+
+    # a profiled problem is always solved (without the cache or sharing the solve with identical problems)
+    profiled = _start_profile(input_dict)
+    _start_capture(input_dict)
+
+    # only build the fields that are asked for...full_trace (one row per resource-activity arc) is by far the largest
+    fields = input_dict.get("fields")
+    stream = input_dict.get("stream", False) or request.accept_mimetypes.best == NDJSON_MIMETYPE
+    trace_wanted = fields is None or TRACE_KEY in fields
+    # a streamed full_trace is generated row by row from the solved model, so it is never part of the result
+    include_trace = trace_wanted and not stream
+
+    # identical problems (ignoring UI only fields) are only solved once
+    use_cache = api_config.DM3K_CACHE_ENABLED and input_dict.get("useCache", True) and not profiled
+    cache_key = problem_key(input_dict, input_dict["algorithm"])
+    no_trace_key = cache_key + "-notrace"
+    if use_cache:
+        cached_result = result_cache.get(cache_key)
+        if cached_result is None and not include_trace:
+            cached_result = result_cache.get(no_trace_key)
+        cache_hit = cached_result is not None and (not stream or not trace_wanted or cached_result[TRACE_KEY]["resource"])
+        _record_cache_lookup(cache_hit)
+        if cache_hit:
+            app.logger.info("Result found in cache: " + cache_key)
+            _capture_observed(cached=True, objective_value=cached_result.get(VALUE_KEY))
+            response = {"body": select_fields(cached_result, fields), "reason": "OK", "statusCode": 200}
+            if stream:
+                return _stream_vizdata(response, iter_trace_columns(cached_result[TRACE_KEY]) if trace_wanted else [])
+            return _json_response(response)
+
+    # problems that are too large are turned away before they are ingested
+    decision, size_estimate, error_response = _admission(input_dict)
+    if error_response is not None:
+        return _json_response(error_response)
+    # a large problem is solved in heuristic mode (see _solve_admitted)...its result must not be returned for the exact solve
+    # of the problem, so it is not cached
+    use_cache = use_cache and decision != LARGE
+
+    if stream:
+        # the solved model is needed to generate the rows, so streamed solves are not shared with other requests
+        try:
+            response, opt = _solve_admitted(input_dict, False, decision, size_estimate)
+        except Cancelled as e:
+            return _json_response(_with_profile(_cancelled_response(e)))
+        _with_profile(response)
+        if response["statusCode"] != 200:
+            return _json_response(response)
+        _capture_observed(objective_value=response["body"].get(VALUE_KEY))
+        if use_cache and _reusable(response):
+            result_cache.put(no_trace_key, response["body"])
+        response["body"] = select_fields(response["body"], fields)
+        return _stream_vizdata(response, opt.iter_trace_rows() if trace_wanted else [])
+
+    # identical problems posted at the same time (in any worker) share one solve, if they are solved the same way
+    solve_key = cache_key if decision != LARGE else problem_key(input_dict, input_dict["algorithm"], HEURISTIC_SOLVE_KWARGS)
+    if not include_trace:
+        solve_key += "-notrace"
+    try:
+        if api_config.DM3K_SINGLE_FLIGHT_ENABLED and not profiled:
+            # a leader that is cancelled raises, so its followers solve the problem within their own deadlines
+            response = single_flight.run(
+                solve_key,
+                lambda: _solve_admitted(input_dict, include_trace, decision, size_estimate)[0],
+                share=_reusable,
+                cancel_token=g.deadline,
+            )
+        else:
+            response, _ = _solve_admitted(input_dict, include_trace, decision, size_estimate)
+    except Cancelled as e:
+        response = _cancelled_response(e)
+    _with_profile(response)
+
+    if response["statusCode"] == 200:
+        _capture_observed(objective_value=response["body"].get(VALUE_KEY))
+        if use_cache and _reusable(response):
+            result_cache.put(solve_key, response["body"])
+        response["body"] = select_fields(response["body"], fields)
+
+    return _json_response(response)
+
+
+def _reusable(response):
+    """
+    Only a result that the solver proved optimal is cached or handed to identical requests.  A solve stopped by its time
+    limit (e.g. the time left before the deadline of its request) returns its best solution so far, which a later request
+    with more time could improve on.
+
+    :param dict response: the response of a solve (see _solve_vizdata and optimizer.util.batch.solve_item)
+    :return bool reusable: True if the response is the optimal result of the problem
+    """
+    solve_stats = response.get("solve_stats") or {}
+    return response["statusCode"] == 200 and solve_stats.get("termination_condition") == OPTIMAL_TERMINATION
+
+
+def _cancelled_response(e):
+    app.logger.warning(str(e))
+    return cancelled_response(e)
+
+
+def _admission(input_dict):
+    """
+    Estimate the size of a problem (without ingesting it) and decide how to handle it (see optimizer.util.admission)
+
+    :param dict input_dict: the posted viz data
+    :return tuple: the decision (ADMIT, LARGE or REJECT), the size estimate, and the response if the problem is rejected (None
+                   if it is not)
+    """
+    if not api_config.DM3K_ADMISSION_ENABLED:
+        return ADMIT, {}, None
+    try:
+        size_estimate = add_memory_estimate(estimate_input_size(input_dict, input_dict.get("algorithm")))
+    except TypeError:
+        return ADMIT, {}, None  # an unknown optimizer...create_opt reports it
+
+    decision = admission.check(size_estimate)
+    metrics.inc("dm3k_admission_total", labels={"decision": decision})
+    if decision == REJECT:
+        app.logger.warning("Problem rejected by admission control: {}".format(size_estimate))
+        body = {"size_estimate": size_estimate, "limits": admission.limits["max"]}
+        return decision, size_estimate, {"body": body, "reason": "Problem too large", "statusCode": 413}
+    return decision, size_estimate, None
+
+
+def _solve_admitted(input_dict, include_trace, decision, size_estimate):
+    """
+    Solve an admitted problem...a large problem waits for a slot and is solved in heuristic mode
+
+    :param dict input_dict: the posted viz data
+    :param bool include_trace: False = leave full_trace out of the result
+    :param str decision: see _admission
+    :param dict size_estimate: see _admission
+    :return tuple: see _solve_vizdata
+    :raises Cancelled: if the request was cancelled, also while it waits for a slot (DeadlineExceeded if its deadline passed)
+    """
+    if decision != LARGE:
+        return _solve_vizdata(input_dict, include_trace)
+
+    if "progress" in g:
+        g.progress.phase("waiting")
+    with admission.large_slot(cancel_token=g.get("deadline")) as acquired:
+        if not acquired:
+            metrics.inc("dm3k_admission_total", labels={"decision": "shed"})
+            body = {"size_estimate": size_estimate, "limits": admission.limits["large"]}
+            return {"body": body, "reason": "Too many large problems are being solved, try again later", "statusCode": 429}, None
+
+        app.logger.info("Solving a large problem in heuristic mode: {}".format(size_estimate))
+        response, opt = _solve_vizdata(input_dict, include_trace, HEURISTIC_SOLVE_KWARGS)
+        response["solve_mode"] = "heuristic"
+        _capture_observed(solve_mode="heuristic")
+        return response, opt
+
+
+def _solve_vizdata(input_dict, include_trace=True, solve_kwargs=None):
+    """
+    Validate, build and solve a viz data problem
+
+    :param dict input_dict: the posted viz data
+    :param bool include_trace: False = leave full_trace out of the result
+    :param dict solve_kwargs: other keyword arguments for OptimizerBase.solve (e.g. mipgap, timeout)
+    :return tuple: the response to POST /api/vizdata and the solved optimizer (None if it was not solved)
+    :raises Cancelled: if the request was cancelled (DeadlineExceeded if its deadline, g.deadline, passed)
+    """
+    # pyomo is only imported by the first solve (or by the preload of the uwsgi master, see optimizer.util.preload)
+    from optimizer.slim_optimizer_main import create_opt
+
+    opt, validation_errors = create_opt(
+        input_dict, input_dict["algorithm"], progress=g.get("progress"), cancel_token=g.get("deadline"), profile=g.get("profile")
+    )
 
     if len(validation_errors) > 0:
         app.logger.warning("VALIDATION ERRORS...")
         for e in validation_errors:
             app.logger.warning(e)
 
-        err_response = {"body": validation_errors, "reason": "Validation Errors in input data", "statusCode": 400}
-
-        return jsonify(err_response)
+        return {"body": validation_errors, "reason": "Validation Errors in input data", "statusCode": 400}, None
     else:
         app.logger.debug("No Validation errors")
 
     opt.build()
-    opt.solve()
 
-    response = {"body": opt.get_results(), "reason": "OK", "statusCode": 200}
+    try:
+        opt.solve(warm_start=input_dict.get("warmStart"), include_trace=include_trace, **(solve_kwargs or {}))
+    except ValueError as e:
+        # an unknown warm start solution id
+        return {"body": [str(e)], "reason": "Invalid warm start", "statusCode": 400}, None
+
+    history = opt.get_history_df().to_dict("records")
+    solve_stats = opt.get_solve_stats()
+    _record_solve(history, solve_stats)
+    _capture_observed(stages={h["operation"]: h["time_to_run_sec"] for h in history if not h.get("depth")}, solve_stats=solve_stats)
+    return {"body": opt.get_results(), "reason": "OK", "statusCode": 200, "solve_stats": solve_stats}, opt
+
+
+def _stream_vizdata(response, trace_rows):
+    """
+    Stream a response as newline delimited json...the first line is the response (without full_trace) and each following
+    line is a row of full_trace
+
+    :param dict response: the response to POST /api/vizdata
+    :param trace_rows: an iterable of full_trace rows (dicts)
+    :return: a streamed flask Response
+    """
+    response["body"].pop(TRACE_KEY, None)
+
+    def generate():
+        yield response
+        yield from trace_rows
+
+    return _stream_response(generate())
+
+
+@api.route("/api/vizdata/progress/<progress_id>", methods=["GET"])
+def get_vizdata_progress(progress_id):
+    """
+    GET /api/vizdata/progress/<progress_id>
+
+    :return: a stream of server-sent events with the progress of the solve posted with this progressId, until it is done
+        (for full API details see /docs/api_devGuide.md)
+    """
+    # a reconnecting client (e.g. an EventSource) only gets the events it missed
+    last_event_id = request.headers.get("Last-Event-ID", "")
+    last_event_id = int(last_event_id) if last_event_id.isdigit() else -1
+    try:
+        events = progress_board.follow(
+            progress_id,
+            last_event_id,
+            wait_sec=api_config.DM3K_PROGRESS_WAIT_SEC,
+            keepalive_sec=api_config.DM3K_PROGRESS_KEEPALIVE_SEC,
+        )
+    except ValueError as e:
+        return _json_response({"body": [str(e)], "reason": "Invalid progress id", "statusCode": 400})
+
+    def generate():
+        for item in events:
+            if item is None:
+                yield b": keepalive\n\n"
+                continue
+            event_id, event = item
+            yield "id: {}\nevent: {}\ndata: ".format(event_id, event["event"]).encode("utf-8") + codec.dumps(event) + b"\n\n"
+
+    response = Response(stream_with_context(generate()), mimetype=SSE_MIMETYPE)
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"  # a proxy (nginx) must not hold back the events
+    return response
+
+
+@api.route("/api/vizdata/cancel/<progress_id>", methods=["POST"])
+def post_vizdata_cancel(progress_id):
+    """
+    POST /api/vizdata/cancel/<progress_id>
+
+    :return dict response: statusCode 200 if the solve posted with this progressId will stop, 404 if it is not running
+        (for full POST API details see /docs/api_devGuide.md)
+    """
+    app.logger.info("Viz Data Cancel POST: {}".format(progress_id))
+    try:
+        cancelled = progress_board.cancel(progress_id)
+    except ValueError as e:
+        return _json_response({"body": [str(e)], "reason": "Invalid progress id", "statusCode": 400})
+
+    if not cancelled:
+        return _json_response({"body": [progress_id], "reason": "No running solve with this progress id", "statusCode": 404})
+    return _json_response({"body": [progress_id], "reason": "OK", "statusCode": 200})
+
+
+@api.route("/api/profiles/<profile_id>/<file_name>", methods=["GET"])
+def get_profile_file(profile_id, file_name):
+    """
+    GET /api/profiles/<profile_id>/<file_name>
+
+    :return: a file of the profile of a solve posted with the X-Profile header or "profile" (see optimizer.util.profiling)
+        (for full API details see /docs/api_devGuide.md)
+    """
+    try:
+        path = profile_store.path(profile_id, file_name)
+    except ValueError as e:
+        return _json_response({"body": [str(e)], "reason": "Invalid profile", "statusCode": 400})
+    if path is None:
+        return _json_response({"body": [profile_id, file_name], "reason": "No profile found", "statusCode": 404})
+
+    if file_name == SUMMARY_FILE:
+        mimetype = "application/json"
+    elif file_name == COLLAPSED_FILE:
+        mimetype = "text/plain"
+    else:
+        mimetype = "application/octet-stream"
+    return send_file(path, mimetype=mimetype, as_attachment=file_name != SUMMARY_FILE)
+
+
+@api.route("/api/vizdata/validate", methods=["POST"])
+def post_vizdata_validate():
+    """
+    POST /api/vizdata/validate
+
+    :return dict response: the validation errors and size estimates of the posted problem, without building or solving it
+        (for full POST API details see /docs/api_devGuide.md)
+    """
+    input_dict, error_response = _read_json()
+    if error_response is not None:
+        return _json_response(error_response)
+
+    g.hist_mgr.start_tag("Validating Input")
+    try:
+        fatal, validation_errors, size_estimate = validate_input(input_dict, input_dict.get("algorithm"))
+    except TypeError as e:
+        return _json_response({"body": [str(e)], "reason": "Unknown optimizer", "statusCode": 400})
+    except Exception as e:
+        # the input is too malformed to be validated
+        return _json_response({"body": ["{}: {}".format(type(e).__name__, e)], "reason": "Invalid input", "statusCode": 400})
+    g.hist_mgr.end_tag("Validating Input")
+
+    body = {"validation_errors": validation_errors, "is_fatal": fatal, "size_estimate": add_memory_estimate(size_estimate)}
+    if len(validation_errors) > 0:
+        return _json_response({"body": body, "reason": "Validation Errors in input data", "statusCode": 400})
+    return _json_response({"body": body, "reason": "OK", "statusCode": 200})
+
+
+@api.route("/api/vizdata/batch", methods=["POST"])
+def post_vizdata_batch():
+    """
+    POST /api/vizdata/batch
+
+    :return: a stream of newline delimited json objects, one per item of the batch, in the order the items complete
+        (for full POST API details see /docs/api_devGuide.md)
+    """
+    batch, error_response = _read_json()
+    if error_response is not None:
+        return _json_response(error_response)
+    items = batch.get("items", [])
+    if not isinstance(items, list):
+        return _json_response({"body": ["The items of a batch must be a list"], "reason": "Invalid batch", "statusCode": 400})
+    max_workers, error_response = _max_workers(batch)
+    if error_response is not None:
+        return _json_response(error_response)
+    use_cache = api_config.DM3K_CACHE_ENABLED and batch.get("useCache", True)
+
+    app.logger.info("Viz Data Batch POST with {} items".format(len(items)))
+
+    error_response = _start_deadline(batch)
+    if error_response is not None:
+        return _json_response(error_response)
+    cancel_token = g.deadline
+
+    def generate():
+        # resolve dataset references and find cached results before starting the pool
+        to_solve = []  # (index of item, input_dict, cache key, solve kwargs)
+        for index, item in enumerate(items):
+            input_dict = item
+            if isinstance(item, dict) and "datasetRef" in item:
+                try:
+                    input_dict = load_dataset_ref(item["datasetRef"], api_config.DM3K_DATASET_DIR)
+                except ValueError as e:
+                    yield _batch_line(index, {"body": [str(e)], "reason": "Invalid dataset reference", "statusCode": 400})
+                    continue
+                input_dict["algorithm"] = item.get("algorithm", input_dict.get("algorithm"))
+
+            # an item that is not a problem is answered on its own line, so it does not stop the rest of the batch
+            error_response = check_item(input_dict)
+            if error_response is not None:
+                yield _batch_line(index, error_response)
+                continue
+
+            cache_key = problem_key(input_dict, input_dict.get("algorithm"))
+            cached_result = result_cache.get(cache_key) if use_cache else None
+            if use_cache:
+                _record_cache_lookup(cached_result is not None)
+            if cached_result is not None:
+                yield _batch_line(index, {"body": cached_result, "reason": "OK", "statusCode": 200, "history": []})
+                continue
+
+            # the pool already limits how many items are solved at once, so large items are only solved in heuristic mode
+            decision, _, error_response = _admission(input_dict)
+            if error_response is not None:
+                yield _batch_line(index, error_response)
+            else:
+                to_solve.append((index, input_dict, cache_key, HEURISTIC_SOLVE_KWARGS if decision == LARGE else {}))
+
+        solve_items = [input_dict for _, input_dict, _, _ in to_solve]
+        solve_kwargs = [kwargs for _, _, _, kwargs in to_solve]
+        for solve_index, response in solve_batch(
+            solve_items, max_workers=max_workers, solve_kwargs=solve_kwargs, cancel_token=cancel_token
+        ):
+            index, _, cache_key, kwargs = to_solve[solve_index]
+            _record_solve(response.get("history", []), response.get("solve_stats"))
+            # the result of a large item (solved in heuristic mode) is not cached
+            if use_cache and not kwargs and _reusable(response):
+                result_cache.put(cache_key, response["body"])
+            yield _batch_line(index, response)
+
+    return _stream_response(generate())
+
+
+def _max_workers(request_dict):
+    """
+    :param dict request_dict: the posted batch or scenarios
+    :return tuple: the number of processes to solve them with (maxWorkers of the request, at most DM3K_BATCH_MAX_WORKERS or,
+                   if that is 0, the number of cores), and the response if maxWorkers is not valid (None if it is)
+    """
+    limit = api_config.DM3K_BATCH_MAX_WORKERS or os.cpu_count() or 1
+    max_workers = request_dict.get("maxWorkers")
+    if max_workers is None:
+        return limit, None
+    if not isinstance(max_workers, int) or isinstance(max_workers, bool) or max_workers < 1:
+        body = ["maxWorkers must be a positive integer, not {!r}".format(max_workers)]
+        return None, {"body": body, "reason": "Invalid maxWorkers", "statusCode": 400}
+    return min(max_workers, limit), None
 
-    return jsonify(response)
+
+def _batch_line(index, response):
+    response["index"] = index
+    return response
+
+
+@api.route("/api/vizdata/scenarios", methods=["POST"])
+def post_vizdata_scenarios():
+    """
+    POST /api/vizdata/scenarios
+
+    :return: a stream of newline delimited json objects...the result of the base problem and then one per scenario, in the
+        order the scenarios complete (for full POST API details see /docs/api_devGuide.md)
+    """
+    request_dict, error_response = _read_json()
+    if error_response is not None:
+        return _json_response(error_response)
+
+    base_input = request_dict.get("base")
+    if "datasetRef" in request_dict:
+        try:
+            base_input = load_dataset_ref(request_dict["datasetRef"], api_config.DM3K_DATASET_DIR)
+        except ValueError as e:
+            return _json_response({"body": [str(e)], "reason": "Invalid dataset reference", "statusCode": 400})
+    if not isinstance(base_input, dict):
+        return _json_response({"body": ["A base problem or datasetRef is required"], "reason": "Invalid scenarios", "statusCode": 400})
+    base_input["algorithm"] = request_dict.get("algorithm", base_input.get("algorithm"))
+
+    scenarios = request_dict.get("scenarios", [])
+    fields = request_dict.get("fields")
+    max_workers, error_response = _max_workers(request_dict)
+    if error_response is not None:
+        return _json_response(error_response)
+    use_cache = api_config.DM3K_CACHE_ENABLED and request_dict.get("useCache", True)
+
+    app.logger.info("Viz Data Scenarios POST with {} scenarios".format(len(scenarios)))
+
+    error_response = _start_deadline(request_dict)
+    if error_response is not None:
+        return _json_response(error_response)
+    cancel_token = g.deadline
+
+    cache_key = problem_key(base_input, base_input["algorithm"])
+    base_result = result_cache.get(cache_key) if use_cache else None
+    if use_cache:
+        _record_cache_lookup(base_result is not None)
+    # the scenarios are variants of the base, so they are about the same size...they are solved even if the base result is cached
+    decision, _, error_response = _admission(base_input)
+    if error_response is not None:
+        return _json_response(error_response)
+    solve_kwargs = {"include_trace": fields is None or TRACE_KEY in fields}
+    base_solve_kwargs = None
+    if decision == LARGE:
+        # as in a batch, the pool already limits how many are solved at once, so they are only solved in heuristic mode
+        app.logger.info("Solving the scenarios of a large problem in heuristic mode")
+        solve_kwargs.update(HEURISTIC_SOLVE_KWARGS)
+        base_solve_kwargs = HEURISTIC_SOLVE_KWARGS
+
+    def generate():
+        for index, response in solve_scenarios(
+            base_input, scenarios, max_workers, base_result, solve_kwargs, cancel_token, base_solve_kwargs
+        ):
+            _record_solve(response.get("history", []), response.get("solve_stats"))
+            solved = index != "base" or base_result is None
+            if decision == LARGE and solved and response["statusCode"] == 200:
+                response["solve_mode"] = "heuristic"
+            # the result of a heuristic solve is not cached
+            if index == "base" and use_cache and base_result is None and decision != LARGE and _reusable(response):
+                result_cache.put(cache_key, response["body"])
+            if response["statusCode"] == 200:
+                response["body"] = select_fields(response["body"], fields)
+            yield _batch_line(index, response)
+
+    return _stream_response(generate())
+
+
+@api.route("/api/cache/stats", methods=["GET"])
+def get_cache_stats():
+    """
+    GET /api/cache/stats
+
+    :return dict stats: hit/miss counters of the result cache and the single-flight counters (of the worker that answers the request)
+    """
+    stats = result_cache.get_stats()
+    stats["single_flight"] = single_flight.get_stats()
+    return _json_response(stats)
+
+
+@api.route("/api/metrics", methods=["GET"])
+def get_metrics():
+    """
+    GET /api/metrics
+
+    :return: the metrics of all uwsgi workers in the Prometheus text format
+    """
+    active_solvers = ("Running solver (glpsol) processes", count_solver_processes())
+    return Response(metrics.render({"dm3k_active_solver_processes": active_solvers}), content_type=PROMETHEUS_CONTENT_TYPE)
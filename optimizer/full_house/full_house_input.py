@@ -14,14 +14,33 @@ from collections import defaultdict
 from pprint import pformat
 from typing import Any, AnyStr, Dict, List, Union
 
-import pandas as pd
-
-from optimizer.slim_optimizer_base import InputBase
+from optimizer.slim_input_base import InputBase
+from optimizer.util.csv_loader import CsvFormatError, load_csv_files
 from optimizer.util.util import FULL_HOUSE_INPUT_DICT_KEYS, FULL_HOUSE_INPUT_KEYS, FULL_HOUSE_INPUT_LIST_KEYS, fh_append, fh_extend
 
 log = logging.getLogger(__name__)
 
 
+def full_house_size(parent_arcs, child_arcs, parent_resources, child_resources, parent_activities, child_activities):
+    """
+    Estimate the size of the full house model from the counts of its instances and arcs
+
+    :return dict size_estimate: counts of resources, activities, arcs (resource-activity pairs), and estimates of the
+                                variables, constraints and nonzeros (constraint coefficients) of the model
+    """
+    return {
+        "resources": parent_resources + child_resources,
+        "activities": parent_activities + child_activities,
+        "arcs": parent_arcs + child_arcs,
+        # an amount and an allocated variable per arc
+        "variables": 2 * (parent_arcs + child_arcs),
+        # required amount per arc, available amount per resource, link per child arc, limit per child activity
+        "constraints": parent_arcs + 2 * child_arcs + parent_resources + child_resources + child_activities,
+        # required amount (2 per arc) + available amount (1 per arc) + link (about 2 per child arc) + limit (1 per child arc)
+        "nonzeros": 3 * parent_arcs + 6 * child_arcs,
+    }
+
+
 class FullHouseInput(InputBase):
     def __init__(self):
         super().__init__()
@@ -39,7 +58,6 @@ class FullHouseInput(InputBase):
         :return bool: self._fatal_error True when the validation error found is fatal
         :return list: self._validation_errors list of all validation errors
         """
-
         self._fatal_error = False
         self._validation_errors = []
         # fh_dict is the placeholder to build the input dictionary and will be set to self._data once complete
@@ -120,41 +138,27 @@ class FullHouseInput(InputBase):
         else:
             log.info("There is no scores.json file in this dataset.  The scorer must be run in order to get values")
 
+        # These files must have column names in the first row of the file, the others are rows of names (see csv_loader)
+        header_required = ["child_budget", "parent_budget", "child_cost", "parent_cost", "force_forbid"]
+        try:
+            # every file is parsed once (and not again while it is unchanged)...the files are read at the same time
+            parsed_files = load_csv_files(csv_files, header_required)
+        except CsvFormatError as e:
+            # Changing this to an immediate error to limit further errors due to this file not being processed correctly
+            raise TypeError(str(e)) from e
+
         resource_type_lookup = defaultdict(list)  # this dict will be used to find resources that can satisfy a cost type
         for csv_file in csv_files:
             file_dict = {}
-            # These files must have column names in the first row of the file
-            header_required = ["child_budget", "parent_budget", "child_cost", "parent_cost", "force_forbid"]
             basename = os.path.basename(csv_file).split(".csv")[0]
             log.info("Working on... %s", basename)
-            try:
-                # A hack to figure out which row has the most columns
-                max_comma_count = 0
-                with open(csv_file) as f:
-                    for line in f:
-                        count = line.count(",")
-                        if count > max_comma_count:
-                            max_comma_count = count
-                col_names = list(range(max_comma_count + 1))
-                if basename in header_required:
-                    csv_df = pd.read_csv(csv_file, index_col=0, skipinitialspace=True)
-                else:
-                    csv_df = pd.read_csv(
-                        csv_file, header=None, index_col=0, names=col_names, skipinitialspace=True, skiprows=1, engine="python"
-                    )
-            except pd.errors.ParserError as e:
-                # Changing this to an immediate error to limit further errors due to this file not being processed correctly
-
-                raise TypeError(
-                    "{}.csv is in an invalid format and pandas could not create a proper dataframe.  {}".format(basename, e)
-                ) from e
+            # the rows of a file of names, or the {row: {column: value}} of a file with column names (do not modify them)
+            parsed = parsed_files[csv_file]
 
             if basename == "activity":
-                for pa_name, ca_names in zip(csv_df.index.values.tolist(), csv_df.values.tolist()):
-                    # Remove null values and duplicates
-                    ca_names = list({str(ca_name) for ca_name in ca_names if ca_name is not None and str(ca_name) != "nan"})
-                    if pa_name not in fh_dict["parent_activities"]:
-                        fh_dict["parent_activities"].append(pa_name)
+                # without duplicates, in the order they are listed
+                fh_dict["parent_activities"] = list(dict.fromkeys(fh_dict["parent_activities"] + [pa_name for pa_name, _ in parsed]))
+                for pa_name, ca_names in parsed:
                     log.debug("Parent activity %s has the following child activities %s", pa_name, ca_names)
                     fh_extend(file_dict, pa_name, ca_names)
                 fh_dict["activity_children"] = file_dict
@@ -164,14 +168,12 @@ class FullHouseInput(InputBase):
                 else:  # parent_allocations
                     req_amt, resources, possible_allocations = "req_parent_amt", "parent_resources", "parent_possible_allocations"
 
-                for resource_name, activity_names in zip(csv_df.index.values.tolist(), csv_df.values.tolist()):
-                    # Remove null values and duplicates
-                    activity_names = list({str(a_name) for a_name in activity_names if a_name is not None and str(a_name) != "nan"})
+                # without duplicates, in the order they are listed
+                fh_dict[resources] = list(dict.fromkeys(fh_dict[resources] + [resource_name for resource_name, _ in parsed]))
+                for resource_name, activity_names in parsed:
                     # Initialize cost dictionary to 0, validate method will check to make sure it does not stay at 0
                     for activity_name in activity_names:
                         fh_dict[req_amt][(resource_name, activity_name)] = 0.0
-                    if resource_name not in fh_dict[resources]:
-                        fh_dict[resources].append(resource_name)
                     log.debug("Resource %s has the following activities: %s", resource_name, activity_names)
                     fh_extend(file_dict, resource_name, activity_names)
                 fh_dict[possible_allocations] = file_dict
@@ -183,10 +185,7 @@ class FullHouseInput(InputBase):
 
                 # Initialize budget dictionary to 0, validate method will check to make sure it does not stay at 0
                 fh_dict[avail_amt] = dict.fromkeys(fh_dict[resources], 0)
-                try:
-                    budget_dict = csv_df.to_dict("index")
-                except pd.errors.ParserError as e:
-                    raise ValueError("Error processing {}.csv file\n{}".format(basename, str(e))) from e
+                budget_dict = parsed
 
                 default_type = ""
                 default_budget = 0
@@ -194,7 +193,8 @@ class FullHouseInput(InputBase):
                 budgets_not_numeric = []
                 for resource_name, row in budget_dict.items():
                     budget = None
-                    if resource_name != "_default_" and resource_name not in fh_dict[resources]:
+                    # the budgets are keyed by the resources (a dict, so this is not a scan of the list of resources)
+                    if resource_name != "_default_" and resource_name not in fh_dict[avail_amt]:
                         self._add_to_validation_errors("Resource {} not listed in {}".format(resource_name, allocations_file), err_code=3)
 
                     for resource_type, value in row.items():
@@ -255,16 +255,14 @@ class FullHouseInput(InputBase):
                     activities = "parent_activities"
                     file_list_all_activities = "activity.csv"
 
-                try:
-                    cost_dict = csv_df.to_dict("index")
-                except pd.errors.ParserError as e:
-                    raise ValueError("Error processing {}.csv file\n{}".format(basename, str(e))) from e
+                cost_dict = parsed
+                all_activities = set(fh_dict[activities])
 
                 default_cost_dict = {}
                 error_found = False
                 costs_not_numeric = []
                 for activity_name, row in cost_dict.items():
-                    if activity_name != "_default_" and activity_name not in fh_dict[activities]:
+                    if activity_name != "_default_" and activity_name not in all_activities:
                         self._add_to_validation_errors(
                             "Activity {} listed in {}.csv but not found in {}".format(activity_name, basename, file_list_all_activities),
                             err_code=4,
@@ -331,11 +329,8 @@ class FullHouseInput(InputBase):
                                     "Resource {} not listed in {} dictionary".format(resource, possible_allocations), err_code=3
                                 )
             elif basename in ("container_child_resource", "container_parent_resource"):
-                for container_name, resource_names in zip(csv_df.index.values.tolist(), csv_df.values.tolist()):
-                    # Remove nan/null values
-                    file_dict[container_name] = list(
-                        {str(r_name) for r_name in resource_names if r_name is not None and str(r_name) != "nan"}
-                    )
+                for container_name, resource_names in parsed:
+                    file_dict[container_name] = list(resource_names)
                     if basename == "container_child_resource":
                         log.debug("Container %s has the following child resources %s", container_name, file_dict[container_name])
                         fh_extend(
@@ -353,11 +348,7 @@ class FullHouseInput(InputBase):
                             type_resources="parent_resources",
                         )
             elif basename == "force_forbid":
-                try:
-                    force_forbid_dict = csv_df.to_dict("index")
-                except pd.errors.ParserError as e:
-                    raise ValueError("Error processing {}.csv file\n{}".format(basename, str(e))) from e
-
+                force_forbid_dict = parsed
                 for ca_name, row in force_forbid_dict.items():
                     acceptable_keys = ["level", "force", "forbid"]
                     if set(row.keys()) != set(acceptable_keys):
@@ -403,6 +394,24 @@ class FullHouseInput(InputBase):
         self._fix()
         return self._fatal_error, self._validation_errors
 
+    def estimate_size(self):
+        """
+        Estimate the size of the full house model from the ingested data
+
+        :return dict size_estimate: see full_house_size
+        """
+        if not self._data:
+            return {}
+
+        return full_house_size(
+            parent_arcs=sum(len(acts) for acts in self._data.get("parent_possible_allocations", {}).values()),
+            child_arcs=sum(len(acts) for acts in self._data.get("child_possible_allocations", {}).values()),
+            parent_resources=len(self._data.get("parent_resources", [])),
+            child_resources=len(self._data.get("child_resources", [])),
+            parent_activities=len(self._data.get("parent_activities", [])),
+            child_activities=len(self._data.get("child_activities", [])),
+        )
+
     def _add_to_validation_errors(self, error_message, is_fatal_error=True, err_code=None, offender=None, fix=None):
         self._validation_errors.append(
             {"err_code": err_code, "err_txt": error_message, "offender": offender, "fix": fix, "is_fatal_error": is_fatal_error}
@@ -411,232 +420,200 @@ class FullHouseInput(InputBase):
             self._fatal_error = True
         log.error(error_message)
 
+    def _sample(self, names):
+        """
+        :param names: an iterable of the offending names (e.g. the generator of a check)
+        :return tuple: (the number of names, a list of the first _max_items_display of them)...only the sample is kept
+        """
+        count, sample = 0, []
+        for name in names:
+            if count < self._max_items_display:
+                sample.append(name)
+            count += 1
+        return count, sample
+
+    def _check_difference(self, names, other_names, message, err_code):
+        """
+        Add a validation error if some names are not in other_names
+
+        :param names: the names to check, without duplicates (a set, or a dict to sample them in the order they were listed)
+        :param other_names: the names they should be in (a set or a dict)
+        :param str message: the error, formatted with the number of missing names and a sample of them
+        :param int err_code: code of the error
+        """
+        count, sample = self._sample(name for name in names if name not in other_names)
+        if count:
+            self._add_to_validation_errors(message.format(count, sample), err_code=err_code)
+
     def _validate(self):
-        all_pr_names, all_cr_names, all_pa_names, all_pa_ca_names, all_cr_ca_names, all_ca_budget_names = [], [], [], [], [], []
-
-        for resources in self._data["resource_families"].values():
-            all_pr_names.extend(resources["parent_resources"])
-            all_cr_names.extend(resources["child_resources"])
-        for pa_names in self._data["parent_possible_allocations"].values():
-            all_pa_names.extend(pa_names)
-        for ca_names in self._data["child_possible_allocations"].values():
-            all_cr_ca_names.extend(ca_names)
-        for ca_names in self._data["activity_children"].values():
-            all_pa_ca_names.extend(ca_names)
-        for cr_ca in self._data["req_child_amt"].keys():
-            all_ca_budget_names.append(cr_ca[1])
-        all_ca_budget_names = sorted(set(all_ca_budget_names))
-
-        for child_activity in self._data["child_activities"].copy():
-            if child_activity not in all_ca_budget_names:
-                self._data["child_activities"].remove(child_activity)
-        for child_activity in self._data["child_score"].copy().keys():
-            if child_activity not in all_ca_budget_names:
-                self._data["child_score"].pop(child_activity)
+        data = self._data
+        # every name list and key is indexed once (as a set), so each check below is one pass over the data
+        all_pr_names, all_cr_names = {}, {}  # dicts keep the order the names are listed in, for the samples of the errors
+        for resources in data["resource_families"].values():
+            all_pr_names.update(dict.fromkeys(resources["parent_resources"]))
+            all_cr_names.update(dict.fromkeys(resources["child_resources"]))
+        all_pa_names = {pa: None for pa_names in data["parent_possible_allocations"].values() for pa in pa_names}
+        all_cr_ca_names = {ca: None for ca_names in data["child_possible_allocations"].values() for ca in ca_names}
+        all_pa_ca_names = {ca: None for ca_names in data["activity_children"].values() for ca in ca_names}
+        all_ca_budget_names = {cr_ca[1] for cr_ca in data["req_child_amt"]}
+        req_pa_names = {pr_pa[1]: None for pr_pa in data["req_parent_amt"]}
+
+        # the child activities without a cost are dropped (in place, the list may be the activity_scores_names of the caller)
+        data["child_activities"][:] = [ca for ca in data["child_activities"] if ca in all_ca_budget_names]
+        for child_activity in [ca for ca in data["child_score"] if ca not in all_ca_budget_names]:
+            data["child_score"].pop(child_activity)
 
         missing_keys = []
-        for key, value in self._data.items():
+        for key, value in data.items():
             if len(value) == 0:
                 if key not in ("force_list", "forbid_list"):
                     missing_keys.append(key)
         if missing_keys:
             self._add_to_validation_errors("{} are not set in _data dictionary".format(missing_keys), err_code=2)
 
-        pa_diff = {x[1] for x in self._data["req_parent_amt"]}.difference(set(self._data["parent_activities"]))
-        if pa_diff:
-            self._add_to_validation_errors(
-                "There are {} parent activit(ies) listed in parent_allocations.csv and not in activity.csv: {}".format(
-                    len(pa_diff), list(pa_diff)[: self._max_items_display]
-                ),
-                err_code=4,
-            )
-
-        pa_diff = set(self._data["parent_activities"]).difference({x[1] for x in self._data["req_parent_amt"]})
-        if pa_diff:
-            self._add_to_validation_errors(
-                "There are {} parent activit(ies) listed in activity.csv and not in parent_allocations.csv: {}".format(
-                    len(pa_diff), list(pa_diff)[: self._max_items_display]
-                ),
-                err_code=4,
-            )
-
-        pr_diff = set(all_pr_names).difference(set(self._data["parent_resources"]))
-        if pr_diff:
-            self._add_to_validation_errors(
-                "There are {} parent resource(s) listed in container_parent_resource.csv and not in parent_allocations.csv: {}".format(
-                    len(pr_diff), list(pr_diff)[: self._max_items_display]
-                ),
-                err_code=3,
-            )
-
-        pr_diff = set(self._data["parent_resources"]).difference(set(all_pr_names))
-        if pr_diff:
-            self._add_to_validation_errors(
-                "There are {} parent resource(s) listed in parent_allocations.csv and not in container_parent_resource.csv: {}".format(
-                    len(pr_diff), list(pr_diff)[: self._max_items_display]
-                ),
-                err_code=3,
-            )
-
-        cr_diff = set(all_cr_names).difference(set(self._data["child_resources"]))
-        if cr_diff:
-            self._add_to_validation_errors(
-                "There are {} child resource(s) listed in container_child_resource.csv and not in child_allocations.csv: {}".format(
-                    len(cr_diff), list(cr_diff)[: self._max_items_display]
-                ),
-                err_code=3,
-            )
-
-        cr_diff = set(self._data["child_resources"]).difference(set(all_cr_names))
-        if cr_diff:
-            self._add_to_validation_errors(
-                "There are {} child resource(s) listed in child_allocations.csv and not in container_child_resource.csv: {}".format(
-                    len(cr_diff), list(cr_diff)[: self._max_items_display]
-                ),
-                err_code=3,
-            )
-
-        pa_diff = set(all_pa_names).difference(set(self._data["parent_activities"]))
-        if pa_diff:
-            self._add_to_validation_errors(
-                "There are {} parent activit(ies) listed in parent_cost.csv and not in parent_allocations.csv: {}".format(
-                    len(pa_diff), list(pa_diff)[: self._max_items_display]
-                ),
-                err_code=4,
-            )
+        parent_activities = dict.fromkeys(data["parent_activities"])
+        parent_resources = dict.fromkeys(data["parent_resources"])
+        child_resources = dict.fromkeys(data["child_resources"])
+        child_activities = dict.fromkeys(data["child_activities"])
 
-        pa_diff = set(self._data["parent_activities"]).difference(set(all_pa_names))
-        if pa_diff:
-            self._add_to_validation_errors(
-                "There are {} parent activit(ies) listed in parent_allocations.csv and not in parent_cost.csv: {}".format(
-                    len(pa_diff), list(pa_diff)[: self._max_items_display]
-                ),
-                err_code=4,
-            )
+        self._check_difference(
+            req_pa_names,
+            parent_activities,
+            "There are {} parent activit(ies) listed in parent_allocations.csv and not in activity.csv: {}",
+            err_code=4,
+        )
+        self._check_difference(
+            parent_activities,
+            req_pa_names,
+            "There are {} parent activit(ies) listed in activity.csv and not in parent_allocations.csv: {}",
+            err_code=4,
+        )
+        self._check_difference(
+            all_pr_names,
+            parent_resources,
+            "There are {} parent resource(s) listed in container_parent_resource.csv and not in parent_allocations.csv: {}",
+            err_code=3,
+        )
+        self._check_difference(
+            parent_resources,
+            all_pr_names,
+            "There are {} parent resource(s) listed in parent_allocations.csv and not in container_parent_resource.csv: {}",
+            err_code=3,
+        )
+        self._check_difference(
+            all_cr_names,
+            child_resources,
+            "There are {} child resource(s) listed in container_child_resource.csv and not in child_allocations.csv: {}",
+            err_code=3,
+        )
+        self._check_difference(
+            child_resources,
+            all_cr_names,
+            "There are {} child resource(s) listed in child_allocations.csv and not in container_child_resource.csv: {}",
+            err_code=3,
+        )
+        self._check_difference(
+            all_pa_names,
+            parent_activities,
+            "There are {} parent activit(ies) listed in parent_cost.csv and not in parent_allocations.csv: {}",
+            err_code=4,
+        )
+        self._check_difference(
+            parent_activities,
+            all_pa_names,
+            "There are {} parent activit(ies) listed in parent_allocations.csv and not in parent_cost.csv: {}",
+            err_code=4,
+        )
+        self._check_difference(
+            all_pa_ca_names,
+            child_activities,
+            "There are {} child activit(ies) listed in activity.csv and not in the child activities list: {}",
+            err_code=4,
+        )
+        self._check_difference(
+            child_activities,
+            all_pa_ca_names,
+            "There are {} child activit(ies) listed in the child activities list and not in activity.csv: {}",
+            err_code=4,
+        )
+        self._check_difference(
+            all_cr_ca_names,
+            child_activities,
+            "There are {} child activit(ies) listed in child_allocations.csv and not in the child activities list: {}",
+            err_code=4,
+        )
+        self._check_difference(
+            child_activities,
+            all_cr_ca_names,
+            "There are {} child activit(ies) listed in the child activities list and not in child_allocations.csv: {}",
+            err_code=4,
+        )
 
-        ca_diff = set(all_pa_ca_names).difference(set(self._data["child_activities"]))
-        if ca_diff:
+        count, sample = self._sample(pr_pa for pr_pa, cost in data["req_parent_amt"].items() if cost == 0)
+        if count:
             self._add_to_validation_errors(
-                "There are {} child activit(ies) listed in activity.csv and not in the child activities list: {}".format(
-                    len(ca_diff), list(ca_diff)[: self._max_items_display]
+                "There are {} parent resource/activity pair(s) that have no cost.  Make sure parent_cost.csv is valid: {}".format(
+                    count, sample
                 ),
                 err_code=4,
             )
 
-        ca_diff = set(self._data["child_activities"]).difference(set(all_pa_ca_names))
-        if ca_diff:
+        count, sample = self._sample(cr_ca for cr_ca, cost in data["req_child_amt"].items() if cost == 0)
+        if count:
             self._add_to_validation_errors(
-                "There are {} child activit(ies) listed in the child activities list and not in activity.csv: {}".format(
-                    len(ca_diff), list(ca_diff)[: self._max_items_display]
+                "There are {} child resource/activity pair(s) that have no cost.  Make sure child_cost.csv is valid: {}".format(
+                    count, sample
                 ),
                 err_code=4,
             )
 
-        ca_diff = set(all_cr_ca_names).difference(set(self._data["child_activities"]))
-        if ca_diff:
+        count, sample = self._sample(pr for pr, budget in data["avail_parent_amt"].items() if budget == 0)
+        if count:
             self._add_to_validation_errors(
-                "There are {} child activit(ies) listed in child_allocations.csv and not in the child activities list: {}".format(
-                    len(ca_diff), list(ca_diff)[: self._max_items_display]
-                ),
-                err_code=4,
+                "There are {} parent resource(s) that have no budget.  Make sure parent_budget.csv is valid: {}".format(count, sample),
+                err_code=3,
             )
 
-        ca_diff = set(self._data["child_activities"]).difference(set(all_cr_ca_names))
-        if ca_diff:
+        count, sample = self._sample(cr for cr, budget in data["avail_child_amt"].items() if budget == 0)
+        if count:
             self._add_to_validation_errors(
-                "There are {} child activit(ies) listed in the child activities list and not in child_allocations.csv: {}".format(
-                    len(ca_diff), list(ca_diff)[: self._max_items_display]
-                ),
-                err_code=4,
+                "There are {} child resource(s) that have no budget.  Make sure child_budget.csv is valid: {}".format(count, sample),
+                err_code=3,
             )
 
-        pr_pas_no_cost = []
-        for pr_pa, cost in self._data["req_parent_amt"].items():
-            if cost == 0:
-                pr_pas_no_cost.append(pr_pa)
-        if pr_pas_no_cost:
-            self._add_to_validation_errors(
-                "There are {} parent resource/activity pair(s) that have no cost.  Make sure parent_cost.csv is valid: {}".format(
-                    len(pr_pas_no_cost), pr_pas_no_cost[: self._max_items_display]
-                ),
-                err_code=4,
-            )
+        self._remove_unallocated_resources("child")
+        self._remove_unallocated_resources("parent")
 
-        cr_cas_no_cost = []
-        for cr_ca, cost in self._data["req_child_amt"].items():
-            if cost == 0:
-                cr_cas_no_cost.append(cr_ca)
-        if cr_cas_no_cost:
-            self._add_to_validation_errors(
-                "There are {} child resource/activity pair(s) that have no cost.  Make sure child_cost.csv is valid: {}".format(
-                    len(cr_cas_no_cost), cr_cas_no_cost[: self._max_items_display]
-                ),
-                err_code=4,
-            )
+    def _remove_unallocated_resources(self, level):
+        """
+        Remove the resources without allocations (a warning for each) from every part of the input, in one pass over each
 
-        prs_no_budget = []
-        for pr, budget in self._data["avail_parent_amt"].items():
-            if budget == 0:
-                prs_no_budget.append(pr)
-        if prs_no_budget:
-            self._add_to_validation_errors(
-                "There are {} parent resource(s) that have no budget.  Make sure parent_budget.csv is valid: {}".format(
-                    len(prs_no_budget), prs_no_budget[: self._max_items_display]
-                ),
-                err_code=3,
-            )
+        :param str level: "child" or "parent"
+        """
+        data = self._data
+        possible_allocations = data["{}_possible_allocations".format(level)]
+        resources_key = "{}_resources".format(level)
+        unallocated = [r for r, activities in possible_allocations.items() if len(activities) == 0]
+        if not unallocated:
+            return
 
-        crs_no_budget = []
-        for cr, budget in self._data["avail_child_amt"].items():
-            if budget == 0:
-                crs_no_budget.append(cr)
-        if crs_no_budget:
+        for resource in unallocated:
             self._add_to_validation_errors(
-                "There are {} child resource(s) that have no budget.  Make sure child_budget.csv is valid: {}".format(
-                    len(crs_no_budget), crs_no_budget[: self._max_items_display]
-                ),
+                "{} resource {} has no allocations".format(level.capitalize(), resource),
                 err_code=3,
+                is_fatal_error=False,
             )
-
-        for cr, cas in self._data["child_possible_allocations"].copy().items():
-            if len(cas) == 0:
-                self._add_to_validation_errors(
-                    "Child resource {} has no allocations".format(cr),
-                    err_code=3,
-                    is_fatal_error=False,
-                )
-                log.info("Removing child resource %s from input", cr)
-                self._data["child_possible_allocations"].pop(cr)
-                if cr in self._data["child_resources"]:
-                    self._data["child_resources"].remove(cr)
-                for container in self._data["resource_families"].keys():
-                    if cr in self._data["resource_families"][container]["child_resources"]:
-                        self._data["resource_families"][container]["child_resources"].remove(cr)
-                for cr_ca in self._data["req_child_amt"].keys():
-                    if cr == cr_ca[0]:
-                        self._data["req_child_amt"].pop(cr_ca)
-                if cr in self._data["avail_child_amt"].keys():
-                    self._data["avail_child_amt"].pop(cr)
-
-        for pr, pas in self._data["parent_possible_allocations"].copy().items():
-            if len(pas) == 0:
-                self._add_to_validation_errors(
-                    "Parent resource {} has no allocations".format(pr),
-                    err_code=3,
-                    is_fatal_error=False,
-                )
-                log.info("Removing parent resource %s from input", pr)
-                self._data["parent_possible_allocations"].pop(pr)
-                if pr in self._data["parent_resources"]:
-                    self._data["parent_resources"].remove(pr)
-                for container in self._data["resource_families"].keys():
-                    if pr in self._data["resource_families"][container]["parent_resources"]:
-                        self._data["resource_families"][container]["parent_resources"].remove(pr)
-                for pr_pa in self._data["req_parent_amt"].keys():
-                    if pr == pr_pa[0]:
-                        self._data["req_parent_amt"].pop(pr_pa)
-                if pr in self._data["avail_parent_amt"].keys():
-                    self._data["avail_parent_amt"].pop(pr)
+            log.info("Removing %s resource %s from input", level, resource)
+            possible_allocations.pop(resource)
+            data["avail_{}_amt".format(level)].pop(resource, None)
+
+        unallocated = set(unallocated)
+        data[resources_key][:] = [r for r in data[resources_key] if r not in unallocated]
+        for family in data["resource_families"].values():
+            family[resources_key][:] = [r for r in family[resources_key] if r not in unallocated]
+        req_amt = data["req_{}_amt".format(level)]
+        for key in [key for key in req_amt if key[0] in unallocated]:
+            req_amt.pop(key)
 
     def _fix(self):
         # if no errors, get out
@@ -4,7 +4,8 @@ This ingests the format from the DM3K-Viz tool
 
 import logging
 
-from optimizer.full_house.full_house_input import FullHouseInput
+from optimizer.full_house.full_house_input import FullHouseInput, full_house_size
+from optimizer.util.util import count_viz_allocations
 
 log = logging.getLogger(__name__)
 
@@ -91,35 +92,106 @@ class FullHouseInputViz(FullHouseInput):
 
     def __init__(self):
         super().__init__()
+        self._viz_index = {}  # indexes of the sections of the viz data being ingested (see _index)
 
-    def _get_all_instances(self, dm3k_viz_data, class_name, class_type="resource"):
-        if class_type == "resource":
-            class_type_name = "resourceInstances"
-        else:
-            class_type_name = "activityInstances"
+    @staticmethod
+    def estimate_input_size(input_dict):
+        """
+        Estimate the size of the full house model from an input that has not been ingested (see InputBase.estimate_input_size).
+        The parent and child classes are found the same way as in ingest_validate, but the arcs are counted, not expanded.
+
+        :param dict input_dict: a dict containing the name of the input and the data from files associated with this input
+        :return dict size_estimate: see full_house_size (empty if the parent and child classes cannot be found)
+        """
+        files = input_dict.get("files") or [{}]
+        viz_data = files[0].get("fileContents") or {}
+        num_res, num_act, pair_arcs = count_viz_allocations(viz_data)
+
+        parent_activity = None
+        child_activity = None
+        for ac in viz_data.get("activityClasses", []):
+            if ac.get("containsClasses"):
+                parent_activity = ac.get("className")
+                child_activity = ac["containsClasses"][0]
+        parent_resource = None
+        child_resource = None
+        for rc in viz_data.get("resourceClasses", []):
+            if parent_activity in rc.get("canBeAllocatedToClasses", []):
+                parent_resource = rc.get("className")
+            if child_activity in rc.get("canBeAllocatedToClasses", []):
+                child_resource = rc.get("className")
+        if None in (parent_activity, child_activity, parent_resource, child_resource):
+            return {}
+
+        return full_house_size(
+            parent_arcs=pair_arcs.get((parent_resource, parent_activity), 0),
+            child_arcs=pair_arcs.get((child_resource, child_activity), 0),
+            parent_resources=num_res.get(parent_resource, 0),
+            child_resources=num_res.get(child_resource, 0),
+            parent_activities=num_act.get(parent_activity, 0),
+            child_activities=num_act.get(child_activity, 0),
+        )
+
+    def _index(self, dm3k_viz_data, section):
+        """
+        Index a section of the viz data in one pass, the first time it is needed (so a missing key is found where the section
+        is first used, as before)
+
+        :param dict dm3k_viz_data: the "fileContents" of the viz input
+        :param str section: "resourceInstances" or "activityInstances" (class name -> {"names": instance names in order,
+                            "instances": instance name -> instance, "last_group": the last instance group of the class}),
+                            "allocationInstances" ((resource class, activity class) -> the last group of the pair) or
+                            "containsInstances" ((parent class, child class) -> the groups of the pair, in order)
+        :return dict index: see section
+        """
+        if section in self._viz_index:
+            return self._viz_index[section]
+
+        index = {}
+        for group in dm3k_viz_data[section]:
+            if section in ("resourceInstances", "activityInstances"):
+                class_index = index.setdefault(group["className"], {"names": [], "instances": {}, "last_group": None})
+                for instance in group["instanceTable"]:
+                    class_index["names"].append(instance["instanceName"])
+                    # a later instance of the same name replaces an earlier one
+                    class_index["instances"][instance["instanceName"]] = instance
+                class_index["last_group"] = group
+            elif section == "allocationInstances":
+                index[(group["resourceClassName"], group["activityClassName"])] = group
+            else:  # containsInstances
+                index.setdefault((group["parentClassName"], group["childClassName"]), []).append(group)
+        self._viz_index[section] = index
+        return index
 
-        instance_list = []
-        for i in dm3k_viz_data[class_type_name]:
-            if i["className"] == class_name:
-                for j in i["instanceTable"]:
-                    instance_list.append(j["instanceName"])
+    def _get_all_instances(self, dm3k_viz_data, class_name, class_type="resource"):
+        class_index = self._index(dm3k_viz_data, class_type + "Instances").get(class_name)
+        return list(class_index["names"]) if class_index else []
 
-        return instance_list
+    def _get_last_group(self, dm3k_viz_data, class_name, class_type="resource"):
+        class_index = self._index(dm3k_viz_data, class_type + "Instances").get(class_name)
+        return class_index["last_group"] if class_index else None
 
     def _get_instance_prop(self, dm3k_viz_data, class_name, instance_name, prop_name="cost", class_type="resource"):
-        if class_type == "resource":
-            class_type_name = "resourceInstances"
-        else:
-            class_type_name = "activityInstances"
+        class_index = self._index(dm3k_viz_data, class_type + "Instances").get(class_name)
+        instance = class_index["instances"].get(instance_name) if class_index else None
+        return None if instance is None else instance[prop_name]
 
-        prop_value = None
-        for i in dm3k_viz_data[class_type_name]:
-            if i["className"] == class_name:
-                for j in i["instanceTable"]:
-                    if j["instanceName"] == instance_name:
-                        prop_value = j[prop_name]
+    def _expand_allocations(self, allocation_group, resource_names, activity_names, possible_allocations):
+        """
+        Add the possible allocations of each row of an allocation group...a row of "ALL" expands to all of the names
 
-        return prop_value
+        :param dict allocation_group: the allocation instances of a resource class and an activity class
+        :param list resource_names: the instances of the resource class
+        :param list activity_names: the instances of the activity class
+        :param dict possible_allocations: resource name -> activity names, extended in place
+        """
+        for row in allocation_group["instanceTable"]:
+            rin = resource_names if row["resourceInstanceName"] == "ALL" else [row["resourceInstanceName"]]
+            ain = activity_names if row["activityInstanceName"] == "ALL" else [row["activityInstanceName"]]
+            if not ain:
+                continue  # no allocations (and no empty list for the resources)
+            for r in rin:
+                possible_allocations.setdefault(r, []).extend(ain)
 
     def ingest_validate(self, input_dict):
         """
@@ -199,6 +271,7 @@ class FullHouseInputViz(FullHouseInput):
 
         # --- INGEST ---
         log.debug("Ingesting Data")
+        self._viz_index = {}
         self._data = {
             "parent_resources": [],
             "child_resources": [],
@@ -370,8 +443,6 @@ class FullHouseInputViz(FullHouseInput):
         # avail_parent amt is a dict of the total budget for each parent resource:
         #   keys are parent resource names,
         #   values are float amounts
-        parent_res_instance = None
-
         if "resourceInstances" not in dm3k_viz_data:
             return (
                 True,
@@ -388,9 +459,7 @@ class FullHouseInputViz(FullHouseInput):
 
         try:
 
-            for ri in dm3k_viz_data["resourceInstances"]:
-                if ri["className"] == parent_resource:
-                    parent_res_instance = ri
+            parent_res_instance = self._get_last_group(dm3k_viz_data, parent_resource)
 
             for pri in parent_res_instance["instanceTable"]:
 
@@ -440,8 +509,6 @@ class FullHouseInputViz(FullHouseInput):
         #    keys are parent resource names and
         #    values are lists of parent activity names
         # Use the allocation instances between the parent resource and activity to fill this
-        parent_allocation_instance = None
-
         if "allocationInstances" not in dm3k_viz_data:
             return (
                 True,
@@ -458,27 +525,13 @@ class FullHouseInputViz(FullHouseInput):
 
         try:
 
-            for ai in dm3k_viz_data["allocationInstances"]:
-                if (ai["resourceClassName"] == parent_resource) and (ai["activityClassName"] == parent_activity):
-                    parent_allocation_instance = ai
-
-            for pai in parent_allocation_instance["instanceTable"]:
-                if pai["resourceInstanceName"] == "ALL":
-                    rin = self._data["parent_resources"]
-                else:
-                    rin = [pai["resourceInstanceName"]]
-
-                if pai["activityInstanceName"] == "ALL":
-                    ain = self._data["parent_activities"]
-                else:
-                    ain = [pai["activityInstanceName"]]
-
-                for r in rin:
-                    for a in ain:
-                        if r in self._data["parent_possible_allocations"]:
-                            self._data["parent_possible_allocations"][r].append(a)
-                        else:
-                            self._data["parent_possible_allocations"][r] = [a]
+            parent_allocation_instance = self._index(dm3k_viz_data, "allocationInstances").get((parent_resource, parent_activity))
+            self._expand_allocations(
+                parent_allocation_instance,
+                self._data["parent_resources"],
+                self._data["parent_activities"],
+                self._data["parent_possible_allocations"],
+            )
 
             log.debug("parent possible allocations")
             log.debug(self._data["parent_possible_allocations"])
@@ -577,10 +630,7 @@ class FullHouseInputViz(FullHouseInput):
         # avail_child_amt is a dict of the total budget for each child resource:
         #    keys are child resource names,
         #    values are float amounts
-        child_res_instance = None
-        for ri in dm3k_viz_data["resourceInstances"]:
-            if ri["className"] == child_resource:
-                child_res_instance = ri
+        child_res_instance = self._get_last_group(dm3k_viz_data, child_resource)
 
         for cri in child_res_instance["instanceTable"]:
 
@@ -600,28 +650,13 @@ class FullHouseInputViz(FullHouseInput):
         #    keys are child resource names and
         #    values are lists of child activity names
         # Use the allocation instances between the child resource and activity to fill this
-        child_allocation_instance = None
-        for ai in dm3k_viz_data["allocationInstances"]:
-            if (ai["resourceClassName"] == child_resource) and (ai["activityClassName"] == child_activity):
-                child_allocation_instance = ai
-
-        for cai in child_allocation_instance["instanceTable"]:
-            if cai["resourceInstanceName"] == "ALL":
-                rin = self._data["child_resources"]
-            else:
-                rin = [cai["resourceInstanceName"]]
-
-            if cai["activityInstanceName"] == "ALL":
-                ain = self._data["child_activities"]
-            else:
-                ain = [cai["activityInstanceName"]]
-
-            for r in rin:
-                for a in ain:
-                    if r in self._data["child_possible_allocations"]:
-                        self._data["child_possible_allocations"][r].append(a)
-                    else:
-                        self._data["child_possible_allocations"][r] = [a]
+        child_allocation_instance = self._index(dm3k_viz_data, "allocationInstances").get((child_resource, child_activity))
+        self._expand_allocations(
+            child_allocation_instance,
+            self._data["child_resources"],
+            self._data["child_activities"],
+            self._data["child_possible_allocations"],
+        )
 
         log.debug("child possible allocations")
         log.debug(self._data["child_possible_allocations"])
@@ -682,19 +717,19 @@ class FullHouseInputViz(FullHouseInput):
             )
             return True, self._validation_errors  # this is a fatal error, just stop now
 
-        for ci in dm3k_viz_data["containsInstances"]:
-            if ci["parentClassName"] == resource_container and ci["childClassName"] == parent_resource:
-                for i in ci["instanceTable"]:
-                    if i["parentInstanceName"] not in self._data["resource_families"]:
-                        self._data["resource_families"][i["parentInstanceName"]] = {"parent_resources": [], "child_resources": []}
+        # the contains instances of each pair of classes, indexed once
+        contains_index = self._index(dm3k_viz_data, "containsInstances")
+        for ci in contains_index.get((resource_container, parent_resource), []):
+            for i in ci["instanceTable"]:
+                if i["parentInstanceName"] not in self._data["resource_families"]:
+                    self._data["resource_families"][i["parentInstanceName"]] = {"parent_resources": [], "child_resources": []}
 
-                    self._data["resource_families"][i["parentInstanceName"]]["parent_resources"].append(i["childInstanceName"])
+                self._data["resource_families"][i["parentInstanceName"]]["parent_resources"].append(i["childInstanceName"])
 
         # had to do separate loops because instance container must be set first
-        for ci in dm3k_viz_data["containsInstances"]:
-            if ci["parentClassName"] == resource_container and ci["childClassName"] == child_resource:
-                for i in ci["instanceTable"]:
-                    self._data["resource_families"][i["parentInstanceName"]]["child_resources"].append(i["childInstanceName"])
+        for ci in contains_index.get((resource_container, child_resource), []):
+            for i in ci["instanceTable"]:
+                self._data["resource_families"][i["parentInstanceName"]]["child_resources"].append(i["childInstanceName"])
 
         log.debug("Resource Families")
         log.debug(self._data["resource_families"])
@@ -703,15 +738,14 @@ class FullHouseInputViz(FullHouseInput):
         #    keys are parent activity names,
         #    values are list of child activity names for that parent
         # To construct this, examine the contains instance between the parent activity and the child activity name
-        for ci in dm3k_viz_data["containsInstances"]:
-            if ci["parentClassName"] == parent_activity and ci["childClassName"] == child_activity:
-                for i in ci["instanceTable"]:
-                    pin = i["parentInstanceName"]
-                    cin = i["childInstanceName"]
-                    if pin in self._data["activity_children"]:
-                        self._data["activity_children"][pin].append(cin)
-                    else:
-                        self._data["activity_children"][pin] = [cin]
+        for ci in contains_index.get((parent_activity, child_activity), []):
+            for i in ci["instanceTable"]:
+                pin = i["parentInstanceName"]
+                cin = i["childInstanceName"]
+                if pin in self._data["activity_children"]:
+                    self._data["activity_children"][pin].append(cin)
+                else:
+                    self._data["activity_children"][pin] = [cin]
 
         log.debug("Activity Children")
         log.debug(self._data["activity_children"])
@@ -11,10 +11,12 @@ pa = parent activity
 import logging
 from collections import defaultdict
 
-from pyomo.environ import Any, Binary, ConcreteModel, Constraint, NonNegativeReals, Objective, Param, Set, Var, maximize
+from pyomo.environ import Any, Binary, ConcreteModel, Constraint, ConstraintList, NonNegativeReals, Objective, Param, Set, Var, maximize
 
 from optimizer.full_house.full_house_input import FullHouseInput
 from optimizer.slim_optimizer_base import ModelBase
+from optimizer.slim_output_base import TRACE_FIELDS, empty_trace
+from optimizer.util.history_pattern import traced
 
 log = logging.getLogger(__name__)
 
@@ -240,10 +242,14 @@ class FullHouseModel(ModelBase):
 
         self._data = data  # store this for filling output later
         self.__initialize_model()
+        self.cancel_token.check("build of the relationships")
         self.__set_relationships()
+        self.cancel_token.check("build of the params and variables")
         self.__create_vars_params()
+        self.cancel_token.check("build of the constraints")
         self.__create_constraints()
 
+    @traced("Creating indices")
     def __initialize_model(self):
         log.info("Building Pyomo model...")
         self._model = ConcreteModel()
@@ -273,6 +279,7 @@ class FullHouseModel(ModelBase):
         forbid_index = [self._rev_ca[name] for name in data["forbid_list"]]
         self._model.forbid = Set(initialize=forbid_index, ordered=True)
 
+    @traced("Creating relationships")
     def __set_relationships(self):
         data = self._data
         log.info("Creating relationships...")
@@ -315,7 +322,9 @@ class FullHouseModel(ModelBase):
         pr_cr_arcs = []
         list_pa_that_link_pr_cr_ca = defaultdict(list)
         for container_name in data["resource_families"]:
-            for pr_name in data["resource_families"][container_name]["parent_resources"]:
+            for pr_name in self.cancel_token.checked_iter(
+                data["resource_families"][container_name]["parent_resources"], "build of the relationships"
+            ):
                 for cr_name in data["resource_families"][container_name]["child_resources"]:
                     pr = self._rev_pr[pr_name]
                     cr = self._rev_cr[cr_name]
@@ -330,6 +339,7 @@ class FullHouseModel(ModelBase):
             self._model.pr * self._model.cr * self._model.ca, initialize=list_pa_that_link_pr_cr_ca, default=set(), within=Any
         )
 
+    @traced("Creating params and variables")
     def __create_vars_params(self):
         data = self._data
         log.info("Creating variables and parameters...")
@@ -374,16 +384,33 @@ class FullHouseModel(ModelBase):
         # indicates if child resource, cr, is allocated to child activity in coordination with parent resource, pr
         self._model.CHILD_ALLOCATED = Var(self._model.cr_ca_arcs, domain=Binary, initialize=0)
 
+    @traced("Creating constraints")
     def __create_constraints(self):
         log.info("Creating constraints...")
-        self._model.required_parent_amount = Constraint(self._model.pr_pa_arcs, rule=required_parent_amount_rule)
-        self._model.required_child_amount = Constraint(self._model.cr_ca_arcs, rule=required_child_amount_rule)
-        self._model.available_parent_amount = Constraint(self._model.pr, rule=available_parent_amount_rule)
-        self._model.available_child_amount = Constraint(self._model.cr, rule=available_child_amount_rule)
-        self._model.link_parent_to_child = Constraint(self._model.cr_ca_arcs, rule=link_parent_to_child_rule)
-        self._model.child_allocated_limit = Constraint(self._model.ca, rule=child_allocated_limit_rule)
-        self._model.force_limit = Constraint(self._model.force, rule=force_child_rule)
-        self._model.forbid_limit = Constraint(self._model.forbid, rule=forbid_child_rule)
+        self._model.required_parent_amount = Constraint(
+            self._model.pr_pa_arcs, rule=self.cancel_token.checked_rule(required_parent_amount_rule, "build of required_parent_amount")
+        )
+        self._model.required_child_amount = Constraint(
+            self._model.cr_ca_arcs, rule=self.cancel_token.checked_rule(required_child_amount_rule, "build of required_child_amount")
+        )
+        self._model.available_parent_amount = Constraint(
+            self._model.pr, rule=self.cancel_token.checked_rule(available_parent_amount_rule, "build of available_parent_amount")
+        )
+        self._model.available_child_amount = Constraint(
+            self._model.cr, rule=self.cancel_token.checked_rule(available_child_amount_rule, "build of available_child_amount")
+        )
+        self._model.link_parent_to_child = Constraint(
+            self._model.cr_ca_arcs, rule=self.cancel_token.checked_rule(link_parent_to_child_rule, "build of link_parent_to_child")
+        )
+        self._model.child_allocated_limit = Constraint(
+            self._model.ca, rule=self.cancel_token.checked_rule(child_allocated_limit_rule, "build of child_allocated_limit")
+        )
+        self._model.force_limit = Constraint(
+            self._model.force, rule=self.cancel_token.checked_rule(force_child_rule, "build of force_limit")
+        )
+        self._model.forbid_limit = Constraint(
+            self._model.forbid, rule=self.cancel_token.checked_rule(forbid_child_rule, "build of forbid_limit")
+        )
 
         log.info("Creating objective function...")
         self._model.objective = Objective(rule=objective_rule, sense=maximize)
@@ -391,7 +418,102 @@ class FullHouseModel(ModelBase):
         log.info("DONE!!")
         # log.debug(self._model.pprint())
 
-    def fill_output(self, output_class):
+    def force_activity(self, act_name, picked=True):
+        """
+        Force one (parent or child) activity to be picked (or not picked) in the next solve
+
+        :param str act_name: name of the activity instance
+        :param bool picked: True = the activity must be allocated to a resource, False = the activity must not be allocated
+        :return bool forced: False if the activity is not in this model
+        """
+        if act_name in self._rev_pa:
+            pa = self._rev_pa[act_name]
+            allocated = [self._model.PARENT_ALLOCATED[pr, a] for (pr, a) in self._model.pr_pa_arcs if a == pa]
+        elif act_name in self._rev_ca:
+            ca = self._rev_ca[act_name]
+            allocated = [self._model.CHILD_ALLOCATED[cr, a] for (cr, a) in self._model.cr_ca_arcs if a == ca]
+        else:
+            return False
+
+        if picked:
+            if not allocated:
+                raise ValueError("Cannot force activity {}...it cannot be allocated to any resource".format(act_name))
+            if not hasattr(self._model, "forced_activity_constraint"):
+                self._model.forced_activity_constraint = ConstraintList()
+            self._model.forced_activity_constraint.add(sum(allocated) >= 1)
+        else:
+            for var in allocated:
+                var.fix(0)
+        return True
+
+    def load_previous_result(self, previous_result):
+        """
+        Map a previous result onto the PARENT_ALLOCATED, PARENT_AMT, CHILD_ALLOCATED and CHILD_AMT variables of this model and
+        repair it so that it is feasible (allocations that no longer exist, exceed a budget, are forbidden or lost their linking
+        parent allocation are dropped).
+
+        :param dict previous_result: a previous result with "allocations" and/or "allocated_amt" keys
+        :return bool loaded: True = the variables were set from the previous result
+        """
+        prev_allocations = previous_result.get("allocations") or {
+            res_name: list(act_amts.keys()) for res_name, act_amts in previous_result.get("allocated_amt", {}).items()
+        }
+        model = self._model
+
+        # parent allocations first, since child allocations depend on them
+        parent_allocated = set()
+        parent_budget_used = defaultdict(float)
+        for pr_name, act_names in prev_allocations.items():
+            if pr_name not in self._rev_pr:
+                continue
+            pr = self._rev_pr[pr_name]
+            for pa_name in act_names:
+                pa = self._rev_pa.get(pa_name)
+                if pa is None or (pr, pa) not in model.pr_pa_arcs:
+                    continue
+                if parent_budget_used[pr] + model.req_parent_amt[pr, pa] > model.avail_parent_amt[pr]:
+                    continue
+                parent_allocated.add((pr, pa))
+                parent_budget_used[pr] += model.req_parent_amt[pr, pa]
+
+        forbid = set(model.forbid)
+        child_allocated = set()
+        child_budget_used = defaultdict(float)
+        picked_ca = set()
+        for cr_name, act_names in prev_allocations.items():
+            if cr_name not in self._rev_cr:
+                continue
+            cr = self._rev_cr[cr_name]
+            for ca_name in act_names:
+                ca = self._rev_ca.get(ca_name)
+                if ca is None or (cr, ca) not in model.cr_ca_arcs or ca in forbid or ca in picked_ca:
+                    continue
+                if child_budget_used[cr] + model.req_child_amt[cr, ca] > model.avail_child_amt[cr]:
+                    continue
+                linked = any((pr, pa) in parent_allocated for pr in model.pr for pa in model.list_pa_that_link_pr_cr_ca[pr, cr, ca])
+                if not linked:
+                    continue
+                child_allocated.add((cr, ca))
+                child_budget_used[cr] += model.req_child_amt[cr, ca]
+                picked_ca.add(ca)
+
+        if not parent_allocated and not child_allocated:
+            log.info("No allocations of the previous result exist in this model...cannot warm start")
+            return False
+
+        for (pr, pa) in model.pr_pa_arcs:
+            is_allocated = (pr, pa) in parent_allocated
+            model.PARENT_ALLOCATED[pr, pa].set_value(1 if is_allocated else 0)
+            model.PARENT_AMT[pr, pa].set_value(model.req_parent_amt[pr, pa] if is_allocated else 0)
+        for (cr, ca) in model.cr_ca_arcs:
+            is_allocated = (cr, ca) in child_allocated
+            model.CHILD_ALLOCATED[cr, ca].set_value(1 if is_allocated else 0)
+            model.CHILD_AMT[cr, ca].set_value(model.req_child_amt[cr, ca] if is_allocated else 0)
+
+        log.info("Warm start kept %s parent and %s child allocations", len(parent_allocated), len(child_allocated))
+        return True
+
+    def fill_output(self, output_class, include_trace=True):
         """
         Return the output of the model after it has been solved by instantiating an object of the output class.
 
@@ -399,64 +521,24 @@ class FullHouseModel(ModelBase):
         this method must be implemented in the subclass
 
         :param OutputBase output_class: the OutputBase or subclass of output base
+        :param bool include_trace: False = leave the columns of "full_trace" empty
         :return output: an instance of the output_class
         """
         output = output_class()
         result = {
             "objective_value": self._model.objective.expr(),
-            "full_trace": {"resource": [], "activity": [], "budget_used": [], "value": [], "selected": [], "picked": [], "allocated": []},
+            "full_trace": empty_trace(),
             "allocated_amt": {},
             "per_resource_score": {},
             "per_resource_budget_used": {},
         }
         allocations = {}
 
-        picked_parent_combos = []
-        picked_child_combos = []
-        not_picked_parent_combos = []
-        not_picked_child_combos = []
-
-        for container_name, data in self._data["resource_families"].items():
-            for parent_resource in data["parent_resources"]:
-                pr = self._rev_pr[parent_resource]  # initials are for index
-                for child_resource in data["child_resources"]:
-                    cr = self._rev_cr[child_resource]
-                    for child_activity in self._data["child_possible_allocations"][child_resource]:
-                        ca = self._rev_ca[child_activity]
-                        parent_activities = self._model.list_pa_that_link_pr_cr_ca[(pr, cr, ca)]
-                        child_picked = self._model.CHILD_ALLOCATED[(cr, ca)].value
-                        for pa in parent_activities:
-                            parent_picked = self._model.PARENT_ALLOCATED[(pr, pa)].value
-                            picked = parent_picked * child_picked
-                            parent_activity = self._data["parent_activities"][pa]  # get name
-
-                            if picked:
-                                if (parent_resource, parent_activity) not in picked_parent_combos:
-                                    picked_parent_combos.append((parent_resource, parent_activity))
-
-                                if (child_resource, child_activity) not in picked_child_combos:
-                                    picked_child_combos.append((child_resource, child_activity))
-                            else:
-                                if (parent_resource, parent_activity) not in not_picked_parent_combos:
-                                    if (parent_resource, parent_activity) not in picked_parent_combos:
-                                        not_picked_parent_combos.append((parent_resource, parent_activity))
-
-                                if (child_resource, child_activity) not in not_picked_child_combos:
-                                    if (child_resource, child_activity) not in picked_child_combos:
-                                        not_picked_child_combos.append((child_resource, child_activity))
-
-        # sometimes items in picked get into non-picked
-        for (re, ac) in picked_parent_combos:
-            if (re, ac) in not_picked_parent_combos:
-                not_picked_parent_combos.remove((re, ac))
-
-        for (re, ac) in picked_child_combos:
-            if (re, ac) in not_picked_child_combos:
-                not_picked_child_combos.remove((re, ac))
+        picked_parent_combos, picked_child_combos, not_picked_parent_combos, not_picked_child_combos = self._get_combos()
 
         # handle all parent metrics
         budget_name1 = self._data["parent_budget_name"]
-        for (res_name1, act_name1) in picked_parent_combos:
+        for (res_name1, act_name1) in self.cancel_token.checked_iter(picked_parent_combos, "output"):
             pr = self._rev_pr[res_name1]  # initials are for index
             pa = self._rev_pa[act_name1]
             # allocated amount
@@ -487,20 +569,9 @@ class FullHouseModel(ModelBase):
                 result["per_resource_budget_used"][res_name1] = {}
                 result["per_resource_budget_used"][res_name1][budget_name1] = self._model.PARENT_AMT[(pr, pa)].value
 
-            # Full trace
-            act1_value = 0  # parent activities have no value
-            result["full_trace"]["resource"].append(res_name1)
-            result["full_trace"]["activity"].append(act_name1)
-            # assume there are two budgets and its oriented [parent_budget, child_budget]
-            result["full_trace"]["budget_used"].append([self._model.PARENT_AMT[(pr, pa)].value, 0.0])
-            result["full_trace"]["value"].append(act1_value)
-            result["full_trace"]["selected"].append(1.0)
-            result["full_trace"]["picked"].append(1.0)
-            result["full_trace"]["allocated"].append(1.0)
-
         # handle all child metrics
         budget_name2 = self._data["child_budget_name"]
-        for (res_name2, act_name2) in picked_child_combos:
+        for (res_name2, act_name2) in self.cancel_token.checked_iter(picked_child_combos, "output"):
             cr = self._rev_cr[res_name2]
             ca = self._rev_ca[act_name2]
 
@@ -540,39 +611,105 @@ class FullHouseModel(ModelBase):
                 result["per_resource_budget_used"][res_name2] = {}
                 result["per_resource_budget_used"][res_name2][budget_name2] = self._model.CHILD_AMT[(cr, ca)].value
 
-            # full trace
-            result["full_trace"]["resource"].append(res_name2)
-            result["full_trace"]["activity"].append(act_name2)
-            # assume there are two budgets and its oriented [parent_budget, child_budget]
-            result["full_trace"]["budget_used"].append([0.0, self._model.CHILD_AMT[(cr, ca)].value])
-            result["full_trace"]["value"].append(act2_val)
-            result["full_trace"]["selected"].append(1.0)
-            result["full_trace"]["picked"].append(1.0)
-            result["full_trace"]["allocated"].append(1.0)
-
-        # do non picked full_trace
-        act1_value = 0
-        for (res_name1, act_name1) in not_picked_parent_combos:
-            result["full_trace"]["resource"].append(res_name1)
-            result["full_trace"]["activity"].append(act_name1)
-            result["full_trace"]["budget_used"].append([0.0, 0.0])
-            result["full_trace"]["value"].append(act1_value)
-            result["full_trace"]["selected"].append(0.0)
-            result["full_trace"]["picked"].append(0.0)
-            result["full_trace"]["allocated"].append(0.0)
-
-        for (res_name2, act_name2) in not_picked_child_combos:
-            ca = self._rev_ca[act_name2]
-            act2_value = self._model.child_score[ca]
-            result["full_trace"]["resource"].append(res_name2)
-            result["full_trace"]["activity"].append(act_name2)
-            result["full_trace"]["budget_used"].append([0.0, 0.0])
-            result["full_trace"]["value"].append(act2_value)
-            result["full_trace"]["selected"].append(0.0)
-            result["full_trace"]["picked"].append(0.0)
-            result["full_trace"]["allocated"].append(0.0)
+        # handle full_trace
+        if include_trace:
+            combos = (picked_parent_combos, picked_child_combos, not_picked_parent_combos, not_picked_child_combos)
+            for row in self.cancel_token.checked_iter(self._trace_rows(*combos), "output"):
+                for field in TRACE_FIELDS:
+                    result["full_trace"][field].append(row[field])
 
         result["allocations"] = allocations
         output.result = result
 
         return output
+
+    def iter_trace_rows(self):
+        """
+        Generate the rows of "full_trace" one at a time after the model has been solved
+
+        :return: a generator of dicts, one per picked and not picked resource-activity combination, with the TRACE_FIELDS keys
+        """
+        return self._trace_rows(*self._get_combos())
+
+    def _get_combos(self):
+        """
+        Find the picked and not picked (resource, activity) combinations of parents and children in the solved model
+
+        :return tuple combos: lists of picked parent, picked child, not picked parent and not picked child combinations
+        """
+        picked_parent_combos = []
+        picked_child_combos = []
+        not_picked_parent_combos = []
+        not_picked_child_combos = []
+
+        for container_name, data in self._data["resource_families"].items():
+            for parent_resource in data["parent_resources"]:
+                pr = self._rev_pr[parent_resource]  # initials are for index
+                for child_resource in data["child_resources"]:
+                    cr = self._rev_cr[child_resource]
+                    for child_activity in self._data["child_possible_allocations"][child_resource]:
+                        ca = self._rev_ca[child_activity]
+                        parent_activities = self._model.list_pa_that_link_pr_cr_ca[(pr, cr, ca)]
+                        child_picked = self._model.CHILD_ALLOCATED[(cr, ca)].value
+                        for pa in parent_activities:
+                            parent_picked = self._model.PARENT_ALLOCATED[(pr, pa)].value
+                            picked = parent_picked * child_picked
+                            parent_activity = self._data["parent_activities"][pa]  # get name
+
+                            if picked:
+                                if (parent_resource, parent_activity) not in picked_parent_combos:
+                                    picked_parent_combos.append((parent_resource, parent_activity))
+
+                                if (child_resource, child_activity) not in picked_child_combos:
+                                    picked_child_combos.append((child_resource, child_activity))
+                            else:
+                                if (parent_resource, parent_activity) not in not_picked_parent_combos:
+                                    if (parent_resource, parent_activity) not in picked_parent_combos:
+                                        not_picked_parent_combos.append((parent_resource, parent_activity))
+
+                                if (child_resource, child_activity) not in not_picked_child_combos:
+                                    if (child_resource, child_activity) not in picked_child_combos:
+                                        not_picked_child_combos.append((child_resource, child_activity))
+
+        # sometimes items in picked get into non-picked
+        for (re, ac) in picked_parent_combos:
+            if (re, ac) in not_picked_parent_combos:
+                not_picked_parent_combos.remove((re, ac))
+
+        for (re, ac) in picked_child_combos:
+            if (re, ac) in not_picked_child_combos:
+                not_picked_child_combos.remove((re, ac))
+
+        return picked_parent_combos, picked_child_combos, not_picked_parent_combos, not_picked_child_combos
+
+    def _trace_rows(self, picked_parent_combos, picked_child_combos, not_picked_parent_combos, not_picked_child_combos):
+        # assume there are two budgets and its oriented [parent_budget, child_budget]
+        for (res_name1, act_name1) in picked_parent_combos:
+            pr = self._rev_pr[res_name1]
+            pa = self._rev_pa[act_name1]
+            # parent activities have no value
+            yield self._trace_row(res_name1, act_name1, [self._model.PARENT_AMT[(pr, pa)].value, 0.0], 0, 1.0)
+
+        for (res_name2, act_name2) in picked_child_combos:
+            cr = self._rev_cr[res_name2]
+            ca = self._rev_ca[act_name2]
+            yield self._trace_row(res_name2, act_name2, [0.0, self._model.CHILD_AMT[(cr, ca)].value], self._model.child_score[ca], 1.0)
+
+        for (res_name1, act_name1) in not_picked_parent_combos:
+            yield self._trace_row(res_name1, act_name1, [0.0, 0.0], 0, 0.0)
+
+        for (res_name2, act_name2) in not_picked_child_combos:
+            ca = self._rev_ca[act_name2]
+            yield self._trace_row(res_name2, act_name2, [0.0, 0.0], self._model.child_score[ca], 0.0)
+
+    @staticmethod
+    def _trace_row(res_name, act_name, budget_used, value, selected):
+        return {
+            "resource": res_name,
+            "activity": act_name,
+            "budget_used": budget_used,
+            "value": value,
+            "selected": selected,
+            "picked": selected,
+            "allocated": selected,
+        }
@@ -4,7 +4,8 @@ Extension of optimizer base...just need to do the init to localize it
 
 from optimizer.full_house.full_house_input_viz import FullHouseInputViz
 from optimizer.full_house.full_house_model import FullHouseModel
-from optimizer.slim_optimizer_base import OptimizerBase, OutputBase
+from optimizer.slim_optimizer_base import OptimizerBase
+from optimizer.slim_output_base import OutputBase
 
 
 class FullHouseOptimizerViz(OptimizerBase):
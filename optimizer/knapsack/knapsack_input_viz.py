@@ -4,7 +4,8 @@ This ingests the format from the DM3K-Viz tool
 
 import logging
 
-from optimizer.slim_optimizer_base import InputBase
+from optimizer.slim_input_base import InputBase
+from optimizer.util.util import count_viz_allocations
 
 log = logging.getLogger(__name__)
 
@@ -78,6 +79,66 @@ class KnapsackInputViz(InputBase):
     def __init__(self):
         super().__init__()
 
+    def estimate_size(self):
+        """
+        Estimate the size of the knapsack model from the viz data (without expanding the arcs)
+
+        :return dict size_estimate: see estimate_viz_size
+        """
+        if not self._data:
+            return {}
+        return self.estimate_viz_size(self._data)
+
+    @staticmethod
+    def estimate_input_size(input_dict):
+        """
+        Estimate the size of the knapsack model from an input that has not been ingested (see InputBase.estimate_input_size)
+
+        :param dict input_dict: a dict containing the name of the input and the data from files associated with this input
+        :return dict size_estimate: see estimate_viz_size
+        """
+        files = input_dict.get("files") or [{}]
+        return KnapsackInputViz.estimate_viz_size(files[0].get("fileContents") or {})
+
+    @staticmethod
+    def estimate_viz_size(viz_data):
+        """
+        Estimate the size of the knapsack model from viz data in linear time (without expanding the arcs)
+
+        :param dict viz_data: the "fileContents" of the viz input
+        :return dict size_estimate: counts of resources, activities, arcs (resource-activity pairs), arc budgets, and
+                                    estimates of the variables, constraints and nonzeros (constraint coefficients) of the model
+        """
+        num_res, num_act, pair_arcs = count_viz_allocations(viz_data)
+        res_budgets = {c.get("className"): set(c.get("budgets", [])) for c in viz_data.get("resourceClasses", [])}
+        act_costs = {c.get("className"): set(c.get("costs", [])) for c in viz_data.get("activityClasses", [])}
+
+        arcs = sum(pair_arcs.values())
+        arc_budgets = 0
+        for (r_class, a_class), num_arcs in pair_arcs.items():
+            arc_budgets += num_arcs * max(1, len(res_budgets.get(r_class, set()) & act_costs.get(a_class, set())))
+
+        resources = sum(num_res.values())
+        activities = sum(num_act.values())
+        resource_budgets = sum(n * len(res_budgets.get(c, [])) for c, n in num_res.items())
+        if_not_arcs = 0
+        for constraint in viz_data.get("allocationConstraints", []):
+            if constraint.get("allocationConstraintType") == "IF-NOT":
+                start = constraint.get("allocationStart", {})
+                if_not_arcs += pair_arcs.get((start.get("resourceClass"), start.get("activityClass")), 0)
+        return {
+            "resources": resources,
+            "activities": activities,
+            "arcs": arcs,
+            "arc_budgets": arc_budgets,
+            # ALLOCATED + ALLOCATED_AMT + PICKED
+            "variables": arcs + arc_budgets + activities,
+            # required amount + available amount + picked and allocated limits + IF-NOT limits (contains constraints add more)
+            "constraints": arc_budgets + resource_budgets + 2 * activities + if_not_arcs,
+            # required amount (2 per arc budget) + available amount (1 per arc budget) + picked and allocated limits
+            "nonzeros": 3 * arc_budgets + 2 * arcs + activities + 2 * if_not_arcs,
+        }
+
     def ingest_validate(self, input_dict):
         """
         Validate the constraints and activity scores to determine if following Errors are found
@@ -29,12 +29,14 @@ b_id = budget_id
 
 import logging
 import sys
-from collections import deque
+from collections import defaultdict, deque
 
 from pyomo.environ import Any, Binary, ConcreteModel, Constraint, NonNegativeReals, Objective, Param, Set, Var, maximize
 
 from optimizer.knapsack.knapsack_input_viz import KnapsackInputViz
 from optimizer.slim_optimizer_base import ModelBase
+from optimizer.slim_output_base import TRACE_FIELDS, empty_trace
+from optimizer.util.history_pattern import traced
 
 log = logging.getLogger(__name__)
 
@@ -219,14 +221,18 @@ class KnapsackModel(ModelBase):
         self.__create_for_base_res_act_relationship()
 
         # all indices, relationships, params and constraints to support contained rewards
+        self.cancel_token.check("build of the contained rewards")
         self.__create_for_contained_reward()
 
         # all indices, relationships, params, and constraints to support IF-NOT constraints
+        self.cancel_token.check("build of the IF-NOT constraints")
         self.__create_for_if_not_constraint()
 
         # all indices, relationships, params, and constraints to support Contained IF-THEN
+        self.cancel_token.check("build of the IF-THEN constraints")
         self.__create_contained_if_constraint()
 
+        self.cancel_token.check("build of the objective")
         self.__create_objective()
 
         log.info("....Pyomo model complete")
@@ -234,13 +240,18 @@ class KnapsackModel(ModelBase):
         if "unittest" not in sys.modules:
             log.debug(self._model.pprint())
 
+    @traced("Creating resource-activity allocations")
     def __create_for_base_res_act_relationship(self):
         log.info("CREATING BASE COMPONENT:  Resource-Activity Allocation...")
         self.__create_indices()
+        self.cancel_token.check("build of the relationships")
         self.__create_relationships()
+        self.cancel_token.check("build of the params and variables")
         self.__create_params_variables()
+        self.cancel_token.check("build of the constraints")
         self.__create_constraints()
 
+    @traced("Creating contained IF-THEN constraints")
     def __create_contained_if_constraint(self):
         """
         contained if-then constraints occur when a allocation constraint is placed between two 'allocated to' links where the resources contain
@@ -364,10 +375,16 @@ class KnapsackModel(ModelBase):
         self._model.no_reward_allocation = Param(self._model.act_id_index, initialize=no_reward_allocation, within=Binary)
 
         # constraints
-        self._model.if_contains_constraint = Constraint(self._model.r_a_arcs_for_contains, rule=if_contains_rule)
+        self._model.if_contains_constraint = Constraint(
+            self._model.r_a_arcs_for_contains, rule=self.cancel_token.checked_rule(if_contains_rule, "build of if_contains_constraint")
+        )
 
-        self._model.if_contains_picked_constraint = Constraint(self._model.allocatable_act_id_index, rule=if_contains_picked)
+        self._model.if_contains_picked_constraint = Constraint(
+            self._model.allocatable_act_id_index,
+            rule=self.cancel_token.checked_rule(if_contains_picked, "build of if_contains_picked_constraint"),
+        )
 
+    @traced("Creating IF-NOT constraints")
     def __create_for_if_not_constraint(self):
         """
         if-not constraints occur when a allocation constraint is placed between two 'allocated to' links and the same resource exists in
@@ -487,8 +504,11 @@ class KnapsackModel(ModelBase):
         self._model.not_allocations = Param(self._model.r_a_arcs_for_not, initialize=not_allocations, within=Any)
 
         # constraints
-        self._model.if_not_limit_constraint = Constraint(self._model.r_a_arcs_for_not, rule=if_not_limit_rule)
+        self._model.if_not_limit_constraint = Constraint(
+            self._model.r_a_arcs_for_not, rule=self.cancel_token.checked_rule(if_not_limit_rule, "build of if_not_limit_constraint")
+        )
 
+    @traced("Creating contained rewards")
     def __create_for_contained_reward(self):
         """
         Contained rewards occur when an activity contains another activity and the containing activity has a reward
@@ -545,8 +565,12 @@ class KnapsackModel(ModelBase):
         )
 
         # constraints
-        self._model.act_picked_contains_constraint = Constraint(self._model.container_act_id_index, rule=act_picked_contains_rule)
+        self._model.act_picked_contains_constraint = Constraint(
+            self._model.container_act_id_index,
+            rule=self.cancel_token.checked_rule(act_picked_contains_rule, "build of act_picked_contains_constraint"),
+        )
 
+    @traced("Creating indices")
     def __create_indices(self):
         log.info("Creating indices...")
 
@@ -620,6 +644,7 @@ class KnapsackModel(ModelBase):
         log.debug("   budget indices..." + str(len(self._model.budget_index.data())))
         log.debug("     " + str(self._model.budget_index.data()))
 
+    @traced("Creating relationships")
     def __create_relationships(self):
         log.info("Creating relationships...")
         r_a_arcs = []  # list of all possible resource to activity allocations
@@ -633,6 +658,9 @@ class KnapsackModel(ModelBase):
         num_budgets = {}  # dict of a_id keys with int number of different costs for that activity
         incoming = {}  # a dict of a_id keys with int number of pairs into that activity
 
+        # how much the rows with ALL expand (e.g. one ALL-to-ALL row of 100 resources and 50 activities = 5000 arcs)
+        all_expansion = {"rows": 0, "all_rows": 0, "all_arcs": 0}
+
         num_incoming_pairs = {}
         for alloc_class_inst in self._data["allocationInstances"]:
             act_class_name = alloc_class_inst["activityClassName"]
@@ -664,7 +692,7 @@ class KnapsackModel(ModelBase):
                 all_budget_ids.append(self._budget_name_to_id[b])
 
             # go through all individual instances of the allocation class instance
-            for alloc_inst in alloc_class_inst["instanceTable"]:
+            for alloc_inst in self.cancel_token.checked_iter(alloc_class_inst["instanceTable"], "build of the relationships"):
                 res_inst_name = alloc_inst["resourceInstanceName"]
                 act_inst_name = alloc_inst["activityInstanceName"]
 
@@ -679,6 +707,11 @@ class KnapsackModel(ModelBase):
                 else:
                     a_ids = all_a_ids
 
+                all_expansion["rows"] += 1
+                if "ALL" in (res_inst_name, act_inst_name):
+                    all_expansion["all_rows"] += 1
+                    all_expansion["all_arcs"] += len(r_ids) * len(a_ids)
+
                 # create ...
                 for a_id in a_ids:
 
@@ -794,6 +827,10 @@ class KnapsackModel(ModelBase):
         log.debug(total_rev_alloc)
         self._model.total_reverse_allocations = Param(self._model.act_id_index, initialize=total_rev_alloc, within=Any)
 
+        all_expansion["factor"] = all_expansion["all_arcs"] / all_expansion["all_rows"] if all_expansion["all_rows"] else None
+        self.structure_stats["all_expansion"] = all_expansion
+
+    @traced("Creating params and variables")
     def __create_params_variables(self):
         log.info("Creating variables and parameters...")
 
@@ -854,19 +891,29 @@ class KnapsackModel(ModelBase):
         # 3)
         self._model.PICKED = Var(self._model.act_id_index, domain=Binary, initialize=0)
 
+    @traced("Creating constraints")
     def __create_constraints(self):
         log.info("Creating constraints...")
-        self._model.required_amount_constraint = Constraint(self._model.r_a_b_arcs, rule=required_amount_rule)
-        self._model.act_picked_constraint = Constraint(self._model.allocatable_act_id_index, rule=act_picked_rule)
-        self._model.available_amount_constraint = Constraint(self._model.r_b_arcs, rule=available_amount_rule)
-        self._model.allocated_limit_constraint = Constraint(self._model.p_a_arcs, rule=allocated_limit_rule)
+        self._model.required_amount_constraint = Constraint(
+            self._model.r_a_b_arcs, rule=self.cancel_token.checked_rule(required_amount_rule, "build of required_amount_constraint")
+        )
+        self._model.act_picked_constraint = Constraint(
+            self._model.allocatable_act_id_index, rule=self.cancel_token.checked_rule(act_picked_rule, "build of act_picked_constraint")
+        )
+        self._model.available_amount_constraint = Constraint(
+            self._model.r_b_arcs, rule=self.cancel_token.checked_rule(available_amount_rule, "build of available_amount_constraint")
+        )
+        self._model.allocated_limit_constraint = Constraint(
+            self._model.p_a_arcs, rule=self.cancel_token.checked_rule(allocated_limit_rule, "build of allocated_limit_constraint")
+        )
 
+    @traced("Creating objective")
     def __create_objective(self):
         log.info("Creating objective function...")
         self._model.objective = Objective(rule=objective_rule, sense=maximize)
         # TODO should we have a condition to minimize as well
 
-    def fill_output(self, output_class):
+    def fill_output(self, output_class, include_trace=True):
         """
         Return the output of the model after it has been solved by instantiating an object of the output class.
 
@@ -874,6 +921,7 @@ class KnapsackModel(ModelBase):
         this method must be implemented in the subclass
 
         :param output_class: the OutputBase or subclass of output base
+        :param bool include_trace: False = leave the columns of "full_trace" empty
         :return output: an instance of the output_class
         """
         output = output_class()
@@ -881,14 +929,14 @@ class KnapsackModel(ModelBase):
         # start with a dict skeleton with objective value filled in
         result = {
             "objective_value": self._model.objective.expr(),
-            "full_trace": {"resource": [], "activity": [], "budget_used": [], "value": [], "selected": [], "picked": [], "allocated": []},
+            "full_trace": empty_trace(),
             "allocated_amt": {},
             "per_resource_score": {},
             "per_resource_budget_used": {},
         }
 
         # calculate allocated amount
-        for (r_id, a_id, b_id) in self._model.r_a_b_arcs:
+        for (r_id, a_id, b_id) in self.cancel_token.checked_iter(self._model.r_a_b_arcs, "output"):
             if self._model.ALLOCATED[r_id, a_id].value and self._model.PICKED[a_id].value:
                 res_name = self._res_id_to_name[r_id]
                 act_name = self._act_id_to_name[a_id]
@@ -924,47 +972,186 @@ class KnapsackModel(ModelBase):
         #  3) allocations - the mapping of resources to activities
         allocations = {}
 
-        for (r_id, a_id) in self._model.r_a_arcs:
-            res_name = self._res_id_to_name[r_id]
-            act_name = self._act_id_to_name[a_id]
-            act_value = self._get_activity_instance(self._act_name_to_class[act_name], act_name)["reward"]
-            act_selected = 0
-            budget_used = [0] * self._max_budget_id
-
-            if self._model.ALLOCATED[r_id, a_id].value and self._model.PICKED[a_id].value:
-                act_selected = 1
+        for (r_id, a_id) in self.cancel_token.checked_iter(self._model.r_a_arcs, "output"):
+            row = self._trace_row(r_id, a_id)
+            res_name = row["resource"]
 
+            if row["selected"]:
                 # handle allocations
                 if res_name in allocations:
-                    allocations[res_name].append(act_name)
+                    allocations[res_name].append(row["activity"])
                 else:
-                    allocations[res_name] = [act_name]
+                    allocations[res_name] = [row["activity"]]
 
                 # handle resource score
                 if res_name in result["per_resource_score"]:
-                    result["per_resource_score"][res_name] += act_value
+                    result["per_resource_score"][res_name] += row["value"]
                 else:
-                    result["per_resource_score"][res_name] = act_value
-
-                # handle budget used
-                for b_id in range(0, self._max_budget_id):
-                    if (r_id, a_id, b_id) in self._model.r_a_b_arcs:
-                        budget_used[b_id] = self._model.ALLOCATED_AMT[(r_id, a_id, b_id)].value
+                    result["per_resource_score"][res_name] = row["value"]
 
             # handle full_trace
-            result["full_trace"]["resource"].append(res_name)
-            result["full_trace"]["activity"].append(act_name)
-            result["full_trace"]["budget_used"].append(budget_used)
-            result["full_trace"]["value"].append(act_value)
-            result["full_trace"]["selected"].append(act_selected)
-            result["full_trace"]["picked"].append(self._model.PICKED[a_id].value)
-            result["full_trace"]["allocated"].append(self._model.ALLOCATED[(r_id, a_id)].value)
+            if include_trace:
+                for field in TRACE_FIELDS:
+                    result["full_trace"][field].append(row[field])
 
         result["allocations"] = allocations
         output.result = result
 
         return output
 
+    def iter_trace_rows(self):
+        """
+        Generate the rows of "full_trace" one at a time after the model has been solved
+
+        :return: a generator of dicts, one per resource-activity arc, with the TRACE_FIELDS keys
+        """
+        for (r_id, a_id) in self._model.r_a_arcs:
+            yield self._trace_row(r_id, a_id)
+
+    def _trace_row(self, r_id, a_id):
+        res_name = self._res_id_to_name[r_id]
+        act_name = self._act_id_to_name[a_id]
+        act_value = self._get_activity_instance(self._act_name_to_class[act_name], act_name)["reward"]
+        act_selected = 0
+        budget_used = [0] * self._max_budget_id
+
+        if self._model.ALLOCATED[r_id, a_id].value and self._model.PICKED[a_id].value:
+            act_selected = 1
+
+            # handle budget used
+            for b_id in range(0, self._max_budget_id):
+                if (r_id, a_id, b_id) in self._model.r_a_b_arcs:
+                    budget_used[b_id] = self._model.ALLOCATED_AMT[(r_id, a_id, b_id)].value
+
+        return {
+            "resource": res_name,
+            "activity": act_name,
+            "budget_used": budget_used,
+            "value": act_value,
+            "selected": act_selected,
+            "picked": self._model.PICKED[a_id].value,
+            "allocated": self._model.ALLOCATED[(r_id, a_id)].value,
+        }
+
+    def force_activity(self, act_name, picked=True):
+        """
+        Force one activity to be picked (or not picked) in the next solve
+
+        :param str act_name: name of the activity instance
+        :param bool picked: True = the activity must be picked, False = the activity must not be picked
+        :return bool forced: False if the activity is not in this model
+        """
+        a_id = self._act_name_to_id.get(act_name)
+        if a_id is None:
+            return False
+
+        self._model.PICKED[a_id].fix(1 if picked else 0)
+        return True
+
+    def load_previous_result(self, previous_result):
+        """
+        Map a previous result onto the ALLOCATED, ALLOCATED_AMT and PICKED variables of this model and repair it so that it is
+        feasible (allocations that no longer exist, exceed a budget, or break an allocation constraint are dropped).
+
+        :param dict previous_result: a previous result with "allocations" and/or "allocated_amt" keys
+        :return bool loaded: True = the variables were set from the previous result
+        """
+        prev_allocations = previous_result.get("allocations") or {
+            res_name: list(act_amts.keys()) for res_name, act_amts in previous_result.get("allocated_amt", {}).items()
+        }
+        model = self._model
+
+        # candidate allocations that still exist in this model
+        candidates = []
+        for res_name, act_names in prev_allocations.items():
+            r_id = self._res_name_to_id.get(res_name)
+            for act_name in act_names:
+                a_id = self._act_name_to_id.get(act_name)
+                if r_id is not None and a_id is not None and (r_id, a_id) in model.r_a_arcs:
+                    candidates.append((r_id, a_id))
+
+        if not candidates:
+            log.info("No allocations of the previous result exist in this model...cannot warm start")
+            return False
+
+        # the res-act pairs each allocation counts against (see allocated_limit_rule)
+        pairs_of_allocation = defaultdict(list)
+        for (p_id, a_id) in model.p_a_arcs:
+            for r_id in model.reverse_allocations[p_id, a_id]:
+                pairs_of_allocation[(r_id, a_id)].append(p_id)
+
+        budgets_of_allocation = defaultdict(list)
+        for (r_id, a_id, b_id) in model.r_a_b_arcs:
+            budgets_of_allocation[(r_id, a_id)].append(b_id)
+
+        has_if_not = hasattr(model, "not_allocations")
+        has_if_contains = hasattr(model, "containing_allocations")
+
+        # greedily keep the candidates that fit the budgets, the allocation limits and the IF-NOT constraints
+        allocated = set()
+        budget_used = defaultdict(float)
+        pairs_used = set()
+        for (r_id, a_id) in candidates:
+            if (r_id, a_id) in allocated:
+                continue
+            if any((p_id, a_id) in pairs_used for p_id in pairs_of_allocation[(r_id, a_id)]):
+                continue
+            if any(
+                budget_used[(r_id, b_id)] + model.required_amount[a_id, b_id] > model.available_amount[r_id, b_id]
+                for b_id in budgets_of_allocation[(r_id, a_id)]
+            ):
+                continue
+            if has_if_not and (r_id, a_id) in model.r_a_arcs_for_not:
+                if any((r_id, not_a_id) in allocated for not_a_id in model.not_allocations[r_id, a_id]):
+                    continue
+
+            allocated.add((r_id, a_id))
+            pairs_used.update((p_id, a_id) for p_id in pairs_of_allocation[(r_id, a_id)])
+            for b_id in budgets_of_allocation[(r_id, a_id)]:
+                budget_used[(r_id, b_id)] += model.required_amount[a_id, b_id]
+
+        # drop allocations to activities that are not picked and Contained IF-THEN allocations that lost their containing
+        # allocation...until nothing changes
+        changed = True
+        picked = set()
+        while changed:
+            changed = False
+            num_allocated = defaultdict(int)
+            for (r_id, a_id) in allocated:
+                num_allocated[a_id] += 1
+            picked = {a_id for a_id in num_allocated if num_allocated[a_id] >= model.num_incoming_pairs[a_id]}
+
+            for (r_id, a_id) in list(allocated):
+                not_picked = a_id not in picked
+                not_contained = (
+                    has_if_contains
+                    and (r_id, a_id) in model.r_a_arcs_for_contains
+                    and not any(alloc in allocated for alloc in model.containing_allocations[r_id, a_id])
+                )
+                if not_picked or not_contained:
+                    allocated.remove((r_id, a_id))
+                    changed = True
+
+        # containing activities are picked when all the activities they contain are picked
+        if hasattr(model, "container_act_id_index"):
+            changed = True
+            while changed:
+                changed = False
+                for a_id in model.container_act_id_index:
+                    if a_id not in picked and all(ca_id in picked for ca_id in model.contained_activities[a_id]):
+                        picked.add(a_id)
+                        changed = True
+
+        for (r_id, a_id) in model.r_a_arcs:
+            model.ALLOCATED[r_id, a_id].set_value(1 if (r_id, a_id) in allocated else 0)
+        for (r_id, a_id, b_id) in model.r_a_b_arcs:
+            model.ALLOCATED_AMT[r_id, a_id, b_id].set_value(model.required_amount[a_id, b_id] if (r_id, a_id) in allocated else 0)
+        for a_id in model.act_id_index:
+            model.PICKED[a_id].set_value(1 if a_id in picked else 0)
+
+        log.info("Warm start kept %s of %s previous allocations", len(allocated), len(candidates))
+        return True
+
     # HELPER FUNCTIONS
     def _get_alloc_inst_name(self, alloc_inst):
         return alloc_inst["resourceClassName"] + "_" + alloc_inst["activityClassName"]
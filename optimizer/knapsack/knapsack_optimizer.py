@@ -4,7 +4,8 @@ Extension of optimizer base...just need to do the init to localize it
 
 from optimizer.knapsack.knapsack_input_viz import KnapsackInputViz
 from optimizer.knapsack.knapsack_model import KnapsackModel
-from optimizer.slim_optimizer_base import OptimizerBase, OutputBase
+from optimizer.slim_optimizer_base import OptimizerBase
+from optimizer.slim_output_base import OutputBase
 
 
 class KnapsackOptimizerViz(OptimizerBase):
@@ -0,0 +1,89 @@
+"""
+The base class of optimizer inputs.
+
+It is kept apart from slim_optimizer_base so that inputs can be ingested and validated without importing pyomo.
+"""
+
+from abc import ABC, abstractmethod
+
+
+class InputBase(ABC):
+    def __init__(self):
+
+        # this attribute needs to be a dict that can be dumped by json.dump
+        self._data = {}
+
+    @abstractmethod
+    def ingest_validate(self, input_dict: dict):
+        """
+        Validate the constraints and activity scores to determine if following Errors are found
+
+        ERROR_CODE DESCRIPTIONS
+            1. the necessary constraints files do not exist
+            2. the formats of the constraints files are incorrect
+            3. the data within the constraints files are not consistent with each other
+            4. the data within the constraints files and the activity names are not consistent
+
+        And then Load the files in the constraints path into this input (capturing them in the self._data attribute)
+
+        :param dict input_dict: a dict containing the name of the input and the data from files associated with this input
+        :return bool fatal: True=a fatal error has been found, the optimizer should not continue
+        :return dict validation_errors: a list of errors where each error is a dict with the following attributes...
+                    "err_code" : <a int where int is key in VALIDATE_ERROR_CODE>,
+                    "err_txt" : <human readable text that describes the error>,
+                    "offender" : <string or list of name(s) (of DU, resource, or resource group) that is causing error>,
+                    "fix": <string name of process performed to fix the error  or None>,
+                    "is_fatal_error": <boolean; True = error is fatal, False = error is fixable>
+        """
+
+    def get_info(self, info_name: str):
+        """
+        Returns a given field of the input dictionary
+
+        :param str info_name: Name of particular input field that is wanted
+        :return: One field from _data dictionary
+        """
+        return self._data.get(info_name)
+
+    def list_info_avail(self):
+        """
+        Returns all keys in the input dictionary
+
+        :return list:
+        """
+        return list(self._data.keys())
+
+    def estimate_size(self) -> dict:
+        """
+        Cheaply estimate the size of the model that would be built from the ingested data (without building it), e.g. to
+        give quick feedback while a problem is edited
+
+        NOTE - inputs that can estimate their model size should override this method
+
+        :return dict size_estimate: estimates such as "arcs", "variables" and "constraints" (empty if no estimate is available)
+        """
+        return {}
+
+    @staticmethod
+    def estimate_input_size(input_dict: dict) -> dict:
+        """
+        Estimate the size of the model from an input that has not been ingested, in linear time (e.g. without expanding
+        "ALL" allocations), so that problems that are too large can be turned away before they take up memory and CPU
+
+        NOTE - inputs that can estimate their model size should override this method...it must not trust the input (it
+               has not been validated)
+
+        :param dict input_dict: a dict containing the name of the input and the data from files associated with this input
+        :return dict size_estimate: estimates such as "arcs", "variables", "constraints" and "nonzeros" (empty if no estimate
+                                    is available)
+        """
+        return {}
+
+    def to_data(self) -> dict:
+        """
+        Whatever data format the model needs
+
+        :return dict data: a dictionary containing all necessary data for the model (this will be defined on a model by model
+                     basis)
+        """
+        return self._data
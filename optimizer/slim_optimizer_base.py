@@ -5,33 +5,90 @@ classes.
 """
 from __future__ import annotations  # needed for the self-referential type hints
 
+import functools
+import json
 import logging
 import os
 import threading
 import time
 from abc import ABC, abstractmethod
 from datetime import datetime
+from typing import TYPE_CHECKING
 
-import pandas as pd
 import psutil  # See https://github.com/PyUtilib/pyutilib/issues/31  - getting ValueError: signal only works in main thread
 import pyutilib.subprocess.GlobalData
+from pyomo.common.errors import ApplicationError
 from pyomo.common.tempfiles import TempfileManager
+from pyomo.environ import Constraint, Objective, Var, value
 from pyomo.opt import SolverFactory, SolverStatus, TerminationCondition
-from pyutilib.common._exceptions import ApplicationError
 
-from optimizer.util.history_pattern import HistoryManager
-from optimizer.util.util import remove_old_temp_files
+from optimizer.slim_input_base import InputBase
+from optimizer.slim_output_base import ALLOC_KEY, MODEL_STATS_KEY, TRACE_KEY, OutputBase, iter_trace_columns, select_fields
+from optimizer.util.cancel import CancellationToken
+from optimizer.util.deadline import DeadlineExceeded
+from optimizer.util.glpk_log import parse_glpk_log, parse_mip_progress
+from optimizer.util.history_pattern import HISTORY_COLUMNS, HistoryManager
+from optimizer.util.model_stats import model_statistics
+from optimizer.util.profiling import ProfileCapture
+from optimizer.util.progress import ProgressReporter
+from optimizer.util.solver_usage import SolverUsageMonitor
+from optimizer.util.util import convertToMB, remove_old_temp_files
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 pyutilib.subprocess.GlobalData.DEFINE_SIGNAL_HANDLERS_DEFAULT = False
 
 log = logging.getLogger(__name__)
 
-# set up logging
+# set up logging...LOG_DIR is created by the first solve (see ModelBase.solve)
 app_directory = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..")
 LOG_DIR = os.path.join(app_directory, "logs")
-if not os.path.exists(LOG_DIR):
-    log.debug("Creating LOG_DIR=" + str(LOG_DIR))
-    os.makedirs(LOG_DIR)
+
+# name of the file (within each solve's pyomo log directory) that holds the solution for later warm starts
+SOLUTION_FILE_NAME = "solution.json"
+# name of the file (within each solve's pyomo log directory) that holds the timeline of the solver log (see ModelBase.solver_log)
+SOLVER_TIMELINE_FILE_NAME = "solver_timeline.json"
+
+# with a deadline, the solver gets this share of the time that is left (the rest is for gathering the output)...and it is
+# not started (or retried) with less than MIN_SOLVER_SEC
+DEADLINE_SOLVER_SHARE = 0.9
+MIN_SOLVER_SEC = 1
+
+# the stages of a pyomo solve (methods of the solver) that are tracked as spans of the history
+SOLVER_SPANS = {"_presolve": "Writing problem file", "_apply_solver": "Running solver", "_postsolve": "Reading solver results"}
+
+
+def _profiled(method):
+    """
+    Run a method of an optimizer under its profile capture (see OptimizerBase.set_profile)
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._profile.active():
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+def load_solution(solution_id: str) -> dict:
+    """
+    Load a previously saved solution so that it can be used to warm start a new solve
+
+    :param str solution_id: the id returned in the "solution_id" field of a previous result
+    :return dict solution: a dict with (at least) the "allocations" and "allocated_amt" of the previous result
+    :raises ValueError: if the solution id is not valid or the solution can not be found
+    """
+    if not solution_id or os.path.basename(solution_id) != solution_id or solution_id in (".", ".."):
+        raise ValueError("Invalid solution id: {}".format(solution_id))
+
+    solution_path = os.path.join(LOG_DIR, "pyomo_logs", solution_id, SOLUTION_FILE_NAME)
+    if not os.path.exists(solution_path):
+        raise ValueError("No solution found with solution id: {}".format(solution_id))
+
+    with open(solution_path) as f:
+        return json.load(f)
 
 
 class OptimizerBase(ABC):
@@ -42,7 +99,7 @@ class OptimizerBase(ABC):
             NOTE - individual optimizers should extend this class in order to specify the corresponding inputs
 
         Args:
-            input_class: python class that extends class InputBase below
+            input_class: python class that extends class InputBase (see optimizer.slim_input_base)
             model_class: python class that extends class ModelBase below OR
                 a list of python classes that extends class ModelBase below.
                 **NOTE** *- the list of model_classes is used when the user wants to
@@ -53,7 +110,7 @@ class OptimizerBase(ABC):
                 the next model_class is checked...until a model_class is found
                 that solves the problem or all model_classes provided fail the
                 checks.*
-            output_class: python class that extends class OutputBase below
+            output_class: python class that extends class OutputBase (see optimizer.slim_output_base)
 
         """
         self._model_class = model_class
@@ -66,7 +123,11 @@ class OptimizerBase(ABC):
         self._input = input_class()
         self._model = None
         self._output = None
+        self._progress = ProgressReporter()
+        self._cancel_token = CancellationToken()
+        self._profile = ProfileCapture()
 
+    @_profiled
     def ingest(self, input_dict: dict):
         """
         Ingest a new input dataset
@@ -87,29 +148,36 @@ class OptimizerBase(ABC):
                 NOTE - when catching this error (i.e. except ValueError as e:),
                     e.args[1] = text of error = "Input Data Failed Validation"
                     e.args[0] = list of validation errors...at least one of these caused the fatal error
+        :raises Cancelled: if the cancellation token (see set_cancel_token) was cancelled
         """
-        self._hist_mgr.start_tag("Ingest from input dictionary")
-        fatal, validation_errors = self._input.ingest_validate(input_dict)
-        if fatal:
-            raise ValueError(validation_errors, "Input Data Failed Validation")
+        self._cancel_token.check("ingest")
+        self._progress.phase("ingest")
+        # the spans end even if a step raises, so the spans that follow are not nested in them
+        with self._hist_mgr.span("Ingest from input dictionary"):
+            fatal, validation_errors = self._input.ingest_validate(input_dict)
+            if fatal:
+                raise ValueError(validation_errors, "Input Data Failed Validation")
 
-        self._model = None
-        self._output = None
-        self._hist_mgr.end_tag("Ingest from input dictionary")
+            self._model = None
+            self._output = None
 
         return validation_errors
 
+    @_profiled
     def build(self):
         """
         Build a new Optimizer Model
 
         :return: None
+        :raises Cancelled: if the cancellation token (see set_cancel_token) was cancelled
         """
         data = self._input.to_data()
         if not data:
             log.error("You are attempting to build a model before ingesting data...you must do ingest method first")
             raise UnboundLocalError("You must ingest data prior to building the model")
 
+        self._cancel_token.check("build")
+        self._progress.phase("build")
         self._hist_mgr.start_tag("Finding Model to use")
         if isinstance(self._model_class, list):
             for mc in self._model_class:
@@ -120,13 +188,28 @@ class OptimizerBase(ABC):
             self._model = self._model_class()
 
         log.debug(f"Building with Class: {self._model.__class__.__name__}")
+        self._model.progress = self._progress
+        self._model.cancel_token = self._cancel_token
+        self._model.hist_mgr = self._hist_mgr  # the stages of the build and solve are nested in the spans below
         self._hist_mgr.end_tag("Finding Model to use")
 
-        self._hist_mgr.start_tag("Building Model")
-        self._model.build(data)
-        self._hist_mgr.end_tag("Building Model")
-
-    def solve(self, solver="glpk", tee=False, timeout=None, retries=3, mipgap=None, keepfiles=True):
+        with self._hist_mgr.span("Building Model"):
+            self._model.build(data)
+            self._hist_mgr.annotate(model_stats=self._model.get_model_stats())
+
+    @_profiled
+    def solve(
+        self,
+        solver="glpk",
+        tee=False,
+        timeout=None,
+        retries=3,
+        mipgap=None,
+        keepfiles=True,
+        warm_start=None,
+        include_trace=True,
+        forced_activities=None,
+    ):
         """
         Solve the optimizer Model and gather input into the output class
 
@@ -136,7 +219,14 @@ class OptimizerBase(ABC):
         :param int retries: Number of max attempts at running the solver
         :param float mipgap: Tolerance for solver
         :param bool keepfiles: Set to true if pyomo files should be kept
+        :param warm_start: a previous result (dict with "allocations" and/or "allocated_amt") or the "solution_id" of a previous
+                           result.  It is mapped onto the new model, repaired to feasibility, and used as the initial incumbent.
+                           By default (None) the model is solved from scratch.
+        :param bool include_trace: Set to false to leave out "full_trace" (one row per resource-activity arc) of the results.
+                                   The rows can still be generated one at a time with iter_trace_rows.
+        :param dict forced_activities: activity instance name -> True (must be picked) or False (must not be picked)
         :return: None
+        :raises Cancelled: if the cancellation token (see set_cancel_token) was cancelled
         """
 
         if self._model is None:
@@ -144,104 +234,169 @@ class OptimizerBase(ABC):
             # instead of throwing error here, just build it for them if they did steps out of order
             self.build()
 
-        self._hist_mgr.start_tag("Solving Model")
-        self._model.solve(
-            solver=solver,
-            tee=tee,
-            timeout=timeout,
-            retries=retries,
-            mipgap=mipgap,
-            keepfiles=keepfiles,
-            constraints_dataset=self._constraints_dataset,
-        )
-        self._hist_mgr.end_tag("Solving Model")
+        warm_started = False
+        if warm_start is not None:
+            with self._hist_mgr.span("Applying Warm Start"):
+                if isinstance(warm_start, str):
+                    warm_start = load_solution(warm_start)
+                warm_started = self._model.warm_start(warm_start)
+
+        if forced_activities:
+            with self._hist_mgr.span("Forcing Activities"):
+                self._model.force_activities(forced_activities)
+                warm_started = self._model.warm_started
+
+        self._cancel_token.check("solve")
+        with self._hist_mgr.span("Solving Model"):
+            self._model.solve(
+                solver=solver,
+                tee=tee,
+                timeout=timeout,
+                retries=retries,
+                mipgap=mipgap,
+                keepfiles=keepfiles,
+                constraints_dataset=self._constraints_dataset,
+                warm_start=warm_started,
+                cancel_token=self._cancel_token,
+            )
+
+        self._cancel_token.check("output")
+        self._progress.phase("output")
+        with self._hist_mgr.span("Gathering Output"):
+            self._output = self._model.fill_output(self._output_class, include_trace=include_trace)
+            self._output.result[MODEL_STATS_KEY] = self._model.get_model_stats()
+            self._save_solution()
+
+    def set_progress(self, progress: ProgressReporter):
+        """
+        Report the progress of the next steps (phases and incumbents of the solver) to a client
+
+        :param ProgressReporter progress: the reporter (see optimizer.util.progress)
+        :return: None
+        """
+        self._progress = progress
+        if self._model is not None:
+            self._model.progress = progress
 
-        self._hist_mgr.start_tag("Gathering Output")
-        self._output = self._model.fill_output(self._output_class)
-        self._hist_mgr.end_tag("Gathering Output")
+    def set_cancel_token(self, cancel_token: CancellationToken):
+        """
+        Make the next steps (ingest, build, solve, output) stop when a token is cancelled.  With a deadline (see
+        optimizer.util.deadline) the steps are charged against it and the solver gets the time that is left as its time limit.
 
-    def get_results(self) -> dict:
+        :param CancellationToken cancel_token: the token (see optimizer.util.cancel)
+        :return: None
         """
-        Return the results from the last solve step
+        self._cancel_token = cancel_token
 
-        :return dict output_dict: a dictionary containing the output of the modeling
+    def set_profile(self, profile: ProfileCapture):
         """
-        if self._output is None:
-            log.warning("You must ingest, build the model, and solve it prior to getting output...will attempt to solve for you")
-            # instead of throwing error here, just attempt to solve model for them if they did steps out of order
-            self.solve()
+        Profile the next steps (ingest, build, solve, output)...call save_profile when they are done
 
-        return self._output.result
+        :param ProfileCapture profile: the capture (see optimizer.util.profiling)
+        :return: None
+        """
+        self._profile = profile
 
-    @property
-    def output(self):
-        return self._output
+    def save_profile(self):
+        """
+        Save the profile of the steps so far (see set_profile)
 
-    def get_history_df(self) -> pd.DataFrame:
+        :return dict handle: the "profile_id" and the names of the "files" of the profile (None if the steps were not profiled)
         """
-        Get the history of operations and metrics on their runtime and memory usage.  This can be used to test the performance of optimizers.
+        return self._profile.save()
 
-        :return pandas.DataFrame history_df: pandas DataFrame with information about runtime and memory events
+    def _save_solution(self):
         """
-        return pd.DataFrame(
-            self._hist_mgr.get_history(), columns=["datetime", "operation", "time_to_run_sec", "memory_gain_MB", "end_memory_MB"]
-        )
+        Save the allocations of the last solve next to the solver logs, so the solve can be used to warm start a later solve.
+        The id of the saved solution is placed in the "solution_id" field of the results.
 
+        :return: None
+        """
+        opt_log_dir = self._model.opt_log_dir
+        if not opt_log_dir or not os.path.isdir(opt_log_dir):
+            return
 
-class InputBase(ABC):
-    def __init__(self):
+        solution = {ALLOC_KEY: self._output.result.get(ALLOC_KEY, {}), "allocated_amt": self._output.result.get("allocated_amt", {})}
+        try:
+            with open(os.path.join(opt_log_dir, SOLUTION_FILE_NAME), "w") as f:
+                json.dump(solution, f)
+        except (OSError, TypeError) as e:
+            log.warning("Unable to save solution for warm starts: %s", e)
+            return
 
-        # this attribute needs to be a dict that can be dumped by json.dump
-        self._data = {}
+        self._output.result["solution_id"] = os.path.basename(opt_log_dir)
 
-    @abstractmethod
-    def ingest_validate(self, input_dict: dict):
+    def get_results(self, fields=None) -> dict:
         """
-        Validate the constraints and activity scores to determine if following Errors are found
+        Return the results from the last solve step
 
-        ERROR_CODE DESCRIPTIONS
-            1. the necessary constraints files do not exist
-            2. the formats of the constraints files are incorrect
-            3. the data within the constraints files are not consistent with each other
-            4. the data within the constraints files and the activity names are not consistent
+        :param list fields: names of the result fields to return (e.g. ["objective_value", "allocations"]).  By default (None)
+                            all fields are returned
+        :return dict output_dict: a dictionary containing the output of the modeling
+        """
+        if self._output is None:
+            log.warning("You must ingest, build the model, and solve it prior to getting output...will attempt to solve for you")
+            # instead of throwing error here, just attempt to solve model for them if they did steps out of order
+            self.solve(include_trace=fields is None or TRACE_KEY in fields)
 
-        And then Load the files in the constraints path into this input (capturing them in the self._data attribute)
+        return select_fields(self._output.result, fields)
 
-        :param dict input_dict: a dict containing the name of the input and the data from files associated with this input
-        :return bool fatal: True=a fatal error has been found, the optimizer should not continue
-        :return dict validation_errors: a list of errors where each error is a dict with the following attributes...
-                    "err_code" : <a int where int is key in VALIDATE_ERROR_CODE>,
-                    "err_txt" : <human readable text that describes the error>,
-                    "offender" : <string or list of name(s) (of DU, resource, or resource group) that is causing error>,
-                    "fix": <string name of process performed to fix the error  or None>,
-                    "is_fatal_error": <boolean; True = error is fatal, False = error is fixable>
+    def iter_trace_rows(self):
         """
+        Generate the rows of "full_trace" one at a time from the solved model, so the full trace never has to be held in memory
 
-    def get_info(self, info_name: str):
+        :return: a generator of dicts, one per resource-activity arc, with the TRACE_FIELDS keys
         """
-        Returns a given field of the input dictionary
+        if self._output is None:
+            log.warning("You must ingest, build the model, and solve it prior to getting output...will attempt to solve for you")
+            self.solve(include_trace=False)
 
-        :param str info_name: Name of particular input field that is wanted
-        :return: One field from _data dictionary
+        return self._model.iter_trace_rows()
+
+    @property
+    def output(self):
+        return self._output
+
+    def get_solve_stats(self) -> dict:
         """
-        return self._data.get(info_name)
+        Get the size of the built model and how the last solve ended
 
-    def list_info_avail(self):
+        :return dict solve_stats: "variables", "constraints" and "nonzeros" of the model, the "termination_condition" of the
+                                  solver, and the "solver_peak_rss_MB" and "solver_cpu_sec" of the solver processes (None if
+                                  the model was not solved, see ModelBase.solver_usage)
         """
-        Returns all keys in the input dictionary
+        if self._model is None or self._model.get_model() is None:
+            return {}
+        model_stats = self._model.get_model_stats()
+        solver_usage = self._model.solver_usage or {}
+        return {
+            "variables": model_stats["variables"]["total"],
+            "constraints": model_stats["constraints"]["total"],
+            "nonzeros": model_stats["nonzeros"],
+            "termination_condition": self._model.termination_condition,
+            "solver_peak_rss_MB": solver_usage.get("peak_rss_MB"),
+            "solver_cpu_sec": solver_usage["cpu_user_sec"] + solver_usage["cpu_system_sec"] if solver_usage else None,
+        }
 
-        :return list:
+    def get_history_df(self) -> "pd.DataFrame":
         """
-        return list(self._data.keys())
+        Get the history of operations and metrics on their runtime and memory usage.  This can be used to test the performance of optimizers.
 
-    def to_data(self) -> dict:
+        :return pandas.DataFrame history_df: pandas DataFrame with information about runtime and memory events...one row per
+                                             span (see HistoryManager), nested spans have the span_id of their parent in parent_id
         """
-        Whatever data format the model needs
+        import pandas as pd  # only needed here, so it is not imported with the module
 
-        :return dict data: a dictionary containing all necessary data for the model (this will be defined on a model by model
-                     basis)
+        return pd.DataFrame(self._hist_mgr.get_history(), columns=HISTORY_COLUMNS)
+
+    def write_chrome_trace(self, filename):
         """
-        return self._data
+        Write the history of operations as a Chrome trace (open it in chrome://tracing or https://ui.perfetto.dev)
+
+        :param str filename: path of the json file
+        :return: None
+        """
+        self._hist_mgr.write_chrome_trace(filename)
 
 
 class ModelBase(ABC):
@@ -256,8 +411,20 @@ class ModelBase(ABC):
         self._continue_check_status = False
         self._pyomo_log_name = None
         self._max_solve_no_update = 600
+        self._check_status_interval_sec = 2
         self.kill_glpsol_if_stuck = False
         self.new_timeout = None
+        self._opt_log_dir = None
+        self._warm_start_values = None
+        self._termination_condition = None
+        self._solver_log_stamps = []  # when check_solve_status first saw each line of the solver log
+        self._solver_log = None
+        self._solver_usage_monitor = None
+        self.progress = ProgressReporter()  # reports the phases and incumbents of the solve (see OptimizerBase.set_progress)
+        self.cancel_token = CancellationToken()  # stops the build, solve and output (see OptimizerBase.set_cancel_token)
+        self.hist_mgr = HistoryManager()  # the spans of the stages of the build and solve (see OptimizerBase.get_history_df)
+        self.structure_stats = {}  # statistics of the structure of the input, filled in by build (see get_model_stats)
+        self._model_stats = None
 
     @abstractmethod
     def can_solve(self, input_instance) -> bool:
@@ -279,7 +446,18 @@ class ModelBase(ABC):
         :return: None
         """
 
-    def solve(self, solver="glpk", tee=False, timeout=None, retries=3, mipgap=None, constraints_dataset="unknown", keepfiles=True):
+    def solve(
+        self,
+        solver="glpk",
+        tee=False,
+        timeout=None,
+        retries=3,
+        mipgap=None,
+        constraints_dataset="unknown",
+        keepfiles=True,
+        warm_start=False,
+        cancel_token=None,
+    ):
         """
         Solve the self._model using the solver
 
@@ -292,8 +470,17 @@ class ModelBase(ABC):
         :param float mipgap: Tolerance for solver
         :param str constraints_dataset: Name of dataset where there are constraints
         :param bool keepfiles: Set to true if pyomo files should be kept
+        :param bool warm_start: True if the current variable values are a feasible incumbent (see warm_start method).  The incumbent
+                                is handed to the solver if the solver supports warm starts (glpk does not) and is kept as the
+                                solution if the solver does not return one.
+        :param CancellationToken cancel_token: replaces self.cancel_token...the solver is stopped when the token is cancelled.
+                                               With a deadline (see optimizer.util.deadline) the solver gets the time that is left
+                                               as its time limit (on top of timeout) and it is not retried when no time is left
         :return: None
+        :raises Cancelled: if the token was cancelled before or while the solver ran (DeadlineExceeded if the time ran out)
         """
+        if cancel_token is not None:
+            self.cancel_token = cancel_token
         temp_dir_name = "/tmp/solver"
         TempfileManager.tempdir = temp_dir_name
         if not os.path.isdir(temp_dir_name):
@@ -309,61 +496,309 @@ class ModelBase(ABC):
         if solver == "glpk" and mipgap:
             opt.options["mipgap"] = mipgap
 
+        solve_kwargs = {}
+        if warm_start:
+            if opt.warm_start_capable():
+                solve_kwargs["warmstart"] = True
+            else:
+                log.info("Solver %s does not support warm starts...the warm start is only kept as a fallback incumbent", solver)
+
         i = 1
         results = None
         opt_log_dir = None
-        while i <= retries:
-            log.info("Attempt %s/%s to complete solver", i, retries)
-            try:
-                opt_log_dir = os.path.join(LOG_DIR, "pyomo_logs", constraints_dataset + "_" + datetime.now().isoformat())
-                os.makedirs(opt_log_dir)
-                self._pyomo_log_name = os.path.join(opt_log_dir, log_name)
-
-                if solver == "glpk":
-                    opt.options["log"] = self._pyomo_log_name
-                    if self.new_timeout:
-                        opt.options["tmlim"] = self.new_timeout
-                    elif timeout:
-                        opt.options["tmlim"] = timeout
-                        # Do a slightly progressive timeout for each retry
-                        timeout = int(timeout * 1.20)
-
-                self._continue_check_status = True
-                status_thread = threading.Thread(target=self.check_solve_status)
-                status_thread.start()
-
-                # There will still be three "Solver .. file" lines displayed on the console due to the use of keepfiles
-                results = opt.solve(self._model, tee=tee, keepfiles=keepfiles)
-                self._continue_check_status = False
-
-                status = results.solver.status
-                termination_condition = results.solver.termination_condition
-
-                if status == SolverStatus.ok:
-                    log.info("Solver finished with a status of %s", status)
-                    if termination_condition == TerminationCondition.optimal:
-                        log.info("Solver finished with termination condition of %s", termination_condition)
-                        break
-                    elif termination_condition == TerminationCondition.feasible:
-                        log.warning("Solver finished with a termination condition of %s", termination_condition)
-                        break
+        # the solver processes are sampled while they run (the history only measures this process)
+        self._solver_usage_monitor = SolverUsageMonitor(self._solver_processes)
+        with self._solver_usage_monitor:
+            while i <= retries:
+                self.cancel_token.check("solve")
+                remaining_sec = self.cancel_token.remaining()
+                if remaining_sec is not None and remaining_sec < MIN_SOLVER_SEC:
+                    if i == 1:
+                        raise DeadlineExceeded("Not enough time left to start the solver")
+                    log.warning("No time left for attempt %s/%s to complete solver", i, retries)
+                    break
+
+                log.info("Attempt %s/%s to complete solver", i, retries)
+                try:
+                    opt_log_dir = os.path.join(LOG_DIR, "pyomo_logs", constraints_dataset + "_" + datetime.now().isoformat())
+                    os.makedirs(opt_log_dir)
+                    self._opt_log_dir = opt_log_dir
+                    self._pyomo_log_name = os.path.join(opt_log_dir, log_name)
+
+                    if solver == "glpk":
+                        opt.options["log"] = self._pyomo_log_name
+                        tmlim = None
+                        if self.new_timeout:
+                            tmlim = self.new_timeout
+                        elif timeout:
+                            tmlim = timeout
+                            # Do a slightly progressive timeout for each retry
+                            timeout = int(timeout * 1.20)
+                        if remaining_sec is not None:
+                            # the progressive timeout never runs past the deadline
+                            deadline_sec = max(MIN_SOLVER_SEC, int(remaining_sec * DEADLINE_SOLVER_SHARE))
+                            tmlim = min(tmlim, deadline_sec) if tmlim else deadline_sec
+                        if tmlim:
+                            opt.options["tmlim"] = tmlim
+
+                    self._continue_check_status = True
+                    status_thread = threading.Thread(target=self.check_solve_status, daemon=True)
+                    status_thread.start()
+
+                    # pyomo writes the problem file and then runs the solver...check_solve_status reports when the solver starts
+                    self.progress.phase("write")
+
+                    # There will still be three "Solver .. file" lines displayed on the console due to the use of keepfiles
+                    try:
+                        with self.hist_mgr.traced_methods(opt, SOLVER_SPANS), self.hist_mgr.traced_methods(
+                            self._model.solutions, {"load_from": "Loading solution"}
+                        ):
+                            results = opt.solve(self._model, tee=tee, keepfiles=keepfiles, **solve_kwargs)
+                    finally:
+                        # always stop the status thread, even if the solver raised an unexpected error
+                        self._continue_check_status = False
+
+                    status = results.solver.status
+                    termination_condition = results.solver.termination_condition
+                    self._termination_condition = str(termination_condition)
+
+                    if status == SolverStatus.ok:
+                        log.info("Solver finished with a status of %s", status)
+                        if termination_condition == TerminationCondition.optimal:
+                            log.info("Solver finished with termination condition of %s", termination_condition)
+                            break
+                        elif termination_condition == TerminationCondition.feasible:
+                            log.warning("Solver finished with a termination condition of %s", termination_condition)
+                            break
+                        else:
+                            log.error("Solver finished with a termination condition of %s", termination_condition)
                     else:
-                        log.error("Solver finished with a termination condition of %s", termination_condition)
-                else:
-                    log.error("Solver finish with a status of %s", status)
-                    log.error("Solver finished with termination condition of %s", termination_condition)
-
-            except ApplicationError as e:
-                self._continue_check_status = False
-                log.error(str(e))
-                if i == retries:
-                    raise Exception("Unable to solve after %s attempts", retries).with_traceback(e.__traceback__)
-            i += 1
+                        log.error("Solver finish with a status of %s", status)
+                        log.error("Solver finished with termination condition of %s", termination_condition)
+
+                except ApplicationError as e:
+                    self._continue_check_status = False
+                    log.error(str(e))
+                    # check_solve_status stops the solver when the token is cancelled
+                    self.cancel_token.check("solve")
+                    if i == retries:
+                        raise Exception("Unable to solve after %s attempts", retries).with_traceback(e.__traceback__)
+                i += 1
 
         log.info("Done")
         # Write optimizer results
+        solver_usage = self._solver_usage_monitor.usage
         if results and opt_log_dir:
             results.write(filename=os.path.join(opt_log_dir, results_name))
+            solver_usage["files_MB"][results_name] = round(os.path.getsize(os.path.join(opt_log_dir, results_name)) / convertToMB, 3)
+        self.hist_mgr.annotate(solver_usage=solver_usage)
+        if opt_log_dir:
+            self._read_solver_log()
+
+        # if the solver did not come back with a solution, fall back to the warm start incumbent...results.solution can not
+        # tell, pyomo clears it once it loaded the solution into the model
+        solved = results is not None and results.solver.termination_condition in (
+            TerminationCondition.optimal,
+            TerminationCondition.feasible,
+        )
+        if warm_start and self._warm_start_values and not solved:
+            log.warning("Solver did not return a solution...using the warm start solution")
+            for var_data, val in self._warm_start_values:
+                var_data.set_value(val)
+
+    @property
+    def opt_log_dir(self):
+        """
+        The directory holding the solver logs (and results) of the last solve
+
+        :return str opt_log_dir: path to the directory, None if the model has not been solved
+        """
+        return self._opt_log_dir
+
+    @property
+    def solver_log(self):
+        """
+        The timeline of the solver log of the last solve (see optimizer.util.glpk_log.parse_glpk_log)...its "summary" tells
+        e.g. when the first and final incumbents were found and whether the solve was limited by the search or the bound
+
+        :return dict timeline: the "records" and "summary" of the log, None if the model has not been solved
+        """
+        return self._solver_log
+
+    @property
+    def solver_usage(self):
+        """
+        The resource usage of the solver processes of the last solve (see optimizer.util.solver_usage), e.g. "peak_rss_MB",
+        "cpu_user_sec" and the size of the files it wrote ("files_MB")
+
+        :return dict solver_usage: None if the model has not been solved
+        """
+        return self._solver_usage_monitor.usage if self._solver_usage_monitor is not None else None
+
+    def _read_solver_log(self):
+        """
+        Parse the solver log of the last attempt into a timeline, save it next to the solver results and add its summary to
+        the span of the solve (see HistoryManager.annotate)
+
+        :return: None
+        """
+        self._solver_log = None
+        if not self._pyomo_log_name or not os.path.exists(self._pyomo_log_name):
+            return
+        with open(self._pyomo_log_name) as f:
+            lines = f.readlines()
+
+        # the lines that were written after the last check of the log were seen when the solver finished
+        stamps = self._solver_log_stamps[: len(lines)]
+        line_times = None
+        if stamps:
+            stamps = stamps + [time.time()] * (len(lines) - len(stamps))
+            line_times = [stamp - stamps[0] for stamp in stamps]
+        self._solver_log = parse_glpk_log(lines, line_times, self._check_status_interval_sec)
+
+        try:
+            with open(os.path.join(self._opt_log_dir, SOLVER_TIMELINE_FILE_NAME), "w") as f:
+                json.dump(self._solver_log, f)
+        except OSError as e:
+            log.warning("Unable to save the timeline of the solver log: %s", e)
+        self.hist_mgr.annotate(solver_log=self._solver_log["summary"])
+
+    @property
+    def termination_condition(self):
+        """
+        The termination condition reported by the solver for the last solve attempt (e.g. "optimal", "maxTimeLimit")
+
+        :return str termination_condition: None if the model has not been solved
+        """
+        return self._termination_condition
+
+    def get_model_stats(self) -> dict:
+        """
+        The size and structure of the built model (computed once per build, see optimizer.util.model_stats)
+
+        :return dict model_stats: the statistics of model_statistics, and the statistics of the structure of the input that
+                                  the build found (e.g. "all_expansion", see structure_stats).  Empty if the model is not built
+        """
+        if self._model is None:
+            return {}
+        if self._model_stats is None:
+            with self.hist_mgr.span("Computing model statistics"):
+                self._model_stats = dict(model_statistics(self._model), **self.structure_stats)
+        return self._model_stats
+
+    def warm_start(self, previous_result: dict) -> bool:
+        """
+        Use a previous result as the starting point (initial incumbent) of the next solve.
+
+        The previous result is mapped onto the variables of this model (see load_previous_result), which repairs the
+        previous solution so that it is feasible for this model.  The repaired solution is then checked against every
+        constraint of the model.
+
+        :param dict previous_result: a previous result with "allocations" and/or "allocated_amt" keys (see OutputBase.result)
+        :return bool warm_started: True = the variables hold a feasible incumbent, False = the model will be solved from scratch
+        """
+        self._warm_start_values = None
+        if self._model is None:
+            log.warning("Cannot warm start a model that has not been built")
+            return False
+
+        if not self.load_previous_result(previous_result):
+            return False
+
+        if not self.is_feasible():
+            log.warning("Warm start solution is not feasible for this model...solving from scratch")
+            return False
+
+        self._warm_start_values = [(v, v.value) for v in self._model.component_data_objects(Var)]
+        log.info("Warm start solution has an objective value of %s", self.get_objective_value())
+        return True
+
+    def load_previous_result(self, previous_result: dict) -> bool:
+        """
+        Map a previous result onto the variables of this model and repair it so that it is feasible.
+
+        NOTE - models that support warm starts must override this method
+
+        :param dict previous_result: a previous result with "allocations" and/or "allocated_amt" keys (see OutputBase.result)
+        :return bool loaded: True = the variables were set from the previous result
+        """
+        log.warning("%s does not support warm starts", type(self).__name__)
+        return False
+
+    def force_activities(self, forced_activities: dict):
+        """
+        Force activities to be picked (or not picked) in the next solve, e.g. to explore a what-if scenario.
+
+        A warm start that is no longer feasible with the forced activities is dropped.
+
+        :param dict forced_activities: activity instance name -> True (must be picked) or False (must not be picked)
+        :return: None
+        :raises ValueError: if an activity is not in this model (or the model does not support forcing activities)
+        """
+        for act_name, picked in forced_activities.items():
+            if not self.force_activity(act_name, bool(picked)):
+                raise ValueError(
+                    "Cannot force activity {}...it is not in this model or {} does not support forcing activities".format(
+                        act_name, type(self).__name__
+                    )
+                )
+
+        if self._warm_start_values is not None:
+            if self.is_feasible():
+                self._warm_start_values = [(v, v.value) for v in self._model.component_data_objects(Var)]
+            else:
+                log.warning("Warm start solution is not feasible with the forced activities...solving from scratch")
+                self._warm_start_values = None
+        self._model_stats = None  # forced activities add rows (or fix variables)
+
+    def force_activity(self, act_name, picked=True) -> bool:
+        """
+        Force one activity to be picked (or not picked) in the next solve
+
+        NOTE - models that support forcing activities must override this method
+
+        :param str act_name: name of the activity instance
+        :param bool picked: True = the activity must be picked, False = the activity must not be picked
+        :return bool forced: False if the activity is not in this model (or the model does not support forcing activities)
+        """
+        log.warning("%s does not support forcing activities", type(self).__name__)
+        return False
+
+    @property
+    def warm_started(self):
+        """
+        :return bool warm_started: True = the variables hold a feasible incumbent for the next solve
+        """
+        return self._warm_start_values is not None
+
+    def is_feasible(self, tolerance=1e-6) -> bool:
+        """
+        Check whether the current variable values satisfy all active constraints of the model
+
+        :param float tolerance: allowed violation of each constraint
+        :return bool feasible: True = all constraints are satisfied
+        """
+        for con in self._model.component_data_objects(Constraint, active=True):
+            body = value(con.body, exception=False)
+            if body is None:
+                return False
+            if con.has_lb() and body < value(con.lower) - tolerance:
+                log.debug("Constraint %s is violated (%s < %s)", con.name, body, value(con.lower))
+                return False
+            if con.has_ub() and body > value(con.upper) + tolerance:
+                log.debug("Constraint %s is violated (%s > %s)", con.name, body, value(con.upper))
+                return False
+        return True
+
+    def get_objective_value(self):
+        """
+        Evaluate the objective with the current variable values
+
+        :return float objective_value: value of the (first) objective of the model, None if it cannot be evaluated
+        """
+        for obj in self._model.component_data_objects(Objective, active=True):
+            return value(obj, exception=False)
+        return None
 
     def check_solve_status(self):
         """
@@ -373,25 +808,31 @@ class ModelBase(ABC):
         best_solution = None
         seconds_find_best_solution = None
         time_of_best_solution = None
+        solver_started = False
+        # a list of each attempt, so a late check of an earlier attempt does not add to it
+        log_stamps = []
+        self._solver_log_stamps = log_stamps
         while self._continue_check_status:
             #  Is there anything we can check?
             # self._model.objective.expr() does not have anything until solver is finished
             last_line = None
             if self._pyomo_log_name and os.path.exists(self._pyomo_log_name):
+                if not solver_started:
+                    solver_started = True
+                    self.progress.phase("solve")
                 with open(self._pyomo_log_name) as f:
-                    last_line = f.readlines()[-1]
+                    lines = f.readlines()
+                    last_line = lines[-1] if lines else None
+                # glpsol does not time its lines...the time a line was first seen is its time in the timeline of the log
+                log_stamps.extend([time.time()] * (len(lines) - len(log_stamps)))
             if last_line:
-                last_line_split = last_line.split()
-                # Only continue to parse lines that begin with a "+"
-                if last_line_split[0].startswith("+"):
-                    new_best_solution = None
-                    # The ">>>>>" indicates there is a new best solution
-                    # There may or may not be a space after the '+'
-                    if last_line_split[2] == ">>>>>":
-                        new_best_solution = float(last_line_split[3])
-                    elif last_line_split[1] == ">>>>>":
-                        new_best_solution = float(last_line_split[2])
+                # Only lines that begin with a "+" report the progress of the search
+                mip_progress = parse_mip_progress(last_line)
+                if mip_progress:
+                    self.progress.incumbent(mip_progress["objective"], mip_progress["bound"], mip_progress["gap"])
 
+                    # The ">>>>>" indicates there is a new best solution
+                    new_best_solution = mip_progress["objective"] if mip_progress["new_incumbent"] else None
                     if new_best_solution:
                         # Make sure that the solution/log file actually has been updated
                         if best_solution != new_best_solution:
@@ -406,14 +847,34 @@ class ModelBase(ABC):
                     if seconds_since_last_new_best_solution > self._max_solve_no_update:
                         log.warning("It has been %s seconds since last new best solution", int(seconds_since_last_new_best_solution))
                         if self.kill_glpsol_if_stuck:
-                            for proc in psutil.process_iter():
-                                if proc.name() == "glpsol" and proc.status() == "running":
+                            for proc in self._solver_processes():
+                                if proc.status() == "running":
                                     proc.kill()
                                     # fudge factor for new timeout
                                     fudge_value = max(10, int(seconds_find_best_solution * 0.1))
                                     self.new_timeout = seconds_find_best_solution + fudge_value
+
+            # the time limit of the solver only counts its own time...stop it when the token is cancelled (or the deadline passed)
+            if self.cancel_token.cancelled():
+                for proc in self._solver_processes():
+                    log.warning("Stopping the solver (pid %s): %s", proc.pid, self.cancel_token.reason)
+                    proc.kill()
             if self._continue_check_status:
-                time.sleep(2)
+                time.sleep(self._check_status_interval_sec)
+
+    def _solver_processes(self):
+        """
+        :return list processes: the solver processes (psutil.Process) of this model...started by this process with the log
+                                file of this model (other threads may run solvers of their own)
+        """
+        processes = []
+        try:
+            for proc in psutil.Process().children(recursive=True):
+                if proc.name() == "glpsol" and self._pyomo_log_name in proc.cmdline():
+                    processes.append(proc)
+        except psutil.Error as e:
+            log.warning("Unable to list the solver processes: %s", e)
+        return processes
 
     def get_model(self):
         """
@@ -424,7 +885,7 @@ class ModelBase(ABC):
         return self._model
 
     @abstractmethod
-    def fill_output(self, output_class) -> OutputBase:
+    def fill_output(self, output_class, include_trace=True) -> OutputBase:
         """
         Return the output of the model after it has been solved by instantiating an object of the output class.
 
@@ -432,65 +893,17 @@ class ModelBase(ABC):
         this method must be implemented in the subclass
 
         :param output_class: the OutputBase or subclass of output base
+        :param bool include_trace: False = leave the columns of "full_trace" empty
         :return output: an instance of the output_class
         """
 
-
-# required output keys
-VALUE_KEY = "objective_value"
-ALLOC_KEY = "allocations"
-TRACE_KEY = "full_trace"
-
-
-class OutputBase(ABC):
-    def __init__(self):
-        """
-        Create a new object to hold output from an optimizer solution, which is basically a dictionary of results with some convenience methods.
-
-        """
-        self._result = {}
-
-    @property
-    def result(self):
-        """
-        Provide the optimizer output as a python dict
-
-        :return dict results: a dictionary of output of the optimizer solution
-                                Keys must include 'objective_value', 'allocations', and 'full_trace' (additional fields can be added by each optimizer)
-        """
-        return self._result
-
-    @result.setter
-    def result(self, result_dict):
-        self._result = result_dict
-
-    @property
-    def objective_value(self):
-        """
-        Provide the value of the objective function of the optimizer
-
-        :return float objective_value: the value of the objective of the optimizer
-        """
-        return self._result[VALUE_KEY]
-
-    @property
-    def allocations(self):
+    def iter_trace_rows(self):
         """
-        Provide the mapping of resources to activities from the optimizer solution
+        Generate the rows of "full_trace" one at a time after the model has been solved.
 
-        :return dict allocations: a dictionary with keys equal to resource names and values equal to lists of activities that
-                             each resource is mapped to
-        """
-        return self._result[ALLOC_KEY]
-
-    def get_trace_df(self, sort_results=True, ascending=False):
-        """
-        Return a dataframe of the "full_trace" dictionary.
+        Subclasses should override this to produce rows directly from the model.  By default the whole output is filled and
+        then split into rows.
 
-        :param bool sort_results: If the DataFrame should be sorted.  Default is true
-        :param bool ascending: Set to false so that the highest value is on top
-        :return: the full_trace dictionary in a DataFrame format
+        :return: a generator of dicts, one per row, with the TRACE_FIELDS keys
         """
-        df = pd.DataFrame(self.result[TRACE_KEY])
-        df.selected = df.selected.astype(bool)
-        return df.sort_values(by=["selected", "value"], ascending=ascending) if sort_results else df
+        return iter_trace_columns(self.fill_output(OutputBase).result[TRACE_KEY])
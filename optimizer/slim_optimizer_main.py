@@ -17,12 +17,18 @@ algorithm_dict = {
 }
 
 
-def create_opt(input_dict, optimizer_name=None):
+def create_opt(input_dict, optimizer_name=None, progress=None, cancel_token=None, profile=None):
     """
     Create an optimizer with input data already loaded.
 
     :param dict input_dict: a dict containing the name of the input and the data from files associated with this input
     :param str optimizer_name: name of opt algorithm; see algorithm_dict above (e.g. 'default'}
+    :param ProgressReporter progress: reports the progress of the ingest, build and solve (see optimizer.util.progress)
+    :param CancellationToken cancel_token: stops the ingest, build, solve and output when it is cancelled (see
+                                           optimizer.util.cancel)...a Deadline (see optimizer.util.deadline) also charges them
+                                           against the time of the request
+    :param ProfileCapture profile: profiles the ingest, build, solve and output (see optimizer.util.profiling)...save it with
+                                   the save_profile method of the optimizer
     :return optimizer: an optimizer class; subclass of optimizer.slim_optimizer_base.OptimizerBase
     :return list validation_errors: a list of errors where each error is a dict with the following attributes...
                     "err_code" : <a int where int is key in VALIDATE_ERROR_CODE>,
@@ -42,6 +48,12 @@ def create_opt(input_dict, optimizer_name=None):
         else:
             optimizer = algorithm_dict[optimizer_name]()
 
+    if progress is not None:
+        optimizer.set_progress(progress)
+    if cancel_token is not None:
+        optimizer.set_cancel_token(cancel_token)
+    if profile is not None:
+        optimizer.set_profile(profile)
     validation_errors = optimizer.ingest(input_dict)
 
     return optimizer, validation_errors
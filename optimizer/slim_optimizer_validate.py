@@ -0,0 +1,64 @@
+"""
+Validate optimizer input without building (or importing) the pyomo models.
+
+This only runs the ingest_validate step of the input class of an optimizer, so it is fast enough to validate a problem
+while it is being edited.  It should be updated as new optimizers are added (see slim_optimizer_main.algorithm_dict).
+"""
+
+import logging
+
+from optimizer.full_house.full_house_input_viz import FullHouseInputViz
+from optimizer.knapsack.knapsack_input_viz import KnapsackInputViz
+
+log = logging.getLogger(__name__)
+
+# input class of each optimizer in slim_optimizer_main.algorithm_dict
+input_class_dict = {
+    "default": KnapsackInputViz,
+    "FullHouseViz": FullHouseInputViz,
+    "KnapsackViz": KnapsackInputViz,
+}
+
+
+def validate_input(input_dict, optimizer_name=None):
+    """
+    Ingest and validate input with the input class of an optimizer
+
+    :param dict input_dict: a dict containing the name of the input and the data from files associated with this input
+    :param str optimizer_name: name of opt algorithm; see input_class_dict above (None = 'default')
+    :return bool fatal: True = a fatal error has been found, the problem cannot be solved
+    :return list validation_errors: a list of errors (see InputBase.ingest_validate)
+    :return dict size_estimate: estimates of the size of the model (see InputBase.estimate_size), empty if fatal
+    :raises TypeError: if the optimizer is not found
+    """
+    input_instance = _input_class(optimizer_name)()
+    fatal, validation_errors = input_instance.ingest_validate(input_dict)
+    size_estimate = {} if fatal else input_instance.estimate_size()
+    return fatal, validation_errors, size_estimate
+
+
+def estimate_input_size(input_dict, optimizer_name=None):
+    """
+    Estimate the size of the model of an input in linear time, without ingesting it (see InputBase.estimate_input_size)
+
+    :param dict input_dict: a dict containing the name of the input and the data from files associated with this input
+    :param str optimizer_name: name of opt algorithm; see input_class_dict above (None = 'default')
+    :return dict size_estimate: estimates of the size of the model, empty if the input cannot be estimated (e.g. it is malformed)
+    :raises TypeError: if the optimizer is not found
+    """
+    input_class = _input_class(optimizer_name)
+    try:
+        return input_class.estimate_input_size(input_dict)
+    except (AttributeError, KeyError, TypeError, IndexError) as e:
+        # the input has not been validated...ingest_validate reports what is wrong with it
+        log.debug("Unable to estimate the size of the input: %s", e)
+        return {}
+
+
+def _input_class(optimizer_name):
+    name = optimizer_name or "default"
+    if name not in input_class_dict:
+        raise TypeError(
+            "Optimizer named: {0} not found\nFollowing optimizers are available {1}".format(optimizer_name, list(input_class_dict.keys()))
+        )
+    return input_class_dict[name]
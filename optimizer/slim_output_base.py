@@ -0,0 +1,105 @@
+"""
+The base class of optimizer outputs and helpers for the fields of results.
+
+It is kept apart from slim_optimizer_base so that results can be handled (e.g. cached, filtered and streamed by the API) without
+importing pyomo or pandas.
+"""
+
+from abc import ABC
+
+# required output keys
+VALUE_KEY = "objective_value"
+ALLOC_KEY = "allocations"
+TRACE_KEY = "full_trace"
+MODEL_STATS_KEY = "model_stats"  # the size and structure of the solved model (see ModelBase.get_model_stats)
+
+# columns of the full trace
+TRACE_FIELDS = ("resource", "activity", "budget_used", "value", "selected", "picked", "allocated")
+
+
+def empty_trace():
+    """
+    :return dict trace: a "full_trace" with no rows
+    """
+    return {f: [] for f in TRACE_FIELDS}
+
+
+def iter_trace_columns(trace):
+    """
+    Split a "full_trace" (a dict of columns) into rows
+
+    :param dict trace: the "full_trace" of a result
+    :return: a generator of dicts, one per row, with the TRACE_FIELDS keys
+    """
+    columns = [trace.get(f, []) for f in TRACE_FIELDS]
+    for values in zip(*columns):
+        yield dict(zip(TRACE_FIELDS, values))
+
+
+def select_fields(result, fields=None):
+    """
+    Select some fields of a result
+
+    :param dict result: the result of an optimizer
+    :param list fields: names of the fields to keep (None = keep all fields)
+    :return dict result: the result with only the selected fields
+    """
+    if fields is None:
+        return result
+    return {k: v for k, v in result.items() if k in fields}
+
+
+class OutputBase(ABC):
+    def __init__(self):
+        """
+        Create a new object to hold output from an optimizer solution, which is basically a dictionary of results with some convenience methods.
+
+        """
+        self._result = {}
+
+    @property
+    def result(self):
+        """
+        Provide the optimizer output as a python dict
+
+        :return dict results: a dictionary of output of the optimizer solution
+                                Keys must include 'objective_value', 'allocations', and 'full_trace' (additional fields can be added by each optimizer)
+        """
+        return self._result
+
+    @result.setter
+    def result(self, result_dict):
+        self._result = result_dict
+
+    @property
+    def objective_value(self):
+        """
+        Provide the value of the objective function of the optimizer
+
+        :return float objective_value: the value of the objective of the optimizer
+        """
+        return self._result[VALUE_KEY]
+
+    @property
+    def allocations(self):
+        """
+        Provide the mapping of resources to activities from the optimizer solution
+
+        :return dict allocations: a dictionary with keys equal to resource names and values equal to lists of activities that
+                             each resource is mapped to
+        """
+        return self._result[ALLOC_KEY]
+
+    def get_trace_df(self, sort_results=True, ascending=False):
+        """
+        Return a dataframe of the "full_trace" dictionary.
+
+        :param bool sort_results: If the DataFrame should be sorted.  Default is true
+        :param bool ascending: Set to false so that the highest value is on top
+        :return: the full_trace dictionary in a DataFrame format
+        """
+        import pandas as pd  # only needed here, so it is not imported with the module
+
+        df = pd.DataFrame(self.result[TRACE_KEY])
+        df.selected = df.selected.astype(bool)
+        return df.sort_values(by=["selected", "value"], ascending=ascending) if sort_results else df
@@ -0,0 +1,123 @@
+"""
+Admission control of solves, based on the predicted cost of the problem.
+
+The size of the model is estimated from the input in linear time (see InputBase.estimate_input_size), before the input is
+ingested or the model is built.  Then each problem is...
+    - rejected: the estimate is over a hard limit...the problem would take up the memory and CPU of a worker for too long
+    - large: the estimate is over a large limit...the problem is solved in heuristic mode (e.g. a looser mipgap and a time
+      limit), and only a few large problems are solved at the same time (across all processes).  The others wait for a slot
+      (so they queue behind the problems that are already running) and are turned away if no slot frees up in time
+    - admitted: everything else is solved as usual
+
+Slots are lock files (fcntl.flock) in a directory shared by all processes, so the operating system releases the slot of a
+process that dies.
+"""
+
+import contextlib
+import fcntl
+import logging
+import os
+import time
+
+log = logging.getLogger(__name__)
+
+ADMIT = "admit"
+LARGE = "large"
+REJECT = "reject"
+
+# measured on knapsack and full house models...pyomo takes about 0.25 KB of memory per nonzero (constraint coefficient)
+MEMORY_MB_PER_NONZERO = 0.25 / 1024
+
+
+def add_memory_estimate(size_estimate):
+    """
+    :param dict size_estimate: see InputBase.estimate_input_size
+    :return dict size_estimate: a copy with the estimated memory of the model ("memory_mb"), if nonzeros were estimated
+    """
+    size_estimate = dict(size_estimate)
+    if "nonzeros" in size_estimate:
+        size_estimate["memory_mb"] = round(size_estimate["nonzeros"] * MEMORY_MB_PER_NONZERO, 1)
+    return size_estimate
+
+
+class AdmissionControl:
+    def __init__(self, slot_dir, max_size=None, large_size=None, large_slots=1, queue_timeout_sec=60, poll_interval_sec=0.5):
+        """
+        Create an admission controller
+
+        :param str slot_dir: directory for the slot files of large problems (must be shared by all processes)
+        :param dict max_size: hard limits...name of an estimate (e.g. "nonzeros", "memory_mb") -> max value (0 = no limit)
+        :param dict large_size: limits of large problems...name of an estimate -> max value (0 = no limit)
+        :param int large_slots: number of large problems solved at the same time
+        :param float queue_timeout_sec: max time a large problem waits for a slot
+        :param float poll_interval_sec: how often a waiting problem checks for a free slot
+        """
+        self._slot_dir = slot_dir
+        self._max_size = {k: v for k, v in (max_size or {}).items() if v}
+        self._large_size = {k: v for k, v in (large_size or {}).items() if v}
+        self._large_slots = max(1, large_slots)
+        self._queue_timeout_sec = queue_timeout_sec
+        self._poll_interval_sec = poll_interval_sec
+
+        if not os.path.exists(self._slot_dir):
+            os.makedirs(self._slot_dir, exist_ok=True)
+
+    @property
+    def limits(self):
+        """
+        :return dict limits: the hard limits ("max") and the limits of large problems ("large")
+        """
+        return {"max": dict(self._max_size), "large": dict(self._large_size)}
+
+    def check(self, size_estimate):
+        """
+        Decide how to handle a problem
+
+        :param dict size_estimate: see add_memory_estimate (an empty estimate is always admitted)
+        :return str decision: ADMIT, LARGE or REJECT
+        """
+        if _over(size_estimate, self._max_size):
+            return REJECT
+        if _over(size_estimate, self._large_size):
+            return LARGE
+        return ADMIT
+
+    @contextlib.contextmanager
+    def large_slot(self, cancel_token=None):
+        """
+        Wait for one of the slots of large problems
+
+        :param CancellationToken cancel_token: the token of the request (see optimizer.util.cancel)...it is checked on every
+                                               poll, so a request that is cancelled (or whose deadline passes) stops waiting
+        :return: a context manager that yields True if a slot was taken (it is released on exit) and False if no slot freed
+                 up before the queue timeout
+        :raises Cancelled: if the token was cancelled while waiting (DeadlineExceeded if the time ran out)
+        """
+        fd = self._acquire_slot(cancel_token)
+        try:
+            yield fd is not None
+        finally:
+            if fd is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+                os.close(fd)
+
+    def _acquire_slot(self, cancel_token):
+        start_time = time.time()
+        while True:
+            if cancel_token is not None:
+                cancel_token.check("waiting for a slot for a large problem")
+            for i in range(self._large_slots):
+                fd = os.open(os.path.join(self._slot_dir, "large_{}.lock".format(i)), os.O_CREAT | os.O_RDWR, 0o644)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    return fd
+                except BlockingIOError:
+                    os.close(fd)
+            if time.time() - start_time >= self._queue_timeout_sec:
+                log.warning("No slot for a large problem freed up in %s seconds", self._queue_timeout_sec)
+                return None
+            time.sleep(self._poll_interval_sec)
+
+
+def _over(size_estimate, limits):
+    return any(size_estimate.get(name, 0) > limit for name, limit in limits.items())
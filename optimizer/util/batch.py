@@ -0,0 +1,192 @@
+"""
+Solve a batch of viz data problems in parallel across a pool of processes.
+
+All items of a batch are validated first.  Valid items are then built and solved in a process pool, and the response of
+each item (the same response as POST /api/vizdata plus the item's history of operations) is yielded as soon as it is
+complete.  A failure in one item never stops the rest of the batch.
+
+The cancellation token of a batch is handed to the worker processes, so they stop when its deadline passes or its cancel
+file is created.  A token cancelled in the API process only (e.g. the client disconnected) stops the items that did not
+start yet.
+
+The pool starts its worker processes with the spawn method, which runs a new python (see set_python_executable).
+"""
+
+import json
+import logging
+import multiprocessing
+import os
+import sys
+from concurrent.futures import CancelledError, ProcessPoolExecutor, as_completed
+
+from optimizer.slim_optimizer_validate import input_class_dict, validate_input
+from optimizer.util.cancel import Cancelled
+from optimizer.util.deadline import DeadlineExceeded
+
+log = logging.getLogger(__name__)
+
+
+def python_executable():
+    """
+    :return str path: the python that runs the worker processes...sys.executable, unless it is not python (under embedded
+                      uwsgi it is the uwsgi binary unless py-sys-executable is set), then the python3 of this installation
+    """
+    if os.path.basename(sys.executable or "").startswith("python"):
+        return sys.executable
+    return os.path.join(sys.exec_prefix, "bin", "python3")
+
+
+def set_python_executable(python=None):
+    """
+    Set the python that runs the worker processes of every batch (the spawn start method starts them with it)
+
+    :param str python: path of the python executable (None = see python_executable)
+    """
+    python = python or python_executable()
+    log.debug("Batch worker processes are started with %s", python)
+    multiprocessing.get_context("spawn").set_executable(python)
+
+
+set_python_executable()
+
+
+def load_dataset_ref(dataset_ref, dataset_dir):
+    """
+    Load a stored dataset that an item of a batch refers to (instead of containing the whole payload)
+
+    :param str dataset_ref: name of a json file (with or without ".json") in dataset_dir
+    :param str dataset_dir: directory of the stored datasets
+    :return dict input_dict: the viz data of the dataset
+    :raises ValueError: if the reference is not valid or the dataset does not exist
+    """
+    file_name = dataset_ref if dataset_ref.endswith(".json") else dataset_ref + ".json"
+    if os.path.basename(file_name) != file_name:
+        raise ValueError("Invalid dataset reference: {}".format(dataset_ref))
+
+    path = os.path.join(dataset_dir, file_name)
+    if not os.path.exists(path):
+        raise ValueError("Dataset {} not found".format(dataset_ref))
+
+    with open(path) as f:
+        return json.load(f)
+
+
+def check_item(item):
+    """
+    Check the shape of one item of a batch before it is looked up in the cache or admitted (it is ingested and validated
+    later, see validate_item)
+
+    :param item: the item (see /docs/api_devGuide.md)
+    :return dict response: an error response if the item is not a JSON object or its algorithm is unknown, None if it is valid
+    """
+    if not isinstance(item, dict):
+        return {"body": ["A batch item must be a JSON object"], "reason": "Invalid item", "statusCode": 400}
+    algorithm = item.get("algorithm")
+    if algorithm is not None and (not isinstance(algorithm, str) or algorithm not in input_class_dict):
+        body = ["Optimizer named: {} not found...the available optimizers are {}".format(algorithm, list(input_class_dict))]
+        return {"body": body, "reason": "Invalid item", "statusCode": 400}
+    if not isinstance(item.get("files", []), list):
+        return {"body": ["The files of a batch item must be a list"], "reason": "Invalid item", "statusCode": 400}
+    return None
+
+
+def validate_item(input_dict):
+    """
+    Validate one item of a batch without building or solving it
+
+    :param dict input_dict: the viz data of the item (see /docs/api_devGuide.md)
+    :return dict response: an error response if the item is not valid, None if it is valid
+    """
+    try:
+        _, validation_errors, _ = validate_input(input_dict, input_dict.get("algorithm"))
+    except Exception as e:
+        return {"body": ["{}: {}".format(type(e).__name__, e)], "reason": "Invalid item", "statusCode": 400}
+
+    if len(validation_errors) > 0:
+        return {"body": validation_errors, "reason": "Validation Errors in input data", "statusCode": 400}
+    return None
+
+
+def cancelled_response(e):
+    """
+    :param Cancelled e: why the work stopped
+    :return dict response: the response of a request that was cancelled (statusCode 504 if its deadline passed, else 499)
+    """
+    if isinstance(e, DeadlineExceeded):
+        return {"body": [str(e)], "reason": "Deadline exceeded", "statusCode": 504}
+    return {"body": [str(e)], "reason": "Cancelled", "statusCode": 499}
+
+
+def solve_item(input_dict, solve_kwargs=None, cancel_token=None):
+    """
+    Ingest, build and solve one item of a batch.  This runs in a worker process of the pool.
+
+    :param dict input_dict: the viz data of the item (see /docs/api_devGuide.md)
+    :param dict solve_kwargs: keyword arguments for OptimizerBase.solve
+    :param CancellationToken cancel_token: stops the ingest, build, solve and output (see optimizer.util.cancel)
+    :return dict response: the response of the item (as POST /api/vizdata) with the history of operations in "history" and
+                           the size of the model and the termination condition of the solver in "solve_stats"
+    """
+    from optimizer.slim_optimizer_main import create_opt  # imported by the worker process, not by the API
+
+    try:
+        opt, _ = create_opt(input_dict, input_dict.get("algorithm"), cancel_token=cancel_token)
+        opt.build()
+        opt.solve(**(solve_kwargs or {}))
+        response = {"body": opt.get_results(), "reason": "OK", "statusCode": 200}
+        response["history"] = json.loads(opt.get_history_df().to_json(orient="records", date_format="iso"))
+        response["solve_stats"] = opt.get_solve_stats()
+    except Cancelled as e:
+        response = cancelled_response(e)
+    except Exception as e:
+        log.exception("Batch item %s failed", input_dict.get("datasetName"))
+        response = {"body": ["{}: {}".format(type(e).__name__, e)], "reason": "Solve failed", "statusCode": 500}
+    return response
+
+
+def solve_batch(items, max_workers=None, solve_kwargs=None, cancel_token=None):
+    """
+    Validate all items of a batch and then solve the valid items in a process pool
+
+    :param list items: list of viz data dicts (see /docs/api_devGuide.md)
+    :param int max_workers: number of worker processes (None = number of cores)
+    :param solve_kwargs: keyword arguments for OptimizerBase.solve...a dict (for every item) or a list with a dict per item
+    :param CancellationToken cancel_token: the token of the whole batch...items that are cancelled get statusCode 499 (504 if
+                                           the deadline of the batch passed)
+    :return: a generator of (index, response) tuples, in the order the items complete
+    """
+    valid = []
+    for index, input_dict in enumerate(items):
+        error_response = validate_item(input_dict)
+        if error_response is not None:
+            yield index, error_response
+        else:
+            valid.append(index)
+
+    if not valid:
+        return
+
+    max_workers = min(max_workers or os.cpu_count() or 1, len(valid))
+    log.info("Solving %s batch items with %s processes", len(valid), max_workers)
+
+    # spawn (instead of fork) since the API workers are multi-threaded
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = {}
+        for index in valid:
+            item_kwargs = solve_kwargs[index] if isinstance(solve_kwargs, list) else solve_kwargs
+            futures[pool.submit(solve_item, items[index], item_kwargs, cancel_token)] = index
+        for future in as_completed(futures):
+            index = futures[future]
+            if cancel_token is not None and cancel_token.cancelled():
+                # the items that did not start yet are dropped
+                for pending in futures:
+                    pending.cancel()
+            try:
+                response = future.result()
+            except CancelledError:
+                response = cancelled_response(Cancelled("{} before the item started".format(cancel_token.reason)))
+            except Exception as e:
+                # e.g. the worker process died
+                log.error("Batch item %s failed: %s", index, e)
+                response = {"body": ["{}: {}".format(type(e).__name__, e)], "reason": "Solve failed", "statusCode": 500}
+            yield index, response
@@ -0,0 +1,113 @@
+"""
+Cooperative cancellation of ingest, build and solve.
+
+A cancellation token is handed to the optimizer (see OptimizerBase.set_cancel_token).  The optimizer checks it between
+the stages, the models check it between the components they build and inside their long loops, and the solver process of
+the model is stopped when the token is cancelled (see ModelBase.check_solve_status).  A check raises Cancelled, so the
+work stops at the next check.
+
+A token can be cancelled in the process that runs the solve (cancel) or from any other process by creating its cancel
+file (e.g. a cancel request that reaches another uwsgi worker, see ProgressBoard.cancel).  Tokens can be handed to the
+worker processes of a batch.
+"""
+
+import logging
+import os
+import time
+
+log = logging.getLogger(__name__)
+
+
+class Cancelled(Exception):
+    pass
+
+
+class CancellationToken:
+    def __init__(self, cancel_path=None, poll_interval_sec=0.5):
+        """
+        Create a cancellation token
+
+        :param str cancel_path: the token is cancelled when this file exists.  By default (None) it is only cancelled by cancel
+        :param float poll_interval_sec: how often the cancel file is checked (checks in between are free)
+        """
+        self._cancel_path = cancel_path
+        self._poll_interval_sec = poll_interval_sec
+        self._last_poll_time = 0
+        self._reason = None
+
+    @property
+    def reason(self):
+        """
+        :return str reason: why the token was cancelled (None if it was not)
+        """
+        return self._reason
+
+    def cancel(self, reason="Cancelled"):
+        """
+        Cancel the token (in this process)
+
+        :param str reason: why it was cancelled (e.g. "The client disconnected")
+        :return: None
+        """
+        if self._reason is None:
+            log.warning("Cancelled: %s", reason)
+            self._reason = reason
+
+    def cancelled(self):
+        """
+        :return bool cancelled: True if the token was cancelled
+        """
+        if self._reason is None and self._cancel_path is not None:
+            now = time.time()
+            if now - self._last_poll_time >= self._poll_interval_sec:
+                self._last_poll_time = now
+                if os.path.exists(self._cancel_path):
+                    self.cancel("Cancelled by the client")
+        return self._reason is not None
+
+    def remaining(self):
+        """
+        :return float seconds: seconds left to do the work (0 if cancelled, None if there is no time limit)
+        """
+        return 0 if self.cancelled() else None
+
+    def check(self, where):
+        """
+        Check that the work can go on
+
+        :param str where: what is about to run (e.g. "build"), for the message of the exception
+        :return: None
+        :raises Cancelled: if the token was cancelled
+        """
+        if self.cancelled():
+            raise Cancelled("{} during {}".format(self._reason, where))
+
+    def checked_rule(self, rule, where):
+        """
+        Wrap the rule of an indexed pyomo component (e.g. a Constraint) so the token is checked before each index is
+        constructed
+
+        :param rule: the rule function (model, *index)
+        :param str where: the name of the component, for the message of the exception
+        :return: the wrapped rule
+        """
+
+        def checked(model, *index):
+            self.check(where)
+            return rule(model, *index)
+
+        return checked
+
+    def checked_iter(self, iterable, where, every=1000):
+        """
+        Iterate over the items of a long loop, checking the token every so many items
+
+        :param iterable: the items
+        :param str where: what the loop does (e.g. "output"), for the message of the exception
+        :param int every: check the token before the first item and then every this many items
+        :return: a generator of the items
+        """
+        for i, item in enumerate(iterable):
+            if i % every == 0:
+                self.check(where)
+            yield item
@@ -0,0 +1,149 @@
+"""
+Capture of production requests, to replay them later against a changed optimizer (see tests/benchmarks/replay.py)
+
+A RequestCapture samples the posted viz data problems (DM3K_CAPTURE_RATE) and stores each sampled problem with how it was
+answered...its status, objective value, size and the seconds of each stage of the solve.  The instance names of a problem
+can be anonymized with a keyed hash (see anonymize_input), which is consistent so the renamed problem has the same solution.
+
+The archive is a directory shared by all processes, with one gzipped json file per capture (written atomically, so
+processes never write the same file).  Only the latest captures are kept.
+"""
+
+import gzip
+import hashlib
+import hmac
+import json
+import logging
+import os
+import random
+import tempfile
+import uuid
+from datetime import datetime
+
+log = logging.getLogger(__name__)
+
+CAPTURE_SUFFIX = ".json.gz"
+# the instance names of a viz data problem (the names they are referred to by elsewhere are replaced too)
+INSTANCE_TABLES = ("resourceInstances", "activityInstances")
+# not instance names, even if an instance has the same name
+RESERVED_NAMES = ("ALL",)
+
+
+def anonymize_input(input_dict, salt):
+    """
+    Replace the instance names of a viz data problem (and every reference to them) with a keyed hash of the name
+
+    :param dict input_dict: the posted viz data (see /docs/api_devGuide.md)
+    :param str salt: the key of the hash...the same salt gives the same names, so captures of the same data still match
+    :return dict anonymized: a copy of the problem with the names replaced
+    """
+    key = salt.encode("utf-8")
+    names = {}
+    for file_dict in input_dict.get("files", []):
+        contents = file_dict.get("fileContents", {})
+        for table_name in INSTANCE_TABLES:
+            for instances in contents.get(table_name, []):
+                for instance in instances.get("instanceTable", []):
+                    name = instance.get("instanceName")
+                    if isinstance(name, str) and name not in RESERVED_NAMES and name not in names:
+                        digest = hmac.new(key, name.encode("utf-8"), hashlib.sha256).hexdigest()
+                        names[name] = "anon_" + digest[:16]
+    return _rename(input_dict, names)
+
+
+def _rename(value, names):
+    if isinstance(value, dict):
+        return {names.get(k, k) if isinstance(k, str) else k: _rename(v, names) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_rename(v, names) for v in value]
+    if isinstance(value, str):
+        return names.get(value, value)
+    return value
+
+
+class RequestCapture:
+    def __init__(self, capture_dir, sample_rate=0.0, anonymize=False, salt="", max_captures=1000):
+        """
+        Create a capture of sampled requests
+
+        :param str capture_dir: directory of the archive (shared by all processes)
+        :param float sample_rate: the share of requests that are captured (0 = off, 1 = every request)
+        :param bool anonymize: True = replace the instance names with a keyed hash (see anonymize_input)
+        :param str salt: the key of the hash of the anonymized names
+        :param int max_captures: the oldest captures are removed when there are more than this
+        """
+        self._capture_dir = capture_dir
+        self._sample_rate = sample_rate
+        self._anonymize = anonymize
+        self._salt = salt
+        self._max_captures = max_captures
+
+    @property
+    def enabled(self):
+        return self._sample_rate > 0
+
+    def sample(self):
+        """
+        :return bool sampled: True if the next request should be captured
+        """
+        return self.enabled and random.random() < self._sample_rate
+
+    def save(self, input_dict, observed):
+        """
+        Store a captured request in the archive...the oldest captures are removed to make room for it
+
+        :param dict input_dict: the posted viz data
+        :param dict observed: how the request was answered, e.g. "statusCode", "objective_value", "total_sec", "stages"
+                              (seconds of each stage of the solve) and "solve_stats" (size of the model)
+        :return str capture_id: the id of the capture (None if it could not be written)
+        """
+        if self._anonymize:
+            input_dict = anonymize_input(input_dict, self._salt)
+        # sorted by the time of the capture
+        capture_id = "{}-{}".format(datetime.now().strftime("%Y%m%dT%H%M%S%f"), uuid.uuid4().hex[:8])
+        record = {
+            "capture_id": capture_id,
+            "captured": datetime.now().isoformat(),
+            "anonymized": self._anonymize,
+            "algorithm": input_dict.get("algorithm"),
+            "observed": observed,
+            "input": input_dict,
+        }
+
+        try:
+            os.makedirs(self._capture_dir, exist_ok=True)
+            self._evict(self._max_captures - 1)
+            # written to a temporary file first, so a reader never sees a partial capture
+            fd, temp_path = tempfile.mkstemp(dir=self._capture_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f, gzip.GzipFile(fileobj=f, mode="wb") as gz:
+                gz.write(json.dumps(record).encode("utf-8"))
+            os.replace(temp_path, os.path.join(self._capture_dir, capture_id + CAPTURE_SUFFIX))
+        except (OSError, TypeError, ValueError) as e:
+            log.warning("Unable to capture the request: %s", e)
+            return None
+        return capture_id
+
+    def _evict(self, keep):
+        captures = sorted(name for name in os.listdir(self._capture_dir) if name.endswith(CAPTURE_SUFFIX))
+        for name in captures[: max(0, len(captures) - keep)]:
+            try:
+                os.remove(os.path.join(self._capture_dir, name))
+            except FileNotFoundError:
+                pass  # removed by another process
+
+
+def iter_captures(capture_dir):
+    """
+    Read the captures of an archive, oldest first
+
+    :param str capture_dir: directory of the archive
+    :return: a generator of the captured records ("capture_id", "captured", "anonymized", "algorithm", "observed", "input")
+    """
+    for name in sorted(os.listdir(capture_dir)):
+        if not name.endswith(CAPTURE_SUFFIX):
+            continue
+        try:
+            with gzip.open(os.path.join(capture_dir, name), "rb") as f:
+                yield json.loads(f.read().decode("utf-8"))
+        except (OSError, ValueError) as e:
+            log.warning("Skipping unreadable capture %s: %s", name, e)
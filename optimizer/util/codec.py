@@ -0,0 +1,239 @@
+"""
+JSON encoding/decoding and compression of API payloads.
+
+JSON codecs are pluggable (see register_codec).  Two are available by default...
+    - "orjson": a fast encoder/decoder (used when the optional orjson package is installed)
+    - "json": the python standard library
+
+Both codecs serialize numpy scalars and arrays (e.g. from pandas or the model) as plain JSON numbers and lists.
+
+Compression supports gzip and deflate (standard library) and zstd (when the optional zstandard package is installed).
+"""
+
+import gzip
+import io
+import json
+import logging
+import sys
+import zlib
+
+log = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+
+class PayloadTooLargeError(ValueError):
+    """Raised when a compressed payload decompresses to more than the allowed number of bytes"""
+
+
+def _to_builtin(obj):
+    """
+    Convert objects the json module cannot serialize (numpy scalars/arrays, sets) to python builtins
+
+    :param obj: the object to convert
+    :return: a json serializable python object
+    """
+    # numpy values can only exist if numpy has been imported (e.g. by pandas or the model), so it is never imported here
+    numpy = sys.modules.get("numpy")
+    if numpy is not None:
+        if isinstance(obj, numpy.ndarray):
+            return obj.tolist()
+        if isinstance(obj, numpy.generic):
+            return obj.item()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError("Object of type {} is not JSON serializable".format(type(obj).__name__))
+
+
+class JsonCodec:
+    def __init__(self, name, dumps, loads):
+        """
+        A JSON encoder/decoder pair
+
+        :param str name: name of the codec
+        :param dumps: function(obj) -> bytes
+        :param loads: function(bytes or str) -> obj
+        """
+        self.name = name
+        self.dumps = dumps
+        self.loads = loads
+
+
+def _std_dumps(obj):
+    return json.dumps(obj, default=_to_builtin, separators=(",", ":")).encode("utf-8")
+
+
+def _orjson_dumps(obj):
+    # orjson only serializes str dict keys without OPT_NON_STR_KEYS
+    return orjson.dumps(obj, default=_to_builtin, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+
+_codecs = {"json": JsonCodec("json", _std_dumps, json.loads)}
+if orjson is not None:
+    _codecs["orjson"] = JsonCodec("orjson", _orjson_dumps, orjson.loads)
+
+
+def register_codec(name, dumps, loads):
+    """
+    Register a JSON codec so it can be selected by name (e.g. with the DM3K_JSON_CODEC setting)
+
+    :param str name: name of the codec
+    :param dumps: function(obj) -> bytes
+    :param loads: function(bytes or str) -> obj
+    :return: None
+    """
+    _codecs[name] = JsonCodec(name, dumps, loads)
+
+
+def get_codec(name=None):
+    """
+    Get a JSON codec
+
+    :param str name: name of a registered codec.  None (or "auto") = the fastest available codec
+    :return JsonCodec codec: the codec
+    """
+    if name in (None, "", "auto"):
+        name = "orjson" if "orjson" in _codecs else "json"
+    if name not in _codecs:
+        log.warning("JSON codec %s is not available...using json", name)
+        name = "json"
+    return _codecs[name]
+
+
+def get_encodings():
+    """
+    :return list encodings: the content encodings that can be compressed and decompressed, most preferred first
+    """
+    encodings = ["gzip", "deflate"]
+    if zstandard is not None:
+        encodings.insert(0, "zstd")
+    return encodings
+
+
+def choose_encoding(accept_encoding):
+    """
+    Choose the content encoding of a response from the Accept-Encoding header of the request
+
+    :param str accept_encoding: the Accept-Encoding header (e.g. "gzip, deflate, br;q=0.9")
+    :return str encoding: the chosen encoding or None if the response should not be compressed
+    """
+    if not accept_encoding:
+        return None
+
+    accepted = {}
+    for part in accept_encoding.split(","):
+        pieces = part.strip().split(";")
+        q = 1.0
+        for param in pieces[1:]:
+            param = param.strip()
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        accepted[pieces[0].strip().lower()] = q
+
+    best, best_q = None, 0.0
+    for encoding in get_encodings():
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(data, encoding, level=None):
+    """
+    Compress bytes
+
+    :param bytes data: the data to compress
+    :param str encoding: "gzip", "deflate" or "zstd"
+    :param int level: compression level (None = the default of the encoding)
+    :return bytes compressed: the compressed data
+    """
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=6 if level is None else level)
+    if encoding == "deflate":
+        return zlib.compress(data, 6 if level is None else level)
+    if encoding == "zstd" and zstandard is not None:
+        return zstandard.ZstdCompressor(level=3 if level is None else level).compress(data)
+    raise ValueError("Unsupported content encoding: {}".format(encoding))
+
+
+def decompress(data, encoding, max_bytes=None):
+    """
+    Decompress bytes
+
+    :param bytes data: the compressed data
+    :param str encoding: "gzip", "deflate", "zstd" or "identity"
+    :param int max_bytes: max size of the decompressed data (None = no limit)
+    :return bytes data: the decompressed data
+    :raises ValueError: if the encoding is not supported or the data is not valid
+    :raises PayloadTooLargeError: if the decompressed data is larger than max_bytes
+    """
+    encoding = (encoding or "identity").strip().lower()
+    if encoding == "identity":
+        return data
+
+    if encoding in ("gzip", "deflate"):
+        # wbits 47 = detect a gzip or zlib header
+        d = zlib.decompressobj(47 if encoding == "gzip" else zlib.MAX_WBITS)
+        try:
+            out = d.decompress(data, max_bytes or 0)
+            if d.unconsumed_tail:
+                raise PayloadTooLargeError("Decompressed payload is larger than {} bytes".format(max_bytes))
+            out += d.flush()
+        except zlib.error as e:
+            raise ValueError("Invalid {} data: {}".format(encoding, e))
+    elif encoding == "zstd" and zstandard is not None:
+        # only one byte past the limit is inflated, so a small payload that decompresses to gigabytes is never held in memory
+        try:
+            with zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data)) as reader:
+                out = reader.read(max_bytes + 1) if max_bytes else reader.read()
+        except zstandard.ZstdError as e:
+            raise ValueError("Invalid {} data: {}".format(encoding, e))
+    else:
+        raise ValueError("Unsupported content encoding: {}".format(encoding))
+
+    if max_bytes and len(out) > max_bytes:
+        raise PayloadTooLargeError("Decompressed payload is larger than {} bytes".format(max_bytes))
+    return out
+
+
+class StreamCompressor:
+    def __init__(self, encoding, level=None):
+        """
+        Compress a stream of chunks (e.g. a newline delimited json response) so each chunk can be sent as soon as it is ready
+
+        :param str encoding: "gzip", "deflate" or "zstd"
+        :param int level: compression level (None = the default of the encoding)
+        """
+        if encoding in ("gzip", "deflate"):
+            # wbits 31 = gzip header, 15 = zlib header
+            self._compressor = zlib.compressobj(6 if level is None else level, zlib.DEFLATED, 31 if encoding == "gzip" else 15)
+            self._flush_mode = zlib.Z_SYNC_FLUSH
+        elif encoding == "zstd" and zstandard is not None:
+            self._compressor = zstandard.ZstdCompressor(level=3 if level is None else level).compressobj()
+            self._flush_mode = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        else:
+            raise ValueError("Unsupported content encoding: {}".format(encoding))
+
+    def compress(self, chunk):
+        """
+        :param bytes chunk: the next chunk of the stream
+        :return bytes: compressed data that can be sent right away
+        """
+        return self._compressor.compress(chunk) + self._compressor.flush(self._flush_mode)
+
+    def finish(self):
+        """
+        :return bytes: the end of the compressed stream
+        """
+        return self._compressor.flush()
@@ -0,0 +1,179 @@
+"""
+A loader of the constraint csv files of a full house dataset (see FullHouseInput.ingest_validate)
+
+Each file is parsed once with the csv module (a C reader) into what the ingest needs...
+    - a name list file (activity.csv, *_allocations.csv, container_*_resource.csv) has a header row that is skipped, then
+      rows of a name followed by a ragged list of names: it is parsed to [(name, [names])], without the missing values and
+      duplicates of each row
+    - a table file (*_budget.csv, *_cost.csv, force_forbid.csv) has the column names in its first row: it is parsed to
+      {row name: {column name: value}}, where a column is numeric only if all its values are numbers (the way pandas reads it)
+
+The files of a directory are read at the same time, and parsed files are cached by their path, size and modification time,
+so ingesting an unchanged dataset again does not read it.  The parsed files are shared by every ingest...do not modify them.
+"""
+
+import csv
+import logging
+import os
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+log = logging.getLogger(__name__)
+
+# the cells pandas reads as missing values (its default na_values)
+NA_VALUES = frozenset(
+    ["", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN"]
+    + ["None", "n/a", "nan", "null"]
+)
+
+
+class CsvFormatError(ValueError):
+    """
+    A csv file that can not be parsed (e.g. a row of a table file with more values than columns)
+    """
+
+
+def _is_missing(cell):
+    return cell in NA_VALUES
+
+
+def read_name_lists(path):
+    """
+    Parse a name list file (see the module docstring)
+
+    :param str path: path of the csv file
+    :return list rows: a (name, [names]) tuple per row, in the order of the file
+    """
+    rows = []
+    with open(path, newline="") as f:
+        reader = csv.reader(f, skipinitialspace=True)
+        next(reader, None)  # the header row
+        for row in reader:
+            if not row:
+                continue  # a blank line
+            names = [cell for cell in row[1:] if not _is_missing(cell)]
+            # without duplicates, in the order they are listed
+            rows.append((row[0], list(dict.fromkeys(names))))
+    return rows
+
+
+def read_table(path):
+    """
+    Parse a table file (see the module docstring)
+
+    :param str path: path of the csv file
+    :return dict table: row name -> {column name -> value}, in the order of the file.  A missing value is nan.
+    :raises CsvFormatError: if the file is empty, a row has more values than columns, or a row name is repeated
+    """
+    with open(path, newline="") as f:
+        reader = csv.reader(f, skipinitialspace=True)
+        header = next(reader, None)
+        if not header:
+            raise CsvFormatError("No columns to parse from file")
+        columns = header[1:]
+        names, cells = [], []
+        for line_number, row in enumerate(reader, start=2):
+            if not row:
+                continue
+            if len(row) > len(header):
+                raise CsvFormatError("Expected {} fields in line {}, saw {}".format(len(header), line_number, len(row)))
+            names.append(row[0])
+            cells.append(row[1:] + [""] * (len(header) - len(row)))
+
+    repeated = [name for name, count in Counter(names).items() if count > 1]
+    if repeated:
+        raise CsvFormatError("Row names must be unique: {}".format(repeated[:5]))
+
+    values = [_column_values([row[i] for row in cells]) for i in range(len(columns))]
+    return {name: {column: values[i][r] for i, column in enumerate(columns)} for r, name in enumerate(names)}
+
+
+def _column_values(cells):
+    """
+    :return list values: the cells of a column as ints (all integers, none missing), floats (all numbers) or strings (any
+                         cell is not a number), with nan for the missing cells
+    """
+    if not any(_is_missing(cell) for cell in cells):
+        try:
+            return [int(cell) for cell in cells]
+        except ValueError:
+            pass
+    try:
+        return [float("nan") if _is_missing(cell) else float(cell) for cell in cells]
+    except ValueError:
+        return [float("nan") if _is_missing(cell) else cell for cell in cells]
+
+
+class ParsedFileCache:
+    def __init__(self, max_files=64):
+        """
+        Create an LRU cache of parsed files, keyed by their path, size and modification time
+
+        :param int max_files: the least recently used files are dropped when there are more than this
+        """
+        self._max_files = max_files
+        self._lock = threading.Lock()
+        self._files = OrderedDict()  # (path, kind) -> (size, mtime_ns, parsed)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path, kind, parse):
+        """
+        :param str path: path of the file
+        :param str kind: "names" or "table"
+        :param parse: the function parsing the file (only called if it is not cached or it changed)
+        :return: the parsed file
+        """
+        stat = os.stat(path)
+        key = (os.path.abspath(path), kind)
+        with self._lock:
+            cached = self._files.get(key)
+            if cached is not None and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+                self._files.move_to_end(key)
+                self.hits += 1
+                return cached[2]
+            self.misses += 1
+
+        parsed = parse(path)
+        with self._lock:
+            self._files[key] = (stat.st_size, stat.st_mtime_ns, parsed)
+            self._files.move_to_end(key)
+            while len(self._files) > self._max_files:
+                self._files.popitem(last=False)
+        return parsed
+
+    def clear(self):
+        with self._lock:
+            self._files.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+parsed_file_cache = ParsedFileCache()
+
+
+def load_csv_files(csv_files, table_basenames, cache=parsed_file_cache, max_workers=4):
+    """
+    Parse the csv files of a constraints directory at the same time
+
+    :param list csv_files: paths of the csv files
+    :param table_basenames: the base names (without .csv) of the table files, the other files are name list files
+    :param ParsedFileCache cache: cache of the parsed files (None = always parse them)
+    :param int max_workers: files read at the same time
+    :return dict parsed: path -> the parsed file (see read_name_lists and read_table)
+    :raises CsvFormatError: if a file can not be parsed (the error names the file)
+    """
+
+    def load(path):
+        basename = os.path.basename(path).split(".csv")[0]
+        kind, parse = ("table", read_table) if basename in table_basenames else ("names", read_name_lists)
+        try:
+            return cache.get(path, kind, parse) if cache is not None else parse(path)
+        except (csv.Error, UnicodeDecodeError, CsvFormatError) as e:
+            raise CsvFormatError("{}.csv is in an invalid format and could not be parsed.  {}".format(basename, e)) from e
+
+    if len(csv_files) <= 1 or max_workers <= 1:
+        return {path: load(path) for path in csv_files}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(csv_files))) as executor:
+        return dict(zip(csv_files, executor.map(load, csv_files)))
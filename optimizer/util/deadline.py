@@ -0,0 +1,108 @@
+"""
+Deadlines of requests, propagated from the HTTP request to the time limit of the solver.
+
+A deadline is set when a request arrives.  It is a cancellation token (see optimizer.util.cancel) that is also cancelled
+when the time is up, so each stage of a solve (ingest, build, solve) is charged against it...the work stops at the next
+check once the deadline has passed, the solver gets the time that is left as its time limit (tmlim), and the solver is
+not retried when no time is left.  A deadline is also cancelled when the client disconnects (see DisconnectWatcher), so
+the work for a client that gave up stops promptly.
+
+Deadlines are wall clock times, so they can be handed to the worker processes of a batch.
+"""
+
+import logging
+import os
+import select
+import socket
+import threading
+import time
+
+from optimizer.util.cancel import CancellationToken, Cancelled
+
+log = logging.getLogger(__name__)
+
+
+class DeadlineExceeded(Cancelled, TimeoutError):
+    pass
+
+
+class Deadline(CancellationToken):
+    def __init__(self, seconds=None, start_time=None, cancel_path=None):
+        """
+        Create a deadline...a cancellation token that is also cancelled when the time is up
+
+        :param float seconds: seconds from the start time to the deadline.  By default (None) there is no deadline
+        :param float start_time: when the time started (time.time()), by default now (e.g. when the request arrived)
+        :param str cancel_path: see CancellationToken
+        """
+        super().__init__(cancel_path)
+        start_time = time.time() if start_time is None else start_time
+        self._expires_at = start_time + seconds if seconds is not None else None
+
+    @property
+    def reason(self):
+        if self._reason is None and self._time_is_up():
+            return "Deadline exceeded"
+        return self._reason
+
+    def remaining(self):
+        if super().cancelled():
+            return 0
+        if self._expires_at is None:
+            return None
+        return max(0, self._expires_at - time.time())
+
+    def cancelled(self):
+        return super().cancelled() or self._time_is_up()
+
+    def check(self, where):
+        """
+        :raises DeadlineExceeded: if the time is up
+        :raises Cancelled: if the deadline was cancelled (e.g. the client disconnected)
+        """
+        if super().cancelled():
+            raise Cancelled("{} during {}".format(self._reason, where))
+        if self._time_is_up():
+            raise DeadlineExceeded("Deadline exceeded during {}".format(where))
+
+    def _time_is_up(self):
+        return self._expires_at is not None and time.time() >= self._expires_at
+
+
+class DisconnectWatcher:
+    def __init__(self, client_fd, token, interval_sec=1):
+        """
+        Watch the connection of a client in a thread and cancel a token (e.g. a deadline) when the client disconnects
+
+        :param int client_fd: file descriptor of the client socket (it is duplicated, the caller keeps its own)
+        :param CancellationToken token: the token to cancel
+        :param float interval_sec: how often the connection is checked
+        """
+        self._sock = socket.socket(fileno=os.dup(client_fd))
+        self._token = token
+        self._interval_sec = interval_sec
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._watch, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+        self._sock.close()
+
+    def _watch(self):
+        while not self._stopped.wait(self._interval_sec):
+            try:
+                readable, _, _ = select.select([self._sock], [], [], 0)
+                # a closed connection is readable with no data (a client may also send its next request early)
+                if readable and self._sock.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT) == b"":
+                    self._token.cancel("The client disconnected")
+                    return
+            except BlockingIOError:
+                continue
+            except OSError as e:
+                self._token.cancel("The client connection failed: {}".format(e))
+                return
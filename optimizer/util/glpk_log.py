@@ -0,0 +1,219 @@
+"""
+Parse the log of the GLPK solver (glpsol)
+
+parse_mip_progress parses one progress line of the branch and bound search (while the solver runs).  parse_glpk_log parses a
+whole log into a timeline of records (the size of the problem, the reductions of the preprocessor, the LP relaxation, the
+progress of the search and the final status) and summary metrics of the solve.  glpsol does not time its lines, so the time
+of a line is the time it was first seen by whoever watched the log (see ModelBase.check_solve_status).
+"""
+
+import math
+import re
+
+# e.g. "+   381: >>>>>   1.200000000e+01 <=   1.300000000e+01   7.7% (12; 0)"
+#      "+   150: mip =     not found yet <=              +inf        (1; 0)"
+#      "+   412: mip =   1.200000000e+01 <=     tree is empty   0.0% (0; 25)"
+MIP_PROGRESS_PATTERN = re.compile(
+    r"^\+\s*(?P<iteration>\d+):\s*(?:mip\s*=|(?P<new>>>>>>))\s*(?P<objective>not found yet|\S+)\s*(?P<sense>[<>]=)\s*"
+    r"(?P<bound>tree is empty|\S+)\s*(?:(?P<gap>[\d.]+)%)?"
+)
+
+# e.g. "46 rows, 85 columns, 210 non-zeros"
+PROBLEM_SIZE_PATTERN = re.compile(r"^(?P<rows>\d+) rows?, (?P<columns>\d+) columns?, (?P<nonzeros>\d+) non-zeros?")
+# e.g. "*    52: obj =   1.350000000e+02 inf =   0.000e+00 (0)"
+LP_PROGRESS_PATTERN = re.compile(r"^[ *]\s*(?P<iteration>\d+):\s*obj\s*=\s*(?P<objective>\S+)")
+# e.g. "(12; 0)" at the end of a progress line...active nodes and nodes done (removed from the tree)
+NODES_PATTERN = re.compile(r"\((?P<active>\d+); (?P<done>\d+)\)\s*$")
+# e.g. "6 hidden covering inequaliti(es) were detected", "2 constraint coefficient(s) were reduced"
+PRESOLVE_PATTERNS = {
+    "hidden_covering_inequalities": re.compile(r"^(\d+) hidden covering inequaliti\(es\) were detected"),
+    "hidden_packing_inequalities": re.compile(r"^(\d+) hidden packing inequaliti\(es\) were detected"),
+    "coefficients_reduced": re.compile(r"^(\d+) constraint coefficient\(s\) were reduced"),
+}
+TIME_USED_PATTERN = re.compile(r"^Time used:\s*(?P<sec>[\d.]+) secs")
+MEMORY_USED_PATTERN = re.compile(r"^Memory used:\s*(?P<mb>[\d.]+) Mb")
+# the final status of the solve, e.g. "INTEGER OPTIMAL SOLUTION FOUND", "TIME LIMIT EXCEEDED; SEARCH TERMINATED"
+STATUS_PATTERN = re.compile(r"^(?P<status>[A-Z]+ [A-Z ;]*[A-Z])$")
+LP_STATUS = "OPTIMAL LP SOLUTION FOUND"
+
+
+def parse_mip_progress(line):
+    """
+    Parse a progress line of the branch and bound search
+
+    :param str line: a line of the glpsol log
+    :return dict progress: None if the line is not a progress line, else...
+                           "iteration": simplex iterations so far
+                           "objective": objective value of the best solution found so far (None = no solution yet)
+                           "bound": best bound of the objective (None = no bound yet or the search tree is empty)
+                           "gap": relative gap between the objective and the bound (e.g. 0.077 = 7.7%, None = unknown)
+                           "new_incumbent": True if the line reports a new best solution (">>>>>")
+    """
+    match = MIP_PROGRESS_PATTERN.match(line)
+    if match is None:
+        return None
+    gap = match.group("gap")
+    return {
+        "iteration": int(match.group("iteration")),
+        "objective": _to_number(match.group("objective")),
+        "bound": _to_number(match.group("bound")),
+        "gap": round(float(gap) / 100, 6) if gap is not None else None,
+        "new_incumbent": match.group("new") is not None,
+    }
+
+
+def _to_number(text):
+    try:
+        number = float(text)
+    except ValueError:
+        return None  # "not found yet" or "tree is empty"
+    return number if math.isfinite(number) else None
+
+
+def parse_glpk_log(lines, line_times=None, timing_resolution_sec=None):
+    """
+    Parse a glpsol log into a timeline of records and summary metrics of the solve
+
+    :param list lines: the lines of the log (a str is split into lines)
+    :param list line_times: seconds since the solver started when each line was first seen (shorter than lines = the later
+                            lines were seen when the solver finished, None = unknown)
+    :param float timing_resolution_sec: how late a line may have been seen (e.g. the interval between two reads of the log)
+    :return dict timeline: "records" = a dict per recognized line with its "line" (number), "elapsed_sec" (None = unknown)
+                           and "type" ("problem", "presolve", "lp", "lp_status", "mip", "status", "time_used" or
+                           "memory_used") and the values of the line...and "summary" (see _summarize)
+    """
+    if isinstance(lines, str):
+        lines = lines.splitlines()
+    line_times = list(line_times or [])
+
+    records = []
+    section = None
+    for number, line in enumerate(lines):
+        line = line.rstrip("\n")
+        text = line.strip()
+        if text == "Preprocessing...":
+            section = "presolve"
+            continue
+        if text.startswith("Scaling...") or text.startswith("Solving LP relaxation") or text.startswith("Constructing"):
+            section = None
+
+        record = _parse_line(line, text, section)
+        if record is None:
+            continue
+        record["line"] = number
+        if line_times:
+            record["elapsed_sec"] = line_times[number] if number < len(line_times) else line_times[-1]
+        else:
+            record["elapsed_sec"] = None
+        records.append(record)
+
+    return {"records": records, "summary": _summarize(records, timing_resolution_sec)}
+
+
+def _parse_line(line, text, section):
+    mip_progress = parse_mip_progress(line)
+    if mip_progress:
+        nodes = NODES_PATTERN.search(line)
+        mip_progress["nodes_active"] = int(nodes.group("active")) if nodes else None
+        mip_progress["nodes_done"] = int(nodes.group("done")) if nodes else None
+        return dict(type="mip", **mip_progress)
+
+    match = PROBLEM_SIZE_PATTERN.match(text)
+    if match:
+        size = {k: int(v) for k, v in match.groupdict().items()}
+        return dict(type="problem", presolved=section == "presolve", **size)
+
+    if section == "presolve":
+        for name, pattern in PRESOLVE_PATTERNS.items():
+            match = pattern.match(text)
+            if match:
+                return {"type": "presolve", "reduction": name, "count": int(match.group(1))}
+
+    match = LP_PROGRESS_PATTERN.match(line)
+    if match:
+        return {"type": "lp", "iteration": int(match.group("iteration")), "objective": _to_number(match.group("objective"))}
+
+    if text == LP_STATUS:
+        return {"type": "lp_status", "status": text}
+
+    match = STATUS_PATTERN.match(text)
+    if match:
+        return {"type": "status", "status": match.group("status")}
+
+    match = TIME_USED_PATTERN.match(text)
+    if match:
+        return {"type": "time_used", "sec": float(match.group("sec"))}
+
+    match = MEMORY_USED_PATTERN.match(text)
+    if match:
+        return {"type": "memory_used", "MB": float(match.group("mb"))}
+    return None
+
+
+def _summarize(records, timing_resolution_sec):
+    """
+    :return dict summary: "status" = the final status line (None = the solver did not finish)
+                          "solver_sec" = the time used by the solver (its own "Time used", else the time of the last line)
+                          "first_incumbent_sec" / "final_incumbent_sec" = time of the first / last new best solution
+                          "proving_optimality_sec" = time after the last new best solution (spent raising the bound)
+                          "limited_by" = "search" (most of the time was spent finding the best solution) or "bound" (most
+                                         of the time was spent proving it), None = no search or too short to tell
+                          "incumbents", "nodes_explored", "nodes_active", "lp_iterations", "objective", "bound", "gap"
+                          "presolve" = the size of the problem before and after the preprocessor and its reductions
+                          "timing_resolution_sec", "memory_MB"
+    """
+    by_type = {}
+    for record in records:
+        by_type.setdefault(record["type"], []).append(record)
+    mip = by_type.get("mip", [])
+    incumbents = [r for r in mip if r["new_incumbent"]]
+    statuses = by_type.get("status", [])
+    iterations = [r["iteration"] for r in mip + by_type.get("lp", [])]
+
+    summary = {
+        "status": statuses[-1]["status"] if statuses else None,
+        "solver_sec": by_type["time_used"][-1]["sec"] if "time_used" in by_type else (records[-1]["elapsed_sec"] if records else None),
+        "timing_resolution_sec": timing_resolution_sec,
+        "first_incumbent_sec": incumbents[0]["elapsed_sec"] if incumbents else None,
+        "final_incumbent_sec": incumbents[-1]["elapsed_sec"] if incumbents else None,
+        "proving_optimality_sec": None,
+        "limited_by": None,
+        "incumbents": len(incumbents),
+        "nodes_explored": mip[-1]["nodes_done"] if mip else None,
+        "nodes_active": mip[-1]["nodes_active"] if mip else None,
+        "lp_iterations": max(iterations) if iterations else None,
+        "objective": mip[-1]["objective"] if mip else None,
+        "bound": mip[-1]["bound"] if mip else None,
+        "gap": mip[-1]["gap"] if mip else None,
+        "presolve": _summarize_presolve(by_type),
+        "memory_MB": by_type["memory_used"][-1]["MB"] if "memory_used" in by_type else None,
+    }
+
+    solver_sec = summary["solver_sec"]
+    final_sec = summary["final_incumbent_sec"]
+    long_enough = solver_sec is not None and solver_sec > (timing_resolution_sec or 0)
+    if final_sec is not None and solver_sec is not None:
+        summary["proving_optimality_sec"] = max(0.0, solver_sec - final_sec)
+        if long_enough:
+            summary["limited_by"] = "bound" if summary["proving_optimality_sec"] > final_sec else "search"
+    elif mip and not incumbents and long_enough:
+        summary["limited_by"] = "search"  # no solution was found
+    return summary
+
+
+def _summarize_presolve(by_type):
+    sizes = by_type.get("problem", [])
+    presolved = [r for r in sizes if r["presolved"]]
+    if not presolved:
+        return None
+    after = presolved[-1]
+    before = [r for r in sizes if not r["presolved"] and r["line"] < after["line"]]
+    presolve = {}
+    for key in ("rows", "columns", "nonzeros"):
+        presolve[key + "_after"] = after[key]
+        if before:
+            presolve[key + "_before"] = before[-1][key]
+            presolve[key + "_removed"] = before[-1][key] - after[key]
+    for record in by_type.get("presolve", []):
+        presolve[record["reduction"]] = presolve.get(record["reduction"], 0) + record["count"]
+    return presolve
@@ -2,61 +2,261 @@
 This provides a common framework to track the history of steps within an optimizer,
  including the time and memory required to load, solve, etc.
 
+The steps are spans that can be nested (e.g. "Building Model" > "Creating constraints"), opened with start_tag/end_tag,
+the span context manager or the traced decorator.  Each span records its wall time, its CPU time (of this process and of
+the solver processes it waited for) and, when tracemalloc is tracing (e.g. PYTHONTRACEMALLOC=1), the peak of the memory
+allocated by python during the span.  The history can be exported as a list of dicts (see get_history, one per span in
+the order they started) or as a Chrome trace (see get_chrome_trace, for chrome://tracing or https://ui.perfetto.dev).
 """
 
+import functools
+import json
 import logging
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
 from datetime import datetime
 
-from optimizer.util.util import time_mem_stamp
+from optimizer.util.util import convertToMB, time_mem_stamp
 
 log = logging.getLogger(__name__)
 
+HISTORY_COLUMNS = [
+    "datetime",
+    "operation",
+    "time_to_run_sec",
+    "memory_gain_MB",
+    "end_memory_MB",
+    "span_id",
+    "parent_id",
+    "depth",
+    "cpu_time_sec",
+    "tracemalloc_peak_MB",
+    "attributes",
+]
+
+
+def traced(operation, attr="hist_mgr"):
+    """
+    Decorate a method so each call is a span of the HistoryManager of its object
+
+    :param str operation: the name of the span
+    :param str attr: the attribute of the object that holds its HistoryManager
+    :return: the decorator
+    """
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with getattr(self, attr).span(operation):
+                return method(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _max_peak(peak, other_peak):
+    # None = not traced
+    if peak is None or other_peak is None:
+        return None
+    return max(peak, other_peak)
+
 
 class HistoryManager:
     def __init__(self):
         log.debug("Initializing the History Manager")
         self._metrics_history = []
-        self._tag_dict = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()  # the stack of open spans of each thread
+        self._next_span_id = 0
+        self._start_counter = time.perf_counter()
 
     def start_tag(self, tag_string):
         """
-        Creates a start tag entry in tag_dict.
+        Starts a span...it is nested in the innermost open span of this thread
 
-        :param str tag_string: The key for the new entry
+        :param str tag_string: The name of the span
         :return: None
         """
-        time, memory = time_mem_stamp()
-        # log.debug("start_tag: %s with time %s and memory %s", tag_string, time, memory)
-        self._tag_dict[tag_string] = {"time": time, "memory": memory}
+        _, memory = time_mem_stamp()
+        stack = self._stack()
+        parent = stack[-1] if stack else None
+        if parent is not None:
+            parent["traced_peak"] = _max_peak(parent["traced_peak"], self._traced_peak())
+        with self._lock:
+            span_id = self._next_span_id
+            self._next_span_id += 1
+        traced_now = self._reset_traced_peak()
+        span = {
+            "tag": tag_string,
+            "span_id": span_id,
+            "parent_id": parent["span_id"] if parent is not None else None,
+            "depth": len(stack),
+            "memory": memory,
+            "cpu": self._cpu_time(),
+            "traced_start": traced_now,
+            "traced_peak": traced_now,
+            "attributes": {},
+        }
+        stack.append(span)
+        span["counter"] = time.perf_counter()  # last, so the span is timed without its own overhead
 
     def end_tag(self, tag_string):
         """
-        Creates a end tag entry in tag_dict
+        Ends the innermost open span with this name (of this thread) and adds it to the history
 
-        :param str tag_string: The key for the new entry
+        :param str tag_string: The name of the span
         :return: None
         """
-        prev_time = self._tag_dict[tag_string]["time"]
-        prev_memory = self._tag_dict[tag_string]["memory"]
-        curr_time, curr_memory = time_mem_stamp()
-        diff_time = curr_time - prev_time
-        diff_memory = curr_memory - prev_memory
-        # log.debug("end_tag: %s with time %s and memory %s", tag_string, curr_time, curr_memory)
+        end_counter = time.perf_counter()
+        _, curr_memory = time_mem_stamp()
+        stack = self._stack()
+        index = max(i for i, span in enumerate(stack) if span["tag"] == tag_string)  # the innermost span with this tag
+        span = stack.pop(index)
+        traced_peak = _max_peak(span["traced_peak"], self._traced_peak())
+        if stack:
+            # the peak of a span counts towards the peak of the span it is nested in
+            stack[-1]["traced_peak"] = _max_peak(stack[-1]["traced_peak"], traced_peak)
+            self._reset_traced_peak()
+
         metric_dict = {
             "datetime": datetime.now(),
             "operation": tag_string,
-            "time_to_run_sec": diff_time.total_seconds(),
-            "memory_gain_MB": diff_memory,
+            "time_to_run_sec": end_counter - span["counter"],
+            "memory_gain_MB": curr_memory - span["memory"],
             "end_memory_MB": curr_memory,
+            "span_id": span["span_id"],
+            "parent_id": span["parent_id"],
+            "depth": span["depth"],
+            "cpu_time_sec": self._cpu_time() - span["cpu"],
+            "tracemalloc_peak_MB": (traced_peak - span["traced_start"]) / convertToMB if traced_peak is not None else None,
+            "attributes": span["attributes"],
+            "start_offset_sec": span["counter"] - self._start_counter,
+            "thread_id": threading.get_ident(),
         }
-        self._metrics_history.append(metric_dict)
-        # log.debug("Removing %s entry from self._tag_dict", tag_string)
-        del self._tag_dict[tag_string]
+        with self._lock:
+            self._metrics_history.append(metric_dict)
+
+    def annotate(self, **attributes):
+        """
+        Add attributes (e.g. the size of the model) to the innermost open span of this thread
+
+        :param attributes: the attributes (json serializable)
+        :return: None
+        """
+        stack = self._stack()
+        if stack:
+            stack[-1]["attributes"].update(attributes)
+
+    @contextmanager
+    def span(self, tag_string):
+        """
+        Track the runtime and memory of a block of code (with hist_mgr.span("Creating constraints"): ...)
+
+        :param str tag_string: the name of the span
+        :return: a context manager
+        """
+        self.start_tag(tag_string)
+        try:
+            yield
+        finally:
+            self.end_tag(tag_string)
+
+    @contextmanager
+    def traced_methods(self, obj, operations):
+        """
+        Track the calls of methods of an object (e.g. the stages of a pyomo solver) as spans, while in the context
+
+        :param obj: the object
+        :param dict operations: name of the method -> name of the span
+        :return: a context manager
+        """
+        for method_name, operation in operations.items():
+            method = getattr(obj, method_name)
+            setattr(obj, method_name, self._traced_call(method, operation))
+        try:
+            yield
+        finally:
+            for method_name in operations:
+                delattr(obj, method_name)  # the method of the class is used again
 
     def get_history(self):
         """
 
-        :return: A list of dict entries
+        :return: A list of dict entries, one per span in the order they started (see HISTORY_COLUMNS)
         """
         log.debug("Returning self._metrics_history")
-        return self._metrics_history
+        with self._lock:
+            return sorted(self._metrics_history, key=lambda h: h["span_id"])
+
+    def get_chrome_trace(self):
+        """
+        Get the history as a Chrome trace (the "Trace Event Format")
+
+        :return dict trace: the trace, with one complete ("X") event per span
+        """
+        pid = os.getpid()
+        events = []
+        for h in self.get_history():
+            args = {k: h[k] for k in ("memory_gain_MB", "end_memory_MB", "cpu_time_sec", "tracemalloc_peak_MB")}
+            args.update(h["attributes"])
+            events.append(
+                {
+                    "name": h["operation"],
+                    "cat": "dm3k",
+                    "ph": "X",
+                    "ts": round(h["start_offset_sec"] * 1e6),
+                    "dur": round(h["time_to_run_sec"] * 1e6),
+                    "pid": pid,
+                    "tid": h["thread_id"],
+                    "args": args,
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, filename):
+        """
+        Write the history as a Chrome trace json file
+
+        :param str filename: path of the file
+        :return: None
+        """
+        with open(filename, "w") as f:
+            json.dump(self.get_chrome_trace(), f)
+
+    def _traced_call(self, method, operation):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            with self.span(operation):
+                return method(*args, **kwargs)
+
+        return wrapper
+
+    def _stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    @staticmethod
+    def _cpu_time():
+        # the children are the solver processes that were waited for
+        times = os.times()
+        return times.user + times.system + times.children_user + times.children_system
+
+    @staticmethod
+    def _traced_peak():
+        return tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else None
+
+    @staticmethod
+    def _reset_traced_peak():
+        """
+        :return int traced: the memory traced by tracemalloc now (None if it is not tracing or the peak cannot be reset)
+        """
+        # reset_peak is new in python 3.9...without it, the peak of a span cannot be told apart from earlier peaks
+        if not tracemalloc.is_tracing() or not hasattr(tracemalloc, "reset_peak"):
+            return None
+        tracemalloc.reset_peak()
+        return tracemalloc.get_traced_memory()[0]
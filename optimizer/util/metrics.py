@@ -0,0 +1,256 @@
+"""
+An always-on registry of metrics (counters, gauges and histograms), aggregated across processes and exposed in the
+Prometheus text format.
+
+Each process (e.g. each uwsgi worker) keeps its own values in memory and flushes them to a json file of its own (named by
+its pid) in a directory shared by all processes.  Collecting merges the files of all processes...
+    - counters and histograms are summed over all files, including the files of processes that have exited, so the totals
+      never go down when a worker is restarted
+    - gauges are summed over the files of the processes that are still running
+"""
+
+import json
+import logging
+import math
+import os
+import tempfile
+import threading
+
+import psutil
+
+log = logging.getLogger(__name__)
+
+COUNTER = "counter"
+GAUGE = "gauge"
+HISTOGRAM = "histogram"
+
+# upper bounds of histogram buckets (an implicit +Inf bucket is always added)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+SIZE_BUCKETS = (10, 100, 1000, 10000, 100000, 1000000, 10000000)
+MEMORY_MB_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class MetricsRegistry:
+    def __init__(self, metrics_dir=None):
+        """
+        Create a metrics registry
+
+        :param str metrics_dir: directory for the files of the processes (must be shared by all processes).  By default (None)
+                                metrics are not shared, only the values of this process are collected
+        """
+        self._metrics_dir = metrics_dir
+        self._metrics = {}  # name -> {"type", "help", "buckets"}
+        self._values = {}  # name -> {label tuple -> value (or [bucket counts..., sum, count] for a histogram)}
+        self._lock = threading.Lock()
+        self._dirty = False
+
+        if self._metrics_dir and not os.path.exists(self._metrics_dir):
+            os.makedirs(self._metrics_dir, exist_ok=True)
+
+    def counter(self, name, help_text):
+        self._register(name, COUNTER, help_text)
+
+    def gauge(self, name, help_text):
+        self._register(name, GAUGE, help_text)
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self._register(name, HISTOGRAM, help_text, sorted(buckets))
+
+    def _register(self, name, metric_type, help_text, buckets=None):
+        with self._lock:
+            self._metrics[name] = {"type": metric_type, "help": help_text, "buckets": buckets}
+            self._values.setdefault(name, {})
+
+    def inc(self, name, amount=1, labels=None):
+        """
+        Add to a counter or gauge
+
+        :param str name: name of a registered counter or gauge
+        :param float amount: amount to add (may be negative for a gauge)
+        :param dict labels: label name -> label value
+        """
+        key = _label_key(labels)
+        with self._lock:
+            values = self._values[name]
+            values[key] = values.get(key, 0) + amount
+            self._dirty = True
+
+    def set(self, name, value, labels=None):
+        """
+        Set a gauge
+
+        :param str name: name of a registered gauge
+        :param float value: the new value
+        :param dict labels: label name -> label value
+        """
+        with self._lock:
+            self._values[name][_label_key(labels)] = value
+            self._dirty = True
+
+    def observe(self, name, value, labels=None):
+        """
+        Add an observation to a histogram
+
+        :param str name: name of a registered histogram
+        :param float value: the observed value
+        :param dict labels: label name -> label value
+        """
+        buckets = self._metrics[name]["buckets"]
+        key = _label_key(labels)
+        with self._lock:
+            counts = self._values[name].setdefault(key, [0] * (len(buckets) + 3))
+            for i, upper_bound in enumerate(buckets):
+                if value <= upper_bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[len(buckets)] += 1
+            counts[-2] += value
+            counts[-1] += 1
+            self._dirty = True
+
+    def flush(self):
+        """
+        Write the values of this process to its file, if they changed since the last flush
+
+        :return: None
+        """
+        if not self._metrics_dir or not self._dirty:
+            return
+
+        with self._lock:
+            data = {"pid": os.getpid(), "values": self._dump_values()}
+            self._dirty = False
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self._metrics_dir, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self._process_path(data["pid"]))
+        except (OSError, TypeError, ValueError) as e:
+            log.warning("Unable to write metrics: %s", e)
+
+    def collect(self):
+        """
+        Merge the values of all processes
+
+        :return dict values: name -> {label tuple -> value (or [bucket counts..., sum, count] for a histogram)}
+        """
+        self.flush()
+        with self._lock:
+            own_values = self._dump_values()
+
+        process_values = {os.getpid(): own_values}
+        if self._metrics_dir:
+            for file_name in os.listdir(self._metrics_dir):
+                if not file_name.endswith(".json"):
+                    continue
+                try:
+                    with open(os.path.join(self._metrics_dir, file_name)) as f:
+                        data = json.load(f)
+                except (OSError, ValueError):
+                    continue  # a partly written or removed file
+                process_values.setdefault(data["pid"], data["values"])
+
+        merged = {name: {} for name in self._metrics}
+        for pid, values in process_values.items():
+            alive = pid == os.getpid() or psutil.pid_exists(pid)
+            for name, entries in values.items():
+                if name not in self._metrics or (self._metrics[name]["type"] == GAUGE and not alive):
+                    continue
+                for labels, value in entries:
+                    key = _label_key(labels)
+                    if isinstance(value, list):
+                        old = merged[name].get(key) or [0] * len(value)
+                        merged[name][key] = [a + b for a, b in zip(old, value)]
+                    else:
+                        merged[name][key] = merged[name].get(key, 0) + value
+        return merged
+
+    def render(self, extra_gauges=None):
+        """
+        Render the merged values of all processes in the Prometheus text format
+
+        :param dict extra_gauges: name -> (help text, value) of gauges that are measured at collection time (not registered)
+        :return str text: the metrics in the Prometheus text format (version 0.0.4)
+        """
+        merged = self.collect()
+        lines = []
+        for name in sorted(self._metrics):
+            metric = self._metrics[name]
+            lines.append("# HELP {} {}".format(name, metric["help"]))
+            lines.append("# TYPE {} {}".format(name, metric["type"]))
+            for key in sorted(merged[name]):
+                value = merged[name][key]
+                if metric["type"] != HISTOGRAM:
+                    lines.append("{}{} {}".format(name, _label_text(key), _number_text(value)))
+                    continue
+
+                cumulative = 0
+                for upper_bound, count in zip(list(metric["buckets"]) + [math.inf], value[:-2]):
+                    cumulative += count
+                    bucket_key = key + (("le", _number_text(upper_bound)),)
+                    lines.append("{}_bucket{} {}".format(name, _label_text(bucket_key), _number_text(cumulative)))
+                lines.append("{}_sum{} {}".format(name, _label_text(key), _number_text(value[-2])))
+                lines.append("{}_count{} {}".format(name, _label_text(key), _number_text(value[-1])))
+
+        for name, (help_text, value) in sorted((extra_gauges or {}).items()):
+            lines.append("# HELP {} {}".format(name, help_text))
+            lines.append("# TYPE {} {}".format(name, GAUGE))
+            lines.append("{} {}".format(name, _number_text(value)))
+
+        return "\n".join(lines) + "\n"
+
+    def _dump_values(self):
+        # json can not hold tuple keys, so each metric is a list of [labels, value] pairs
+        return {name: [[dict(key), value] for key, value in entries.items()] for name, entries in self._values.items()}
+
+    def _process_path(self, pid):
+        return os.path.join(self._metrics_dir, "{}.json".format(pid))
+
+
+def count_solver_processes(solver_name="glpsol"):
+    """
+    :param str solver_name: the name of the solver executable
+    :return int count: the number of running solver processes (of any worker or batch pool on this host)
+    """
+    count = 0
+    for proc in psutil.process_iter(["name"]):
+        if proc.info["name"] == solver_name:
+            count += 1
+    return count
+
+
+def latency_summary(seconds, quantiles=(50, 90, 95, 99)):
+    """
+    Summarize latencies measured by a client (e.g. a replay or a load test), with exact percentiles (nearest rank)
+
+    :param list seconds: the latencies
+    :param tuple quantiles: the percentiles to report
+    :return dict summary: "count", "mean", "max" and "p<q>" of each percentile (None if there are no latencies)
+    """
+    values = sorted(seconds)
+    summary = {"count": len(values), "mean": sum(values) / len(values) if values else None, "max": values[-1] if values else None}
+    for q in quantiles:
+        summary["p{}".format(q)] = values[max(0, math.ceil(q / 100 * len(values)) - 1)] if values else None
+    return summary
+
+
+def _label_key(labels):
+    return tuple(sorted((str(k), str(v)) for k, v in (labels or {}).items()))
+
+
+def _label_text(key):
+    if not key:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in key)
+    return "{" + ",".join('{}="{}"'.format(k, v) for (k, _), v in zip(key, escaped)) + "}"
+
+
+def _number_text(value):
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
@@ -0,0 +1,96 @@
+"""
+Statistics of the size and structure of a built pyomo model, so a slow solve can be told apart as a large model or a hard one.
+
+The statistics are gathered in one pass over the variables and the active constraints (without pprint), cheap enough to be
+computed for every solve.
+"""
+
+import logging
+import math
+
+from pyomo.core import Constraint, Objective, Var
+from pyomo.core.expr.visitor import identify_variables
+from pyomo.repn import generate_standard_repn
+
+log = logging.getLogger(__name__)
+
+
+def model_statistics(model):
+    """
+    Count the variables, the rows of each constraint family and the nonzeros of a model, and find the ranges of its coefficients
+
+    :param model: the built pyomo model (ConcreteModel)
+    :return dict stats: with the keys...
+        "variables": counts of "binary", "integer", "continuous" and "fixed" variables and their "total"
+        "constraints": "rows" per constraint family (the name of the Constraint component) and their "total"
+        "nonzeros": the number of nonzero coefficients of the constraints
+        "objective_nonzeros": the number of nonzero coefficients of the active objectives
+        "coefficient_range": [smallest, largest] absolute nonzero coefficient of the constraints (None if there are none)
+        "rhs_range": [smallest, largest] absolute nonzero bound (right hand side) of the constraints (None if there are none)
+    """
+    variables = {"binary": 0, "integer": 0, "continuous": 0, "fixed": 0}
+    for var in model.component_data_objects(Var, descend_into=True):
+        if var.is_fixed():
+            variables["fixed"] += 1
+        elif var.is_binary():
+            variables["binary"] += 1
+        elif var.is_integer():
+            variables["integer"] += 1
+        else:
+            variables["continuous"] += 1
+    variables["total"] = sum(variables.values())
+
+    rows = {}
+    nonzeros = 0
+    coefficient_range = _Range()
+    rhs_range = _Range()
+    for con in model.component_data_objects(Constraint, active=True, descend_into=True):
+        family = con.parent_component().local_name
+        rows[family] = rows.get(family, 0) + 1
+        nonzeros += _count_nonzeros(con.body, coefficient_range)
+        for bound in (con.lb, con.ub):
+            if bound is not None:
+                rhs_range.add(bound)
+
+    objective_nonzeros = 0
+    for obj in model.component_data_objects(Objective, active=True, descend_into=True):
+        objective_nonzeros += _count_nonzeros(obj.expr)
+
+    return {
+        "variables": variables,
+        "constraints": {"rows": rows, "total": sum(rows.values())},
+        "nonzeros": nonzeros,
+        "objective_nonzeros": objective_nonzeros,
+        "coefficient_range": coefficient_range.to_list(),
+        "rhs_range": rhs_range.to_list(),
+    }
+
+
+def _count_nonzeros(expr, coefficient_range=None):
+    repn = generate_standard_repn(expr, compute_values=True, quadratic=False)
+    if not repn.is_linear():
+        # the models are linear...count the variables of anything else without its coefficients
+        return len(list(identify_variables(expr, include_fixed=False)))
+
+    count = 0
+    for coef in repn.linear_coefs:
+        if coef:
+            count += 1
+            if coefficient_range is not None:
+                coefficient_range.add(coef)
+    return count
+
+
+class _Range:
+    def __init__(self):
+        self.smallest = math.inf
+        self.largest = 0
+
+    def add(self, value):
+        value = abs(value)
+        if value:
+            self.smallest = min(self.smallest, value)
+            self.largest = max(self.largest, value)
+
+    def to_list(self):
+        return [self.smallest, self.largest] if self.largest else None
@@ -0,0 +1,99 @@
+"""
+Preload and warm up the optimizers in a parent process (e.g. the uwsgi master) before worker processes are forked from it.
+
+The heavy modules (pyomo, pandas) are only imported when they are first needed, so a process that just validates inputs or
+answers /api/version never pays for them.  A server that solves problems should pay for them once, in the master, so every
+forked worker shares those pages copy-on-write instead of importing (and warming up) everything on its own...
+    - import the optimizers (with pyomo and pandas)
+    - probe which solvers are available
+    - solve a tiny problem with each optimizer, which loads the rest of pyomo (solver plugins, problem writers) and runs the
+      solver once
+    - freeze the objects created so far (gc.freeze), so the garbage collector of a worker does not write to the shared pages
+"""
+
+import gc
+import logging
+import time
+
+log = logging.getLogger(__name__)
+
+
+def preload_modules():
+    """
+    Import the optimizers and the heavy modules they use
+
+    :return list names: names of the optimizers
+    """
+    import pandas  # noqa: F401  (imported lazily by the optimizers)
+
+    from optimizer.slim_optimizer_main import algorithm_dict
+
+    return list(algorithm_dict.keys())
+
+
+def probe_solvers(solver_names=("glpk",)):
+    """
+    Check which solvers can be run
+
+    :param list solver_names: names of the pyomo solvers to check
+    :return dict available: solver name -> True if the solver executable was found
+    """
+    from pyomo.opt import SolverFactory
+
+    available = {}
+    for name in solver_names:
+        available[name] = bool(SolverFactory(name).available(exception_flag=False))
+        if not available[name]:
+            log.warning("Solver %s is not available...problems can be validated but not solved", name)
+    return available
+
+
+def warm_up(input_dict, optimizer_name=None, solver="glpk"):
+    """
+    Ingest, build and solve a (tiny) problem
+
+    :param dict input_dict: the viz data of the problem (see /docs/api_devGuide.md)
+    :param str optimizer_name: name of opt algorithm (see slim_optimizer_main.algorithm_dict)
+    :param str solver: name of the solver
+    :return: None
+    """
+    from optimizer.slim_optimizer_main import create_opt
+
+    opt, _ = create_opt(input_dict, optimizer_name)
+    opt.build()
+    opt.solve(solver=solver, retries=1)
+    opt.get_results()
+
+
+def preload(warm_up_inputs=(), solver="glpk"):
+    """
+    Preload the optimizers and warm them up (see the module docstring).  Failures are logged, they never stop the server.
+
+    :param list warm_up_inputs: list of (optimizer name, input dict) of tiny problems to solve
+    :param str solver: name of the solver to probe and warm up
+    :return dict timings: seconds taken by each step ("import_sec", "probe_sec", "warm_up_sec") and the "solvers" that are available
+    """
+    timings = {}
+
+    start = time.time()
+    preload_modules()
+    timings["import_sec"] = time.time() - start
+
+    start = time.time()
+    timings["solvers"] = probe_solvers([solver])
+    timings["probe_sec"] = time.time() - start
+
+    start = time.time()
+    if timings["solvers"][solver]:
+        for optimizer_name, input_dict in warm_up_inputs:
+            try:
+                warm_up(input_dict, optimizer_name, solver)
+            except Exception as e:
+                log.warning("Warm up of %s failed: %s", optimizer_name, e)
+    timings["warm_up_sec"] = time.time() - start
+
+    gc.collect()
+    gc.freeze()
+
+    log.info("Preloaded optimizers: %s", timings)
+    return timings
@@ -0,0 +1,325 @@
+"""
+Generate synthetic problems in the viz format (see KnapsackInputViz and FullHouseInputViz) at a controllable scale and shape,
+for benchmarks (see tests/benchmarks/solve_benchmark.py) and tests that need more than the small files in /examples.
+
+The problems are deterministic for a seed.  The budgets are set from the costs of the activities a resource can be
+allocated to, so a tightness of 0.5 means about half of the cost that could be allocated to a resource fits in its budget.
+"""
+
+import logging
+import random
+
+log = logging.getLogger(__name__)
+
+ALLOCATION_TYPES = ("ALL", "explicit")
+
+
+def generate_knapsack_problem(
+    resource_classes=1,
+    activity_classes_per_resource=2,
+    resources_per_class=5,
+    activities_per_class=20,
+    budgets_per_class=1,
+    allocation="ALL",
+    explicit_fanout=3,
+    contains_depth=0,
+    contains_fanout=2,
+    if_not_density=0.0,
+    if_then_density=0.0,
+    tightness=0.5,
+    max_cost=10,
+    max_reward=10,
+    seed=0,
+):
+    """
+    Generate a knapsack problem (for KnapsackViz).  Each resource class can be allocated to its own activity classes...
+
+    :param int resource_classes: the number of resource classes
+    :param int activity_classes_per_resource: the number of activity classes each resource class can be allocated to
+    :param int resources_per_class: the number of instances of each resource class
+    :param int activities_per_class: the number of instances of each activity class
+    :param int budgets_per_class: the number of budgets of each resource class (each activity costs all of them)
+    :param str allocation: "ALL" = one ALL-to-ALL row per allocation, "explicit" = one row per resource-activity arc
+    :param int explicit_fanout: the number of resources that can be allocated to each activity (if allocation="explicit")
+    :param int contains_depth: the number of levels of (not allocated) container activity classes above each activity class,
+                               the containers are rewarded when all the activities they contain are picked (a contained reward)
+    :param int contains_fanout: the number of instances of the level below that each container instance contains
+    :param float if_not_density: the fraction (0 to 1) of the pairs of activity classes of a resource class with an IF-NOT
+                                 constraint (a resource instance cannot be allocated to both classes)...needs allocation="ALL"
+    :param float if_then_density: the fraction (0 to 1) of the resource classes with a Contained IF-THEN constraint...each
+                                  resource contains parts that can only be allocated to the tasks of an activity it is
+                                  allocated to
+    :param float tightness: the fraction of the cost that could be allocated to a resource that fits in its budget
+    :param int max_cost: the costs are random integers from 1 to max_cost
+    :param int max_reward: the rewards are random integers from 1 to max_reward
+    :param int seed: the seed of the random costs and rewards
+    :return dict input_dict: the viz input ({"datasetName": ..., "files": [{"fileName": ..., "fileContents": {...}}]})
+    :raises ValueError: if the shape is not valid
+    """
+    _check_shape(allocation, if_not_density=if_not_density, if_then_density=if_then_density)
+    if if_not_density and allocation != "ALL":
+        # the knapsack model pairs a resource with every activity of the other class of an IF-NOT
+        raise ValueError("IF-NOT constraints need ALL allocations")
+    rng = random.Random(seed)
+    budget_names = ["Budget{}".format(b) for b in range(budgets_per_class)]
+    viz = _empty_viz()
+
+    for r in range(resource_classes):
+        r_class = "Resource{}".format(r)
+        a_classes = ["Activity{}_{}".format(r, k) for k in range(activity_classes_per_resource)]
+
+        activities = {}
+        for a_class in a_classes:
+            activities[a_class] = _add_activities(viz, rng, a_class, activities_per_class, budget_names, max_cost, max_reward)
+
+        per_resource_cost = sum(_cost_sum(a, budget_names) for a in activities.values()) / max(1, resources_per_class)
+        if allocation == "explicit":
+            per_resource_cost *= min(explicit_fanout, resources_per_class) / max(1, resources_per_class)
+        budget = {b: max(max_cost, round(tightness * per_resource_cost / len(budget_names))) for b in budget_names}
+        resources = _add_resources(viz, r_class, resources_per_class, budget, a_classes)
+        for a_class in a_classes:
+            _add_allocation(viz, r_class, a_class, resources, activities[a_class], allocation, explicit_fanout)
+
+        # IF-NOT between the first pairs of activity classes
+        pairs = [(a_classes[i], a_classes[j]) for i in range(len(a_classes)) for j in range(i + 1, len(a_classes))]
+        for start_class, end_class in pairs[: round(if_not_density * len(pairs))]:
+            viz["allocationConstraints"].append(_allocation_constraint(r_class, start_class, r_class, end_class, "IF-NOT"))
+
+        # Contained IF-THEN on the first resource classes
+        if r < round(if_then_density * resource_classes):
+            part_class = r_class + "_Part"
+            task_class = a_classes[0] + "_Task"
+            parts = _add_resources(viz, part_class, resources_per_class * contains_fanout, budget, [task_class])
+            tasks = _add_activities(viz, rng, task_class, activities_per_class * contains_fanout, budget_names, max_cost, max_reward)
+            _add_contains(viz, "resource", r_class, part_class, resources, parts)
+            _add_contains(viz, "activity", a_classes[0], task_class, [a["instanceName"] for a in activities[a_classes[0]]], tasks)
+            _add_allocation(viz, part_class, task_class, parts, tasks, allocation, explicit_fanout)
+            viz["allocationConstraints"].append(_allocation_constraint(r_class, a_classes[0], part_class, task_class, "Contained IF-THEN"))
+
+        # levels of containers above each activity class
+        for a_class in a_classes:
+            children = [a["instanceName"] for a in activities[a_class]]
+            child_class = a_class
+            for level in range(contains_depth):
+                container_class = "{}_Container{}".format(a_class, level)
+                num_containers = max(1, -(-len(children) // contains_fanout))
+                containers = _add_activities(viz, rng, container_class, num_containers, [], max_cost, max_reward)
+                _add_contains(viz, "activity", container_class, child_class, [c["instanceName"] for c in containers], children)
+                children = [c["instanceName"] for c in containers]
+                child_class = container_class
+
+    name = "synthetic_knapsack_{}x{}".format(resources_per_class, activities_per_class)
+    return _input_dict(name, viz)
+
+
+def generate_full_house_problem(
+    containers=2,
+    parent_resources_per_container=1,
+    child_resources_per_container=2,
+    parent_activities=5,
+    children_per_parent=3,
+    allocation="ALL",
+    explicit_fanout=2,
+    tightness=0.5,
+    max_cost=3,
+    max_reward=10,
+    seed=0,
+):
+    """
+    Generate a full house problem (for FullHouseViz).  The full house has exactly one level of contains (containers of
+    parent and child resources, parent activities of child activities), one budget per resource and one Contained
+    IF-THEN constraint, so only the numbers of instances and the allocations can be shaped.
+
+    :param int containers: the number of containers (of parent and child resources)
+    :param int parent_resources_per_container: the number of parent resources in each container
+    :param int child_resources_per_container: the number of child resources in each container
+    :param int parent_activities: the number of parent activities
+    :param int children_per_parent: the number of child activities of each parent activity
+    :param str allocation: "ALL" = one ALL-to-ALL row per allocation, "explicit" = one row per resource-activity arc
+    :param int explicit_fanout: the number of resources that can be allocated to each activity (if allocation="explicit")
+    :param float tightness: the fraction of the cost that could be allocated to a resource that fits in its budget
+    :param int max_cost: the costs of the child activities are random integers from 1 to max_cost
+    :param int max_reward: the rewards of the child activities are random integers from 1 to max_reward
+    :param int seed: the seed of the random costs and rewards
+    :return dict input_dict: the viz input ({"datasetName": ..., "files": [{"fileName": ..., "fileContents": {...}}]})
+        :raises ValueError: if the shape is not valid
+    """
+    _check_shape(allocation)
+    rng = random.Random(seed)
+    viz = _empty_viz()
+    viz["resourceClasses"].append(_resource_class("Container", [], [], contains=["Parent", "Child"]))
+
+    # the parent activities only cost a slot of a parent resource...the rewards are of the child activities
+    parents = _add_activities(viz, rng, "ParentActivity", parent_activities, ["Slots"], 1, 0, contains=["ChildActivity"])
+    children = _add_activities(viz, rng, "ChildActivity", parent_activities * children_per_parent, ["Shots"], max_cost, max_reward)
+
+    num_parents = containers * parent_resources_per_container
+    num_children = containers * child_resources_per_container
+    parent_budget = max(1, round(tightness * parent_activities / max(1, num_parents)))
+    child_budget = max(max_cost, round(tightness * _cost_sum(children, ["Shots"]) / max(1, num_children)))
+    parent_resources = _add_resources(viz, "Parent", num_parents, {"Slots": parent_budget}, ["ParentActivity"])
+    child_resources = _add_resources(viz, "Child", num_children, {"Shots": child_budget}, ["ChildActivity"])
+    container_names = _add_resources(viz, "Container", containers, {}, [], add_class=False)
+
+    _add_contains(viz, "resource", "Container", "Parent", container_names, parent_resources)
+    _add_contains(viz, "resource", "Container", "Child", container_names, child_resources)
+    _add_contains(viz, "activity", "ParentActivity", "ChildActivity", [p["instanceName"] for p in parents], children)
+    _add_allocation(viz, "Parent", "ParentActivity", parent_resources, parents, allocation, explicit_fanout)
+    _add_allocation(viz, "Child", "ChildActivity", child_resources, children, allocation, explicit_fanout)
+    viz["allocationConstraints"].append(_allocation_constraint("Parent", "ParentActivity", "Child", "ChildActivity", "Contained IF-THEN"))
+
+    name = "synthetic_full_house_{}x{}".format(containers, parent_activities)
+    return _input_dict(name, viz)
+
+
+# name of the problem -> the generator, the name of its optimizer, and the numbers of instances that are multiplied by a scale
+PROBLEMS = {
+    "knapsack": {
+        "generate": generate_knapsack_problem,
+        "optimizer": "KnapsackViz",
+        "scale_keys": ("resources_per_class", "activities_per_class"),
+    },
+    "full_house": {
+        "generate": generate_full_house_problem,
+        "optimizer": "FullHouseViz",
+        "scale_keys": ("containers", "parent_activities"),
+    },
+}
+
+
+def generate_problem(problem, scale=1, **shape):
+    """
+    Generate a problem of a scale...the numbers of instances (see "scale_keys" of PROBLEMS) are multiplied by the scale
+
+    :param str problem: the name of the problem (a key of PROBLEMS)
+    :param float scale: the multiplier of the numbers of instances
+    :param shape: the keyword arguments of the generator (see generate_knapsack_problem and generate_full_house_problem)
+    :return dict input_dict: the viz input
+    :raises ValueError: if the problem is not found or the shape is not valid
+    """
+    if problem not in PROBLEMS:
+        raise ValueError("Problem named: {} not found...the following problems are available {}".format(problem, list(PROBLEMS)))
+    generate = PROBLEMS[problem]["generate"]
+    for key in PROBLEMS[problem]["scale_keys"]:
+        default = generate.__defaults__[generate.__code__.co_varnames.index(key)]
+        shape[key] = max(1, round(shape.get(key, default) * scale))
+    return generate(**shape)
+
+
+def _check_shape(allocation, **densities):
+    if allocation not in ALLOCATION_TYPES:
+        raise ValueError("allocation must be one of {}, not {!r}".format(ALLOCATION_TYPES, allocation))
+    for name, density in densities.items():
+        if not 0 <= density <= 1:
+            raise ValueError("{} must be between 0 and 1, not {!r}".format(name, density))
+
+
+def _empty_viz():
+    return {
+        "resourceClasses": [],
+        "activityClasses": [],
+        "resourceInstances": [],
+        "activityInstances": [],
+        "allocationInstances": [],
+        "containsInstances": [],
+        "allocationConstraints": [],
+    }
+
+
+def _input_dict(name, viz):
+    return {"datasetName": name, "files": [{"fileName": name + ".json", "fileContents": viz}]}
+
+
+def _resource_class(class_name, budget_names, allocated_to, contains=()):
+    return {
+        "className": class_name,
+        "locX": 0,
+        "locY": 0,
+        "typeName": "resource",
+        "budgets": list(budget_names),
+        "containsClasses": list(contains),
+        "canBeAllocatedToClasses": list(allocated_to),
+    }
+
+
+def _add_resources(viz, class_name, count, budget, allocated_to, add_class=True):
+    """
+    :return list names: the names of the instances
+    """
+    if add_class:
+        viz["resourceClasses"].append(_resource_class(class_name, budget, allocated_to))
+    names = ["{}_Resource_instance_{}".format(class_name, i) for i in range(count)]
+    viz["resourceInstances"].append(
+        {"className": class_name, "instanceTable": [{"instanceName": n, "budget": dict(budget)} for n in names]}
+    )
+    return names
+
+
+def _add_activities(viz, rng, class_name, count, cost_names, max_cost, max_reward, contains=()):
+    """
+    :return list instances: the rows of the instance table
+    """
+    viz["activityClasses"].append(
+        {
+            "className": class_name,
+            "locX": 0,
+            "locY": 0,
+            "typeName": "activity",
+            "rewards": ["value"],
+            "costs": list(cost_names),
+            "containsClasses": list(contains),
+            "allocatedWhen": {},
+        }
+    )
+    instances = [
+        {
+            "instanceName": "{}_Activity_instance_{}".format(class_name, i),
+            "cost": {c: rng.randint(1, max_cost) for c in cost_names},
+            "reward": rng.randint(1, max_reward) if max_reward else 0,
+        }
+        for i in range(count)
+    ]
+    viz["activityInstances"].append({"className": class_name, "instanceTable": instances})
+    return instances
+
+
+def _cost_sum(activities, cost_names):
+    return sum(a["cost"].get(c, 0) for a in activities for c in cost_names)
+
+
+def _add_allocation(viz, r_class, a_class, resources, activities, allocation, explicit_fanout):
+    if allocation == "ALL":
+        table = [{"resourceInstanceName": "ALL", "activityInstanceName": "ALL"}]
+    else:
+        # each activity can be allocated to the next explicit_fanout resources (round robin)
+        fanout = min(explicit_fanout, len(resources))
+        table = [
+            {"resourceInstanceName": resources[(i + k) % len(resources)], "activityInstanceName": a["instanceName"]}
+            for i, a in enumerate(activities)
+            for k in range(fanout)
+        ]
+    viz["allocationInstances"].append({"resourceClassName": r_class, "activityClassName": a_class, "instanceTable": table})
+
+
+def _add_contains(viz, parent_type, parent_class, child_class, parents, children):
+    """
+    The children are split evenly (in order) among the parents
+    """
+    for c_class in viz[parent_type + "Classes"]:
+        if c_class["className"] == parent_class and child_class not in c_class["containsClasses"]:
+            c_class["containsClasses"].append(child_class)
+    children = [c["instanceName"] if isinstance(c, dict) else c for c in children]
+    table = [
+        {"parentInstanceName": parents[i * len(parents) // len(children)], "childInstanceName": child} for i, child in enumerate(children)
+    ]
+    viz["containsInstances"].append(
+        {"parentClassName": parent_class, "childClassName": child_class, "parentType": parent_type, "instanceTable": table}
+    )
+
+
+def _allocation_constraint(start_r_class, start_a_class, end_r_class, end_a_class, constraint_type):
+    return {
+        "allocationStart": {"resourceClass": start_r_class, "activityClass": start_a_class},
+        "allocationEnd": {"resourceClass": end_r_class, "activityClass": end_a_class},
+        "allocationConstraintType": constraint_type,
+    }
@@ -0,0 +1,267 @@
+"""
+On-demand profiling of a solve, to find out locally why a request was slow in production.
+
+A profile capture (see ProfileCapture) is turned on around the ingest, build, solve and output of an optimizer (see
+OptimizerBase.set_profile).  While it is on...
+    - cProfile profiles the functions called by the thread (saved as pstats, for python -m pstats or snakeviz)
+    - a sampler records the stack of the thread every few milliseconds (saved as collapsed stacks, one "frame;frame;... count"
+      line per stack, for flamegraph.pl or speedscope)
+    - tracemalloc traces the memory allocated by python, from the first step until the capture is saved (saved as a snapshot,
+      for tracemalloc.Snapshot.load)
+
+The artifacts of each capture are saved in a directory of their own (named by the id of the profile) of a ProfileStore,
+which keeps only the latest profiles.  A capture without a directory is off and costs nothing.
+"""
+
+import contextlib
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import re
+import shutil
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from datetime import datetime
+
+from optimizer.util.util import convertToMB
+
+log = logging.getLogger(__name__)
+
+PSTATS_FILE = "profile.pstats"
+COLLAPSED_FILE = "profile.collapsed"
+TRACEMALLOC_FILE = "tracemalloc.snapshot"
+SUMMARY_FILE = "summary.json"
+PROFILE_FILES = (PSTATS_FILE, COLLAPSED_FILE, TRACEMALLOC_FILE, SUMMARY_FILE)
+
+PROFILE_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+# the number of functions and allocations in the summary
+SUMMARY_TOP = 20
+
+
+class ProfileCapture:
+    def __init__(self, profile_dir=None, sample_interval_sec=0.005, tracemalloc_frames=10):
+        """
+        Create a capture of the profile of one solve
+
+        :param str profile_dir: the directory of the artifacts (created by save).  By default (None) the capture is off, so
+                                code can always turn it on
+        :param float sample_interval_sec: the time between two samples of the stack
+        :param int tracemalloc_frames: the number of frames of the traceback of each allocation (if tracemalloc is started by
+                                       the capture)
+        """
+        self._profile_dir = profile_dir
+        self._sample_interval_sec = sample_interval_sec
+        self._tracemalloc_frames = tracemalloc_frames
+
+        self._depth = 0
+        self._profiler = None
+        self._sampler = None
+        self._started_tracemalloc = False
+        self._profiled_sec = 0.0
+        self._start_counter = None
+        self._handle = None
+
+    @property
+    def enabled(self):
+        return self._profile_dir is not None
+
+    @property
+    def profile_id(self):
+        return os.path.basename(self._profile_dir) if self.enabled else None
+
+    def active(self):
+        """
+        Profile a block of code (with capture.active(): ...)...a block nested in another block is part of its profile
+
+        :return: a context manager
+        """
+        if not self.enabled:
+            return contextlib.nullcontext()
+        return self._active()
+
+    @contextlib.contextmanager
+    def _active(self):
+        self._depth += 1
+        if self._depth == 1:
+            self._start()
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            if self._depth == 0:
+                self._stop()
+
+    def save(self):
+        """
+        Save the artifacts of the capture in its directory, and stop tracemalloc if the capture started it...a capture is saved
+        once, later calls return the same handle
+
+        :return dict handle: the "profile_id" and the names of the "files" of the profile (None if the capture is off)
+        """
+        if not self.enabled or self._handle is not None:
+            return self._handle
+        if self._depth:
+            raise RuntimeError("A profile cannot be saved while it is active")
+
+        os.makedirs(self._profile_dir, exist_ok=True)
+        summary = {"profile_id": self.profile_id, "created": datetime.now().isoformat(), "profiled_sec": self._profiled_sec}
+        files = []
+
+        if self._profiler is not None:
+            self._profiler.dump_stats(self._path(PSTATS_FILE))
+            summary["top_functions"] = self._top_functions()
+            files.append(PSTATS_FILE)
+
+        if self._sampler is not None:
+            with open(self._path(COLLAPSED_FILE), "w") as f:
+                for stack, count in self._sampler.stacks.most_common():
+                    f.write("{} {}\n".format(";".join(stack), count))
+            summary["samples"] = sum(self._sampler.stacks.values())
+            files.append(COLLAPSED_FILE)
+
+        if self._started_tracemalloc:
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+            snapshot.dump(self._path(TRACEMALLOC_FILE))
+            summary["top_allocations"] = [
+                {"traceback": str(stat.traceback), "size_MB": stat.size / convertToMB, "count": stat.count}
+                for stat in snapshot.statistics("lineno")[:SUMMARY_TOP]
+            ]
+            files.append(TRACEMALLOC_FILE)
+
+        files.append(SUMMARY_FILE)
+        summary["files"] = files
+        with open(self._path(SUMMARY_FILE), "w") as f:
+            json.dump(summary, f, indent=2)
+        log.info("Saved profile %s", self.profile_id)
+        self._handle = {"profile_id": self.profile_id, "files": files}
+        return self._handle
+
+    def _start(self):
+        self._start_counter = time.perf_counter()
+        if not tracemalloc.is_tracing():
+            # if tracemalloc was started by someone else (e.g. PYTHONTRACEMALLOC=1), its traces are left alone
+            tracemalloc.start(self._tracemalloc_frames)
+            self._started_tracemalloc = True
+        if self._sampler is None:
+            self._sampler = _StackSampler(threading.get_ident(), self._sample_interval_sec)
+        self._sampler.start()
+        if self._profiler is None:
+            self._profiler = cProfile.Profile()
+        self._profiler.enable()
+
+    def _stop(self):
+        self._profiler.disable()
+        self._sampler.stop()
+        self._profiled_sec += time.perf_counter() - self._start_counter
+
+    def _path(self, file_name):
+        return os.path.join(self._profile_dir, file_name)
+
+    def _top_functions(self):
+        stats = pstats.Stats(self._profiler, stream=io.StringIO())
+        top = []
+        for func, (_, calls, total_sec, cumulative_sec, _) in sorted(stats.stats.items(), key=lambda s: -s[1][3])[:SUMMARY_TOP]:
+            file_name, line, name = func
+            top.append(
+                {
+                    "function": "{} ({}:{})".format(name, os.path.basename(file_name), line),
+                    "calls": calls,
+                    "total_sec": total_sec,
+                    "cumulative_sec": cumulative_sec,
+                }
+            )
+        return top
+
+
+class _StackSampler:
+    """
+    Counts the stacks of a thread, sampled by a thread of its own while it is started
+    """
+
+    def __init__(self, thread_id, interval_sec):
+        self.stacks = Counter()
+        self._thread_id = thread_id
+        self._interval_sec = interval_sec
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="dm3k-profile-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop_event.wait(self._interval_sec):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                return
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append("{} ({}:{})".format(code.co_name, os.path.basename(code.co_filename), code.co_firstlineno))
+                frame = frame.f_back
+            self.stacks[tuple(reversed(stack))] += 1
+
+
+class ProfileStore:
+    def __init__(self, profile_dir, max_profiles=20):
+        """
+        Create a store of the profiles of solves
+
+        :param str profile_dir: directory of the profiles (must be shared by all processes that serve them)
+        :param int max_profiles: the oldest profiles are removed when there are more than this
+        """
+        self._profile_dir = profile_dir
+        self._max_profiles = max_profiles
+
+        if not os.path.exists(self._profile_dir):
+            os.makedirs(self._profile_dir, exist_ok=True)
+
+    def capture(self, **kwargs):
+        """
+        Start a capture with a new profile id...the oldest profiles are removed to make room for it
+
+        :param kwargs: see ProfileCapture
+        :return ProfileCapture capture: the capture (call its save method when the solve is done)
+        """
+        self._evict(self._max_profiles - 1)
+        return ProfileCapture(os.path.join(self._profile_dir, uuid.uuid4().hex), **kwargs)
+
+    def path(self, profile_id, file_name):
+        """
+        :param str profile_id: the id of the profile
+        :param str file_name: one of PROFILE_FILES
+        :return str path: the path of the file of the profile (None if it does not exist)
+        :raises ValueError: if the profile id or the file name is not valid
+        """
+        if not isinstance(profile_id, str) or not PROFILE_ID_PATTERN.match(profile_id):
+            raise ValueError("Invalid profile id: {}".format(profile_id))
+        if file_name not in PROFILE_FILES:
+            raise ValueError("Invalid profile file: {}...the files are {}".format(file_name, list(PROFILE_FILES)))
+        path = os.path.join(self._profile_dir, profile_id, file_name)
+        return path if os.path.exists(path) else None
+
+    def _evict(self, keep):
+        profiles = []
+        for name in os.listdir(self._profile_dir):
+            path = os.path.join(self._profile_dir, name)
+            try:
+                profiles.append((os.stat(path).st_mtime, path))
+            except FileNotFoundError:
+                continue  # removed by another process
+        for _, path in sorted(profiles)[: max(0, len(profiles) - keep)]:
+            shutil.rmtree(path, ignore_errors=True)
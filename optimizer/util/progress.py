@@ -0,0 +1,223 @@
+"""
+Progress of long solves, so a client can follow a solve while it runs.
+
+The request that solves a problem writes progress events to a file of its own (named by a progress id that the client
+picks), in a directory shared by all processes, so any uwsgi worker can follow it...
+    - start: the solve was received (with the pid of the process that solves it)
+    - phase: the solve moved to a new phase (ingest, waiting, build, write, solve, output)
+    - incumbent: the solver found a better solution or bound (objective, bound, gap)
+    - done: the request ended (statusCode, reason)
+
+Each event is one json line with the "event" name and the seconds since the start ("elapsed_sec").
+
+A running solve can be cancelled from any worker (see cancel)...it creates the cancel file of the solve, and the
+cancellation token of the solve (see optimizer.util.cancel) sees it at its next check.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+import psutil
+
+from optimizer.util.util import remove_old_temp_files
+
+log = logging.getLogger(__name__)
+
+START = "start"
+PHASE = "phase"
+INCUMBENT = "incumbent"
+DONE = "done"
+
+PROGRESS_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-][A-Za-z0-9_.-]{0,63}$")
+
+
+class ProgressReporter:
+    def __init__(self, path=None):
+        """
+        Create a reporter of the progress of one solve
+
+        :param str path: the progress file.  By default (None) events are dropped, so code can always report progress
+        """
+        self._path = path
+        self._start_time = time.time()
+        self._lock = threading.Lock()
+        self._last_incumbent = None
+
+    @property
+    def enabled(self):
+        return self._path is not None
+
+    def emit(self, event, **data):
+        """
+        Append an event to the progress file
+
+        :param str event: name of the event (START, PHASE, INCUMBENT or DONE)
+        :param data: the attributes of the event
+        :return: None
+        """
+        if self._path is None:
+            return
+        data = dict(data, event=event, elapsed_sec=round(time.time() - self._start_time, 3))
+        line = json.dumps(data) + "\n"
+        with self._lock:
+            try:
+                with open(self._path, "a") as f:
+                    f.write(line)
+            except OSError as e:
+                log.warning("Unable to write progress: %s", e)
+
+    def phase(self, name):
+        self.emit(PHASE, phase=name)
+
+    def incumbent(self, objective, bound=None, gap=None):
+        """
+        Report the best solution (and bound) of the solver, if it changed since the last report
+
+        :param float objective: objective value of the best solution found so far (None = no solution yet)
+        :param float bound: best bound of the objective
+        :param float gap: relative gap between the objective and the bound (e.g. 0.05 = 5%)
+        :return: None
+        """
+        incumbent = (objective, bound, gap)
+        if incumbent == self._last_incumbent:
+            return
+        self._last_incumbent = incumbent
+        self.emit(INCUMBENT, objective=objective, bound=bound, gap=gap)
+
+    def done(self, status_code, reason=None):
+        self.emit(DONE, statusCode=status_code, reason=reason)
+
+
+class ProgressBoard:
+    def __init__(self, progress_dir, max_age_sec=3600):
+        """
+        Create a board of the progress files of all solves
+
+        :param str progress_dir: directory for the progress files (must be shared by all processes)
+        :param float max_age_sec: progress files older than this are removed
+        """
+        self._progress_dir = progress_dir
+        self._max_age_sec = max_age_sec
+
+        if not os.path.exists(self._progress_dir):
+            os.makedirs(self._progress_dir, exist_ok=True)
+
+    def reporter(self, progress_id):
+        """
+        Start reporting the progress of a solve...an earlier progress file with the same id is replaced
+
+        :param str progress_id: the id picked by the client (letters, digits, "_", "-" and ".", at most 64 characters)
+        :return ProgressReporter reporter: the reporter of the solve
+        :raises ValueError: if the progress id is not valid
+        """
+        path = self._progress_path(progress_id)
+        remove_old_temp_files(self._progress_dir, seconds=self._max_age_sec)
+
+        for stale_path in (path, self.cancel_path(progress_id)):
+            if os.path.exists(stale_path):
+                os.remove(stale_path)
+        reporter = ProgressReporter(path)
+        reporter.emit(START, pid=os.getpid())
+        return reporter
+
+    def cancel_path(self, progress_id):
+        """
+        :param str progress_id: the id of the solve
+        :return str path: the cancel file of the solve (see optimizer.util.cancel.CancellationToken)
+        :raises ValueError: if the progress id is not valid
+        """
+        return self._progress_path(progress_id)[: -len(".jsonl")] + ".cancel"
+
+    def cancel(self, progress_id):
+        """
+        Cancel a running solve
+
+        :param str progress_id: the id of the solve
+        :return bool cancelled: False if there is no running solve with this id (it never started or it is done)
+        :raises ValueError: if the progress id is not valid
+        """
+        path = self._progress_path(progress_id)
+        try:
+            with open(path) as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            return False
+        if lines and json.loads(lines[-1])["event"] == DONE:
+            return False
+
+        with open(self.cancel_path(progress_id), "w") as f:
+            f.write(str(time.time()))
+        return True
+
+    def follow(self, progress_id, last_event_id=-1, wait_sec=60, poll_interval_sec=0.5, keepalive_sec=15):
+        """
+        Follow the progress of a solve until it is done
+
+        :param str progress_id: the id of the solve
+        :param int last_event_id: skip the events up to this id (the id of the last event a reconnecting client received)
+        :param float wait_sec: max time to wait for the solve to start
+        :param float poll_interval_sec: how often the progress file is checked for new events
+        :param float keepalive_sec: yield None when there were no events for this long (so the client knows the
+                                    connection is alive)
+        :return: a generator of (event id, event dict) tuples (or None for a keep alive).  It ends after the done event.  If
+                 the solve never starts, or the process solving it dies, it ends with a done event with statusCode 404 or 500
+        :raises ValueError: if the progress id is not valid
+        """
+        path = self._progress_path(progress_id)
+        return self._follow(path, last_event_id, wait_sec, poll_interval_sec, keepalive_sec)
+
+    def _follow(self, path, last_event_id, wait_sec, poll_interval_sec, keepalive_sec):
+        start_time = time.time()
+        while not os.path.exists(path):
+            if time.time() - start_time >= wait_sec:
+                yield last_event_id + 1, {"event": DONE, "statusCode": 404, "reason": "No solve with this progress id"}
+                return
+            time.sleep(poll_interval_sec)
+
+        event_id = -1
+        pid = None
+        position = 0
+        partial = ""
+        last_yield_time = time.time()
+        while True:
+            try:
+                with open(path) as f:
+                    f.seek(position)
+                    data = f.read()
+                    position = f.tell()
+            except FileNotFoundError:
+                # replaced by a new solve with the same id
+                position, partial, event_id = 0, "", -1
+                time.sleep(poll_interval_sec)
+                continue
+
+            lines = (partial + data).split("\n")
+            partial = lines.pop()  # a line that is still being written
+            for line in lines:
+                if not line:
+                    continue
+                event_id += 1
+                event = json.loads(line)
+                pid = event.get("pid", pid)
+                if event_id > last_event_id:
+                    yield event_id, event
+                    last_yield_time = time.time()
+                if event["event"] == DONE:
+                    return
+
+            if pid is not None and not psutil.pid_exists(pid):
+                yield event_id + 1, {"event": DONE, "statusCode": 500, "reason": "The process solving the problem stopped"}
+                return
+            if time.time() - last_yield_time >= keepalive_sec:
+                yield None
+                last_yield_time = time.time()
+            time.sleep(poll_interval_sec)
+
+    def _progress_path(self, progress_id):
+        if not isinstance(progress_id, str) or not PROGRESS_ID_PATTERN.match(progress_id):
+            raise ValueError("Invalid progress id: {}".format(progress_id))
+        return os.path.join(self._progress_dir, progress_id + ".jsonl")
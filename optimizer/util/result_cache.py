@@ -0,0 +1,234 @@
+"""
+A content-addressed cache of optimizer results.
+
+Results are keyed by a canonical hash of the solver-relevant parts of a problem (see problem_key), so the same problem
+posted twice (e.g. by different users of a shared dataset or after the UI only moved a class on the canvas) is solved once.
+
+The cache has two tiers...
+    - an in-process LRU tier (fast, but private to each uwsgi worker)
+    - a shared on-disk tier (a directory of json files that all uwsgi workers can read and write)
+
+Both tiers evict the oldest entries once their byte size limit is reached and drop entries older than the TTL.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+log = logging.getLogger(__name__)
+
+# fields of the viz input that only support the UI and do not change the solution
+UI_ONLY_FIELDS = ("locX", "locY", "loc")
+
+
+def canonical_contents(file_contents):
+    """
+    Return a copy of the viz fileContents with all UI-only fields removed
+
+    :param file_contents: the viz input (input_dict["files"][0]["fileContents"]) or any part of it
+    :return: the same structure without the UI_ONLY_FIELDS keys
+    """
+    if isinstance(file_contents, dict):
+        return {k: canonical_contents(v) for k, v in file_contents.items() if k not in UI_ONLY_FIELDS}
+    if isinstance(file_contents, list):
+        return [canonical_contents(v) for v in file_contents]
+    return file_contents
+
+
+def problem_key(input_dict, optimizer_name=None, solver_options=None):
+    """
+    Create a canonical hash of a problem.  Two problems with the same key have the same solution.
+
+    :param dict input_dict: the viz input (see /docs/api_devGuide.md)
+    :param str optimizer_name: name of opt algorithm; see optimizer.slim_optimizer_main.algorithm_dict
+    :param dict solver_options: any options passed to the solver (e.g. mipgap) that change the solution
+    :return str key: a sha256 hex digest
+    """
+    files = input_dict.get("files", [])
+    contents = [canonical_contents(f.get("fileContents")) for f in files if isinstance(f, dict)]
+    canonical = {"optimizer": optimizer_name or "default", "solver_options": solver_options or {}, "files": contents}
+    encoded = json.dumps(canonical, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, cache_dir=None, max_memory_bytes=64 * 2 ** 20, max_disk_bytes=1024 * 2 ** 20, ttl_sec=3600):
+        """
+        Create a result cache
+
+        :param str cache_dir: directory of the shared on-disk tier (None = no disk tier)
+        :param int max_memory_bytes: byte size limit of the in-process tier
+        :param int max_disk_bytes: byte size limit of the on-disk tier
+        :param float ttl_sec: time (seconds) that an entry stays valid
+        """
+        self._cache_dir = cache_dir
+        self._max_memory_bytes = max_memory_bytes
+        self._max_disk_bytes = max_disk_bytes
+        self._ttl_sec = ttl_sec
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # key -> (time stored, encoded result)
+        self._memory_bytes = 0
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "puts": 0, "memory_evictions": 0, "disk_evictions": 0}
+
+        if self._cache_dir and not os.path.exists(self._cache_dir):
+            os.makedirs(self._cache_dir, exist_ok=True)
+
+    def get(self, key):
+        """
+        Find the result of a problem
+
+        :param str key: the problem key (see problem_key)
+        :return dict result: the cached result, None if it is not in the cache (or is expired)
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                stored, encoded = entry
+                if now - stored <= self._ttl_sec:
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return json.loads(encoded)
+                self._remove_from_memory(key)
+
+        encoded = self._read_disk(key, now)
+        with self._lock:
+            if encoded is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["disk_hits"] += 1
+            self._add_to_memory(key, encoded, now)
+        return json.loads(encoded)
+
+    def put(self, key, result):
+        """
+        Store the result of a problem in both tiers
+
+        :param str key: the problem key (see problem_key)
+        :param dict result: the result (must be json serializable)
+        :return: None
+        """
+        try:
+            encoded = json.dumps(result, separators=(",", ":")).encode("utf-8")
+        except (TypeError, ValueError) as e:
+            log.warning("Result for %s cannot be cached: %s", key, e)
+            return
+
+        now = time.time()
+        with self._lock:
+            self._stats["puts"] += 1
+            self._add_to_memory(key, encoded, now)
+        self._write_disk(key, encoded)
+
+    def get_stats(self):
+        """
+        :return dict stats: hit/miss counters and the current size of the in-process tier
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+            stats["memory_bytes"] = self._memory_bytes
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
+
+    def clear(self):
+        """
+        Remove all entries from both tiers
+
+        :return: None
+        """
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+        for path, _, _ in self._list_disk():
+            self._remove_file(path)
+
+    # --- in-process tier (callers must hold self._lock) ---
+    def _add_to_memory(self, key, encoded, now):
+        if len(encoded) > self._max_memory_bytes:
+            return
+        self._remove_from_memory(key)
+        self._memory[key] = (now, encoded)
+        self._memory_bytes += len(encoded)
+        while self._memory_bytes > self._max_memory_bytes:
+            oldest_key = next(iter(self._memory))
+            self._remove_from_memory(oldest_key)
+            self._stats["memory_evictions"] += 1
+
+    def _remove_from_memory(self, key):
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._memory_bytes -= len(entry[1])
+
+    # --- on-disk tier ---
+    def _disk_path(self, key):
+        return os.path.join(self._cache_dir, key + ".json")
+
+    def _read_disk(self, key, now):
+        if not self._cache_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            if now - os.path.getmtime(path) > self._ttl_sec:
+                self._remove_file(path)
+                return None
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_disk(self, key, encoded):
+        if not self._cache_dir or len(encoded) > self._max_disk_bytes:
+            return
+        try:
+            # write to a temp file and rename, so other processes never read a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=self._cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(encoded)
+            os.replace(tmp_path, self._disk_path(key))
+        except OSError as e:
+            log.warning("Unable to write result cache file for %s: %s", key, e)
+            return
+        self._evict_disk()
+
+    def _list_disk(self):
+        entries = []
+        if not self._cache_dir:
+            return entries
+        for name in os.listdir(self._cache_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self._cache_dir, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue  # removed by another process
+            entries.append((path, st.st_mtime, st.st_size))
+        return entries
+
+    def _evict_disk(self):
+        now = time.time()
+        entries = self._list_disk()
+        total_bytes = sum(size for _, _, size in entries)
+        # oldest first
+        for path, mtime, size in sorted(entries, key=lambda e: e[1]):
+            if now - mtime <= self._ttl_sec and total_bytes <= self._max_disk_bytes:
+                break
+            self._remove_file(path)
+            total_bytes -= size
+            with self._lock:
+                self._stats["disk_evictions"] += 1
+
+    @staticmethod
+    def _remove_file(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass  # another process got to it first
@@ -0,0 +1,251 @@
+"""
+What-if scenarios: variants of a base problem described by a list of compact deltas.
+
+A delta is a dict with an "op" and the arguments of the op...
+    - {"op": "budget", "resource": R, "budget": B, "value": V}      set (or "factor": F scale, or "add": A add to) the budget B
+                                                                    of resource R (B is optional = all budgets)
+    - {"op": "cost", "activity": A, "budget": B, "factor": F}       change the cost of activity A (same value/factor/add options)
+    - {"op": "reward", "activity": A, "value": V}                   change the reward of activity A (same value/factor/add options)
+    - {"op": "removeResource", "resource": R}                       remove resource instance(s) R and the rows that refer to them
+    - {"op": "removeActivity", "activity": A}                       remove activity instance(s) A and the rows that refer to them
+    - {"op": "addResource", "className": C, "instance": {...}}      add a resource instance (an instanceTable row) to class C
+    - {"op": "addActivity", "className": C, "instance": {...}}      add an activity instance (an instanceTable row) to class C
+    - {"op": "addAllocation", "resourceClassName": RC, "activityClassName": AC,
+       "resourceInstanceName": R, "activityInstanceName": A}        add an allocation row
+    - {"op": "removeAllocation", ...same keys as addAllocation...}  remove the matching allocation rows
+    - {"op": "forceActivity", "activity": A, "picked": true}        force activity instance A to be picked (or not picked)
+
+R and A are an instance name, a class name (= all instances of the class) or "ALL".
+
+All ops except forceActivity change the viz input.  forceActivity is applied to the built model (see
+ModelBase.force_activities).  Each scenario is warm started from the solution of the base problem.
+"""
+
+import copy
+import logging
+
+from optimizer.slim_output_base import ALLOC_KEY, VALUE_KEY
+from optimizer.util.batch import solve_batch, solve_item
+
+log = logging.getLogger(__name__)
+
+
+def _file_contents(input_dict):
+    files = input_dict.get("files") or []
+    if not files or not isinstance(files[0], dict) or "fileContents" not in files[0]:
+        raise ValueError("The base problem has no fileContents")
+    return files[0]["fileContents"]
+
+
+def _select_instances(instance_groups, target, kind):
+    """
+    :param list instance_groups: resourceInstances or activityInstances of the viz input
+    :param str target: an instance name, a class name or "ALL"
+    :param str kind: "resource" or "activity" (for error messages)
+    :return list instances: the instanceTable rows that match the target
+    """
+    selected = []
+    for group in instance_groups:
+        for instance in group.get("instanceTable", []):
+            if target in ("ALL", group.get("className"), instance.get("instanceName")):
+                selected.append(instance)
+    if not selected:
+        raise ValueError("No {} instance or class named {}".format(kind, target))
+    return selected
+
+
+def _new_value(old_value, delta):
+    if "value" in delta:
+        return delta["value"]
+    if "factor" in delta:
+        return old_value * delta["factor"]
+    if "add" in delta:
+        return old_value + delta["add"]
+    raise ValueError("Delta {} needs a value, factor or add".format(delta.get("op")))
+
+
+def _change_amounts(instances, amounts_key, budget_name, delta):
+    changed = 0
+    for instance in instances:
+        amounts = instance.setdefault(amounts_key, {})
+        names = [budget_name] if budget_name is not None else list(amounts.keys())
+        for name in names:
+            if name in amounts or "value" in delta:
+                amounts[name] = _new_value(amounts.get(name, 0), delta)
+                changed += 1
+    if changed == 0:
+        raise ValueError("No {} named {} to change".format(amounts_key, budget_name))
+
+
+def _remove_instances(contents, instances_key, target, kind):
+    names = {i["instanceName"] for i in _select_instances(contents[instances_key], target, kind)}
+    for group in contents[instances_key]:
+        group["instanceTable"] = [i for i in group.get("instanceTable", []) if i.get("instanceName") not in names]
+
+    name_key = kind + "InstanceName"
+    for group in contents.get("allocationInstances", []):
+        group["instanceTable"] = [row for row in group.get("instanceTable", []) if row.get(name_key) not in names]
+    for group in contents.get("containsInstances", []):
+        group["instanceTable"] = [
+            row
+            for row in group.get("instanceTable", [])
+            if row.get("parentInstanceName") not in names and row.get("childInstanceName") not in names
+        ]
+
+
+def _add_instance(contents, instances_key, delta):
+    for group in contents[instances_key]:
+        if group.get("className") == delta.get("className"):
+            group.setdefault("instanceTable", []).append(copy.deepcopy(delta["instance"]))
+            return
+    raise ValueError("No class named {} in {}".format(delta.get("className"), instances_key))
+
+
+ALLOCATION_ROW_KEYS = ("resourceInstanceName", "activityInstanceName")
+
+
+def _change_allocation(contents, delta, add):
+    class_pair = (delta.get("resourceClassName"), delta.get("activityClassName"))
+    for group in contents.get("allocationInstances", []):
+        if (group.get("resourceClassName"), group.get("activityClassName")) == class_pair:
+            row = {k: delta.get(k, "ALL") for k in ALLOCATION_ROW_KEYS}
+            if add:
+                group.setdefault("instanceTable", []).append(row)
+            else:
+                group["instanceTable"] = [r for r in group.get("instanceTable", []) if {k: r.get(k) for k in ALLOCATION_ROW_KEYS} != row]
+            return
+
+    if not add:
+        raise ValueError("No allocations from {} to {}".format(delta.get("resourceClassName"), delta.get("activityClassName")))
+    contents.setdefault("allocationInstances", []).append(
+        {
+            "resourceClassName": delta.get("resourceClassName"),
+            "activityClassName": delta.get("activityClassName"),
+            "instanceTable": [{k: delta.get(k, "ALL") for k in ALLOCATION_ROW_KEYS}],
+        }
+    )
+
+
+def apply_deltas(input_dict, deltas):
+    """
+    Apply what-if deltas to a viz input
+
+    :param dict input_dict: the base viz input (see /docs/api_devGuide.md)...it is not changed
+    :param list deltas: list of delta dicts (see the module docstring)
+    :return tuple: the changed copy of the viz input and the dict of forced activities (activity name -> picked)
+    :raises ValueError: if a delta is not valid for the input
+    """
+    input_dict = copy.deepcopy(input_dict)
+    contents = _file_contents(input_dict)
+    forced_activities = {}
+
+    for delta in deltas:
+        op = delta.get("op")
+        if op == "budget":
+            instances = _select_instances(contents["resourceInstances"], delta.get("resource", "ALL"), "resource")
+            _change_amounts(instances, "budget", delta.get("budget"), delta)
+        elif op == "cost":
+            instances = _select_instances(contents["activityInstances"], delta.get("activity", "ALL"), "activity")
+            _change_amounts(instances, "cost", delta.get("budget"), delta)
+        elif op == "reward":
+            for instance in _select_instances(contents["activityInstances"], delta.get("activity", "ALL"), "activity"):
+                instance["reward"] = _new_value(instance.get("reward", 0), delta)
+        elif op == "removeResource":
+            _remove_instances(contents, "resourceInstances", delta.get("resource"), "resource")
+        elif op == "removeActivity":
+            _remove_instances(contents, "activityInstances", delta.get("activity"), "activity")
+        elif op == "addResource":
+            _add_instance(contents, "resourceInstances", delta)
+        elif op == "addActivity":
+            _add_instance(contents, "activityInstances", delta)
+        elif op in ("addAllocation", "removeAllocation"):
+            _change_allocation(contents, delta, add=op == "addAllocation")
+        elif op == "forceActivity":
+            for instance in _select_instances(contents["activityInstances"], delta.get("activity"), "activity"):
+                forced_activities[instance["instanceName"]] = bool(delta.get("picked", True))
+        else:
+            raise ValueError("Unknown delta op: {}".format(op))
+
+    return input_dict, forced_activities
+
+
+def diff_results(base_result, result):
+    """
+    Compare the result of a scenario with the result of the base problem
+
+    :param dict base_result: result of the base problem (see OutputBase.result)
+    :param dict result: result of the scenario
+    :return dict diff: the change of the objective value and the allocations that were added and removed (per resource)
+    """
+    base_allocations = base_result.get(ALLOC_KEY, {})
+    allocations = result.get(ALLOC_KEY, {})
+
+    added = {}
+    removed = {}
+    for res_name in set(base_allocations) | set(allocations):
+        base_acts = set(base_allocations.get(res_name, []))
+        acts = set(allocations.get(res_name, []))
+        if acts - base_acts:
+            added[res_name] = sorted(acts - base_acts)
+        if base_acts - acts:
+            removed[res_name] = sorted(base_acts - acts)
+
+    return {
+        "objective_value_change": (result.get(VALUE_KEY) or 0) - (base_result.get(VALUE_KEY) or 0),
+        "added_allocations": added,
+        "removed_allocations": removed,
+    }
+
+
+def solve_scenarios(
+    base_input, scenarios, max_workers=None, base_result=None, solve_kwargs=None, cancel_token=None, base_solve_kwargs=None
+):
+    """
+    Solve the base problem and then all scenarios in a process pool, each warm started from the base solution
+
+    :param dict base_input: the base viz input (with "algorithm")
+    :param list scenarios: list of {"name": <str>, "deltas": <list of deltas>}
+    :param int max_workers: number of worker processes (None = number of cores)
+    :param dict base_result: the result of the base problem, if it is already known (e.g. cached)
+    :param dict solve_kwargs: keyword arguments for OptimizerBase.solve of every scenario
+    :param CancellationToken cancel_token: the token of the base problem and all scenarios (see optimizer.util.cancel)
+    :param dict base_solve_kwargs: keyword arguments for OptimizerBase.solve of the base problem (e.g. heuristic mode)
+    :return: a generator of (index, response) tuples...first ("base", response of the base problem), then one per scenario
+             (in the order they complete) with the "name" of the scenario and a "diff" against the base result
+    """
+    if base_result is None:
+        base_response = solve_item(base_input, base_solve_kwargs, cancel_token)
+        if base_response["statusCode"] != 200:
+            yield "base", base_response
+            return
+        base_result = base_response["body"]
+    else:
+        base_response = {"body": base_result, "reason": "OK", "statusCode": 200, "history": []}
+    yield "base", base_response
+
+    warm_start = {ALLOC_KEY: base_result.get(ALLOC_KEY, {}), "allocated_amt": base_result.get("allocated_amt", {})}
+
+    items = []
+    item_kwargs = []
+    item_index = []
+    for index, scenario in enumerate(scenarios):
+        name = scenario.get("name", str(index))
+        try:
+            input_dict, forced_activities = apply_deltas(base_input, scenario.get("deltas", []))
+        except (ValueError, KeyError, TypeError) as e:
+            yield index, {"name": name, "body": [str(e)], "reason": "Invalid scenario deltas", "statusCode": 400}
+            continue
+
+        kwargs = dict(solve_kwargs or {}, warm_start=warm_start)
+        if forced_activities:
+            kwargs["forced_activities"] = forced_activities
+        items.append(input_dict)
+        item_kwargs.append(kwargs)
+        item_index.append((index, name))
+
+    for i, response in solve_batch(items, max_workers=max_workers, solve_kwargs=item_kwargs, cancel_token=cancel_token):
+        index, name = item_index[i]
+        response["name"] = name
+        if response["statusCode"] == 200:
+            response["diff"] = diff_results(base_result, response["body"])
+        yield index, response
@@ -0,0 +1,198 @@
+"""
+Single-flight coalescing of identical solves across processes.
+
+When several requests for the same problem arrive at the same time (possibly in different uwsgi workers), only the
+first one (the leader) solves it.  The others (followers) wait for the leader and receive the same result.
+
+Coordination uses a lock file per problem key (fcntl.flock) and a result file written by the leader...
+    - the operating system releases the lock when the leader process dies, so followers never wait on a dead leader
+    - if the leader fails (or dies) without writing a result, the first follower to get the lock becomes the new leader
+    - a leader can keep its result to itself (e.g. a solve stopped by its time limit)...its followers then go on as if it failed
+    - followers stop waiting after a timeout and solve the problem themselves, or when their request is cancelled
+    - result files are removed after their ttl, and so are lock files that are not locked...a process that locks a lock file
+      after it was removed locks the new lock file of its key instead
+"""
+
+import fcntl
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    def __init__(self, lock_dir, wait_timeout_sec=600, poll_interval_sec=0.1, result_ttl_sec=60):
+        """
+        Create a single-flight coordinator
+
+        :param str lock_dir: directory for the lock and result files (must be shared by all processes)
+        :param float wait_timeout_sec: max time a follower waits for the leader before solving on its own
+        :param float poll_interval_sec: how often a follower checks if the leader is done
+        :param float result_ttl_sec: how long the result of a leader is kept for followers
+        """
+        self._lock_dir = lock_dir
+        self._wait_timeout_sec = wait_timeout_sec
+        self._poll_interval_sec = poll_interval_sec
+        self._result_ttl_sec = result_ttl_sec
+
+        self._stats_lock = threading.Lock()
+        self._stats = {"leaders": 0, "coalesced": 0, "timeouts": 0}
+        self._in_flight = 0
+
+        if not os.path.exists(self._lock_dir):
+            os.makedirs(self._lock_dir, exist_ok=True)
+
+    def run(self, key, solve_fn, share=None, cancel_token=None):
+        """
+        Run solve_fn, unless a solve of the same key is already in flight, in which case wait for its result.
+
+        :param str key: the problem key (see optimizer.util.result_cache.problem_key)
+        :param solve_fn: a function without arguments that solves the problem and returns a json serializable result
+        :param share: a function of the result of solve_fn...False = the result is not handed to the followers (e.g. a solve
+                      that was stopped by its time limit), so they solve the problem themselves.  By default every result is.
+        :param CancellationToken cancel_token: the token of the request (see optimizer.util.cancel)...it is checked on every
+                                               poll, so a follower that is cancelled (or whose deadline passes) stops waiting
+        :return: the result of solve_fn (from this call or from the leader's call)
+        :raises Cancelled: if the token was cancelled while waiting (DeadlineExceeded if the time ran out)
+        """
+        self._remove_old_results()
+
+        fd = os.open(self._lock_path(key), os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            waited = False
+            start_time = time.time()
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    waited = True
+                    if cancel_token is not None:
+                        cancel_token.check("waiting for an identical solve in flight")
+                    if time.time() - start_time > self._wait_timeout_sec:
+                        log.warning("Timed out waiting for solve of %s...solving without waiting", key)
+                        self._count("timeouts")
+                        return solve_fn()
+                    time.sleep(self._poll_interval_sec)
+                    continue
+                if self._is_lock_file(fd, key):
+                    break
+                # the lock file was removed (see _remove_old_results) before it was locked...lock the lock file of the key
+                new_fd = os.open(self._lock_path(key), os.O_CREAT | os.O_RDWR, 0o644)
+                fcntl.flock(fd, fcntl.LOCK_UN)
+                os.close(fd)
+                fd = new_fd
+
+            if waited:
+                result = self._read_result(key)
+                if result is not None:
+                    log.info("Solve of %s was coalesced with a solve in flight", key)
+                    self._count("coalesced")
+                    return result
+                log.warning("Leader of %s did not leave a result...solving", key)
+
+            # this call is the leader
+            self._count("leaders")
+            with self._stats_lock:
+                self._in_flight += 1
+            try:
+                result = solve_fn()
+            finally:
+                with self._stats_lock:
+                    self._in_flight -= 1
+            if share is None or share(result):
+                self._write_result(key, result)
+            else:
+                self._remove_result(key)  # the followers must not get the result of an earlier leader either
+            return result
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def get_stats(self):
+        """
+        :return dict stats: counters of leaders, coalesced solves, timeouts and the solves in flight (for this process)
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = self._in_flight
+        return stats
+
+    def _count(self, stat_name):
+        with self._stats_lock:
+            self._stats[stat_name] += 1
+
+    def _lock_path(self, key):
+        return os.path.join(self._lock_dir, key + ".lock")
+
+    def _result_path(self, key):
+        return os.path.join(self._lock_dir, key + ".result")
+
+    def _is_lock_file(self, fd, key):
+        """
+        :return bool: True if fd is open on the lock file of the key (and not on a lock file that was removed since)
+        """
+        try:
+            stat = os.stat(self._lock_path(key))
+        except FileNotFoundError:
+            return False
+        fd_stat = os.fstat(fd)
+        return (fd_stat.st_dev, fd_stat.st_ino) == (stat.st_dev, stat.st_ino)
+
+    def _write_result(self, key, result):
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self._lock_dir, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(result, f)
+            os.replace(tmp_path, self._result_path(key))
+        except (OSError, TypeError, ValueError) as e:
+            log.warning("Unable to share result of %s with followers: %s", key, e)
+
+    def _remove_result(self, key):
+        try:
+            os.remove(self._result_path(key))
+        except FileNotFoundError:
+            pass
+
+    def _read_result(self, key):
+        path = self._result_path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self._result_ttl_sec:
+                return None
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _remove_old_results(self):
+        # the result files and the lock files that are not locked (there is a lock file per key ever solved)
+        now = time.time()
+        for name in os.listdir(self._lock_dir):
+            if not name.endswith((".result", ".lock")):
+                continue
+            path = os.path.join(self._lock_dir, name)
+            try:
+                if now - os.path.getmtime(path) <= self._result_ttl_sec:
+                    continue
+                if name.endswith(".result"):
+                    os.remove(path)
+                else:
+                    self._remove_unlocked(path)
+            except FileNotFoundError:
+                pass  # another process got to it first
+
+    def _remove_unlocked(self, path):
+        fd = os.open(path, os.O_RDWR)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return  # a solve in flight
+        try:
+            os.remove(path)
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
@@ -0,0 +1,144 @@
+"""
+Resource usage of the solver processes of a solve (e.g. glpsol)
+
+The history of an optimizer (see optimizer.util.history_pattern) measures the memory of the python process, and the CPU
+time of the solver only once it was waited for.  The solver is usually the largest consumer of memory and CPU of a
+request, so a SolverUsageMonitor samples the solver processes of a solve while they run...
+    - the peak of their resident memory (VmHWM on Linux, which is exact, else the largest sample)
+    - their user and system CPU time and the bytes they read and wrote (as of the last sample, at most one interval before
+      the process exited)
+    - the largest size of each file on their command line (e.g. the LP file, the solution and the log)
+"""
+
+import logging
+import os
+import threading
+
+import psutil
+
+from optimizer.util.util import convertToMB
+
+log = logging.getLogger(__name__)
+
+
+class SolverUsageMonitor:
+    def __init__(self, find_processes, interval_sec=0.1):
+        """
+        Create a monitor of the solver processes of a solve...use it as a context manager (or call start and stop)
+
+        :param find_processes: a function that returns the solver processes (psutil.Process) to sample, e.g.
+                               ModelBase._solver_processes
+        :param float interval_sec: the time between two samples
+        """
+        self._find_processes = find_processes
+        self._interval_sec = interval_sec
+        self._processes = {}  # pid -> usage of the process (see _sample_process)
+        self._samples = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.usage = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="dm3k-solver-usage", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop sampling
+
+        :return dict usage: see summary (also in the usage attribute)
+        """
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+            self._sample()  # the files are still there (and a process may still be running, e.g. when it is stuck)
+            self.usage = self.summary()
+        return self.usage
+
+    def summary(self):
+        """
+        :return dict usage: "processes" (number of solver processes seen), "samples", "interval_sec", "peak_rss_MB" (of the
+                            largest process), "cpu_user_sec", "cpu_system_sec", "io_read_MB", "io_write_MB" (of all
+                            processes, None if the platform does not count them) and "files_MB" (file name -> size)
+        """
+        processes = list(self._processes.values())
+        files = {}
+        for p in processes:
+            for path, size in p["files"].items():
+                files[os.path.basename(path)] = round(size / convertToMB, 3)
+        io_known = bool(processes) and all(p["read_bytes"] is not None for p in processes)
+        return {
+            "processes": len(processes),
+            "samples": self._samples,
+            "interval_sec": self._interval_sec,
+            "peak_rss_MB": round(max(p["peak_rss"] for p in processes) / convertToMB, 3) if processes else None,
+            "cpu_user_sec": round(sum(p["cpu_user"] for p in processes), 3),
+            "cpu_system_sec": round(sum(p["cpu_system"] for p in processes), 3),
+            "io_read_MB": round(sum(p["read_bytes"] for p in processes) / convertToMB, 3) if io_known else None,
+            "io_write_MB": round(sum(p["write_bytes"] for p in processes) / convertToMB, 3) if io_known else None,
+            "files_MB": files,
+        }
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self._sample()
+            self._stop_event.wait(self._interval_sec)
+
+    def _sample(self):
+        self._samples += 1
+        for proc in self._find_processes():
+            try:
+                with proc.oneshot():
+                    self._sample_process(proc)
+            except psutil.Error:
+                continue  # the process exited since it was found
+        for usage in self._processes.values():
+            for path in usage["files"]:
+                try:
+                    usage["files"][path] = max(usage["files"][path], os.path.getsize(path))
+                except OSError:
+                    pass  # removed (e.g. pyomo removes its files unless keepfiles is set)
+
+    def _sample_process(self, proc):
+        usage = self._processes.get(proc.pid)
+        if usage is None:
+            # the files on the command line (e.g. --cpxlp problem.lp --write solution.raw --log solver.log)...not the solver
+            # itself, which is the second argument when it is a script (e.g. /bin/sh glpsol ...)
+            name = proc.name()
+            files = {arg: 0 for arg in proc.cmdline()[1:] if os.path.isfile(arg) and os.path.basename(arg) != name}
+            usage = {"peak_rss": 0, "cpu_user": 0.0, "cpu_system": 0.0, "read_bytes": None, "write_bytes": None, "files": files}
+            self._processes[proc.pid] = usage
+
+        cpu_times = proc.cpu_times()
+        usage["cpu_user"] = cpu_times.user
+        usage["cpu_system"] = cpu_times.system
+        usage["peak_rss"] = max(usage["peak_rss"], _peak_rss(proc))
+        try:
+            io = proc.io_counters()
+        except (AttributeError, NotImplementedError, psutil.AccessDenied):
+            return  # not counted on this platform (e.g. macOS)
+        # the bytes of the read and write calls (read_chars, Linux) include the files in the page cache
+        usage["read_bytes"] = getattr(io, "read_chars", io.read_bytes)
+        usage["write_bytes"] = getattr(io, "write_chars", io.write_bytes)
+
+
+def _peak_rss(proc):
+    """
+    :return int peak_rss: the peak resident memory of the process (bytes)...VmHWM on Linux, else its resident memory now
+    """
+    try:
+        with open("/proc/{}/status".format(proc.pid)) as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024  # kB
+    except (OSError, ValueError, IndexError):
+        pass
+    return proc.memory_info().rss
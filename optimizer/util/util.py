@@ -12,7 +12,7 @@ import psutil
 log = logging.getLogger(__name__)
 
 convertToMB = float(2 ** 20)
-process = psutil.Process()
+_process = None
 
 FULL_HOUSE_FULL_TRACE_KEYS = [
     "allocated",
@@ -81,7 +81,15 @@ def time_mem_stamp():
     :return time_stamp: the current time in as datetime object.
     :return mem_stamp: the current memory amount as
     """
-    return datetime.now(), process.memory_info()[0] / convertToMB
+    return datetime.now(), _current_process().memory_info()[0] / convertToMB
+
+
+def _current_process():
+    # the process is looked up again after a fork (e.g. a uwsgi worker forked from the master that imported this module)
+    global _process
+    if _process is None or _process.pid != os.getpid():
+        _process = psutil.Process()
+    return _process
 
 
 def fh_append(append_dict, key, value, type_resources=None):
@@ -131,3 +139,29 @@ def fh_extend(extend_dict, key, values, type_resources=None):
         if set(values).intersection(set(extend_dict[key][type_resources])):
             log.warning("Adding repeated values to list at key %s", key)
         extend_dict[key][type_resources].extend(values)
+
+
+def count_viz_allocations(viz_data):
+    """
+    Count the instances and the possible allocations (arcs) of viz data in linear time...allocation rows with "ALL" are
+    counted, not expanded
+
+    :param dict viz_data: the "fileContents" of a viz input (see /docs/api_devGuide.md)
+    :return dict num_res: resource class name -> number of instances
+    :return dict num_act: activity class name -> number of instances
+    :return dict pair_arcs: (resource class name, activity class name) -> number of arcs
+    """
+    num_res = {g.get("className"): len(g.get("instanceTable", [])) for g in viz_data.get("resourceInstances", [])}
+    num_act = {g.get("className"): len(g.get("instanceTable", [])) for g in viz_data.get("activityInstances", [])}
+
+    pair_arcs = {}
+    for group in viz_data.get("allocationInstances", []):
+        r_class = group.get("resourceClassName")
+        a_class = group.get("activityClassName")
+        group_arcs = 0
+        for row in group.get("instanceTable", []):
+            n_res = num_res.get(r_class, 0) if row.get("resourceInstanceName") == "ALL" else 1
+            n_act = num_act.get(a_class, 0) if row.get("activityInstanceName") == "ALL" else 1
+            group_arcs += n_res * n_act
+        pair_arcs[(r_class, a_class)] = pair_arcs.get((r_class, a_class), 0) + group_arcs
+    return num_res, num_act, pair_arcs
@@ -0,0 +1,119 @@
+"""
+Cold-start benchmark of the API
+
+Each mode runs in a fresh python process...
+    - lazy: load the app without preloading, then answer the first requests (each worker of uwsgi does this on its own)
+    - preload: load the app with DM3K_PRELOAD=1 (as the uwsgi master does), fork a worker, then answer the first requests
+      in the worker
+
+For each mode it reports the seconds to load the app, the seconds to the first response of each endpoint, and the unique
+memory (USS) of the process that answers the requests...the pages that a forked worker shares with the master are not
+part of its USS.
+
+Usage: python tests/benchmarks/cold_start.py [--repeat N] [--dataset simpleKnapsack] [--algorithm KnapsackViz]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+app_directory = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..")
+api_directory = os.path.join(app_directory, "api")
+
+
+def _first_requests(app, input_dict):
+    """
+    :return dict timings: seconds to the first response of each endpoint
+    """
+    client = app.test_client()
+    timings = {}
+    for name, method, url, body in [
+        ("version_sec", "get", "/api/version", None),
+        ("optimizers_sec", "get", "/api/optimizers", None),
+        ("validate_sec", "post", "/api/vizdata/validate", input_dict),
+        ("solve_sec", "post", "/api/vizdata", dict(input_dict, useCache=False)),
+    ]:
+        start = time.time()
+        response = getattr(client, method)(url, json=body)
+        ok = response.status_code == 200 and (not isinstance(response.json, dict) or response.json.get("statusCode", 200) == 200)
+        timings[name] = round(time.time() - start, 3) if ok else None
+    return timings
+
+
+def _uss_mb():
+    import psutil
+
+    return round(psutil.Process().memory_full_info().uss / 2 ** 20, 1)
+
+
+def run_child(mode, dataset, algorithm):
+    """
+    Run one mode (in a fresh process) and print its timings as json
+    """
+    for name in ("DM3K_CACHE_DIR", "DM3K_SINGLE_FLIGHT_DIR", "DM3K_METRICS_DIR"):
+        os.environ[name] = tempfile.mkdtemp()
+    os.environ["DM3K_PRELOAD"] = "1" if mode == "preload" else "0"
+    os.environ["CLEAR_LOGS"] = ""
+    sys.path.insert(0, api_directory)
+
+    with open(os.path.join(app_directory, "examples", dataset + ".json")) as f:
+        input_dict = json.load(f)
+    input_dict["algorithm"] = algorithm
+
+    start = time.time()
+    from run import app
+
+    result = {"mode": mode, "load_app_sec": round(time.time() - start, 3)}
+
+    if mode == "lazy":
+        result.update(_first_requests(app, input_dict))
+        result["uss_mb"] = _uss_mb()
+        print(json.dumps(result))
+        return
+
+    # a forked worker, as uwsgi forks its workers from the master
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        worker_result = _first_requests(app, input_dict)
+        worker_result["uss_mb"] = _uss_mb()
+        os.write(write_fd, json.dumps(worker_result).encode("utf-8"))
+        os._exit(0)
+
+    os.close(write_fd)
+    with os.fdopen(read_fd) as f:
+        result.update(json.loads(f.read()))
+    os.waitpid(pid, 0)
+    print(json.dumps(result))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=3, help="runs of each mode")
+    parser.add_argument("--dataset", default="simpleKnapsack", help="name of a dataset in /examples")
+    parser.add_argument("--algorithm", default="KnapsackViz", help="name of the optimizer")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.dataset, args.algorithm)
+        return
+
+    columns = ["mode", "load_app_sec", "version_sec", "optimizers_sec", "validate_sec", "solve_sec", "uss_mb"]
+    print("\t".join(columns))
+    for _ in range(args.repeat):
+        for mode in ("lazy", "preload"):
+            command = [sys.executable, __file__, "--child", mode, "--dataset", args.dataset, "--algorithm", args.algorithm]
+            output = subprocess.run(command, cwd=api_directory, capture_output=True, text=True, check=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print("\t".join(str(result.get(c)) for c in columns))
+    print("(None = the request failed, e.g. glpsol is not installed)")
+
+
+if __name__ == "__main__":
+    main()
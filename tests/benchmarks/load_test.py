@@ -0,0 +1,327 @@
+"""
+Load test of POST /api/vizdata, to size the processes and threads of the API (see /api/app.ini)
+
+A mix of problems (datasets of examples/ and synthetic problems of optimizer.util.problem_generator, each with a weight) is
+posted to the API at each load level...
+    - open loop (--rates): requests are sent at a target rate (requests per second) by up to --concurrency clients.  The
+      latency of a request counts from the time it was due to be sent, so a server that falls behind is not hidden by the
+      clients waiting for it (coordinated omission)
+    - closed loop (--concurrency levels without --rates): each client sends its next request as soon as it has an answer
+
+For each level it reports the throughput, the percentiles of the latencies, the error rate (a statusCode other than 200),
+and the saturation of the workers over time...the requests in progress (dm3k_requests_in_progress of /api/metrics) over
+the threads of the server, and the running solver processes.
+
+With --start the API is started here for each --layout (processes x threads) with uwsgi (as in app.ini, but serving http
+directly instead of behind nginx) or with --server flask (one process, a thread per request), so layouts and concurrency
+models are compared on the same hardware.  Without --start the load is sent to --url.
+
+Usage: python tests/benchmarks/load_test.py [--url http://localhost:5000 | --start [--server uwsgi|flask] [--layouts 4x2 2x4]]
+           [--mix '[{"dataset": "simpleKnapsack", "algorithm": "KnapsackViz", "weight": 3}, {"problem": "knapsack", "scale": 2}]']
+           [--rates 1 2 4] [--concurrency 8] [--duration 30] [--sample-sec 1] [--use-cache] [--output results.json]
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+app_directory = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..")
+api_directory = os.path.join(app_directory, "api")
+if app_directory not in sys.path:
+    sys.path.append(app_directory)
+
+from optimizer.util.batch import load_dataset_ref  # noqa: E402
+from optimizer.util.metrics import latency_summary  # noqa: E402
+from optimizer.util.problem_generator import PROBLEMS, generate_problem  # noqa: E402
+
+DEFAULT_MIX = [
+    {"dataset": "simpleKnapsack", "algorithm": "KnapsackViz", "weight": 4},
+    {"dataset": "AlienWorldDomination_wShip", "algorithm": "FullHouseViz", "weight": 2},
+    {"problem": "knapsack", "scale": 2, "weight": 1},
+    {"problem": "full_house", "scale": 2, "weight": 1},
+]
+# the directories of the state of the API that are shared by its workers (a fresh set for each started server)
+STATE_DIRS = (
+    "DM3K_CACHE_DIR",
+    "DM3K_SINGLE_FLIGHT_DIR",
+    "DM3K_METRICS_DIR",
+    "DM3K_PROGRESS_DIR",
+    "DM3K_ADMISSION_DIR",
+    "DM3K_PROFILE_DIR",
+    "DM3K_CAPTURE_DIR",
+)
+SERVER_START_TIMEOUT_SEC = 120
+
+
+def load_mix(mix):
+    """
+    :param list mix: dicts with a "dataset" (in examples/) and its "algorithm", or a synthetic "problem" (see PROBLEMS) with
+                     an optional "scale" and "shape"...and an optional "weight" (1 by default)
+    :return list problems: (name, weight, input dict) of each entry
+    """
+    problems = []
+    for entry in mix:
+        if "dataset" in entry:
+            input_dict = load_dataset_ref(entry["dataset"], os.path.join(app_directory, "examples"))
+            input_dict["algorithm"] = entry["algorithm"]
+            name = entry["dataset"]
+        else:
+            scale = entry.get("scale", 1)
+            input_dict = generate_problem(entry["problem"], scale, **entry.get("shape", {}))
+            input_dict["algorithm"] = PROBLEMS[entry["problem"]]["optimizer"]
+            name = "{}@{}".format(entry["problem"], scale)
+        problems.append((name, entry.get("weight", 1), input_dict))
+    return problems
+
+
+def post(url, body):
+    """
+    :return int status_code: the statusCode of the response (None if the request failed)
+    """
+    req = urllib.request.Request(url + "/api/vizdata", data=body, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req) as resp:
+            status_code = json.loads(resp.read().decode("utf-8")).get("statusCode")
+    except urllib.error.HTTPError as e:
+        status_code = e.code
+    except (OSError, ValueError):
+        status_code = None
+    return status_code
+
+
+def sample_metrics(url):
+    """
+    :return dict sample: the requests in progress (all endpoints) and the running solver processes (None if unknown)
+    """
+    try:
+        with urllib.request.urlopen(url + "/api/metrics", timeout=5) as resp:
+            text = resp.read().decode("utf-8")
+    except (OSError, ValueError):
+        return {"in_progress": None, "solver_processes": None}
+    values = {"dm3k_requests_in_progress": 0.0, "dm3k_active_solver_processes": 0.0}
+    for line in text.splitlines():
+        name = line.split("{", 1)[0].split(" ", 1)[0]
+        if name in values:
+            values[name] += float(line.rsplit(" ", 1)[1])
+    # the request for the metrics is in progress too
+    return {"in_progress": values["dm3k_requests_in_progress"] - 1, "solver_processes": values["dm3k_active_solver_processes"]}
+
+
+def run_level(url, problems, duration_sec, concurrency, rate=None, use_cache=False, sample_sec=1.0, threads=None):
+    """
+    Send the load of one level and measure it
+
+    :param float rate: requests per second (open loop), None = closed loop (each client sends its next request right away)
+    :param int threads: the threads of the server (to compute the saturation), None = unknown
+    :return dict level: the summary of the level and its "timeline" (one sample per sample_sec)
+    """
+    bodies = [(name, weight, json.dumps(dict(input_dict, useCache=use_cache)).encode("utf-8")) for name, weight, input_dict in problems]
+    weights = [weight for _, weight, _ in bodies]
+    rng = random.Random(0)
+    results = []  # (name, due time, status code, latency)
+    in_flight = [0]  # requests sent and not answered yet
+    lock = threading.Lock()
+
+    def send(name, body, due):
+        with lock:
+            in_flight[0] += 1
+        status_code = post(url, body)
+        with lock:
+            in_flight[0] -= 1
+            results.append((name, due - start, status_code, time.perf_counter() - due))
+
+    def client():
+        while time.perf_counter() - start < duration_sec:
+            name, _, body = rng.choices(bodies, weights)[0]
+            send(name, body, time.perf_counter())
+
+    timeline = []
+    stop = threading.Event()
+
+    def sampler():
+        while not stop.wait(sample_sec):
+            sample = sample_metrics(url)
+            with lock:
+                sample.update(elapsed_sec=round(time.perf_counter() - start, 2), completed=len(results), in_flight=in_flight[0])
+            if threads and sample["in_progress"] is not None:
+                sample["saturation"] = round(sample["in_progress"] / threads, 3)
+            timeline.append(sample)
+
+    start = time.perf_counter()
+    sampler_thread = threading.Thread(target=sampler, daemon=True)
+    sampler_thread.start()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        if rate is None:
+            for _ in range(concurrency):
+                executor.submit(client)
+        else:
+            due = start
+            while due - start < duration_sec:
+                # a fixed rate with random gaps (Poisson arrivals)
+                due += rng.expovariate(rate)
+                time.sleep(max(0.0, due - time.perf_counter()))
+                name, _, body = rng.choices(bodies, weights)[0]
+                executor.submit(send, name, body, due)
+    elapsed_sec = time.perf_counter() - start
+    stop.set()
+    sampler_thread.join()
+
+    statuses = {}
+    for _, _, status_code, _ in results:
+        statuses[str(status_code)] = statuses.get(str(status_code), 0) + 1
+    errors = sum(1 for _, _, status_code, _ in results if status_code != 200)
+    saturations = [s["saturation"] for s in timeline if s.get("saturation") is not None]
+    return {
+        "rate": rate,
+        "concurrency": concurrency,
+        "requests": len(results),
+        "throughput_per_sec": round(len(results) / elapsed_sec, 3),
+        "error_rate": round(errors / len(results), 3) if results else None,
+        "status_codes": statuses,
+        "latency_sec": latency_summary([latency for _, _, _, latency in results]),
+        "latency_sec_by_problem": {
+            name: latency_summary([latency for n, _, _, latency in results if n == name]) for name, _, _ in problems
+        },
+        "max_saturation": max(saturations) if saturations else None,
+        "mean_saturation": round(sum(saturations) / len(saturations), 3) if saturations else None,
+        "timeline": timeline,
+    }
+
+
+class LocalServer:
+    def __init__(self, server, processes, threads, port):
+        """
+        Start the API here (see --start)...use it as a context manager, the server is stopped at the end
+        """
+        self.url = "http://127.0.0.1:{}".format(port)
+        self._state_dirs = {name: tempfile.mkdtemp(prefix="dm3k_load_") for name in STATE_DIRS}
+        env = dict(os.environ, **self._state_dirs)
+        if server == "uwsgi":
+            if shutil.which("uwsgi") is None:
+                raise RuntimeError("uwsgi is not installed (see api/requirements.txt)")
+            # app.ini without the socket for nginx and the autoreload
+            command = ["uwsgi", "--http", ":{}".format(port), "--wsgi-file", "run.py", "--callable", "app", "--master"]
+            command += ["--processes", str(processes), "--threads", str(threads), "--die-on-term", "--env", "DM3K_PRELOAD=1"]
+        else:
+            command = [sys.executable, "-c", "from run import app; app.run(port={}, threaded=True)".format(port)]
+        self._proc = subprocess.Popen(command, cwd=api_directory, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def __enter__(self):
+        deadline = time.time() + SERVER_START_TIMEOUT_SEC
+        while time.time() < deadline:
+            if self._proc.poll() is not None:
+                raise RuntimeError("The server exited with code {}".format(self._proc.returncode))
+            try:
+                with urllib.request.urlopen(self.url + "/api/version", timeout=1):
+                    return self
+            except OSError:
+                time.sleep(0.5)
+        self.__exit__(None, None, None)
+        raise RuntimeError("The server did not start within {} seconds".format(SERVER_START_TIMEOUT_SEC))
+
+    def __exit__(self, *exc):
+        self._proc.terminate()
+        try:
+            self._proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            self._proc.kill()
+        for path in self._state_dirs.values():
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _levels(args):
+    if args.rates:
+        return [(rate, args.concurrency[-1]) for rate in args.rates]
+    return [(None, concurrency) for concurrency in args.concurrency]
+
+
+def run_levels(url, problems, args, threads=None):
+    levels = []
+    for rate, concurrency in _levels(args):
+        level = run_level(url, problems, args.duration, concurrency, rate, args.use_cache, args.sample_sec, threads)
+        latency = level["latency_sec"]
+        print(
+            "{:>10}{:>8}{:>10}{:>12}{:>10}{:>10}{:>10}{:>10}{:>12}".format(
+                "-" if rate is None else rate,
+                concurrency,
+                level["requests"],
+                level["throughput_per_sec"],
+                _format(level["error_rate"]),
+                _format(latency["p50"]),
+                _format(latency["p95"]),
+                _format(latency["p99"]),
+                _format(level["max_saturation"]),
+            )
+        )
+        levels.append(level)
+    return levels
+
+
+def _format(value):
+    return "-" if value is None else "{:.3f}".format(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", default="http://localhost:5000", help="base url of a running API (without --start)")
+    parser.add_argument("--start", action="store_true", help="start the API here for each layout")
+    parser.add_argument("--server", choices=["uwsgi", "flask"], default="uwsgi", help="server started by --start")
+    parser.add_argument("--layouts", nargs="+", default=["4x2"], help="processes x threads of the started uwsgi server")
+    parser.add_argument("--threads", type=int, help="threads of the server at --url (to compute the saturation)")
+    parser.add_argument("--mix", type=json.loads, default=DEFAULT_MIX, help="json list of the problems (see load_mix)")
+    parser.add_argument("--rates", nargs="+", type=float, help="target requests per second (open loop)")
+    parser.add_argument(
+        "--concurrency", nargs="+", type=int, default=[1, 2, 4, 8], help="clients (closed loop), or max clients of the open loop"
+    )
+    parser.add_argument("--duration", type=float, default=30, help="seconds of each level")
+    parser.add_argument("--sample-sec", type=float, default=1.0, help="seconds between samples of /api/metrics")
+    parser.add_argument("--use-cache", action="store_true", help="let the API answer repeated problems from its result cache")
+    parser.add_argument("--output", help="path of the json of the results")
+    args = parser.parse_args()
+
+    problems = load_mix(args.mix)
+    print(
+        "{:>10}{:>8}{:>10}{:>12}{:>10}{:>10}{:>10}{:>10}{:>12}".format(
+            "rate", "clients", "requests", "per_sec", "errors", "p50", "p95", "p99", "saturation"
+        )
+    )
+
+    runs = []
+    if args.start:
+        layouts = args.layouts if args.server == "uwsgi" else ["1x0"]  # the flask server starts a thread per request
+        for layout in layouts:
+            processes, threads = (int(n) for n in layout.split("x"))
+            print("{} {}".format(args.server, layout if args.server == "uwsgi" else "(a thread per request)"))
+            try:
+                with LocalServer(args.server, processes, threads, _free_port()) as server:
+                    levels = run_levels(server.url, problems, args, processes * threads or None)
+            except RuntimeError as e:
+                sys.exit("Unable to start the server: {}".format(e))
+            runs.append({"server": args.server, "processes": processes, "threads": threads, "levels": levels})
+    else:
+        runs.append({"url": args.url, "levels": run_levels(args.url.rstrip("/"), problems, args, args.threads)})
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"mix": args.mix, "duration_sec": args.duration, "runs": runs}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Replay of captured production requests (see optimizer.util.capture and DM3K_CAPTURE_RATE)
+
+Each captured problem is solved again...in this process (or a pool of processes with --concurrency), or by posting it to a
+running API with --url.  It reports the percentiles of the latencies of the replay next to the latencies that were
+observed when the requests were captured, and whether the replay found the same objective value as the captured solve
+(within --rel-tol).  The exit code is 1 if an objective did not match or a replay failed.
+
+Usage: python tests/benchmarks/replay.py ARCHIVE [--optimizer KnapsackViz] [--url http://localhost:5000] [--concurrency N]
+           [--repeat N] [--rel-tol 1e-6] [--output results.json]
+"""
+
+import argparse
+import contextlib
+import json
+import logging
+import math
+import os
+import sys
+import time
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+app_directory = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..")
+if app_directory not in sys.path:
+    sys.path.append(app_directory)
+
+from optimizer.slim_output_base import VALUE_KEY  # noqa: E402
+from optimizer.util.capture import iter_captures  # noqa: E402
+from optimizer.util.metrics import latency_summary  # noqa: E402
+
+
+def solve_local(input_dict, optimizer_name):
+    """
+    Ingest, build and solve a problem in this process
+
+    :return dict replayed: "latency_sec", "statusCode", "objective_value" and "error" (None if the solve succeeded)
+    """
+    from optimizer.slim_optimizer_main import create_opt
+
+    start = time.perf_counter()
+    try:
+        opt, validation_errors = create_opt(input_dict, optimizer_name)
+        if validation_errors:
+            return {"latency_sec": time.perf_counter() - start, "statusCode": 400, "objective_value": None, "error": "validation"}
+        # the knapsack model prints itself when it is built (outside of unittest)
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            opt.build()
+            opt.solve(include_trace=False)
+        objective_value = opt.get_results([VALUE_KEY])[VALUE_KEY]
+    except Exception as e:
+        return {"latency_sec": time.perf_counter() - start, "statusCode": 500, "objective_value": None, "error": str(e)}
+    return {"latency_sec": time.perf_counter() - start, "statusCode": 200, "objective_value": objective_value, "error": None}
+
+
+def solve_remote(input_dict, optimizer_name, url):
+    """
+    Post a problem to POST /api/vizdata of a running API (without its result cache)
+
+    :return dict replayed: see solve_local
+    """
+    body = dict(input_dict, algorithm=optimizer_name, useCache=False, fields=[VALUE_KEY])
+    req = urllib.request.Request(
+        url.rstrip("/") + "/api/vizdata", data=json.dumps(body).encode("utf-8"), headers={"Content-Type": "application/json"}
+    )
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req) as resp:
+            response = json.loads(resp.read().decode("utf-8"))
+    except Exception as e:
+        return {"latency_sec": time.perf_counter() - start, "statusCode": None, "objective_value": None, "error": str(e)}
+    latency_sec = time.perf_counter() - start
+    status_code = response.get("statusCode")
+    if status_code != 200:
+        return {"latency_sec": latency_sec, "statusCode": status_code, "objective_value": None, "error": response.get("reason")}
+    return {"latency_sec": latency_sec, "statusCode": 200, "objective_value": response["body"].get(VALUE_KEY), "error": None}
+
+
+def compare_objective(recorded, replayed, rel_tol):
+    """
+    :return str equivalence: "match", "mismatch", "error" (the replay failed) or "unknown" (no objective was recorded)
+    """
+    if replayed["error"] is not None:
+        return "error"
+    observed = recorded["observed"]
+    if observed.get("statusCode") != 200 or observed.get(VALUE_KEY) is None:
+        return "unknown"
+    if replayed["objective_value"] is None:
+        return "mismatch"
+    return "match" if math.isclose(observed[VALUE_KEY], replayed["objective_value"], rel_tol=rel_tol, abs_tol=1e-9) else "mismatch"
+
+
+def replay(records, optimizer_name=None, url=None, concurrency=1, repeat=1):
+    """
+    :return list runs: a dict per replay of a capture with its "capture_id", "optimizer", "recorded_sec" and the result of
+                       the replay (see solve_local)
+    """
+    jobs = [(record, optimizer_name or record["algorithm"]) for record in records for _ in range(repeat)]
+    if url:
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        futures = [executor.submit(solve_remote, record["input"], name, url) for record, name in jobs]
+    elif concurrency > 1:
+        executor = ProcessPoolExecutor(max_workers=concurrency)
+        futures = [executor.submit(solve_local, record["input"], name) for record, name in jobs]
+    else:
+        executor = None
+        futures = None
+
+    runs = []
+    for i, (record, name) in enumerate(jobs):
+        replayed = futures[i].result() if futures else solve_local(record["input"], name)
+        runs.append(dict(replayed, capture_id=record["capture_id"], optimizer=name, recorded_sec=record["observed"].get("total_sec")))
+    if executor is not None:
+        executor.shutdown()
+    return runs
+
+
+def report(records, runs, rel_tol):
+    """
+    :return dict report: the latencies of the replay and of the captured requests, the ratio of each replay to its capture,
+                         and the count of each equivalence of the objectives (see compare_objective)
+    """
+    by_id = {record["capture_id"]: record for record in records}
+    equivalence = {"match": 0, "mismatch": 0, "error": 0, "unknown": 0}
+    for run in runs:
+        run["equivalence"] = compare_objective(by_id[run["capture_id"]], run, rel_tol)
+        equivalence[run["equivalence"]] += 1
+    ratios = [run["latency_sec"] / run["recorded_sec"] for run in runs if run["error"] is None and run["recorded_sec"]]
+    return {
+        "replay_latency_sec": latency_summary([run["latency_sec"] for run in runs if run["error"] is None]),
+        "recorded_latency_sec": latency_summary([r["observed"]["total_sec"] for r in records if r["observed"].get("total_sec")]),
+        "latency_ratio": latency_summary(ratios),
+        "equivalence": equivalence,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("archive", help="directory of the captures (DM3K_CAPTURE_DIR)")
+    parser.add_argument("--optimizer", help="optimizer to replay the captures with (by default the captured algorithm)")
+    parser.add_argument("--url", help="base url of a running API to post the captures to (by default they are solved here)")
+    parser.add_argument("--concurrency", type=int, default=1, help="captures replayed at the same time")
+    parser.add_argument("--repeat", type=int, default=1, help="replays of each capture")
+    parser.add_argument("--rel-tol", type=float, default=1e-6, help="relative tolerance of a matching objective value")
+    parser.add_argument("--output", help="path of the json of the results")
+    args = parser.parse_args()
+
+    # the optimizer logs an error for each solve when glpsol is not installed
+    logging.basicConfig(level=logging.CRITICAL)
+    records = list(iter_captures(args.archive))
+    if not records:
+        print("No captures in {}".format(args.archive))
+        sys.exit(1)
+
+    runs = replay(records, args.optimizer, args.url, args.concurrency, args.repeat)
+    results = report(records, runs, args.rel_tol)
+    for run in runs:
+        print(
+            "{:<32}{:<16}{:>10}{:>10}  {}".format(
+                run["capture_id"],
+                run["optimizer"],
+                "{:.3f}".format(run["latency_sec"]),
+                "-" if run["recorded_sec"] is None else "{:.3f}".format(run["recorded_sec"]),
+                run["equivalence"] if run["error"] is None else "error: " + run["error"][:60],
+            )
+        )
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(dict(results, runs=runs), f, indent=2)
+
+    sys.exit(1 if results["equivalence"]["mismatch"] or results["equivalence"]["error"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+Benchmark of the stages of a solve across a ladder of scales of synthetic problems (see optimizer.util.problem_generator)
+
+For each problem and scale it reports the seconds to ingest, build, write the problem file, run the solver and gather the
+output (the fastest of the repeats, from the history of the optimizer), and the size of the model.  The complexity exponent
+of a stage is the slope of log(seconds) over log(nonzeros of the model)...1 = linear, 2 = quadratic.
+
+The results are written as json.  With --baseline (the json of an earlier run), a stage that got slower than the baseline
+by more than the tolerance (and by more than --min-sec) is a regression, and the exit code is 1.
+
+Usage: python tests/benchmarks/solve_benchmark.py [--problems knapsack full_house] [--scales 1 2 4 8]
+           [--shape '{"knapsack": {"if_not_density": 1}}'] [--repeat N] [--output results.json] [--baseline baseline.json]
+           [--tolerance 0.25] [--min-sec 0.05]
+"""
+
+import argparse
+import contextlib
+import json
+import logging
+import math
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+app_directory = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..")
+if app_directory not in sys.path:
+    sys.path.append(app_directory)
+
+from optimizer.slim_optimizer_main import create_opt  # noqa: E402
+from optimizer.util.problem_generator import PROBLEMS, generate_problem  # noqa: E402
+
+# stage -> the operations of the history of the optimizer that are part of it
+STAGES = {
+    "ingest_sec": ("Ingest from input dictionary",),
+    "build_sec": ("Building Model",),
+    "write_sec": ("Writing problem file",),
+    "solve_sec": ("Running solver",),
+    "output_sec": ("Gathering Output",),
+}
+
+
+def run_once(input_dict, optimizer_name):
+    """
+    Ingest, build and solve a problem
+
+    :return dict stages: seconds of each stage (None if the stage did not run, e.g. glpsol is not installed)
+    :return dict model_stats: the statistics of the model (see optimizer.util.model_stats)
+    """
+    opt, _ = create_opt(input_dict, optimizer_name)
+    opt.build()
+    solved = True
+    try:
+        # pyomo prints the model when the solver fails
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            opt.solve(retries=1, keepfiles=False)
+    except Exception:
+        solved = False
+
+    history_df = opt.get_history_df()
+    stages = {}
+    for stage, operations in STAGES.items():
+        rows = history_df[history_df["operation"].isin(operations)]
+        stages[stage] = float(rows["time_to_run_sec"].sum()) if len(rows) else None
+
+    if not solved:
+        # still measure the write of the problem file (without a solver)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            start = time.perf_counter()
+            opt._model.get_model().write(os.path.join(temp_dir, "problem.lp"))
+            stages["write_sec"] = time.perf_counter() - start
+    return stages, opt._model.get_model_stats()
+
+
+def run_benchmark(problems, scales, shape, repeat):
+    """
+    :return list runs: a dict per problem and scale with the "stages" (fastest seconds of the repeats) and "size" of the model
+    """
+    runs = []
+    for problem in problems:
+        optimizer_name = PROBLEMS[problem]["optimizer"]
+        for scale in scales:
+            input_dict = generate_problem(problem, scale, **shape.get(problem, {}))
+            timings = {stage: [] for stage in STAGES}
+            for _ in range(repeat):
+                stages, model_stats = run_once(input_dict, optimizer_name)
+                for stage, sec in stages.items():
+                    if sec is not None:
+                        timings[stage].append(sec)
+            best = {stage: min(secs) if secs else None for stage, secs in timings.items()}
+            size = {
+                "variables": model_stats["variables"]["total"],
+                "constraints": model_stats["constraints"]["total"],
+                "nonzeros": model_stats["nonzeros"],
+            }
+            runs.append({"problem": problem, "optimizer": optimizer_name, "scale": scale, "size": size, "stages": best})
+            print("{:<12}{:>8}{:>12}".format(problem, scale, size["nonzeros"]) + "".join(_format_sec(best[s]) for s in STAGES))
+    return runs
+
+
+def complexity_exponents(runs):
+    """
+    :return dict exponents: problem -> stage -> least squares slope of log(seconds) over log(nonzeros) (None if unknown)
+    """
+    exponents = {}
+    for problem in sorted({r["problem"] for r in runs}):
+        exponents[problem] = {}
+        for stage in STAGES:
+            points = [
+                (math.log(r["size"]["nonzeros"]), math.log(r["stages"][stage]))
+                for r in runs
+                if r["problem"] == problem and r["stages"].get(stage) and r["size"]["nonzeros"]
+            ]
+            exponents[problem][stage] = _slope(points)
+    return exponents
+
+
+def compare_to_baseline(runs, baseline, tolerance, min_sec):
+    """
+    :return list comparisons: a dict per stage of a run that is also in the baseline, with its "ratio" to the baseline and
+                              whether it is a "regression"
+    """
+    baseline_runs = {(r["problem"], r["scale"]): r for r in baseline["runs"]}
+    comparisons = []
+    for run in runs:
+        baseline_run = baseline_runs.get((run["problem"], run["scale"]))
+        if baseline_run is None:
+            continue
+        for stage, sec in run["stages"].items():
+            baseline_sec = baseline_run["stages"].get(stage)
+            if not sec or not baseline_sec:
+                continue
+            ratio = sec / baseline_sec
+            comparisons.append(
+                {
+                    "problem": run["problem"],
+                    "scale": run["scale"],
+                    "stage": stage,
+                    "sec": sec,
+                    "baseline_sec": baseline_sec,
+                    "ratio": round(ratio, 3),
+                    "regression": ratio > 1 + tolerance and sec - baseline_sec > min_sec,
+                }
+            )
+    return comparisons
+
+
+def _slope(points):
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    var_x = sum((x - mean_x) ** 2 for x, _ in points)
+    if not var_x:
+        return None
+    return round(sum((x - mean_x) * (y - mean_y) for x, y in points) / var_x, 2)
+
+
+def _format_sec(sec):
+    return "{:>12}".format("-" if sec is None else "{:.3f}".format(sec))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--problems", nargs="+", default=list(PROBLEMS), choices=list(PROBLEMS), help="problems to generate")
+    parser.add_argument("--scales", nargs="+", type=float, default=[1, 2, 4, 8], help="multipliers of the numbers of instances")
+    parser.add_argument(
+        "--shape", type=json.loads, default={}, help='json of the shape of each problem, e.g. {"knapsack": {"if_not_density": 1}}'
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="runs of each scale (the fastest is kept)")
+    parser.add_argument("--output", help="path of the json of the results")
+    parser.add_argument("--baseline", help="path of the json of an earlier run to compare to")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="slowdown (fraction) of a stage that is a regression")
+    parser.add_argument("--min-sec", type=float, default=0.05, help="slowdown (seconds) of a stage that is ignored as noise")
+    args = parser.parse_args()
+
+    # the optimizer logs an error for each solve when glpsol is not installed
+    logging.basicConfig(level=logging.CRITICAL)
+    print("{:<12}{:>8}{:>12}".format("problem", "scale", "nonzeros") + "".join("{:>12}".format(s) for s in STAGES))
+    runs = run_benchmark(args.problems, args.scales, args.shape, args.repeat)
+    exponents = complexity_exponents(runs)
+    print("complexity exponents (seconds ~ nonzeros^k): " + json.dumps(exponents))
+    print("(- = the stage did not run, e.g. glpsol is not installed)")
+
+    results = {
+        "created": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "shape": args.shape,
+        "runs": runs,
+        "exponents": exponents,
+    }
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            results["comparison"] = compare_to_baseline(runs, json.load(f), args.tolerance, args.min_sec)
+        regressions = [c for c in results["comparison"] if c["regression"]]
+        for c in regressions:
+            print("REGRESSION {problem} scale {scale} {stage}: {sec:.3f} sec vs {baseline_sec:.3f} sec (x{ratio})".format(**c))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
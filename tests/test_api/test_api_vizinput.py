@@ -5,6 +5,7 @@ Tests API vizinput interface to run the optimizer
 import json
 import logging
 import os
+import sys
 import unittest
 from unittest import TestCase
 
@@ -14,6 +15,11 @@ log = logging.getLogger(__name__)
 
 # make sure we can get access to examples
 app_directory = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..")
+if app_directory not in sys.path:
+    sys.path.append(app_directory)
+
+from optimizer.slim_optimizer_validate import estimate_input_size  # noqa: E402
+from optimizer.util.problem_generator import generate_problem  # noqa: E402
 
 # for this test we assume that api is in dev mode - see docker-compose-dev.yml for internal port
 URL = "http://localhost:5000"
@@ -59,10 +65,72 @@ class TestVizInput(TestCase):
         log.debug("  response text: \n" + str(response.text))
         log.debug("  response json: \n" + str(response.json()))
 
+    def test_viz_batch_invalid_items(self):
+        batch_url = URL + "/api/vizdata/batch"
+
+        # the items that are not problems are answered on their own lines...the rest of the batch is still solved
+        items = [["not", "an", "object"], self._load("simpleKnapsack.json"), {"algorithm": "no_such_optimizer", "files": []}]
+        response = requests.post(batch_url, json={"items": items, "useCache": False})
+
+        log.debug("POST: " + str(batch_url))
+        log.debug("  response code: " + str(response.status_code))
+        log.debug("  response text: \n" + str(response.text))
+
+        lines = {line["index"]: line for line in map(json.loads, response.text.splitlines())}
+        self.assertEqual(sorted(lines.keys()), [0, 1, 2])
+        self.assertEqual((lines[0]["statusCode"], lines[0]["reason"]), (400, "Invalid item"))
+        self.assertEqual((lines[2]["statusCode"], lines[2]["reason"]), (400, "Invalid item"))
+        self.assertEqual(lines[1]["statusCode"], 200)
+        self.assertEqual(lines[1]["body"]["objective_value"], 1)
+
+    def test_viz_batch_invalid_max_workers(self):
+        batch_url = URL + "/api/vizdata/batch"
+
+        items = [self._load("simpleKnapsack.json")]
+        for max_workers in ["4", 0, -1, 2.5, True]:
+            response = requests.post(batch_url, json={"items": items, "maxWorkers": max_workers, "useCache": False})
+
+            log.debug("POST: " + str(batch_url))
+            log.debug("  response code: " + str(response.status_code))
+            log.debug("  response text: \n" + str(response.text))
+
+            self.assertEqual(response.json()["statusCode"], 400, max_workers)
+            self.assertEqual(response.json()["reason"], "Invalid maxWorkers")
+
+        # more processes than the limit are capped to it
+        response = requests.post(batch_url, json={"items": items, "maxWorkers": 500, "useCache": False})
+        line = json.loads(response.text.splitlines()[0])
+        self.assertEqual(line["statusCode"], 200)
+
+    def test_viz_scenarios_large_problem(self):
+        scenarios_url = URL + "/api/vizdata/scenarios"
+
+        # the smallest generated problem over the large limit of the api (same environment as this test)
+        large_nonzeros = int(os.environ.get("DM3K_ADMISSION_LARGE_NONZEROS", 200000))
+        scale = 1
+        base = generate_problem("knapsack", scale)
+        while estimate_input_size(base, "KnapsackViz")["nonzeros"] <= large_nonzeros:
+            scale += 1
+            base = generate_problem("knapsack", scale)
+
+        scenarios = [{"name": "double budgets", "deltas": [{"op": "budget", "resource": "ALL", "factor": 2}]}]
+        request = {"base": base, "algorithm": "KnapsackViz", "scenarios": scenarios, "fields": ["objective_value"], "useCache": False}
+        response = requests.post(scenarios_url, json=request)
+
+        log.debug("POST: " + str(scenarios_url))
+        log.debug("  response code: " + str(response.status_code))
+        log.debug("  response text: \n" + str(response.text))
+
+        # the base problem and its scenarios are solved in heuristic mode, like a large problem posted to /api/vizdata
+        lines = {line["index"]: line for line in map(json.loads, response.text.splitlines())}
+        self.assertEqual(sorted(lines.keys(), key=str), [0, "base"])
+        for line in lines.values():
+            self.assertEqual(line["statusCode"], 200)
+            self.assertEqual(line["solve_mode"], "heuristic")
+
 
 if __name__ == "__main__":
     # FOR DEBUGGING USE...
-    import sys
 
     log = logging.getLogger()
     log.level = logging.DEBUG
@@ -0,0 +1,150 @@
+"""
+Tests estimating the size of a model before ingesting the input, and admission control based on the estimate
+"""
+
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import TestCase
+
+log = logging.getLogger(__name__)
+
+# ensure that optimizer directory is in path
+app_directory = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..")
+if app_directory not in sys.path:
+    sys.path.append(app_directory)
+
+from optimizer.slim_optimizer_validate import estimate_input_size, validate_input  # noqa: E402
+from optimizer.util.admission import ADMIT, LARGE, REJECT, AdmissionControl, add_memory_estimate  # noqa: E402
+from optimizer.util.cancel import CancellationToken, Cancelled  # noqa: E402
+from optimizer.util.deadline import Deadline, DeadlineExceeded  # noqa: E402
+
+
+def _big_knapsack(num_resources, num_activities):
+    """
+    :return dict input_dict: a knapsack whose resources can all be allocated to all activities (num_resources * num_activities arcs)
+    """
+    with open(os.path.join(app_directory, "examples", "simpleKnapsack.json"), "r") as f:
+        input_dict = json.load(f)
+    viz_data = input_dict["files"][0]["fileContents"]
+    viz_data["resourceInstances"][0]["instanceTable"] = [
+        {"instanceName": "backpack_{}".format(i), "budget": {"space": 10}} for i in range(num_resources)
+    ]
+    viz_data["activityInstances"][0]["instanceTable"] = [
+        {"instanceName": "item_{}".format(i), "cost": {"space": 1}, "reward": 1} for i in range(num_activities)
+    ]
+    return input_dict
+
+
+class TestAdmission(TestCase):
+    def setUp(self):
+        log.info("Testing: " + self.__class__.__name__ + " " + self._testMethodName + "----------")
+        self._temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def _load(self, data_filename):
+        with open(os.path.join(app_directory, "examples", data_filename), "r") as f:
+            return json.load(f)
+
+    def test_estimate_matches_ingested(self):
+        for data_filename, opt_name in [
+            ("simpleKnapsack.json", "KnapsackViz"),
+            ("fanOutKnapsack_ifNot_multi_combo.json", "KnapsackViz"),
+            ("multiBudgetKnapsack.json", "KnapsackViz"),
+            ("AlienWorldDomination_wShip.json", "FullHouseViz"),
+        ]:
+            fatal, _, size_estimate = validate_input(self._load(data_filename), opt_name)
+            self.assertFalse(fatal)
+            self.assertEqual(estimate_input_size(self._load(data_filename), opt_name), size_estimate, data_filename)
+
+    def test_estimate_malformed(self):
+        self.assertEqual(estimate_input_size({"files": [{"fileContents": "not viz data"}]}, "KnapsackViz"), {})
+        self.assertEqual(estimate_input_size(self._load("simpleKnapsack.json"), "FullHouseViz"), {})
+        with self.assertRaises(TypeError):
+            estimate_input_size({}, "no_such_optimizer")
+
+    def test_estimate_without_expanding(self):
+        # 2.5 billion arcs...expanding them would run out of memory
+        input_dict = _big_knapsack(50000, 50000)
+
+        start = time.time()
+        size_estimate = add_memory_estimate(estimate_input_size(input_dict, "KnapsackViz"))
+        self.assertLess(time.time() - start, 5)
+
+        self.assertEqual(size_estimate["arcs"], 50000 * 50000)
+        self.assertGreater(size_estimate["memory_mb"], 1024)
+
+        admission = AdmissionControl(self._temp_dir.name, max_size={"memory_mb": 1024})
+        self.assertEqual(admission.check(size_estimate), REJECT)
+
+    def test_check(self):
+        admission = AdmissionControl(
+            self._temp_dir.name, max_size={"nonzeros": 1000, "memory_mb": 0}, large_size={"nonzeros": 100, "memory_mb": 0}
+        )
+        self.assertEqual(admission.limits, {"max": {"nonzeros": 1000}, "large": {"nonzeros": 100}})
+        self.assertEqual(admission.check({"nonzeros": 10}), ADMIT)
+        self.assertEqual(admission.check({"nonzeros": 500}), LARGE)
+        self.assertEqual(admission.check({"nonzeros": 5000}), REJECT)
+        # a problem that can not be estimated is admitted
+        self.assertEqual(admission.check({}), ADMIT)
+
+    def test_large_slots(self):
+        admission = AdmissionControl(self._temp_dir.name, large_slots=1, queue_timeout_sec=0.2, poll_interval_sec=0.05)
+        # another controller on the same directory, as in another uwsgi worker
+        other = AdmissionControl(self._temp_dir.name, large_slots=1, queue_timeout_sec=5, poll_interval_sec=0.05)
+
+        with admission.large_slot() as acquired:
+            self.assertTrue(acquired)
+            with admission.large_slot() as acquired_again:
+                self.assertFalse(acquired_again)
+
+            # a waiting problem gets the slot when it frees up
+            waited = []
+
+            def wait_for_slot():
+                with other.large_slot() as other_acquired:
+                    waited.append(other_acquired)
+
+            thread = threading.Thread(target=wait_for_slot)
+            thread.start()
+            time.sleep(0.2)
+        thread.join()
+        self.assertEqual(waited, [True])
+
+    def test_large_slot_stops_on_cancel(self):
+        admission = AdmissionControl(self._temp_dir.name, large_slots=1, queue_timeout_sec=60, poll_interval_sec=0.05)
+
+        with admission.large_slot() as acquired:
+            self.assertTrue(acquired)
+            # a waiting problem whose client disconnected, and one whose deadline passes, leave the queue right away
+            cancel_token = CancellationToken()
+            threading.Timer(0.1, cancel_token.cancel, args=("The client disconnected",)).start()
+            start = time.time()
+            with self.assertRaises(Cancelled):
+                with admission.large_slot(cancel_token=cancel_token):
+                    pass
+            with self.assertRaises(DeadlineExceeded):
+                with admission.large_slot(cancel_token=Deadline(0.1)):
+                    pass
+            self.assertLess(time.time() - start, 1)
+
+        # the slots were not taken by the problems that stopped waiting
+        with admission.large_slot(cancel_token=CancellationToken()) as acquired:
+            self.assertTrue(acquired)
+
+
+if __name__ == "__main__":
+    # FOR DEBUGGING USE...
+    log = logging.getLogger()
+    log.level = logging.DEBUG
+    stream_handler = logging.StreamHandler(sys.stdout)
+    log.addHandler(stream_handler)
+
+    unittest.main()
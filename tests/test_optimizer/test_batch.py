@@ -0,0 +1,91 @@
+"""
+Tests solving a batch of problems in a process pool
+"""
+
+import logging
+import os
+import sys
+import unittest
+from unittest import TestCase, mock
+
+log = logging.getLogger(__name__)
+
+# ensure that optimizer directory is in path
+app_directory = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..")
+if app_directory not in sys.path:
+    sys.path.append(app_directory)
+
+from optimizer.util.batch import check_item, load_dataset_ref, python_executable, solve_batch  # noqa: E402
+
+DATASET_DIR = os.path.join(app_directory, "examples")
+
+
+class TestBatch(TestCase):
+    def setUp(self):
+        log.info("Testing: " + self.__class__.__name__ + " " + self._testMethodName + "----------")
+
+    def tearDown(self):
+        pass
+
+    def _load(self, dataset_ref, opt_name):
+        input_dict = load_dataset_ref(dataset_ref, DATASET_DIR)
+        input_dict["algorithm"] = opt_name
+        return input_dict
+
+    def test_batch(self):
+        items = [
+            self._load("simpleKnapsack", "KnapsackViz"),
+            self._load("fanInKnapsack", "FullHouseViz"),  # not a full house problem
+            self._load("multiBudgetKnapsack.json", "KnapsackViz"),
+        ]
+
+        responses = dict(solve_batch(items, max_workers=2))
+
+        self.assertEqual(sorted(responses.keys()), [0, 1, 2])
+        self.assertEqual(responses[1]["statusCode"], 400)
+        self.assertEqual(responses[0]["statusCode"], 200)
+        self.assertEqual(responses[0]["body"]["objective_value"], 1)
+        self.assertEqual(responses[2]["body"]["objective_value"], 4)
+
+        operations = [h["operation"] for h in responses[0]["history"]]
+        self.assertIn("Solving Model", operations)
+
+    def test_check_item(self):
+        self.assertIsNone(check_item(self._load("simpleKnapsack", "KnapsackViz")))
+        self.assertIsNone(check_item({"datasetName": "no algorithm", "files": []}))
+        for item in [
+            ["not", "an", "object"],
+            "simpleKnapsack",
+            None,
+            {"algorithm": "no_such_optimizer", "files": []},
+            {"algorithm": ["KnapsackViz"], "files": []},
+            {"algorithm": "KnapsackViz", "files": "not a list"},
+        ]:
+            response = check_item(item)
+            self.assertEqual((response["statusCode"], response["reason"]), (400, "Invalid item"), item)
+
+    def test_python_executable(self):
+        self.assertEqual(python_executable(), sys.executable)
+        # under embedded uwsgi sys.executable is the uwsgi binary...the workers must still be started with python
+        with mock.patch.object(sys, "executable", "/usr/local/bin/uwsgi"):
+            python = python_executable()
+        self.assertTrue(os.path.basename(python).startswith("python"))
+        self.assertTrue(os.access(python, os.X_OK))
+
+    def test_invalid_dataset_ref(self):
+        with self.assertRaises(ValueError):
+            load_dataset_ref("../api/app.ini", DATASET_DIR)
+        with self.assertRaises(ValueError):
+            load_dataset_ref("no_such_dataset", DATASET_DIR)
+
+        self.assertEqual(load_dataset_ref("simpleKnapsack", DATASET_DIR)["datasetName"], "simpleKnapsack")
+
+
+if __name__ == "__main__":
+    # FOR DEBUGGING USE...
+    log = logging.getLogger()
+    log.level = logging.DEBUG
+    stream_handler = logging.StreamHandler(sys.stdout)
+    log.addHandler(stream_handler)
+
+    unittest.main()
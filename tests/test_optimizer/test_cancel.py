@@ -0,0 +1,131 @@
+"""
+Tests cancelling the ingest, build and output of a solve
+"""
+
+import json
+import logging
+import os
+import sys
+import tempfile
+import unittest
+from unittest import TestCase
+
+log = logging.getLogger(__name__)
+
+# ensure that optimizer directory is in path
+app_directory = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..")
+if app_directory not in sys.path:
+    sys.path.append(app_directory)
+
+from optimizer.slim_optimizer_main import create_opt  # noqa: E402
+from optimizer.util.batch import solve_item  # noqa: E402
+from optimizer.util.cancel import CancellationToken, Cancelled  # noqa: E402
+from optimizer.util.progress import ProgressBoard  # noqa: E402
+
+
+class CountdownToken(CancellationToken):
+    """
+    A token that cancels itself after a number of checks
+    """
+
+    def __init__(self, checks):
+        super().__init__()
+        self.checks = 0
+        self._cancel_after = checks
+
+    def check(self, where):
+        self.checks += 1
+        if self.checks > self._cancel_after:
+            self.cancel("Cancelled by the test")
+        super().check(where)
+
+
+class TestCancel(TestCase):
+    def setUp(self):
+        log.info("Testing: " + self.__class__.__name__ + " " + self._testMethodName + "----------")
+        self._temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def _load(self, data_filename):
+        with open(os.path.join(app_directory, "examples", data_filename), "r") as f:
+            return json.load(f)
+
+    def test_token(self):
+        token = CancellationToken()
+        self.assertFalse(token.cancelled())
+        self.assertIsNone(token.remaining())
+        token.check("build")
+
+        token.cancel("The client disconnected")
+        token.cancel("Cancelled again")  # the first reason is kept
+        self.assertEqual(token.reason, "The client disconnected")
+        self.assertEqual(token.remaining(), 0)
+        with self.assertRaisesRegex(Cancelled, "The client disconnected during build"):
+            token.check("build")
+
+        # a rule is checked before each index...a loop every so many items
+        rule = CancellationToken().checked_rule(lambda model, a, b: a + b, "build of a constraint")
+        self.assertEqual(rule(None, 1, 2), 3)
+        countdown = CountdownToken(3)
+        self.assertEqual(list(countdown.checked_iter(range(25), "output", every=10)), list(range(25)))
+        self.assertEqual(countdown.checks, 3)
+        with self.assertRaises(Cancelled):
+            list(CountdownToken(1).checked_iter(range(25), "output", every=10))
+
+    def test_cancel_file(self):
+        board = ProgressBoard(self._temp_dir.name)
+        self.assertFalse(board.cancel("missing"))
+        with self.assertRaises(ValueError):
+            board.cancel("../escape")
+
+        progress = board.reporter("running")
+        token = CancellationToken(board.cancel_path("running"), poll_interval_sec=0)
+        self.assertFalse(token.cancelled())
+        self.assertTrue(board.cancel("running"))
+        with self.assertRaisesRegex(Cancelled, "Cancelled by the client during build"):
+            token.check("build")
+
+        # a new solve with the same id starts without the cancel file...a solve that is done cannot be cancelled
+        board.reporter("running")
+        self.assertFalse(CancellationToken(board.cancel_path("running"), poll_interval_sec=0).cancelled())
+        progress.done(200, "OK")
+        self.assertFalse(board.cancel("running"))
+
+    def test_build(self):
+        for data_filename, optimizer_name in (
+            ("fanOutKnapsack_ifNot_multi_combo.json", "KnapsackViz"),
+            ("AlienWorldDomination_wShip.json", "FullHouseViz"),
+        ):
+            opt, _ = create_opt(self._load(data_filename), optimizer_name)
+            opt.build()
+
+            # count the checks of a whole build, then cancel in the middle of it
+            counter = CountdownToken(sys.maxsize)
+            opt.set_cancel_token(counter)
+            opt.build()
+            self.assertGreater(counter.checks, 10, data_filename)
+
+            opt.set_cancel_token(CountdownToken(counter.checks // 2))
+            with self.assertRaisesRegex(Cancelled, "Cancelled by the test during build of"):
+                opt.build()
+
+    def test_batch_item(self):
+        input_dict = self._load("simpleKnapsack.json")
+        input_dict["algorithm"] = "KnapsackViz"
+        token = CancellationToken()
+        token.cancel()
+        response = solve_item(input_dict, cancel_token=token)
+        self.assertEqual(response["statusCode"], 499)
+        self.assertEqual(response["reason"], "Cancelled")
+
+
+if __name__ == "__main__":
+    # FOR DEBUGGING USE...
+    log = logging.getLogger()
+    log.level = logging.DEBUG
+    stream_handler = logging.StreamHandler(sys.stdout)
+    log.addHandler(stream_handler)
+
+    unittest.main()
@@ -0,0 +1,84 @@
+"""
+Tests capturing requests for replay
+"""
+
+import json
+import logging
+import os
+import sys
+import tempfile
+import unittest
+from unittest import TestCase
+
+log = logging.getLogger(__name__)
+
+# ensure that optimizer directory is in path
+app_directory = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..")
+if app_directory not in sys.path:
+    sys.path.append(app_directory)
+
+from optimizer.slim_optimizer_main import create_opt  # noqa: E402
+from optimizer.util.capture import CAPTURE_SUFFIX, RequestCapture, anonymize_input, iter_captures  # noqa: E402
+from optimizer.util.metrics import latency_summary  # noqa: E402
+
+
+class TestCapture(TestCase):
+    def setUp(self):
+        log.info("Testing: " + self.__class__.__name__ + " " + self._testMethodName + "----------")
+        self._temp_dir = tempfile.TemporaryDirectory()
+        with open(os.path.join(app_directory, "examples", "AlienWorldDomination_wShip.json"), "r") as f:
+            self._input_dict = json.load(f)
+        self._input_dict["algorithm"] = "FullHouseViz"
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def test_anonymize(self):
+        anonymized = anonymize_input(self._input_dict, "secret")
+        text = json.dumps(anonymized)
+        self.assertNotIn("Turret_Resource_instance_0", text)
+        self.assertNotIn("VIP_Activity_instance_7", text)
+        self.assertIn("Turret_Resource_instance_0", json.dumps(self._input_dict))  # the problem itself is not changed
+        # the instance names that are referred to by the allocations and contains are renamed too
+        self.assertEqual(anonymized, anonymize_input(self._input_dict, "secret"))
+        self.assertNotEqual(anonymized, anonymize_input(self._input_dict, "other"))
+
+        # the renamed problem is still valid (and has the same solution)
+        _, validation_errors = create_opt(anonymized, "FullHouseViz")
+        self.assertEqual(validation_errors, [])
+
+    def test_save_and_read(self):
+        capture = RequestCapture(self._temp_dir.name, sample_rate=1, anonymize=True, salt="secret", max_captures=2)
+        self.assertTrue(capture.sample())
+        self.assertFalse(RequestCapture(self._temp_dir.name).sample())
+
+        capture_ids = []
+        for i in range(3):
+            observed = {"statusCode": 200, "objective_value": float(i), "total_sec": 0.5}
+            capture_ids.append(capture.save(self._input_dict, observed))
+
+        # only the latest captures are kept
+        files = sorted(os.listdir(self._temp_dir.name))
+        self.assertEqual(files, [capture_id + CAPTURE_SUFFIX for capture_id in capture_ids[1:]])
+        records = list(iter_captures(self._temp_dir.name))
+        self.assertEqual([r["capture_id"] for r in records], capture_ids[1:])
+        self.assertEqual(records[-1]["observed"]["objective_value"], 2.0)
+        self.assertEqual(records[-1]["algorithm"], "FullHouseViz")
+        self.assertTrue(records[-1]["anonymized"])
+        self.assertEqual(records[-1]["input"], anonymize_input(self._input_dict, "secret"))
+
+    def test_latency_summary(self):
+        summary = latency_summary([float(i) for i in range(1, 101)])
+        self.assertEqual((summary["count"], summary["p50"], summary["p99"], summary["max"]), (100, 50.0, 99.0, 100.0))
+        self.assertEqual(summary["mean"], 50.5)
+        self.assertIsNone(latency_summary([])["p90"])
+
+
+if __name__ == "__main__":
+    # FOR DEBUGGING USE...
+    log = logging.getLogger()
+    log.level = logging.DEBUG
+    stream_handler = logging.StreamHandler(sys.stdout)
+    log.addHandler(stream_handler)
+
+    unittest.main()
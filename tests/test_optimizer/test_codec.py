@@ -0,0 +1,105 @@
+"""
+Tests the JSON codecs and the compression of API payloads
+"""
+
+import json
+import logging
+import os
+import sys
+import tracemalloc
+import unittest
+from unittest import TestCase
+
+import numpy
+
+log = logging.getLogger(__name__)
+
+# ensure that optimizer directory is in path
+app_directory = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..")
+if app_directory not in sys.path:
+    sys.path.append(app_directory)
+
+from optimizer.util import codec  # noqa: E402
+
+
+class TestCodec(TestCase):
+    def setUp(self):
+        log.info("Testing: " + self.__class__.__name__ + " " + self._testMethodName + "----------")
+        with open(os.path.join(app_directory, "examples", "simpleKnapsack.json"), "r") as f:
+            self._input_dict = json.load(f)
+
+    def tearDown(self):
+        pass
+
+    def test_codecs_round_trip(self):
+        for name in ("json", "auto"):
+            json_codec = codec.get_codec(name)
+            data = json_codec.dumps(self._input_dict)
+            self.assertIsInstance(data, bytes)
+            self.assertEqual(json_codec.loads(data), self._input_dict)
+
+    def test_numpy_values(self):
+        result = {"objective_value": numpy.float64(1.5), "picked": numpy.array([1, 0, 1]), "count": numpy.int64(3)}
+        for name in ("json", "auto"):
+            self.assertEqual(json.loads(codec.get_codec(name).dumps(result)), {"objective_value": 1.5, "picked": [1, 0, 1], "count": 3})
+
+    def test_register_codec(self):
+        codec.register_codec("test", lambda obj: json.dumps(obj).encode("utf-8"), json.loads)
+        self.assertEqual(codec.get_codec("test").name, "test")
+        self.assertEqual(codec.get_codec("no_such_codec").name, "json")
+
+    def test_compression_round_trip(self):
+        data = codec.get_codec().dumps(self._input_dict)
+        for encoding in codec.get_encodings():
+            compressed = codec.compress(data, encoding)
+            self.assertLess(len(compressed), len(data))
+            self.assertEqual(codec.decompress(compressed, encoding), data)
+        self.assertEqual(codec.decompress(data, None), data)
+
+        with self.assertRaises(ValueError):
+            codec.decompress(data, "gzip")
+        with self.assertRaises(ValueError):
+            codec.decompress(data, "br")
+        with self.assertRaises(codec.PayloadTooLargeError):
+            codec.decompress(codec.compress(data, "gzip"), "gzip", max_bytes=100)
+
+    def test_decompression_bomb(self):
+        # a small payload that inflates to 64 MB is turned away without inflating it
+        data = b"0" * (64 * 2 ** 20)
+        for encoding in codec.get_encodings():
+            compressed = codec.compress(data, encoding)
+            self.assertLess(len(compressed), 2 ** 20)
+
+            tracemalloc.start()
+            try:
+                with self.assertRaises(codec.PayloadTooLargeError):
+                    codec.decompress(compressed, encoding, max_bytes=2 ** 20)
+                _, peak_bytes = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+            self.assertLess(peak_bytes, 8 * 2 ** 20, encoding)
+
+    def test_stream_compression(self):
+        lines = [codec.get_codec().dumps({"row": i}) + b"\n" for i in range(100)]
+        for encoding in codec.get_encodings():
+            compressor = codec.StreamCompressor(encoding)
+            compressed = b"".join(compressor.compress(line) for line in lines) + compressor.finish()
+            self.assertEqual(codec.decompress(compressed, encoding), b"".join(lines))
+
+    def test_choose_encoding(self):
+        self.assertIsNone(codec.choose_encoding(None))
+        self.assertIsNone(codec.choose_encoding("br"))
+        self.assertIsNone(codec.choose_encoding("gzip;q=0"))
+        self.assertEqual(codec.choose_encoding("gzip, deflate"), "gzip")
+        self.assertEqual(codec.choose_encoding("gzip;q=0.5, deflate"), "deflate")
+        self.assertEqual(codec.choose_encoding("*"), codec.get_encodings()[0])
+
+
+if __name__ == "__main__":
+    # FOR DEBUGGING USE...
+    log = logging.getLogger()
+    log.level = logging.DEBUG
+    stream_handler = logging.StreamHandler(sys.stdout)
+    log.addHandler(stream_handler)
+
+    unittest.main()
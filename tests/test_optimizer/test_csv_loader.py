@@ -0,0 +1,133 @@
+"""
+Tests the single pass loader of the constraint csv files of a full house dataset
+"""
+
+import logging
+import math
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest import TestCase
+
+log = logging.getLogger(__name__)
+
+# ensure that optimizer directory is in path
+app_directory = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..")
+if app_directory not in sys.path:
+    sys.path.append(app_directory)
+
+from optimizer.full_house.full_house_input import FullHouseInput  # noqa: E402
+from optimizer.util.csv_loader import CsvFormatError, ParsedFileCache, load_csv_files, read_name_lists, read_table  # noqa: E402
+
+# a small but valid dataset (see FullHouseInput.ingest_validate)
+CONSTRAINTS = {
+    "activity.csv": "parent_activity,child_activities\npa1,ca1,ca2\npa2,ca3\n",
+    "child_allocations.csv": "child_resource,child_activities\ncr1,ca1,ca2,ca3\ncr2,ca1, ca3,ca1\n",
+    "parent_allocations.csv": "parent_resource,parent_activities\npr1,pa1,pa2\n",
+    "child_budget.csv": "child_resource,fuel\ncr1,10\ncr2,20.5\n",
+    "parent_budget.csv": "parent_resource,cash\n_default_,100\n",
+    "child_cost.csv": "child_activity,fuel\n_default_,1\nca2,3\n",
+    "parent_cost.csv": "parent_activity,cash\npa1,5\npa2,7\n",
+    "container_child_resource.csv": "container,child_resources\nc1,cr1,cr2\n",
+    "container_parent_resource.csv": "container,parent_resources\nc1,pr1\n",
+    "force_forbid.csv": "child_activity,level,force,forbid\nca1,child_activity,1,\nca3,child_activity,,1\n",
+}
+SCORES = '{"ca1": 1, "ca2": 2, "ca3": 3}'
+
+
+class TestCsvLoader(TestCase):
+    def setUp(self):
+        log.info("Testing: " + self.__class__.__name__ + " " + self._testMethodName + "----------")
+        self._temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def _write(self, name, contents):
+        path = os.path.join(self._temp_dir.name, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(contents)
+        return path
+
+    def test_read_name_lists(self):
+        path = self._write("activity.csv", 'parent,children\npa1,ca1, ca2,,ca1,nan\n\npa2\n"pa,3",ca3\n')
+        self.assertEqual(read_name_lists(path), [("pa1", ["ca1", "ca2"]), ("pa2", []), ("pa,3", ["ca3"])])
+
+    def test_read_table(self):
+        path = self._write("child_budget.csv", "resource,fuel,food,note,count\ncr1,10,1.5,a,1\ncr2,,2,,2\ncr3,30\n")
+        table = read_table(path)
+        self.assertEqual(list(table), ["cr1", "cr2", "cr3"])
+        # a column is read the way pandas reads it...ints, floats if any is missing or fractional, strings if any is not a number
+        self.assertEqual(table["cr1"], {"fuel": 10.0, "food": 1.5, "note": "a", "count": 1.0})
+        self.assertIsInstance(table["cr1"]["fuel"], float)
+        self.assertTrue(math.isnan(table["cr2"]["fuel"]) and math.isnan(table["cr2"]["note"]))
+        self.assertTrue(math.isnan(table["cr3"]["count"]))
+
+        path = self._write("parent_cost.csv", "activity,cash\npa1,5\npa2,7\n")
+        self.assertEqual(read_table(path), {"pa1": {"cash": 5}, "pa2": {"cash": 7}})
+        self.assertIsInstance(read_table(path)["pa1"]["cash"], int)
+
+        path = self._write("parent_budget.csv", "resource,cash\npr1,5,6\n")
+        with self.assertRaises(CsvFormatError):
+            read_table(path)
+
+    def test_cache(self):
+        cache = ParsedFileCache()
+        paths = [self._write(name, contents) for name, contents in CONSTRAINTS.items()]
+        tables = ["child_budget", "parent_budget", "child_cost", "parent_cost", "force_forbid"]
+
+        first = load_csv_files(paths, tables, cache=cache)
+        self.assertEqual(cache.misses, len(paths))
+        self.assertEqual(first[paths[0]], [("pa1", ["ca1", "ca2"]), ("pa2", ["ca3"])])
+        self.assertEqual(load_csv_files(paths, tables, cache=cache), first)
+        self.assertEqual(cache.hits, len(paths))
+
+        # a changed file is parsed again
+        time.sleep(0.01)
+        self._write("activity.csv", "parent_activity,child_activities\npa1,ca1\n")
+        self.assertEqual(load_csv_files(paths[:1], tables, cache=cache)[paths[0]], [("pa1", ["ca1"])])
+        self.assertEqual(cache.misses, len(paths) + 1)
+
+        self._write("parent_cost.csv", "parent_activity,cash\npa1,5,5\n")
+        with self.assertRaisesRegex(CsvFormatError, "parent_cost.csv"):
+            load_csv_files(paths, tables, cache=cache)
+
+    def test_ingest(self):
+        for name, contents in CONSTRAINTS.items():
+            self._write(os.path.join("constraints", name), contents)
+        self._write("scores.json", SCORES)
+
+        fh_input = FullHouseInput()
+        fatal, errors = fh_input.ingest_validate(self._temp_dir.name)
+        self.assertFalse(fatal)
+        self.assertEqual(errors, [])
+        data = fh_input.to_data()
+        self.assertEqual(data["parent_activities"], ["pa1", "pa2"])
+        self.assertEqual(data["child_possible_allocations"], {"cr1": ["ca1", "ca2", "ca3"], "cr2": ["ca1", "ca3"]})
+        self.assertEqual(data["avail_child_amt"], {"cr1": 10.0, "cr2": 20.5})
+        self.assertEqual(data["avail_parent_amt"], {"pr1": 100})
+        self.assertEqual(data["req_child_amt"][("cr1", "ca2")], 3)
+        self.assertEqual(data["req_child_amt"][("cr2", "ca3")], 1)
+        self.assertEqual((data["force_list"], data["forbid_list"]), (["ca1"], ["ca3"]))
+
+        # the parsed files are shared by every ingest of the dataset, so an ingest must not change them
+        again = FullHouseInput()
+        again.ingest_validate(self._temp_dir.name)
+        self.assertEqual(again.to_data(), data)
+
+        self._write(os.path.join("constraints", "child_budget.csv"), "child_resource,fuel\ncr1,1,2\n")
+        with self.assertRaisesRegex(TypeError, "child_budget.csv is in an invalid format"):
+            FullHouseInput().ingest_validate(self._temp_dir.name)
+
+
+if __name__ == "__main__":
+    # FOR DEBUGGING USE...
+    log = logging.getLogger()
+    log.level = logging.DEBUG
+    stream_handler = logging.StreamHandler(sys.stdout)
+    log.addHandler(stream_handler)
+
+    unittest.main()
@@ -0,0 +1,113 @@
+"""
+Tests charging the stages of a solve against a deadline
+"""
+
+import json
+import logging
+import os
+import socket
+import sys
+import time
+import unittest
+from unittest import TestCase
+
+log = logging.getLogger(__name__)
+
+# ensure that optimizer directory is in path
+app_directory = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..")
+if app_directory not in sys.path:
+    sys.path.append(app_directory)
+
+from optimizer.slim_optimizer_main import create_opt  # noqa: E402
+from optimizer.util.batch import solve_item  # noqa: E402
+from optimizer.util.cancel import Cancelled  # noqa: E402
+from optimizer.util.deadline import Deadline, DeadlineExceeded, DisconnectWatcher  # noqa: E402
+
+
+class TestDeadline(TestCase):
+    def setUp(self):
+        log.info("Testing: " + self.__class__.__name__ + " " + self._testMethodName + "----------")
+
+    def tearDown(self):
+        pass
+
+    def _load(self, data_filename):
+        with open(os.path.join(app_directory, "examples", data_filename), "r") as f:
+            return json.load(f)
+
+    def test_deadline(self):
+        no_deadline = Deadline()
+        self.assertIsNone(no_deadline.remaining())
+        self.assertFalse(no_deadline.cancelled())
+        no_deadline.check("build")
+
+        deadline = Deadline(10, start_time=time.time() - 4)
+        self.assertAlmostEqual(deadline.remaining(), 6, delta=0.5)
+        self.assertIsNone(deadline.reason)
+
+        # a deadline that is cancelled before the time is up is not exceeded
+        deadline.cancel("The client disconnected")
+        self.assertEqual(deadline.remaining(), 0)
+        with self.assertRaisesRegex(Cancelled, "The client disconnected during build") as raised:
+            deadline.check("build")
+        self.assertNotIsInstance(raised.exception, DeadlineExceeded)
+
+        passed = Deadline(1, start_time=time.time() - 2)
+        self.assertTrue(passed.cancelled())
+        self.assertEqual(passed.reason, "Deadline exceeded")
+        with self.assertRaisesRegex(DeadlineExceeded, "Deadline exceeded during build"):
+            passed.check("build")
+
+    def test_stages(self):
+        # the deadline passes while the model is built
+        deadline = Deadline(0.2)
+        opt, _ = create_opt(self._load("simpleKnapsack.json"), "KnapsackViz", cancel_token=deadline)
+        opt.build()
+        time.sleep(0.3)
+        with self.assertRaisesRegex(DeadlineExceeded, "during solve"):
+            opt.solve()
+
+        with self.assertRaisesRegex(DeadlineExceeded, "during ingest"):
+            create_opt(self._load("simpleKnapsack.json"), "KnapsackViz", cancel_token=Deadline(0))
+
+        # with time left for the build, but not enough for the solver
+        opt, _ = create_opt(self._load("simpleKnapsack.json"), "KnapsackViz", cancel_token=Deadline(0.5))
+        opt.build()
+        with self.assertRaisesRegex(DeadlineExceeded, "Not enough time left to start the solver"):
+            opt.solve()
+
+    def test_batch_item(self):
+        input_dict = self._load("simpleKnapsack.json")
+        input_dict["algorithm"] = "KnapsackViz"
+        response = solve_item(input_dict, cancel_token=Deadline(0))
+        self.assertEqual(response["statusCode"], 504)
+        self.assertEqual(response["reason"], "Deadline exceeded")
+
+    def test_disconnect(self):
+        server_sock, client_sock = socket.socketpair()
+        deadline = Deadline(60)
+        watcher = DisconnectWatcher(server_sock.fileno(), deadline, interval_sec=0.05).start()
+
+        # a client that sends its next request early is still connected
+        client_sock.sendall(b"GET")
+        time.sleep(0.2)
+        self.assertFalse(deadline.cancelled())
+
+        server_sock.recv(3)
+        client_sock.close()
+        time.sleep(0.2)
+        self.assertTrue(deadline.cancelled())
+        self.assertEqual(deadline.reason, "The client disconnected")
+
+        watcher.stop()
+        server_sock.close()
+
+
+if __name__ == "__main__":
+    # FOR DEBUGGING USE...
+    log = logging.getLogger()
+    log.level = logging.DEBUG
+    stream_handler = logging.StreamHandler(sys.stdout)
+    log.addHandler(stream_handler)
+
+    unittest.main()
@@ -0,0 +1,162 @@
+"""
+Tests parsing the log of the GLPK solver into a timeline
+"""
+
+import json
+import logging
+import os
+import sys
+import tempfile
+import unittest
+from unittest import TestCase
+
+log = logging.getLogger(__name__)
+
+# ensure that optimizer directory is in path
+app_directory = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..")
+if app_directory not in sys.path:
+    sys.path.append(app_directory)
+
+from optimizer.knapsack.knapsack_model import KnapsackModel  # noqa: E402
+from optimizer.slim_optimizer_base import SOLVER_TIMELINE_FILE_NAME  # noqa: E402
+from optimizer.util.glpk_log import parse_glpk_log  # noqa: E402
+from optimizer.util.history_pattern import HistoryManager  # noqa: E402
+
+GLPK_LOG = """GLPSOL: GLPK LP/MIP Solver, v4.65
+Parameter(s) specified in the command line:
+ --write /tmp/solver/tmp1.glpk.raw --wglp /tmp/solver/tmp2.glpk.glp --cpxlp /tmp/solver/tmp3.pyomo.lp
+Reading problem data from '/tmp/solver/tmp3.pyomo.lp'...
+46 rows, 85 columns, 210 non-zeros
+85 integer variables, all of which are binary
+520 lines were read
+GLPK Integer Optimizer, v4.65
+46 rows, 85 columns, 210 non-zeros
+85 integer variables, all of which are binary
+Preprocessing...
+6 hidden covering inequaliti(es) were detected
+2 constraint coefficient(s) were reduced
+40 rows, 80 columns, 190 non-zeros
+80 integer variables, all of which are binary
+Scaling...
+ A: min|aij| =  1.000e+00  max|aij| =  1.000e+00  ratio =  1.000e+00
+Problem data seem to be well scaled
+Constructing initial basis...
+Size of triangular part is 40
+Solving LP relaxation...
+GLPK Simplex Optimizer, v4.65
+40 rows, 80 columns, 190 non-zeros
+*     0: obj =  -0.000000000e+00 inf =   0.000e+00 (80)
+*    52: obj =   1.350000000e+02 inf =   0.000e+00 (0)
+OPTIMAL LP SOLUTION FOUND
+Integer optimization begins...
+Long-step dual simplex will be used
++    52: mip =     not found yet <=              +inf        (1; 0)
++    60: >>>>>   1.200000000e+02 <=   1.350000000e+02  12.5% (5; 0)
++   120: >>>>>   1.300000000e+02 <=   1.340000000e+02   3.1% (8; 10)
++   900: mip =   1.300000000e+02 <=   1.320000000e+02   1.5% (20; 300)
++  1450: mip =   1.300000000e+02 <=     tree is empty   0.0% (0; 641)
+INTEGER OPTIMAL SOLUTION FOUND
+Time used:   30.0 secs
+Memory used: 0.3 Mb (315512 bytes)
+Writing MIP solution to '/tmp/solver/tmp1.glpk.raw'...
+"""
+
+
+class TestGlpkLog(TestCase):
+    def setUp(self):
+        log.info("Testing: " + self.__class__.__name__ + " " + self._testMethodName + "----------")
+        self._temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def test_parse(self):
+        lines = GLPK_LOG.splitlines()
+        # the search found its final incumbent after 4 seconds and spent the rest of the 30 seconds proving it
+        line_times = [0.0] * 30 + [4.0, 10.0] + [30.0] * (len(lines) - 32)
+        timeline = parse_glpk_log(lines, line_times, timing_resolution_sec=2)
+
+        types = [r["type"] for r in timeline["records"]]
+        self.assertEqual(types.count("mip"), 5)
+        self.assertEqual(types.count("lp"), 2)
+        self.assertEqual(types[-3:], ["status", "time_used", "memory_used"])
+        mip = [r for r in timeline["records"] if r["type"] == "mip"]
+        self.assertEqual((mip[2]["nodes_active"], mip[2]["nodes_done"], mip[2]["elapsed_sec"]), (8, 10, 4.0))
+
+        summary = timeline["summary"]
+        self.assertEqual(summary["status"], "INTEGER OPTIMAL SOLUTION FOUND")
+        self.assertEqual(summary["solver_sec"], 30.0)
+        self.assertEqual(summary["first_incumbent_sec"], 0.0)
+        self.assertEqual(summary["final_incumbent_sec"], 4.0)
+        self.assertEqual(summary["proving_optimality_sec"], 26.0)
+        self.assertEqual(summary["limited_by"], "bound")
+        self.assertEqual(summary["incumbents"], 2)
+        self.assertEqual(summary["nodes_explored"], 641)
+        self.assertEqual(summary["lp_iterations"], 1450)
+        self.assertEqual((summary["objective"], summary["bound"], summary["gap"]), (130.0, None, 0.0))
+        self.assertEqual(
+            summary["presolve"],
+            {
+                "rows_before": 46,
+                "rows_after": 40,
+                "rows_removed": 6,
+                "columns_before": 85,
+                "columns_after": 80,
+                "columns_removed": 5,
+                "nonzeros_before": 210,
+                "nonzeros_after": 190,
+                "nonzeros_removed": 20,
+                "hidden_covering_inequalities": 6,
+                "coefficients_reduced": 2,
+            },
+        )
+        self.assertEqual(summary["memory_MB"], 0.3)
+
+        # the final incumbent was found late...the search is the limit
+        line_times = [0.0] * 30 + [25.0, 29.0] + [30.0] * (len(lines) - 32)
+        self.assertEqual(parse_glpk_log(lines, line_times)["summary"]["limited_by"], "search")
+
+    def test_parse_partial(self):
+        # without times (or before the solver finished) the metrics that need them are unknown
+        summary = parse_glpk_log(GLPK_LOG)["summary"]
+        self.assertIsNone(summary["final_incumbent_sec"])
+        self.assertIsNone(summary["limited_by"])
+        self.assertEqual(summary["solver_sec"], 30.0)
+
+        lines = GLPK_LOG.splitlines()[:29]
+        summary = parse_glpk_log(lines, [float(i) for i in range(len(lines))])["summary"]
+        self.assertIsNone(summary["status"])
+        self.assertEqual(summary["solver_sec"], 28.0)
+        self.assertEqual(summary["incumbents"], 0)
+        self.assertEqual(summary["limited_by"], "search")
+
+        self.assertEqual(parse_glpk_log("")["records"], [])
+
+    def test_solver_log_of_model(self):
+        model = KnapsackModel()
+        model.hist_mgr = HistoryManager()
+        model._opt_log_dir = self._temp_dir.name
+        model._pyomo_log_name = os.path.join(self._temp_dir.name, "glpk.log")
+        with open(model._pyomo_log_name, "w") as f:
+            f.write(GLPK_LOG)
+        # check_solve_status saw the first lines of the log...the rest were seen when the solver finished
+        model._solver_log_stamps = [100.0] * 10
+
+        with model.hist_mgr.span("Solving Model"):
+            model._read_solver_log()
+
+        summary = model.solver_log["summary"]
+        self.assertEqual(summary["status"], "INTEGER OPTIMAL SOLUTION FOUND")
+        self.assertEqual(model.hist_mgr.get_history()[0]["attributes"]["solver_log"], summary)
+        with open(os.path.join(self._temp_dir.name, SOLVER_TIMELINE_FILE_NAME)) as f:
+            self.assertEqual(json.load(f)["summary"], summary)
+
+
+if __name__ == "__main__":
+    # FOR DEBUGGING USE...
+    log = logging.getLogger()
+    log.level = logging.DEBUG
+    stream_handler = logging.StreamHandler(sys.stdout)
+    log.addHandler(stream_handler)
+
+    unittest.main()
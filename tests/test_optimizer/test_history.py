@@ -0,0 +1,149 @@
+"""
+Tests tracking the history of an optimizer as nested spans
+"""
+
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import unittest
+from unittest import TestCase
+
+log = logging.getLogger(__name__)
+
+# ensure that optimizer directory is in path
+app_directory = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..")
+if app_directory not in sys.path:
+    sys.path.append(app_directory)
+
+from optimizer.slim_optimizer_main import create_opt  # noqa: E402
+from optimizer.util.history_pattern import HISTORY_COLUMNS, HistoryManager, traced  # noqa: E402
+
+
+class Stages:
+    def __init__(self):
+        self.hist_mgr = HistoryManager()
+
+    @traced("Outer")
+    def outer(self):
+        time.sleep(0.02)
+        self.inner()
+        return "done"
+
+    @traced("Inner")
+    def inner(self):
+        time.sleep(0.01)
+
+
+class TestHistory(TestCase):
+    def setUp(self):
+        log.info("Testing: " + self.__class__.__name__ + " " + self._testMethodName + "----------")
+
+    def tearDown(self):
+        pass
+
+    def test_nested_spans(self):
+        stages = Stages()
+        hist_mgr = stages.hist_mgr
+        hist_mgr.start_tag("Request")
+        self.assertEqual(stages.outer(), "done")
+        with self.assertRaises(RuntimeError):
+            with hist_mgr.span("Failing"):
+                raise RuntimeError("the span still ends")
+        hist_mgr.end_tag("Request")
+
+        history = hist_mgr.get_history()
+        self.assertEqual([h["operation"] for h in history], ["Request", "Outer", "Inner", "Failing"])
+        self.assertEqual([h["depth"] for h in history], [0, 1, 2, 1])
+        request, outer, inner, failing = history
+        self.assertIsNone(request["parent_id"])
+        self.assertEqual(outer["parent_id"], request["span_id"])
+        self.assertEqual(inner["parent_id"], outer["span_id"])
+        self.assertEqual(failing["parent_id"], request["span_id"])
+        self.assertGreaterEqual(outer["time_to_run_sec"], inner["time_to_run_sec"] + 0.02)
+        self.assertTrue(set(HISTORY_COLUMNS) <= set(request))
+
+        trace = hist_mgr.get_chrome_trace()
+        self.assertEqual([e["name"] for e in trace["traceEvents"]], ["Request", "Outer", "Inner", "Failing"])
+        outer_event, inner_event = trace["traceEvents"][1:3]
+        self.assertEqual(outer_event["ph"], "X")
+        self.assertLessEqual(outer_event["ts"], inner_event["ts"])
+        self.assertGreaterEqual(outer_event["ts"] + outer_event["dur"], inner_event["ts"] + inner_event["dur"])
+
+    def test_traced_methods(self):
+        class Solver:
+            def solve(self):
+                return self.write() + 1
+
+            def write(self):
+                return 1
+
+        hist_mgr = HistoryManager()
+        solver = Solver()
+        with hist_mgr.span("Solving"), hist_mgr.traced_methods(solver, {"write": "Writing"}):
+            self.assertEqual(solver.solve(), 2)
+        self.assertNotIn("write", vars(solver))  # the method of the class is restored
+        self.assertEqual([(h["operation"], h["depth"]) for h in hist_mgr.get_history()], [("Solving", 0), ("Writing", 1)])
+
+    @unittest.skipUnless(hasattr(tracemalloc, "reset_peak"), "tracemalloc.reset_peak is new in python 3.9")
+    def test_tracemalloc_peak(self):
+        hist_mgr = HistoryManager()
+        self.assertIsNone(self._traced_run(hist_mgr, trace=False))
+
+        hist_mgr = HistoryManager()
+        peaks = self._traced_run(hist_mgr, trace=True)
+        # the peak of the nested span (about 8 MB) counts towards the peak of the outer span
+        self.assertGreater(peaks["Allocating"], 7)
+        self.assertGreater(peaks["Outer"], peaks["Allocating"] - 0.5)
+        self.assertLess(peaks["Small"], 1)
+
+    def _traced_run(self, hist_mgr, trace):
+        if trace:
+            tracemalloc.start()
+        try:
+            with hist_mgr.span("Outer"):
+                with hist_mgr.span("Allocating"):
+                    data = [0] * (1024 * 1024)  # 8 MB of pointers
+                    del data
+                with hist_mgr.span("Small"):
+                    pass
+        finally:
+            if trace:
+                tracemalloc.stop()
+        peaks = {h["operation"]: h["tracemalloc_peak_MB"] for h in hist_mgr.get_history()}
+        return peaks if trace else peaks["Outer"]
+
+    def test_optimizer_history(self):
+        with open(os.path.join(app_directory, "examples", "fanOutKnapsack_ifNot_multi_combo.json"), "r") as f:
+            input_dict = json.load(f)
+        opt, _ = create_opt(input_dict, "KnapsackViz")
+        opt.build()
+
+        history_df = opt.get_history_df()
+        self.assertEqual(list(history_df.columns), HISTORY_COLUMNS)
+        build_id = history_df[history_df["operation"] == "Building Model"]["span_id"].iloc[0]
+        build_stages = history_df[history_df["parent_id"] == build_id]["operation"].tolist()
+        self.assertIn("Creating resource-activity allocations", build_stages)
+        self.assertIn("Creating IF-NOT constraints", build_stages)
+        constraints = history_df[history_df["operation"] == "Creating constraints"].iloc[0]
+        self.assertEqual(constraints["depth"], 2)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            filename = os.path.join(temp_dir, "trace.json")
+            opt.write_chrome_trace(filename)
+            with open(filename) as f:
+                trace = json.load(f)
+        self.assertEqual(len(trace["traceEvents"]), len(history_df))
+
+
+if __name__ == "__main__":
+    # FOR DEBUGGING USE...
+    log = logging.getLogger()
+    log.level = logging.DEBUG
+    stream_handler = logging.StreamHandler(sys.stdout)
+    log.addHandler(stream_handler)
+
+    unittest.main()
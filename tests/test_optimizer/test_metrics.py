@@ -0,0 +1,87 @@
+"""
+Tests the metrics registry and its aggregation across processes
+"""
+
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import TestCase
+
+log = logging.getLogger(__name__)
+
+# ensure that optimizer directory is in path
+app_directory = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..")
+if app_directory not in sys.path:
+    sys.path.append(app_directory)
+
+from optimizer.util.metrics import MetricsRegistry  # noqa: E402
+
+
+def _make_registry(metrics_dir=None):
+    registry = MetricsRegistry(metrics_dir)
+    registry.counter("test_requests_total", "Requests")
+    registry.gauge("test_in_progress", "Requests in progress")
+    registry.histogram("test_duration_seconds", "Durations", buckets=(0.1, 1))
+    return registry
+
+
+class TestMetrics(TestCase):
+    def setUp(self):
+        log.info("Testing: " + self.__class__.__name__ + " " + self._testMethodName + "----------")
+        self._temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def test_render(self):
+        registry = _make_registry()
+        registry.inc("test_requests_total", labels={"endpoint": "/api/vizdata", "status": 200})
+        registry.inc("test_requests_total", 2, labels={"endpoint": "/api/vizdata", "status": 200})
+        registry.set("test_in_progress", 1.5)
+        for value in (0.05, 0.5, 5):
+            registry.observe("test_duration_seconds", value, labels={"stage": 'Solving "Model"'})
+
+        lines = registry.render({"test_solvers": ("Solvers", 0)}).splitlines()
+
+        self.assertIn("# TYPE test_requests_total counter", lines)
+        self.assertIn('test_requests_total{endpoint="/api/vizdata",status="200"} 3', lines)
+        self.assertIn("test_in_progress 1.5", lines)
+        self.assertIn('test_duration_seconds_bucket{stage="Solving \\"Model\\"",le="0.1"} 1', lines)
+        self.assertIn('test_duration_seconds_bucket{stage="Solving \\"Model\\"",le="1"} 2', lines)
+        self.assertIn('test_duration_seconds_bucket{stage="Solving \\"Model\\"",le="+Inf"} 3', lines)
+        self.assertIn('test_duration_seconds_sum{stage="Solving \\"Model\\""} 5.55', lines)
+        self.assertIn('test_duration_seconds_count{stage="Solving \\"Model\\""} 3', lines)
+        self.assertIn("# TYPE test_solvers gauge", lines)
+
+    def test_aggregate_processes(self):
+        # another process (e.g. another uwsgi worker) that records metrics and exits
+        code = (
+            "import sys; sys.path.append({!r}); from tests.test_optimizer.test_metrics import _make_registry; "
+            "r = _make_registry({!r}); r.inc('test_requests_total'); r.inc('test_in_progress'); "
+            "r.observe('test_duration_seconds', 0.5); r.flush()"
+        ).format(app_directory, self._temp_dir.name)
+        subprocess.run([sys.executable, "-c", code], check=True)
+
+        registry = _make_registry(self._temp_dir.name)
+        registry.inc("test_requests_total")
+        registry.inc("test_in_progress")
+        registry.observe("test_duration_seconds", 2)
+        merged = registry.collect()
+
+        self.assertEqual(merged["test_requests_total"][()], 2)
+        # the gauges of processes that have exited are dropped
+        self.assertEqual(merged["test_in_progress"][()], 1)
+        self.assertEqual(merged["test_duration_seconds"][()], [0, 1, 1, 2.5, 2])
+
+
+if __name__ == "__main__":
+    # FOR DEBUGGING USE...
+    log = logging.getLogger()
+    log.level = logging.DEBUG
+    stream_handler = logging.StreamHandler(sys.stdout)
+    log.addHandler(stream_handler)
+
+    unittest.main()
@@ -0,0 +1,91 @@
+"""
+Tests the statistics of the size and structure of built models
+"""
+
+import json
+import logging
+import os
+import sys
+import unittest
+from unittest import TestCase
+
+from pyomo.environ import Binary, ConcreteModel, Constraint, NonNegativeReals, Objective, Var, maximize
+
+log = logging.getLogger(__name__)
+
+# ensure that optimizer directory is in path
+app_directory = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..")
+if app_directory not in sys.path:
+    sys.path.append(app_directory)
+
+from optimizer.slim_optimizer_main import create_opt  # noqa: E402
+from optimizer.util.model_stats import model_statistics  # noqa: E402
+
+
+class TestModelStats(TestCase):
+    def setUp(self):
+        log.info("Testing: " + self.__class__.__name__ + " " + self._testMethodName + "----------")
+
+    def tearDown(self):
+        pass
+
+    def _build(self, data_filename, optimizer_name):
+        with open(os.path.join(app_directory, "examples", data_filename), "r") as f:
+            input_dict = json.load(f)
+        opt, _ = create_opt(input_dict, optimizer_name)
+        opt.build()
+        return opt
+
+    def test_model_statistics(self):
+        model = ConcreteModel()
+        model.x = Var([1, 2, 3], domain=Binary)
+        model.y = Var([1, 2], domain=NonNegativeReals)
+        model.y[2].fix(4)
+        model.limit = Constraint([1, 2], rule=lambda m, i: 0.5 * m.x[i] + 200 * m.x[3] <= 10 * i)
+        model.link = Constraint(expr=model.y[1] + model.y[2] - 0 * model.x[1] >= 0.25)
+        model.objective = Objective(expr=model.x[1] + 3 * model.y[1], sense=maximize)
+
+        stats = model_statistics(model)
+        self.assertEqual(stats["variables"], {"binary": 3, "integer": 0, "continuous": 1, "fixed": 1, "total": 5})
+        self.assertEqual(stats["constraints"], {"rows": {"limit": 2, "link": 1}, "total": 3})
+        # the fixed variable and the zero coefficient are not nonzeros of the matrix
+        self.assertEqual(stats["nonzeros"], 5)
+        self.assertEqual(stats["objective_nonzeros"], 2)
+        self.assertEqual(stats["coefficient_range"], [0.5, 200])
+        self.assertEqual(stats["rhs_range"], [0.25, 20])
+
+    def test_knapsack(self):
+        opt = self._build("fanOutKnapsack_ifNot_multi_combo.json", "KnapsackViz")
+        model = opt._model.get_model()
+        stats = opt._model.get_model_stats()
+
+        self.assertEqual(stats["variables"]["total"], model.nvariables())
+        self.assertEqual(stats["constraints"]["total"], model.nconstraints())
+        self.assertEqual(stats["constraints"]["rows"]["if_not_limit_constraint"], len(model.if_not_limit_constraint))
+        self.assertEqual(stats["variables"]["binary"], len(model.ALLOCATED) + len(model.PICKED))
+        self.assertEqual(stats["all_expansion"], {"rows": 3, "all_rows": 3, "all_arcs": 45, "factor": 15.0})
+
+        solve_stats = opt.get_solve_stats()
+        self.assertEqual(solve_stats["nonzeros"], stats["nonzeros"])
+
+        # the statistics are part of the history of the build
+        history_df = opt.get_history_df()
+        build = history_df[history_df["operation"] == "Building Model"].iloc[0]
+        self.assertEqual(build["attributes"]["model_stats"], stats)
+
+    def test_full_house(self):
+        opt = self._build("AlienWorldDomination_wShip.json", "FullHouseViz")
+        stats = opt._model.get_model_stats()
+        self.assertEqual(stats["constraints"]["total"], opt._model.get_model().nconstraints())
+        self.assertIn("link_parent_to_child", stats["constraints"]["rows"])
+        self.assertNotIn("all_expansion", stats)
+
+
+if __name__ == "__main__":
+    # FOR DEBUGGING USE...
+    log = logging.getLogger()
+    log.level = logging.DEBUG
+    stream_handler = logging.StreamHandler(sys.stdout)
+    log.addHandler(stream_handler)
+
+    unittest.main()
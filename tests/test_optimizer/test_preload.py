@@ -0,0 +1,54 @@
+"""
+Tests the lazy imports and the preloading of the optimizers
+"""
+
+import logging
+import os
+import subprocess
+import sys
+import unittest
+from unittest import TestCase
+
+log = logging.getLogger(__name__)
+
+# ensure that optimizer directory is in path
+app_directory = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..")
+if app_directory not in sys.path:
+    sys.path.append(app_directory)
+
+from optimizer.util.preload import preload  # noqa: E402
+
+
+class TestPreload(TestCase):
+    def setUp(self):
+        log.info("Testing: " + self.__class__.__name__ + " " + self._testMethodName + "----------")
+
+    def tearDown(self):
+        pass
+
+    def _modules_imported_by(self, code, cwd=app_directory, env=None):
+        code += "; print(','.join(m for m in ('pyomo', 'pandas', 'numpy') if m in sys.modules))"
+        output = subprocess.run([sys.executable, "-c", code], cwd=cwd, env=env, capture_output=True, text=True, check=True).stdout
+        return output.strip().splitlines()[-1] if output.strip() else ""
+
+    def test_lazy_imports(self):
+        env = dict(os.environ, DM3K_PRELOAD="0", CLEAR_LOGS="")
+        self.assertEqual(self._modules_imported_by("import sys; import run", os.path.join(app_directory, "api"), env), "")
+        self.assertEqual(self._modules_imported_by("import sys; import optimizer.slim_output_base"), "")
+
+    def test_preload(self):
+        timings = preload()
+        self.assertIn("glpk", timings["solvers"])
+        for step in ("import_sec", "probe_sec", "warm_up_sec"):
+            self.assertGreaterEqual(timings[step], 0)
+        self.assertIn("pyomo", sys.modules)
+
+
+if __name__ == "__main__":
+    # FOR DEBUGGING USE...
+    log = logging.getLogger()
+    log.level = logging.DEBUG
+    stream_handler = logging.StreamHandler(sys.stdout)
+    log.addHandler(stream_handler)
+
+    unittest.main()
@@ -0,0 +1,99 @@
+"""
+Tests the generator of synthetic problems
+"""
+
+import logging
+import os
+import sys
+import unittest
+from unittest import TestCase
+
+log = logging.getLogger(__name__)
+
+# ensure that optimizer directory is in path
+app_directory = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..")
+if app_directory not in sys.path:
+    sys.path.append(app_directory)
+
+from optimizer.slim_optimizer_main import create_opt  # noqa: E402
+from optimizer.util.problem_generator import generate_full_house_problem, generate_knapsack_problem, generate_problem  # noqa: E402
+
+
+class TestProblemGenerator(TestCase):
+    def setUp(self):
+        log.info("Testing: " + self.__class__.__name__ + " " + self._testMethodName + "----------")
+
+    def tearDown(self):
+        pass
+
+    def _build(self, input_dict, optimizer_name):
+        opt, validation_errors = create_opt(input_dict, optimizer_name)
+        self.assertEqual(validation_errors, [])
+        opt.build()
+        return opt._model.get_model_stats()
+
+    def test_knapsack_scale(self):
+        for scale in (1, 2):
+            stats = self._build(generate_problem("knapsack", scale), "KnapsackViz")
+            resources = 5 * scale
+            activities = 2 * 20 * scale
+            # ALLOCATED and ALLOCATED_AMT (1 budget) per arc, PICKED per activity
+            self.assertEqual(stats["variables"]["total"], 2 * resources * activities + activities)
+            self.assertEqual(stats["constraints"]["rows"]["available_amount_constraint"], resources)
+
+        # the same seed generates the same problem
+        self.assertEqual(generate_knapsack_problem(seed=3), generate_knapsack_problem(seed=3))
+        self.assertNotEqual(generate_knapsack_problem(seed=3), generate_knapsack_problem(seed=4))
+
+    def test_knapsack_shape(self):
+        input_dict = generate_knapsack_problem(
+            resources_per_class=4,
+            activities_per_class=6,
+            budgets_per_class=2,
+            allocation="explicit",
+            explicit_fanout=2,
+            contains_depth=2,
+            if_then_density=1,
+        )
+        viz = input_dict["files"][0]["fileContents"]
+        self.assertEqual([len(a["instanceTable"]) for a in viz["allocationInstances"]], [12, 12, 24])
+        self.assertEqual([c["allocationConstraintType"] for c in viz["allocationConstraints"]], ["Contained IF-THEN"])
+
+        stats = self._build(input_dict, "KnapsackViz")
+        rows = stats["constraints"]["rows"]
+        # 2 levels of containers above 2 activity classes of 6 activities...3 and 2 containers per class
+        self.assertEqual(rows["act_picked_contains_constraint"], 2 * (3 + 2))
+        self.assertIn("if_contains_constraint", rows)
+        self.assertEqual(rows["available_amount_constraint"], 2 * (4 + 8))
+
+        stats = self._build(generate_knapsack_problem(activity_classes_per_resource=3, if_not_density=1), "KnapsackViz")
+        self.assertIn("if_not_limit_constraint", stats["constraints"]["rows"])
+
+        with self.assertRaises(ValueError):
+            generate_knapsack_problem(allocation="explicit", if_not_density=0.5)
+        with self.assertRaises(ValueError):
+            generate_knapsack_problem(if_then_density=2)
+        with self.assertRaises(ValueError):
+            generate_problem("missing")
+
+    def test_full_house(self):
+        for allocation in ("ALL", "explicit"):
+            input_dict = generate_full_house_problem(containers=3, parent_activities=4, children_per_parent=2, allocation=allocation)
+            stats = self._build(input_dict, "FullHouseViz")
+            rows = stats["constraints"]["rows"]
+            self.assertEqual(rows["available_parent_amount"], 3)
+            self.assertEqual(rows["available_child_amount"], 6)
+            self.assertEqual(rows["child_allocated_limit"], 8)
+
+        stats = self._build(generate_problem("full_house", 2), "FullHouseViz")
+        self.assertEqual(stats["constraints"]["rows"]["available_parent_amount"], 4)
+
+
+if __name__ == "__main__":
+    # FOR DEBUGGING USE...
+    log = logging.getLogger()
+    log.level = logging.DEBUG
+    stream_handler = logging.StreamHandler(sys.stdout)
+    log.addHandler(stream_handler)
+
+    unittest.main()
@@ -0,0 +1,109 @@
+"""
+Tests the on-demand profiling of solves
+"""
+
+import json
+import logging
+import os
+import pstats
+import sys
+import tempfile
+import tracemalloc
+import unittest
+from unittest import TestCase
+
+log = logging.getLogger(__name__)
+
+# ensure that optimizer directory is in path
+app_directory = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..")
+if app_directory not in sys.path:
+    sys.path.append(app_directory)
+
+from optimizer.slim_optimizer_main import create_opt  # noqa: E402
+from optimizer.util import profiling  # noqa: E402
+from optimizer.util.problem_generator import generate_problem  # noqa: E402
+
+
+class TestProfiling(TestCase):
+    def setUp(self):
+        log.info("Testing: " + self.__class__.__name__ + " " + self._testMethodName + "----------")
+        self._temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def test_off(self):
+        capture = profiling.ProfileCapture()
+        self.assertFalse(capture.enabled)
+        with capture.active():
+            pass
+        self.assertIsNone(capture.save())
+
+        opt, _ = create_opt(generate_problem("knapsack"), "KnapsackViz")
+        opt.build()
+        self.assertIsNone(opt.save_profile())
+
+    @unittest.skipIf(tracemalloc.is_tracing(), "tracemalloc is already tracing (e.g. PYTHONTRACEMALLOC=1)")
+    def test_profile_build(self):
+        store = profiling.ProfileStore(self._temp_dir.name)
+        capture = store.capture(sample_interval_sec=0.001)
+        opt, _ = create_opt(generate_problem("knapsack", 2), "KnapsackViz", profile=capture)
+        opt.build()
+        self.assertTrue(tracemalloc.is_tracing())  # until the profile is saved, so the snapshot has all the steps
+
+        handle = opt.save_profile()
+        self.assertEqual(
+            handle["files"], [profiling.PSTATS_FILE, profiling.COLLAPSED_FILE, profiling.TRACEMALLOC_FILE, profiling.SUMMARY_FILE]
+        )
+        self.assertIs(opt.save_profile(), handle)
+        profile_id = handle["profile_id"]
+        self.assertFalse(tracemalloc.is_tracing())
+
+        stats = pstats.Stats(store.path(profile_id, profiling.PSTATS_FILE))
+        self.assertTrue(any(name == "build" for _, _, name in stats.stats))
+
+        with open(store.path(profile_id, profiling.COLLAPSED_FILE)) as f:
+            lines = f.read().splitlines()
+        self.assertGreater(len(lines), 0)
+        stack, count = lines[0].rsplit(" ", 1)
+        self.assertGreater(int(count), 0)
+        self.assertTrue(any("build (slim_optimizer_base.py" in line for line in lines))
+
+        snapshot = tracemalloc.Snapshot.load(store.path(profile_id, profiling.TRACEMALLOC_FILE))
+        self.assertGreater(len(snapshot.traces), 0)
+
+        with open(store.path(profile_id, profiling.SUMMARY_FILE)) as f:
+            summary = json.load(f)
+        self.assertEqual(summary["profile_id"], profile_id)
+        self.assertGreater(summary["profiled_sec"], 0)
+        self.assertGreater(summary["samples"], 0)
+        self.assertTrue(summary["top_functions"])
+        self.assertTrue(summary["top_allocations"])
+
+    def test_store(self):
+        store = profiling.ProfileStore(self._temp_dir.name, max_profiles=2)
+        profile_ids = []
+        for _ in range(3):
+            capture = store.capture()
+            with capture.active():
+                sum(range(1000))
+            profile_ids.append(capture.save()["profile_id"])
+
+        # only the latest profiles are kept
+        self.assertEqual(sorted(os.listdir(self._temp_dir.name)), sorted(profile_ids[1:]))
+        self.assertIsNone(store.path(profile_ids[0], profiling.SUMMARY_FILE))
+        self.assertIsNotNone(store.path(profile_ids[2], profiling.SUMMARY_FILE))
+        with self.assertRaises(ValueError):
+            store.path("../" + profile_ids[2], profiling.SUMMARY_FILE)
+        with self.assertRaises(ValueError):
+            store.path(profile_ids[2], "../../etc/passwd")
+
+
+if __name__ == "__main__":
+    # FOR DEBUGGING USE...
+    log = logging.getLogger()
+    log.level = logging.DEBUG
+    stream_handler = logging.StreamHandler(sys.stdout)
+    log.addHandler(stream_handler)
+
+    unittest.main()
@@ -0,0 +1,130 @@
+"""
+Tests reporting and following the progress of a solve
+"""
+
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import TestCase
+
+log = logging.getLogger(__name__)
+
+# ensure that optimizer directory is in path
+app_directory = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..")
+if app_directory not in sys.path:
+    sys.path.append(app_directory)
+
+from optimizer.knapsack.knapsack_model import KnapsackModel  # noqa: E402
+from optimizer.slim_optimizer_main import create_opt  # noqa: E402
+from optimizer.util.glpk_log import parse_mip_progress  # noqa: E402
+from optimizer.util.progress import DONE, ProgressBoard  # noqa: E402
+
+GLPK_LOG_LINES = [
+    "Integer optimization begins...\n",
+    "+    15: mip =     not found yet <=              +inf        (1; 0)\n",
+    "+    40: >>>>>   1.000000000e+01 <=   1.500000000e+01  33.3% (4; 0)\n",
+    "+    71: >>>>>   1.400000000e+01 <=   1.500000000e+01   6.7% (2; 3)\n",
+    "+    80: mip =   1.400000000e+01 <=     tree is empty   0.0% (0; 7)\n",
+]
+
+
+class TestProgress(TestCase):
+    def setUp(self):
+        log.info("Testing: " + self.__class__.__name__ + " " + self._testMethodName + "----------")
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._board = ProgressBoard(self._temp_dir.name)
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def _events(self, progress_id, **kwargs):
+        return [event for _, event in self._board.follow(progress_id, poll_interval_sec=0.01, **kwargs)]
+
+    def test_parse_mip_progress(self):
+        self.assertIsNone(parse_mip_progress(GLPK_LOG_LINES[0]))
+        self.assertEqual(
+            parse_mip_progress(GLPK_LOG_LINES[1]), {"iteration": 15, "objective": None, "bound": None, "gap": None, "new_incumbent": False}
+        )
+        self.assertEqual(
+            parse_mip_progress(GLPK_LOG_LINES[2]), {"iteration": 40, "objective": 10.0, "bound": 15.0, "gap": 0.333, "new_incumbent": True}
+        )
+        self.assertEqual(parse_mip_progress(GLPK_LOG_LINES[4])["bound"], None)
+
+    def test_phases(self):
+        with open(os.path.join(app_directory, "examples", "simpleKnapsack.json"), "r") as f:
+            input_dict = json.load(f)
+
+        progress = self._board.reporter("phases")
+        opt, _ = create_opt(input_dict, "KnapsackViz", progress=progress)
+        opt.build()
+        progress.done(200, "OK")
+
+        events = self._events("phases")
+        self.assertEqual([e["event"] for e in events], ["start", "phase", "phase", "done"])
+        self.assertEqual([e.get("phase") for e in events[1:3]], ["ingest", "build"])
+        self.assertEqual(events[0]["pid"], os.getpid())
+
+    def test_incumbents_from_solver_log(self):
+        progress = self._board.reporter("incumbents")
+        model = KnapsackModel()
+        model.progress = progress
+        model._check_status_interval_sec = 0.01
+        model._pyomo_log_name = os.path.join(self._temp_dir.name, "glpk.log")
+
+        # the solver appends to its log while check_solve_status watches it
+        model._continue_check_status = True
+        status_thread = threading.Thread(target=model.check_solve_status)
+        status_thread.start()
+        for line in GLPK_LOG_LINES:
+            with open(model._pyomo_log_name, "a") as f:
+                f.write(line)
+            time.sleep(0.1)
+        model._continue_check_status = False
+        status_thread.join()
+        progress.done(200, "OK")
+
+        events = self._events("incumbents")
+        self.assertEqual(events[1], {"event": "phase", "phase": "solve", "elapsed_sec": events[1]["elapsed_sec"]})
+        incumbents = [(e["objective"], e["bound"], e["gap"]) for e in events if e["event"] == "incumbent"]
+        self.assertEqual(incumbents, [(None, None, None), (10.0, 15.0, 0.333), (14.0, 15.0, 0.067), (14.0, None, 0.0)])
+
+    def test_follow(self):
+        # no solve with this id
+        events = self._events("missing", wait_sec=0.05)
+        self.assertEqual([(e["event"], e["statusCode"]) for e in events], [(DONE, 404)])
+
+        with self.assertRaises(ValueError):
+            self._board.follow("../escape")
+
+        # a client that follows a solve while it runs, then reconnects after the second event
+        progress = self._board.reporter("running")
+
+        def solve():
+            for phase in ("ingest", "build", "solve"):
+                time.sleep(0.05)
+                progress.phase(phase)
+            progress.done(200, "OK")
+
+        thread = threading.Thread(target=solve)
+        thread.start()
+        events = self._events("running")
+        thread.join()
+        self.assertEqual([e.get("phase", e["event"]) for e in events], ["start", "ingest", "build", "solve", "done"])
+
+        reconnected = list(self._board.follow("running", last_event_id=1))
+        self.assertEqual([event_id for event_id, _ in reconnected], [2, 3, 4])
+
+
+if __name__ == "__main__":
+    # FOR DEBUGGING USE...
+    log = logging.getLogger()
+    log.level = logging.DEBUG
+    stream_handler = logging.StreamHandler(sys.stdout)
+    log.addHandler(stream_handler)
+
+    unittest.main()
@@ -0,0 +1,93 @@
+"""
+Tests the content-addressed result cache
+"""
+
+import copy
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from unittest import TestCase
+
+log = logging.getLogger(__name__)
+
+# ensure that optimizer directory is in path
+app_directory = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..")
+if app_directory not in sys.path:
+    sys.path.append(app_directory)
+
+from optimizer.util.result_cache import ResultCache, problem_key  # noqa: E402
+
+
+class TestResultCache(TestCase):
+    def setUp(self):
+        log.info("Testing: " + self.__class__.__name__ + " " + self._testMethodName + "----------")
+        self._cache_dir = tempfile.mkdtemp()
+
+        path_to_file = os.path.join(app_directory, "examples", "simpleKnapsack.json")
+        with open(path_to_file, "r") as f:
+            self._input_dict = json.load(f)
+
+    def tearDown(self):
+        shutil.rmtree(self._cache_dir, ignore_errors=True)
+
+    def test_key_ignores_ui_fields(self):
+        moved = copy.deepcopy(self._input_dict)
+        moved["datasetName"] = "renamed"
+        for ac in moved["files"][0]["fileContents"]["activityClasses"]:
+            ac["locX"] += 100
+            ac["locY"] += 100
+
+        self.assertEqual(problem_key(self._input_dict, "KnapsackViz"), problem_key(moved, "KnapsackViz"))
+
+    def test_key_changes_with_problem(self):
+        changed = copy.deepcopy(self._input_dict)
+        changed["files"][0]["fileContents"]["resourceInstances"][0]["instanceTable"][0]["budget"]["space"] = 2
+
+        key = problem_key(self._input_dict, "KnapsackViz")
+        self.assertNotEqual(key, problem_key(changed, "KnapsackViz"))
+        self.assertNotEqual(key, problem_key(self._input_dict, "FullHouseViz"))
+        self.assertNotEqual(key, problem_key(self._input_dict, "KnapsackViz", {"mipgap": 0.1}))
+
+    def test_memory_and_disk_tiers(self):
+        cache = ResultCache(cache_dir=self._cache_dir)
+        self.assertIsNone(cache.get("abc"))
+        cache.put("abc", {"objective_value": 1})
+        self.assertEqual(cache.get("abc"), {"objective_value": 1})
+
+        # a second cache (i.e. another uwsgi worker) finds the result on disk
+        other_cache = ResultCache(cache_dir=self._cache_dir)
+        self.assertEqual(other_cache.get("abc"), {"objective_value": 1})
+
+        self.assertEqual(cache.get_stats()["memory_hits"], 1)
+        self.assertEqual(cache.get_stats()["misses"], 1)
+        self.assertEqual(other_cache.get_stats()["disk_hits"], 1)
+
+    def test_byte_size_eviction(self):
+        cache = ResultCache(cache_dir=self._cache_dir, max_memory_bytes=100, max_disk_bytes=100)
+        cache.put("first", {"value": "x" * 50})
+        cache.put("second", {"value": "y" * 50})
+
+        self.assertEqual(cache.get_stats()["memory_entries"], 1)
+        self.assertEqual(os.listdir(self._cache_dir), ["second.json"])
+        self.assertIsNone(cache.get("first"))
+
+    def test_ttl(self):
+        cache = ResultCache(cache_dir=self._cache_dir, ttl_sec=0.1)
+        cache.put("abc", {"objective_value": 1})
+        time.sleep(0.2)
+        self.assertIsNone(cache.get("abc"))
+
+
+if __name__ == "__main__":
+    # FOR DEBUGGING USE...
+    log = logging.getLogger()
+    log.level = logging.DEBUG
+    stream_handler = logging.StreamHandler(sys.stdout)
+    log.addHandler(stream_handler)
+
+    unittest.main()
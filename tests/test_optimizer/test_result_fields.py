@@ -0,0 +1,86 @@
+"""
+Tests building results without the full trace and generating the full trace row by row
+"""
+
+import json
+import logging
+import os
+import sys
+import unittest
+from unittest import TestCase
+
+log = logging.getLogger(__name__)
+
+# ensure that optimizer directory is in path
+app_directory = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..")
+if app_directory not in sys.path:
+    sys.path.append(app_directory)
+
+from optimizer.slim_optimizer_main import create_opt  # noqa: E402
+from optimizer.slim_output_base import TRACE_KEY, OutputBase, iter_trace_columns, select_fields  # noqa: E402
+
+
+class TestResultFields(TestCase):
+    def setUp(self):
+        log.info("Testing: " + self.__class__.__name__ + " " + self._testMethodName + "----------")
+
+    def tearDown(self):
+        pass
+
+    def _build_allocated(self, data_filename, opt_name):
+        """
+        Build a model and set its variables (from a repaired warm start that allocates everything) so output can be filled
+        without a solver
+        """
+        path_to_file = os.path.join(app_directory, "examples", data_filename)
+        with open(path_to_file, "r") as f:
+            input_dict = json.load(f)
+
+        opt, _ = create_opt(input_dict, opt_name)
+        opt.build()
+        model = opt._model
+
+        allocations = {}
+        for name, acts in opt._input.to_data().get("parent_possible_allocations", {}).items():
+            allocations[name] = list(acts)
+        for name, acts in opt._input.to_data().get("child_possible_allocations", {}).items():
+            allocations[name] = list(acts)
+        if not allocations:
+            for (r_id, a_id) in model.get_model().r_a_arcs:
+                allocations.setdefault(model._res_id_to_name[r_id], []).append(model._act_id_to_name[a_id])
+
+        self.assertTrue(model.warm_start({"allocations": allocations}))
+        return model
+
+    def _check_trace(self, model):
+        full = model.fill_output(OutputBase).result
+        no_trace = model.fill_output(OutputBase, include_trace=False).result
+
+        self.assertGreater(len(full[TRACE_KEY]["resource"]), 0)
+        self.assertEqual(no_trace[TRACE_KEY]["resource"], [])
+        self.assertEqual(
+            select_fields(no_trace, ["objective_value", "allocations"]), select_fields(full, ["objective_value", "allocations"])
+        )
+
+        self.assertEqual(list(model.iter_trace_rows()), list(iter_trace_columns(full[TRACE_KEY])))
+
+    def test_knapsack_trace(self):
+        self._check_trace(self._build_allocated("fanOutKnapsack_ifNot_multi_combo.json", "KnapsackViz"))
+
+    def test_full_house_trace(self):
+        self._check_trace(self._build_allocated("AlienWorldDomination_wShip.json", "FullHouseViz"))
+
+    def test_select_fields(self):
+        result = {"objective_value": 1, "allocations": {}, TRACE_KEY: {}}
+        self.assertEqual(select_fields(result, ["objective_value", "no_such_field"]), {"objective_value": 1})
+        self.assertIs(select_fields(result), result)
+
+
+if __name__ == "__main__":
+    # FOR DEBUGGING USE...
+    log = logging.getLogger()
+    log.level = logging.DEBUG
+    stream_handler = logging.StreamHandler(sys.stdout)
+    log.addHandler(stream_handler)
+
+    unittest.main()
@@ -0,0 +1,161 @@
+"""
+Tests what-if scenarios of a base problem
+"""
+
+import json
+import logging
+import os
+import sys
+import unittest
+from unittest import TestCase
+
+log = logging.getLogger(__name__)
+
+# ensure that optimizer directory is in path
+app_directory = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..")
+if app_directory not in sys.path:
+    sys.path.append(app_directory)
+
+from optimizer.slim_optimizer_base import ModelBase  # noqa: E402
+from optimizer.slim_optimizer_main import create_opt  # noqa: E402
+from optimizer.util.scenario import apply_deltas, diff_results, solve_scenarios  # noqa: E402
+
+
+class NoForcingModel(ModelBase):
+    # a model that does not override force_activity
+    def can_solve(self, input_instance):
+        return True
+
+    def build(self, data):
+        pass
+
+    def fill_output(self, output_class, include_trace=True):
+        return None
+
+
+class TestScenario(TestCase):
+    def setUp(self):
+        log.info("Testing: " + self.__class__.__name__ + " " + self._testMethodName + "----------")
+
+    def tearDown(self):
+        pass
+
+    def _load(self, data_filename, opt_name):
+        with open(os.path.join(app_directory, "examples", data_filename), "r") as f:
+            input_dict = json.load(f)
+        input_dict["algorithm"] = opt_name
+        return input_dict
+
+    def test_apply_deltas(self):
+        base = self._load("fanOutKnapsack_ifNot_multi_combo.json", "KnapsackViz")
+        base_text = json.dumps(base)
+        deltas = [
+            {"op": "budget", "resource": "ALL", "factor": 2},
+            {"op": "reward", "activity": "People", "value": 5},
+            {"op": "removeActivity", "activity": "Garbage_Activity_instance_0"},
+            {"op": "forceActivity", "activity": "Furniture_Activity_instance_0"},
+        ]
+
+        variant, forced = apply_deltas(base, deltas)
+
+        self.assertEqual(json.dumps(base), base_text)  # the base is not changed
+        contents = variant["files"][0]["fileContents"]
+        base_contents = base["files"][0]["fileContents"]
+        for group, base_group in zip(contents["resourceInstances"], base_contents["resourceInstances"]):
+            for inst, base_inst in zip(group["instanceTable"], base_group["instanceTable"]):
+                self.assertEqual(inst["budget"], {k: v * 2 for k, v in base_inst["budget"].items()})
+        activity_names = [i["instanceName"] for g in contents["activityInstances"] for i in g["instanceTable"]]
+        self.assertNotIn("Garbage_Activity_instance_0", activity_names)
+        for group in contents["activityInstances"]:
+            if group["className"] == "People":
+                self.assertTrue(all(i["reward"] == 5 for i in group["instanceTable"]))
+        self.assertEqual(forced, {"Furniture_Activity_instance_0": True})
+
+        # the variant can still be ingested and built
+        opt, validation_errors = create_opt(variant, "KnapsackViz")
+        opt.build()
+        opt._model.force_activities(forced)
+        self.assertTrue(opt._model.get_model().PICKED[opt._model._act_name_to_id["Furniture_Activity_instance_0"]].fixed)
+
+    def test_invalid_deltas(self):
+        base = self._load("simpleKnapsack.json", "KnapsackViz")
+        for delta in [
+            {"op": "budget", "resource": "no_such_resource", "value": 1},
+            {"op": "no_such_op"},
+            {"op": "reward", "activity": "ALL"},
+        ]:
+            with self.assertRaises(ValueError):
+                apply_deltas(base, [delta])
+
+    def test_full_house_force_activity(self):
+        base = self._load("AlienWorldDomination_wShip.json", "FullHouseViz")
+        opt, _ = create_opt(base, "FullHouseViz")
+        opt.build()
+        model = opt._model
+        child_activity = model._data["child_activities"][0]
+        parent_activity = model._data["parent_activities"][0]
+
+        model.force_activities({child_activity: True, parent_activity: False})
+
+        self.assertEqual(len(model.get_model().forced_activity_constraint), 1)
+        pa = model._rev_pa[parent_activity]
+        self.assertTrue(all(model.get_model().PARENT_ALLOCATED[pr, a].fixed for (pr, a) in model.get_model().pr_pa_arcs if a == pa))
+        with self.assertRaises(ValueError):
+            model.force_activities({"no_such_activity": True})
+
+    def test_force_activity_not_supported(self):
+        with self.assertRaisesRegex(ValueError, "NoForcingModel does not support forcing activities"):
+            NoForcingModel().force_activities({"a1": True})
+
+    def test_diff_results(self):
+        base = {"objective_value": 3, "allocations": {"r1": ["a1", "a2"], "r2": ["a3"]}}
+        result = {"objective_value": 4, "allocations": {"r1": ["a1"], "r3": ["a2", "a4"]}}
+        self.assertEqual(
+            diff_results(base, result),
+            {"objective_value_change": 1, "added_allocations": {"r3": ["a2", "a4"]}, "removed_allocations": {"r1": ["a2"], "r2": ["a3"]}},
+        )
+
+    def test_solve_scenarios(self):
+        base = self._load("simpleKnapsack.json", "KnapsackViz")
+        scenarios = [
+            {"name": "no space", "deltas": [{"op": "budget", "resource": "backpack", "value": 0}]},
+            {"name": "bad", "deltas": [{"op": "removeResource", "resource": "no_such_resource"}]},
+            {"name": "more reward", "deltas": [{"op": "reward", "activity": "ALL", "factor": 3}]},
+        ]
+
+        responses = dict(solve_scenarios(base, scenarios, max_workers=2))
+
+        self.assertEqual(responses["base"]["body"]["objective_value"], 1)
+        self.assertEqual(responses[0]["diff"]["objective_value_change"], -1)
+        self.assertEqual(responses[0]["diff"]["removed_allocations"], {"backpack_Resource_instance_0": ["item_Activity_instance_0"]})
+        self.assertEqual(responses[1]["statusCode"], 400)
+        self.assertEqual(responses[2]["name"], "more reward")
+        self.assertEqual(responses[2]["diff"]["objective_value_change"], 2)
+
+    def test_solve_scenarios_change_optimum(self):
+        # each scenario is warm started from the base result...a scenario must still come back with its own optimum
+        base = self._load("multiBudgetKnapsack.json", "KnapsackViz")
+        scenarios = [
+            {"name": "double budgets", "deltas": [{"op": "budget", "resource": "ALL", "factor": 2}]},
+            {"name": "force job 4", "deltas": [{"op": "forceActivity", "activity": "job_Activity_instance_4"}]},
+        ]
+
+        responses = dict(solve_scenarios(base, scenarios, max_workers=2))
+
+        self.assertEqual(responses["base"]["body"]["objective_value"], 4)
+        # the base allocations still fit the doubled budgets, but they are no longer optimal
+        self.assertEqual(responses[0]["body"]["objective_value"], 6)
+        self.assertEqual(responses[0]["diff"]["objective_value_change"], 2)
+        allocated = [act for acts in responses[1]["body"]["allocations"].values() for act in acts]
+        self.assertIn("job_Activity_instance_4", allocated)
+        self.assertEqual(responses[1]["diff"]["objective_value_change"], -1)
+
+
+if __name__ == "__main__":
+    # FOR DEBUGGING USE...
+    log = logging.getLogger()
+    log.level = logging.DEBUG
+    stream_handler = logging.StreamHandler(sys.stdout)
+    log.addHandler(stream_handler)
+
+    unittest.main()
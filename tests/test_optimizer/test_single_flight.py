@@ -0,0 +1,200 @@
+"""
+Tests single-flight coalescing of identical solves
+"""
+
+import fcntl
+import logging
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import TestCase
+
+log = logging.getLogger(__name__)
+
+# ensure that optimizer directory is in path
+app_directory = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..")
+if app_directory not in sys.path:
+    sys.path.append(app_directory)
+
+from optimizer.util.cancel import CancellationToken, Cancelled  # noqa: E402
+from optimizer.util.deadline import Deadline, DeadlineExceeded  # noqa: E402
+from optimizer.util.single_flight import SingleFlight  # noqa: E402
+
+
+def _die_while_leading(lock_dir, key):
+    def solve_and_die():
+        time.sleep(0.5)
+        os._exit(1)
+
+    SingleFlight(lock_dir).run(key, solve_and_die)
+
+
+class TestSingleFlight(TestCase):
+    def setUp(self):
+        log.info("Testing: " + self.__class__.__name__ + " " + self._testMethodName + "----------")
+        self._lock_dir = tempfile.mkdtemp()
+        self._num_solves = 0
+
+    def tearDown(self):
+        shutil.rmtree(self._lock_dir, ignore_errors=True)
+
+    def _slow_solve(self):
+        self._num_solves += 1
+        time.sleep(0.5)
+        return {"objective_value": 7}
+
+    def test_concurrent_solves_are_coalesced(self):
+        results = []
+
+        def post():
+            # a separate SingleFlight per thread acts like a separate uwsgi worker
+            results.append(SingleFlight(self._lock_dir, poll_interval_sec=0.01).run("abc", self._slow_solve))
+
+        threads = [threading.Thread(target=post) for _ in range(4)]
+        for t in threads:
+            t.start()
+            time.sleep(0.05)
+        for t in threads:
+            t.join()
+
+        self.assertEqual(self._num_solves, 1)
+        self.assertEqual(results, [{"objective_value": 7}] * 4)
+
+    def test_result_not_shared(self):
+        # e.g. a solve that was stopped by its time limit...each request solves the problem itself
+        results = []
+
+        def post():
+            single_flight = SingleFlight(self._lock_dir, poll_interval_sec=0.01)
+            results.append(single_flight.run("abc", self._slow_solve, share=lambda result: result["objective_value"] > 7))
+
+        threads = [threading.Thread(target=post) for _ in range(3)]
+        for t in threads:
+            t.start()
+            time.sleep(0.05)
+        for t in threads:
+            t.join()
+
+        self.assertEqual(self._num_solves, 3)
+        self.assertEqual(results, [{"objective_value": 7}] * 3)
+        self.assertFalse(os.path.exists(os.path.join(self._lock_dir, "abc.result")))
+
+    def test_different_keys_are_not_coalesced(self):
+        single_flight = SingleFlight(self._lock_dir)
+        single_flight.run("abc", self._slow_solve)
+        single_flight.run("def", self._slow_solve)
+        self.assertEqual(self._num_solves, 2)
+        self.assertEqual(single_flight.get_stats()["leaders"], 2)
+
+    def test_follower_takes_over_from_dead_leader(self):
+        leader = multiprocessing.Process(target=_die_while_leading, args=(self._lock_dir, "abc"))
+        leader.start()
+        time.sleep(0.2)
+
+        single_flight = SingleFlight(self._lock_dir, poll_interval_sec=0.01)
+        result = single_flight.run("abc", lambda: {"objective_value": 3})
+        leader.join()
+
+        self.assertEqual(result, {"objective_value": 3})
+        self.assertEqual(single_flight.get_stats()["leaders"], 1)
+
+    def test_wait_timeout(self):
+        started = threading.Event()
+
+        def lead():
+            SingleFlight(self._lock_dir).run("abc", lambda: started.set() or time.sleep(1.0) or {"objective_value": 1})
+
+        leader = threading.Thread(target=lead)
+        leader.start()
+        started.wait()
+
+        single_flight = SingleFlight(self._lock_dir, wait_timeout_sec=0.1, poll_interval_sec=0.01)
+        result = single_flight.run("abc", lambda: {"objective_value": 2})
+        leader.join()
+
+        self.assertEqual(result, {"objective_value": 2})
+        self.assertEqual(single_flight.get_stats()["timeouts"], 1)
+
+    def test_follower_stops_on_cancel(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def lead():
+            SingleFlight(self._lock_dir).run("abc", lambda: started.set() or release.wait(5) or {"objective_value": 1})
+
+        leader = threading.Thread(target=lead)
+        leader.start()
+        started.wait()
+
+        # a follower whose client disconnected, and one whose deadline passes, stop waiting for the leader right away
+        single_flight = SingleFlight(self._lock_dir, poll_interval_sec=0.01)
+        cancel_token = CancellationToken()
+        threading.Timer(0.1, cancel_token.cancel, args=("The client disconnected",)).start()
+        start = time.time()
+        with self.assertRaises(Cancelled):
+            single_flight.run("abc", self._slow_solve, cancel_token=cancel_token)
+        with self.assertRaises(DeadlineExceeded):
+            single_flight.run("abc", self._slow_solve, cancel_token=Deadline(0.1))
+        self.assertLess(time.time() - start, 1)
+        release.set()
+        leader.join()
+
+        self.assertEqual(self._num_solves, 0)
+        self.assertEqual(single_flight.get_stats()["leaders"], 0)
+
+    def test_old_lock_files_are_removed(self):
+        single_flight = SingleFlight(self._lock_dir, result_ttl_sec=60)
+        single_flight.run("abc", lambda: {"objective_value": 1})
+        single_flight.run("def", lambda: {"objective_value": 2})
+        old_time = time.time() - 120
+        for name in os.listdir(self._lock_dir):
+            os.utime(os.path.join(self._lock_dir, name), (old_time, old_time))
+
+        # the old files of a solve in flight are kept...the others are removed by the next solve
+        fd = os.open(os.path.join(self._lock_dir, "def.lock"), os.O_RDWR)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            single_flight.run("ghi", lambda: {"objective_value": 3})
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+        self.assertEqual(sorted(os.listdir(self._lock_dir)), ["def.lock", "ghi.lock", "ghi.result"])
+
+    def test_lock_file_removed_while_waiting(self):
+        # a follower waits on a lock file that is removed after the leader is done...it then leads on the new lock file
+        single_flight = SingleFlight(self._lock_dir, poll_interval_sec=0.01)
+        lock_path = os.path.join(self._lock_dir, "abc.lock")
+        fd = os.open(lock_path, os.O_CREAT | os.O_RDWR, 0o644)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+
+        def remove_and_unlock():
+            os.remove(lock_path)
+            holder = os.open(lock_path, os.O_CREAT | os.O_RDWR, 0o644)  # another process that leads on the new lock file
+            fcntl.flock(holder, fcntl.LOCK_EX)
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            time.sleep(0.3)
+            single_flight._write_result("abc", {"objective_value": 5})
+            fcntl.flock(holder, fcntl.LOCK_UN)
+            os.close(holder)
+
+        threading.Timer(0.1, remove_and_unlock).start()
+        result = single_flight.run("abc", self._slow_solve)
+        os.close(fd)
+
+        self.assertEqual(result, {"objective_value": 5})
+        self.assertEqual(self._num_solves, 0)
+
+
+if __name__ == "__main__":
+    # FOR DEBUGGING USE...
+    log = logging.getLogger()
+    log.level = logging.DEBUG
+    stream_handler = logging.StreamHandler(sys.stdout)
+    log.addHandler(stream_handler)
+
+    unittest.main()
@@ -0,0 +1,81 @@
+"""
+Tests sampling the resource usage of solver processes
+"""
+
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import TestCase
+
+import psutil
+
+log = logging.getLogger(__name__)
+
+# ensure that optimizer directory is in path
+app_directory = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..")
+if app_directory not in sys.path:
+    sys.path.append(app_directory)
+
+from optimizer.util.solver_usage import SolverUsageMonitor  # noqa: E402
+
+# stands in for a solver...allocates 64 MB, burns some CPU and writes its "solution" to the file on its command line
+FAKE_SOLVER = """
+import sys, time
+memory = bytearray(64 * 2 ** 20)
+start = time.process_time()
+while time.process_time() - start < 0.2:
+    pass
+with open(sys.argv[1], "w") as f:
+    f.write("x" * 2 ** 20)
+time.sleep(0.3)
+"""
+
+
+class TestSolverUsage(TestCase):
+    def setUp(self):
+        log.info("Testing: " + self.__class__.__name__ + " " + self._testMethodName + "----------")
+        self._temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def test_sample_process(self):
+        solution_path = os.path.join(self._temp_dir.name, "solution.raw")
+        open(solution_path, "w").close()
+        procs = []
+
+        def find_processes():
+            return [psutil.Process(p.pid) for p in procs if p.poll() is None]
+
+        with SolverUsageMonitor(find_processes, interval_sec=0.02) as monitor:
+            procs.append(subprocess.Popen([sys.executable, "-c", FAKE_SOLVER, solution_path]))
+            procs[0].wait()
+
+        usage = monitor.usage
+        self.assertEqual(usage["processes"], 1)
+        self.assertGreater(usage["samples"], 1)
+        self.assertGreater(usage["peak_rss_MB"], 64)
+        self.assertGreater(usage["cpu_user_sec"] + usage["cpu_system_sec"], 0.1)
+        self.assertEqual(usage["files_MB"], {"solution.raw": 1.0})
+        if usage["io_write_MB"] is not None:
+            self.assertGreaterEqual(usage["io_write_MB"], 1.0)
+
+    def test_no_process(self):
+        with SolverUsageMonitor(lambda: [], interval_sec=0.01) as monitor:
+            pass
+        self.assertEqual(monitor.usage["processes"], 0)
+        self.assertIsNone(monitor.usage["peak_rss_MB"])
+        self.assertEqual(monitor.usage["files_MB"], {})
+
+
+if __name__ == "__main__":
+    # FOR DEBUGGING USE...
+    log = logging.getLogger()
+    log.level = logging.DEBUG
+    stream_handler = logging.StreamHandler(sys.stdout)
+    log.addHandler(stream_handler)
+
+    unittest.main()
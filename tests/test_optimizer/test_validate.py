@@ -0,0 +1,160 @@
+"""
+Tests validating input without building the model
+"""
+
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+import unittest
+from unittest import TestCase
+
+from pyomo.environ import Var
+
+log = logging.getLogger(__name__)
+
+# ensure that optimizer directory is in path
+app_directory = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..")
+if app_directory not in sys.path:
+    sys.path.append(app_directory)
+
+from optimizer.full_house.full_house_input import FullHouseInput  # noqa: E402
+from optimizer.full_house.full_house_input_viz import FullHouseInputViz  # noqa: E402
+from optimizer.slim_optimizer_main import algorithm_dict, create_opt  # noqa: E402
+from optimizer.slim_optimizer_validate import input_class_dict, validate_input  # noqa: E402
+from optimizer.util.problem_generator import generate_full_house_problem  # noqa: E402
+
+
+class TestValidate(TestCase):
+    def setUp(self):
+        log.info("Testing: " + self.__class__.__name__ + " " + self._testMethodName + "----------")
+
+    def tearDown(self):
+        pass
+
+    def _load(self, data_filename):
+        with open(os.path.join(app_directory, "examples", data_filename), "r") as f:
+            return json.load(f)
+
+    def test_input_classes_match_optimizers(self):
+        self.assertEqual(sorted(input_class_dict.keys()), sorted(algorithm_dict.keys()))
+        for name, optimizer_class in algorithm_dict.items():
+            self.assertIs(type(optimizer_class()._input), input_class_dict[name])
+
+    def test_does_not_import_pyomo(self):
+        code = "import sys; import optimizer.slim_optimizer_validate; print('pyomo' in sys.modules)"
+        output = subprocess.run([sys.executable, "-c", code], cwd=app_directory, capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip(), "False")
+
+    def test_size_estimate(self):
+        for data_filename, opt_name in [
+            ("fanOutKnapsack_ifNot_multi_combo.json", "KnapsackViz"),
+            ("AlienWorldDomination_wShip.json", "FullHouseViz"),
+        ]:
+            input_dict = self._load(data_filename)
+            fatal, validation_errors, size_estimate = validate_input(input_dict, opt_name)
+            self.assertFalse(fatal)
+
+            opt, opt_validation_errors = create_opt(self._load(data_filename), opt_name)
+            self.assertEqual(validation_errors, opt_validation_errors)
+            opt.build()
+            num_vars = sum(1 for _ in opt._model.get_model().component_data_objects(Var))
+            self.assertEqual(size_estimate["variables"], num_vars)
+
+    def test_fatal_errors(self):
+        fatal, validation_errors, size_estimate = validate_input(self._load("simpleKnapsack.json"), "FullHouseViz")
+        self.assertTrue(fatal)
+        self.assertGreater(len(validation_errors), 0)
+        self.assertEqual(size_estimate, {})
+
+        with self.assertRaises(TypeError):
+            validate_input(self._load("simpleKnapsack.json"), "no_such_optimizer")
+
+    def test_full_house_validate_large(self):
+        # 100k child activities of 10k parent activities, allocated to 1000 child and 100 parent resources.  The last child
+        # resource has no allocations, so its 100 activities have no cost and are dropped from the child activities.
+        cas = ["ca{}".format(i) for i in range(100000)]
+        pas = ["pa{}".format(i) for i in range(10000)]
+        crs = ["cr{}".format(i) for i in range(1000)]
+        prs = ["pr{}".format(i) for i in range(100)]
+        child_allocations = {cr: cas[i * 100 : (i + 1) * 100] for i, cr in enumerate(crs[:-1])}
+        child_allocations[crs[-1]] = []
+        parent_allocations = {pr: pas[i * 100 : (i + 1) * 100] for i, pr in enumerate(prs)}
+
+        fh_input = FullHouseInput()
+        fh_input._data = {
+            "resource_families": {"container": {"child_resources": list(crs), "parent_resources": list(prs)}},
+            "req_child_amt": {(cr, ca): 1 for cr, ca_names in child_allocations.items() for ca in ca_names},
+            "req_parent_amt": {(pr, pa): 1 for pr, pa_names in parent_allocations.items() for pa in pa_names},
+            "avail_child_amt": dict.fromkeys(crs, 10),
+            "avail_parent_amt": dict.fromkeys(prs, 10),
+            "child_resources": list(crs),
+            "parent_resources": list(prs),
+            "force_list": [],
+            "forbid_list": [],
+            "child_activities": list(cas),
+            "parent_activities": list(pas),
+            "child_possible_allocations": child_allocations,
+            "parent_possible_allocations": parent_allocations,
+            "activity_children": {pa: cas[i * 10 : (i + 1) * 10] for i, pa in enumerate(pas)},
+            "parent_budget_name": "parent_budget",
+            "child_budget_name": "child_budget",
+            "child_score": dict.fromkeys(cas, 1),
+        }
+
+        start = time.time()
+        fh_input._validate()
+        # a few tenths of a second...the checks used to scan lists inside loops, which took minutes for this input
+        self.assertLess(time.time() - start, 10)
+
+        self.assertEqual(
+            [(e["err_code"], e["err_txt"], e["is_fatal_error"]) for e in fh_input._validation_errors],
+            [
+                (
+                    4,
+                    "There are 100 child activit(ies) listed in activity.csv and not in the child activities list: "
+                    "['ca99900', 'ca99901', 'ca99902', 'ca99903', 'ca99904']",
+                    True,
+                ),
+                (3, "Child resource cr999 has no allocations", False),
+            ],
+        )
+        data = fh_input.to_data()
+        self.assertEqual(data["child_activities"], cas[:99900])
+        self.assertEqual(len(data["child_score"]), 99900)
+        self.assertNotIn("cr999", data["child_resources"])
+        self.assertNotIn("cr999", data["resource_families"]["container"]["child_resources"])
+        self.assertNotIn("cr999", data["avail_child_amt"])
+        self.assertNotIn("cr999", data["child_possible_allocations"])
+
+    def test_full_house_viz_ingest_large(self):
+        # 5000 child activities of 1000 parent activities, allocated with ALL rows to 40 child and 20 parent resources
+        input_dict = generate_full_house_problem(containers=20, parent_activities=1000, children_per_parent=5)
+        size_estimate = FullHouseInputViz.estimate_input_size(input_dict)
+
+        fh_input = FullHouseInputViz()
+        start = time.time()
+        fatal, validation_errors = fh_input.ingest_validate(input_dict)
+        # well under a second...the properties of the instances used to be found by scanning every instance, which took a minute
+        self.assertLess(time.time() - start, 20)
+        self.assertFalse(fatal)
+        self.assertEqual(validation_errors, [])
+
+        data = fh_input.to_data()
+        self.assertEqual(fh_input.estimate_size(), size_estimate)
+        self.assertEqual(len(data["child_activities"]), 5000)
+        self.assertEqual(len(data["req_child_amt"]), 40 * 5000)
+        self.assertEqual(len(data["child_score"]), 5000)
+        self.assertEqual(sum(len(children) for children in data["activity_children"].values()), 5000)
+
+
+if __name__ == "__main__":
+    # FOR DEBUGGING USE...
+    log = logging.getLogger()
+    log.level = logging.DEBUG
+    stream_handler = logging.StreamHandler(sys.stdout)
+    log.addHandler(stream_handler)
+
+    unittest.main()
@@ -0,0 +1,96 @@
+"""
+Tests warm starting a model from a previous result
+"""
+
+import json
+import logging
+import os
+import sys
+import unittest
+from unittest import TestCase
+
+log = logging.getLogger(__name__)
+
+# ensure that optimizer directory is in path
+app_directory = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..")
+if app_directory not in sys.path:
+    sys.path.append(app_directory)
+
+from optimizer.slim_optimizer_base import load_solution  # noqa: E402
+from optimizer.slim_optimizer_main import create_opt  # noqa: E402
+
+
+class TestWarmStart(TestCase):
+    def setUp(self):
+        log.info("Testing: " + self.__class__.__name__ + " " + self._testMethodName + "----------")
+
+    def tearDown(self):
+        pass
+
+    def _build(self, data_filename, opt_name):
+        path_to_file = os.path.join(app_directory, "examples", data_filename)
+        with open(path_to_file, "r") as f:
+            input_dict = json.load(f)
+
+        opt, _ = create_opt(input_dict, opt_name)
+        opt.build()
+        return opt
+
+    def test_knapsack_repairs_over_allocation(self):
+        # every possible allocation at once breaks the budgets...the warm start must be repaired to be feasible
+        opt = self._build("fanOutKnapsack_ifNot.json", "KnapsackViz")
+        model = opt._model
+        allocations = {}
+        for (r_id, a_id) in model.get_model().r_a_arcs:
+            allocations.setdefault(model._res_id_to_name[r_id], []).append(model._act_id_to_name[a_id])
+
+        self.assertTrue(model.warm_start({"allocations": allocations}))
+        self.assertTrue(model.is_feasible())
+        self.assertGreater(model.get_objective_value(), 0)
+
+    def test_knapsack_unknown_names(self):
+        opt = self._build("simpleKnapsack.json", "KnapsackViz")
+        self.assertFalse(opt._model.warm_start({"allocations": {"no_such_resource": ["no_such_activity"]}}))
+
+    def test_knapsack_from_allocated_amt(self):
+        opt = self._build("simpleKnapsack.json", "KnapsackViz")
+        previous = {"allocated_amt": {"backpack_Resource_instance_0": {"item_Activity_instance_0": {"space": 1}}}}
+        self.assertTrue(opt._model.warm_start(previous))
+        self.assertEqual(opt._model.get_objective_value(), 1)
+
+    def test_knapsack_keeps_solver_solution(self):
+        # the warm start is feasible (objective 2) but not optimal...the solve must keep the optimum of the solver
+        opt = self._build("multiBudgetKnapsack.json", "KnapsackViz")
+        previous = {"allocations": {"node_Resource_instance_1": ["job_Activity_instance_2"]}}
+        self.assertTrue(opt._model.warm_start(previous))
+        self.assertEqual(opt._model.get_objective_value(), 2)
+
+        opt.solve(warm_start=previous)
+        self.assertEqual(opt._model._termination_condition, "optimal")
+        self.assertEqual(opt._model.get_objective_value(), 4)
+
+    def test_full_house_repairs_over_allocation(self):
+        opt = self._build("AlienWorldDomination_wShip.json", "FullHouseViz")
+        data = opt._model._data
+        allocations = {}
+        allocations.update({name: list(acts) for name, acts in data["parent_possible_allocations"].items()})
+        allocations.update({name: list(acts) for name, acts in data["child_possible_allocations"].items()})
+
+        self.assertTrue(opt._model.warm_start({"allocations": allocations}))
+        self.assertTrue(opt._model.is_feasible())
+
+    def test_invalid_solution_id(self):
+        with self.assertRaises(ValueError):
+            load_solution("../etc")
+        with self.assertRaises(ValueError):
+            load_solution("no_such_solution")
+
+
+if __name__ == "__main__":
+    # FOR DEBUGGING USE...
+    log = logging.getLogger()
+    log.level = logging.DEBUG
+    stream_handler = logging.StreamHandler(sys.stdout)
+    log.addHandler(stream_handler)
+
+    unittest.main()